@@ -0,0 +1,61 @@
+"""
+Histograma do Prometheus que aceita um lote de observações de uma vez.
+
+O `Histogram` do prometheus_client só tem `observe(valor)`: um lote de N alunos
+custaria N chamadas em Python, cada uma com o seu lock. Aqui as contagens ficam
+em um array do numpy: `observar_lote` distribui todos os valores nos baldes com
+um `searchsorted` + `bincount` e atualiza contagens e soma juntas, sob um único
+lock. A exposição usa a API pública de coletores (`HistogramMetricFamily`), com
+os mesmos nomes de série do `Histogram` (_bucket, _count, _sum).
+"""
+import math
+import threading
+
+import numpy as np
+from prometheus_client import REGISTRY, Histogram
+from prometheus_client.metrics_core import HistogramMetricFamily
+from prometheus_client.utils import floatToGoString
+
+
+class HistogramaLote:
+    """
+    limites: limites superiores dos baldes (padrão: os do `Histogram`); +Inf é sempre incluído
+    registry: onde o coletor é registrado (None = não registra)
+    """
+
+    def __init__(self, nome: str, documentacao: str, limites=Histogram.DEFAULT_BUCKETS, registry=REGISTRY):
+        self.nome = nome
+        self.documentacao = documentacao
+        self._limites = np.array(sorted(float(l) for l in limites if not math.isinf(float(l))))
+        # Um balde por limite finito mais o +Inf; contagens não acumuladas
+        self._contagens = np.zeros(len(self._limites) + 1, dtype=np.int64)
+        self._soma = 0.0
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def observe(self, valor: float):
+        self.observar_lote([valor])
+
+    def observar_lote(self, valores):
+        valores = np.asarray(valores, dtype=float).ravel()
+        if not valores.size:
+            return
+        # side="left": valor igual ao limite entra no balde do limite (le = "menor ou igual")
+        contagens = np.bincount(np.searchsorted(self._limites, valores, side="left"),
+                                minlength=len(self._contagens))
+        soma = float(valores.sum())
+        with self._lock:
+            self._contagens += contagens
+            self._soma += soma
+
+    def collect(self):
+        with self._lock:
+            acumuladas = np.cumsum(self._contagens)
+            soma = self._soma
+        rotulos = [floatToGoString(l) for l in self._limites] + ["+Inf"]
+        yield HistogramMetricFamily(
+            self.nome, self.documentacao,
+            buckets=[(rotulo, int(c)) for rotulo, c in zip(rotulos, acumuladas)],
+            sum_value=soma,
+        )
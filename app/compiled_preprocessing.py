@@ -0,0 +1,164 @@
+"""
+Caminho rápido de inferência para um único aluno.
+
+O passo 'preprocessor' do pipeline treinado (ColumnTransformer com SimpleImputer
+e OneHotEncoder, ver src/train.py) é "compilado" no carregamento do modelo em um
+layout fixo de numpy: posição de cada coluna no vetor final, constantes de
+imputação e mapas categoria -> índice do one-hot. Assim uma requisição validada
+vira direto um vetor float32, sem montar DataFrame nem passar pelo ColumnTransformer.
+
+Qualquer estrutura de pipeline que não seja reconhecida faz `compilar_preprocessador`
+devolver None, e a API continua usando o caminho original (pandas + pipeline).
+"""
+import logging
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+logger = logging.getLogger(__name__)
+
+
+def _ausente(valor) -> bool:
+    return valor is None or (isinstance(valor, float) and valor != valor)
+
+
+class PreprocessadorCompilado:
+    """
+    Versão "achatada" do ColumnTransformer treinado.
+
+    numericas: lista de (posição no vetor, coluna, valor de imputação)
+    categoricas: lista de (coluna, valor de imputação, {categoria: posição no vetor})
+    """
+
+    def __init__(self, numericas, categoricas, n_saida, classificador):
+        self.numericas = numericas
+        self.categoricas = categoricas
+        self.n_saida = n_saida
+        self.classificador = classificador
+        self.colunas = [c for _, c, _ in numericas] + [c for c, _, _ in categoricas]
+
+    def vetorizar(self, registro: dict) -> np.ndarray:
+        """Converte um aluno (dict coluna -> valor já normalizado) em uma matriz float32 (1, n)."""
+        vetor = np.zeros((1, self.n_saida), dtype=np.float32)
+        linha = vetor[0]
+        for posicao, coluna, imputacao in self.numericas:
+            valor = registro[coluna]
+            linha[posicao] = imputacao if _ausente(valor) else valor
+        for coluna, imputacao, mapa in self.categoricas:
+            valor = registro[coluna]
+            if _ausente(valor):
+                valor = imputacao
+            # handle_unknown='ignore': categoria desconhecida vira um bloco de zeros
+            posicao = mapa.get(valor)
+            if posicao is not None:
+                linha[posicao] = 1.0
+        return vetor
+
+    def predict_proba(self, registro: dict) -> np.ndarray:
+        return self.classificador.predict_proba(self.vetorizar(registro))
+
+
+def _imputer_suportado(imputer) -> bool:
+    return (
+        isinstance(imputer, SimpleImputer)
+        and not imputer.add_indicator
+        and _ausente(imputer.missing_values)
+        and hasattr(imputer, "statistics_")
+    )
+
+
+def _colunas_mantidas(imputer, colunas):
+    """SimpleImputer descarta colunas sem nenhum valor observado no treino (estatística NaN)."""
+    mantidas = []
+    for coluna, estatistica in zip(colunas, imputer.statistics_):
+        if _ausente(estatistica) and not imputer.keep_empty_features:
+            continue
+        if _ausente(estatistica):
+            estatistica = 0
+        mantidas.append((coluna, estatistica))
+    return mantidas
+
+
+def _compilar_numerico(transformer, colunas, inicio):
+    steps = transformer.steps if isinstance(transformer, Pipeline) else [("imputer", transformer)]
+    if len(steps) != 1 or not _imputer_suportado(steps[0][1]):
+        return None
+    imputer = steps[0][1]
+    return [
+        (inicio + i, coluna, float(estatistica))
+        for i, (coluna, estatistica) in enumerate(_colunas_mantidas(imputer, colunas))
+    ]
+
+
+def _compilar_categorico(transformer, colunas, inicio):
+    if not isinstance(transformer, Pipeline) or len(transformer.steps) != 2:
+        return None, inicio
+    imputer, encoder = transformer.steps[0][1], transformer.steps[1][1]
+    if not _imputer_suportado(imputer) or not isinstance(encoder, OneHotEncoder):
+        return None, inicio
+    if (
+        encoder.handle_unknown != "ignore"
+        or encoder.drop is not None
+        or getattr(encoder, "_infrequent_enabled", False)
+    ):
+        return None, inicio
+
+    mantidas = _colunas_mantidas(imputer, colunas)
+    if len(mantidas) != len(encoder.categories_):
+        return None, inicio
+
+    categoricas = []
+    posicao = inicio
+    for (coluna, moda), categorias in zip(mantidas, encoder.categories_):
+        mapa = {}
+        for categoria in categorias:
+            mapa[categoria] = posicao
+            posicao += 1
+        categoricas.append((coluna, moda, mapa))
+    return categoricas, posicao
+
+
+def compilar_preprocessador(modelo):
+    """
+    Compila o pipeline treinado (preprocessor + classifier) para o caminho rápido.
+    Retorna None quando o modelo não tem a estrutura esperada.
+    """
+    if not isinstance(modelo, Pipeline) or "preprocessor" not in modelo.named_steps:
+        return None
+    preprocessor = modelo.named_steps["preprocessor"]
+    classificador = modelo.steps[-1][1]
+    if len(modelo.steps) != 2 or not isinstance(preprocessor, ColumnTransformer):
+        return None
+    if not hasattr(preprocessor, "transformers_"):
+        return None
+
+    numericas, categoricas = [], []
+    posicao = 0
+    for _, transformer, colunas in preprocessor.transformers_:
+        if transformer == "drop" or len(colunas) == 0:
+            continue
+        if isinstance(transformer, str):
+            # 'passthrough' e afins não são compilados
+            return None
+        colunas = list(colunas)
+        ultimo_passo = transformer.steps[-1][1] if isinstance(transformer, Pipeline) else transformer
+        if isinstance(ultimo_passo, OneHotEncoder):
+            compilado, posicao = _compilar_categorico(transformer, colunas, posicao)
+            if compilado is None:
+                return None
+            categoricas.extend(compilado)
+        else:
+            compilado = _compilar_numerico(transformer, colunas, posicao)
+            if compilado is None:
+                return None
+            numericas.extend(compilado)
+            posicao += len(compilado)
+
+    if getattr(classificador, "n_features_in_", None) != posicao:
+        logger.warning("Preprocessador compilado com largura diferente da esperada pelo classificador.")
+        return None
+
+    return PreprocessadorCompilado(numericas, categoricas, posicao, classificador)
@@ -15,8 +15,115 @@ def _get_float(key: str, default: float) -> float:
         return default
 
 
+def _get_int(key: str, default: int) -> int:
+    raw = os.getenv(key)
+    if raw is None or raw == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+def _get_bool(key: str, default: bool) -> bool:
+    raw = os.getenv(key)
+    if raw is None or raw == "":
+        return default
+    return raw.strip().lower() in ("1", "true", "sim", "yes", "on")
+
+
 # String de conexão do MLflow (ex: sqlite:///mlflow.db ou http://host:5000)
 MLFLOW_TRACKING_URI: str = os.getenv("MLFLOW_TRACKING_URI", "sqlite:///mlflow.db")
 
 # Limiar de probabilidade para classificar como risco (0.0 a 1.0)
 LIMIAR_FIXO: float = _get_float("LIMIAR_FIXO", 0.40)
+# Recall desejado: o treino recomenda o maior limiar que o atinge nas probabilidades fora da amostra
+RECALL_ALVO: float = _get_float("RECALL_ALVO", 0.90)
+# Importância por permutação na avaliação: rodadas (0 desliga) e tempo máximo em segundos
+IMPORTANCIA_REPETICOES: int = _get_int("IMPORTANCIA_REPETICOES", 10)
+IMPORTANCIA_ORCAMENTO_SEGUNDOS: float = _get_float("IMPORTANCIA_ORCAMENTO_SEGUNDOS", 60.0)
+# Compactação da floresta (treino completo e retreino sem_busca): liga/desliga, queda máxima de recall e F1 out-of-bag
+# aceita e menor profundidade testada na poda das árvores (0 = sem poda de profundidade)
+COMPACTAR_FLORESTA: bool = _get_bool("COMPACTAR_FLORESTA", True)
+COMPACTACAO_TOLERANCIA: float = _get_float("COMPACTACAO_TOLERANCIA", 0.01)
+COMPACTACAO_PROFUNDIDADE_MINIMA: int = _get_int("COMPACTACAO_PROFUNDIDADE_MINIMA", 0)
+# Reamostragens do bootstrap para os intervalos de confiança das métricas de teste (0 desliga)
+BOOTSTRAP_REAMOSTRAGENS: int = _get_int("BOOTSTRAP_REAMOSTRAGENS", 2000)
+
+# Quantidade máxima de alunos aceitos em uma única chamada ao /predict/batch
+TAMANHO_MAX_LOTE: int = _get_int("TAMANHO_MAX_LOTE", 5000)
+
+# Usa o pré-processamento compilado (numpy) no /predict em vez de pandas + ColumnTransformer
+PREPROCESSAMENTO_COMPILADO: bool = _get_bool("PREPROCESSAMENTO_COMPILADO", True)
+
+# Motor de avaliação do RandomForest: "sklearn" (padrão) ou "compilado" (app/forest_engine.py)
+MOTOR_FLORESTA: str = os.getenv("MOTOR_FLORESTA", "sklearn").strip().lower()
+
+# Cache de predições em memória: quantidade máxima de alunos (0 desliga) e validade em segundos
+CACHE_PREDICOES_TAMANHO: int = _get_int("CACHE_PREDICOES_TAMANHO", 10000)
+CACHE_PREDICOES_TTL_SEGUNDOS: float = _get_float("CACHE_PREDICOES_TTL_SEGUNDOS", 3600.0)
+
+# Cache local (em disco) das versões de modelo resolvidas no MLflow; vazio desliga
+CACHE_MODELOS_DIR: str = os.getenv("CACHE_MODELOS_DIR", "app/model/cache")
+CACHE_MODELOS_MAX_VERSOES: int = _get_int("CACHE_MODELOS_MAX_VERSOES", 3)
+
+# Modelo usado na inicialização quando nem o cache local nem o MLflow estão disponíveis
+MODELO_FALLBACK_PATH: str = os.getenv("MODELO_FALLBACK_PATH", "app/model/modelo.pkl")
+
+# Workers do uvicorn (o próprio uvicorn lê a mesma variável). Com mais de um, /reload e /retrain
+# são recusados: recarga, fila de treinos, cache de predições e métricas são de cada processo
+WEB_CONCURRENCY: int = _get_int("WEB_CONCURRENCY", 1)
+
+# Vários workers: serve a cópia do modelo com a floresta em mmap (compartilhada entre processos)
+MODELO_COMPARTILHADO: bool = _get_bool("MODELO_COMPARTILHADO", False)
+
+# Executor de inferência do /predict/batch: "thread" (padrão) ou "processos" (pool com o modelo pré-carregado)
+EXECUTOR_INFERENCIA: str = os.getenv("EXECUTOR_INFERENCIA", "thread").strip().lower()
+EXECUTOR_PROCESSOS: int = _get_int("EXECUTOR_PROCESSOS", 2)
+# Linhas por bloco enviado a um processo, máximo de blocos pendentes e tamanho mínimo de lote para usar o pool
+EXECUTOR_TAMANHO_BLOCO: int = _get_int("EXECUTOR_TAMANHO_BLOCO", 1000)
+EXECUTOR_FILA_MAX: int = _get_int("EXECUTOR_FILA_MAX", 64)
+EXECUTOR_MIN_LINHAS: int = _get_int("EXECUTOR_MIN_LINHAS", 2000)
+
+# Logging: arquivo (rotacionado por tamanho), formato "json" ou "texto" e escrita em thread separada
+LOG_ARQUIVO: str = os.getenv("LOG_ARQUIVO", "logs/api_events.log")
+LOG_FORMATO: str = os.getenv("LOG_FORMATO", "json").strip().lower()
+LOG_ASSINCRONO: bool = _get_bool("LOG_ASSINCRONO", True)
+LOG_MAX_BYTES: int = _get_int("LOG_MAX_BYTES", 10_000_000)
+LOG_BACKUPS: int = _get_int("LOG_BACKUPS", 5)
+LOG_FILA_MAX: int = _get_int("LOG_FILA_MAX", 10000)
+
+# Fração das predições individuais registradas no log com os dados do aluno (0.0 a 1.0)
+AMOSTRAGEM_LOG_PREDICOES: float = _get_float("AMOSTRAGEM_LOG_PREDICOES", 1.0)
+
+# Cache colunar (Parquet) dos CSVs do PEDE já parseados, usado pelo treino; vazio desliga
+CACHE_DADOS_DIR: str = os.getenv("CACHE_DADOS_DIR", "files/cache")
+
+# Drift: alunos na janela deslizante, baldes da janela e mínimo de alunos para calcular PSI/KS
+DRIFT_JANELA: int = _get_int("DRIFT_JANELA", 5000)
+DRIFT_BALDES: int = _get_int("DRIFT_BALDES", 5)
+DRIFT_MIN_AMOSTRAS: int = _get_int("DRIFT_MIN_AMOSTRAS", 200)
+# Referência de drift usada quando o modelo carregado não traz a sua (modelos treinados antes dela)
+DRIFT_REFERENCIA_PATH: str = os.getenv("DRIFT_REFERENCIA_PATH", "app/model/referencia_drift.json")
+
+# Busca de hiperparâmetros do treino: "aleatoria" (RandomizedSearchCV) ou "halving" (successive halving)
+ESTRATEGIA_BUSCA: str = os.getenv("ESTRATEGIA_BUSCA", "aleatoria").strip().lower()
+# Roda também a outra estratégia, em runs aninhadas do MLflow, para comparar tempo e recall (o
+# modelo servido continua o de ESTRATEGIA_BUSCA; o treino fica ~2x mais longo)
+COMPARAR_BUSCAS: bool = _get_bool("COMPARAR_BUSCAS", False)
+
+# Retreino: "completo" (com busca), "sem_busca" (hiperparâmetros do modelo de produção) ou "incremental" (warm start)
+MODOS_RETREINO = ("completo", "sem_busca", "incremental")
+MODO_RETREINO: str = os.getenv("MODO_RETREINO", "completo").strip().lower()
+# Árvores acrescentadas ao modelo de produção no modo incremental
+ARVORES_INCREMENTAIS: int = _get_int("ARVORES_INCREMENTAIS", 100)
+# Portão de qualidade: queda máxima de recall (conjunto de teste) aceita para registrar o novo modelo
+TOLERANCIA_RECALL: float = _get_float("TOLERANCIA_RECALL", 0.01)
+
+# Orçamento de CPU do treino: núcleos da busca de hiperparâmetros (padrão: metade dos núcleos,
+# deixando o restante para as predições; 0 ou -1 = todos, por opção explícita) e
+# incremento de nice do worker de treino da API (prioridade menor que a das predições)
+TREINO_NUCLEOS: int = _get_int("TREINO_NUCLEOS", max(1, (os.cpu_count() or 1) // 2))
+TREINO_NICE: int = _get_int("TREINO_NICE", 10)
+# Jobs de treino encerrados mantidos para consulta em /retrain/{job_id}
+TREINO_HISTORICO_MAX: int = _get_int("TREINO_HISTORICO_MAX", 50)
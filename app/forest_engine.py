@@ -0,0 +1,198 @@
+"""
+Motor de inferência opcional para o RandomForest treinado em src/train.py.
+
+O predict_proba do sklearn percorre as árvores em um loop Python (uma chamada por
+estimador). Aqui a floresta inteira é "achatada" em arrays contíguos e compactos:
+
+- feature:   índice da feature testada em cada nó (int16 quando possível)
+- limiar:    limiar do nó em float32, arredondado para baixo de forma que
+             `x <= limiar32` seja exatamente equivalente ao `x <= limiar64` do sklearn
+             (X já é convertido para float32 pelo próprio sklearn)
+- filhos:    filhos de cada nó intercalados [esquerdo, direito] (índices globais int32)
+- folha:     marca os nós folha
+- valores:   probabilidade de cada classe já normalizada em cada nó (n_classes, n_nos)
+
+Todas as árvores e linhas avançam juntas, um nível por iteração, com indexação
+vetorizada do numpy; pares (árvore, linha) que já chegaram a uma folha saem do
+conjunto ativo. As probabilidades são somadas árvore a árvore, na mesma ordem do
+sklearn, portanto o resultado é numericamente idêntico.
+"""
+import logging
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+
+logger = logging.getLogger(__name__)
+
+# Linhas processadas por vez (limita a matriz linhas x árvores em memória)
+TAMANHO_BLOCO = 4096
+
+ARRAYS = ("feature", "limiar", "filhos", "folha", "nan_esquerda", "valores", "raizes")
+
+
+def _limiar_float32(limiar64: np.ndarray) -> np.ndarray:
+    """Maior float32 <= limiar64, preservando a comparação `x32 <= limiar64`."""
+    limiar32 = limiar64.astype(np.float32)
+    acima = limiar32.astype(np.float64) > limiar64
+    limiar32[acima] = np.nextafter(limiar32[acima], np.float32(-np.inf))
+    return limiar32
+
+
+class FlorestaCompilada(ClassifierMixin, BaseEstimator):
+    """
+    Floresta em arrays planos, com a mesma interface predict_proba do sklearn.
+    Pode substituir o 'classifier' de um Pipeline treinado.
+
+    floresta: RandomForestClassifier (não treinado) com os hiperparâmetros; `fit`
+    treina um clone dele e compila o resultado. `de_sklearn` compila uma floresta
+    já treinada e guarda só um clone sem árvores dela como parâmetro.
+    """
+
+    def __init__(self, floresta=None):
+        self.floresta = floresta
+
+    @property
+    def n_arvores(self) -> int:
+        return len(self.raizes)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, nome).nbytes for nome in ARRAYS)
+
+    @classmethod
+    def de_sklearn(cls, floresta: RandomForestClassifier) -> "FlorestaCompilada":
+        compilada = cls(floresta=clone(floresta))
+        compilada._compilar(floresta)
+        return compilada
+
+    def fit(self, X, y, **fit_params):
+        base = self.floresta if self.floresta is not None else RandomForestClassifier()
+        self._compilar(clone(base).fit(X, y, **fit_params))
+        return self
+
+    def _compilar(self, floresta: RandomForestClassifier):
+        arvores = [estimador.tree_ for estimador in floresta.estimators_]
+        n_nos = np.array([arvore.node_count for arvore in arvores])
+        raizes = np.concatenate([[0], np.cumsum(n_nos)[:-1]]).astype(np.int32)
+        total = int(n_nos.sum())
+        n_classes = len(floresta.classes_)
+
+        tipo_feature = np.int16 if floresta.n_features_in_ < np.iinfo(np.int16).max else np.int32
+        feature = np.zeros(total, dtype=tipo_feature)
+        limiar = np.zeros(total, dtype=np.float32)
+        filhos = np.zeros((total, 2), dtype=np.int32)
+        folha = np.zeros(total, dtype=bool)
+        nan_esquerda = np.zeros(total, dtype=bool)
+        valores = np.zeros((n_classes, total), dtype=np.float64)
+
+        for inicio, arvore in zip(raizes, arvores):
+            fim = inicio + arvore.node_count
+            nos = np.arange(inicio, fim, dtype=np.int32)
+            e_folha = arvore.children_left == -1
+
+            folha[inicio:fim] = e_folha
+            feature[inicio:fim] = np.where(e_folha, 0, arvore.feature)
+            limiar[inicio:fim] = np.where(e_folha, np.float32(0), _limiar_float32(arvore.threshold))
+            filhos[inicio:fim, 0] = np.where(e_folha, nos, arvore.children_left + inicio)
+            filhos[inicio:fim, 1] = np.where(e_folha, nos, arvore.children_right + inicio)
+            faltantes = getattr(arvore, "missing_go_to_left", None)
+            if faltantes is not None:
+                nan_esquerda[inicio:fim] = faltantes.astype(bool)
+
+            # Mesma normalização de DecisionTreeClassifier.predict_proba
+            proba = arvore.value[:, 0, :n_classes].astype(np.float64)
+            normalizador = proba.sum(axis=1, keepdims=True)
+            normalizador[normalizador == 0.0] = 1.0
+            valores[:, inicio:fim] = (proba / normalizador).T
+
+        self.feature = feature
+        self.limiar = limiar
+        self.filhos = filhos.ravel()
+        self.folha = folha
+        self.nan_esquerda = nan_esquerda
+        self.valores = valores
+        self.raizes = raizes
+        self.classes_ = floresta.classes_
+        self.n_features_in_ = int(floresta.n_features_in_)
+
+    def folhas(self, X) -> np.ndarray:
+        """Índice global da folha alcançada por cada linha em cada árvore: (n_arvores, n_linhas)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_linhas, n_features = X.shape
+        x_plano = X.ravel()
+        tem_nan = bool(np.isnan(x_plano).any())
+
+        # Pares (árvore, linha) em ordem árvore-major: vizinhos consultam os mesmos nós
+        nos = np.repeat(self.raizes, n_linhas)
+        base = np.tile(np.arange(n_linhas, dtype=np.int64) * n_features, self.n_arvores)
+        ativos = np.flatnonzero(~self.folha.take(nos))
+        while ativos.size:
+            atuais = nos.take(ativos)
+            valores_x = x_plano.take(base.take(ativos) + self.feature.take(atuais))
+            direcao = valores_x > self.limiar.take(atuais)
+            if tem_nan:
+                direcao = np.where(np.isnan(valores_x), ~self.nan_esquerda.take(atuais), direcao)
+            proximos = self.filhos.take(2 * atuais + direcao)
+            nos[ativos] = proximos
+            ativos = ativos[~self.folha.take(proximos)]
+        return nos.reshape(self.n_arvores, n_linhas)
+
+    def predict_proba(self, X) -> np.ndarray:
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"Esperado X com {self.n_features_in_} features, recebido shape {X.shape}."
+            )
+        saida = np.empty((X.shape[0], self.valores.shape[0]), dtype=np.float64)
+        for inicio in range(0, X.shape[0], TAMANHO_BLOCO):
+            folhas = self.folhas(X[inicio:inicio + TAMANHO_BLOCO])
+            for classe, valores_classe in enumerate(self.valores):
+                # Soma no eixo das árvores (eixo 0): acumulação sequencial, como no sklearn
+                saida[inicio:inicio + folhas.shape[1], classe] = valores_classe.take(folhas).sum(axis=0)
+        saida /= self.n_arvores
+        return saida
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def compilar_floresta(classificador):
+    """
+    Achata um RandomForestClassifier treinado. Retorna None para qualquer outro
+    estimador (a API continua usando o predict_proba do sklearn).
+    """
+    if isinstance(classificador, FlorestaCompilada):
+        return classificador
+    if not isinstance(classificador, RandomForestClassifier):
+        return None
+    if not hasattr(classificador, "estimators_") or classificador.n_outputs_ != 1:
+        return None
+    floresta = FlorestaCompilada.de_sklearn(classificador)
+    logger.info(
+        f"Floresta compilada: {floresta.n_arvores} árvores, {len(floresta.folha)} nós, "
+        f"{floresta.nbytes / 1e6:.1f} MB em arrays."
+    )
+    return floresta
+
+
+def pipeline_com_floresta_compilada(modelo):
+    """
+    Cópia rasa do pipeline treinado com o RandomForest trocado pela FlorestaCompilada.
+    Serializado com joblib, os arrays da floresta podem ser abertos com mmap_mode='r'
+    (o Tree do sklearn sempre copia os nós para memória própria ao ser desserializado).
+    Retorna None se o modelo não for um Pipeline terminado em RandomForestClassifier.
+    """
+    if not isinstance(modelo, Pipeline):
+        return None
+    floresta = compilar_floresta(modelo.steps[-1][1])
+    if floresta is None:
+        return None
+    servico = Pipeline(modelo.steps[:-1] + [(modelo.steps[-1][0], floresta)])
+    # Referência de drift gravada no treino (src/train.py) acompanha o modelo
+    if hasattr(modelo, "referencia_drift_"):
+        servico.referencia_drift_ = modelo.referencia_drift_
+    return servico
@@ -0,0 +1,172 @@
+"""
+Executor de inferência para lotes grandes.
+
+As rotas da API são síncronas e o FastAPI as executa no thread pool padrão; ali
+as chamadas de predict_proba (CPU) disputam o GIL. No modo "processos" os lotes
+grandes são divididos em blocos de linhas e pontuados em paralelo por um pool
+de processos, em que cada processo recebe o modelo uma única vez (no
+initializer) e o mantém em memória. Os blocos voltam na ordem original.
+
+No modo "thread" (padrão) nada muda: a predição roda na própria thread da requisição.
+Este módulo é importado pelos processos filhos (spawn), por isso não importa app.routes.
+"""
+import logging
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODOS = ("thread", "processos")
+
+# Modelo carregado em cada processo do pool
+_modelo_processo = None
+
+
+def _inicializar_processo(modelo_serializado: bytes):
+    global _modelo_processo
+    _modelo_processo = pickle.loads(modelo_serializado)
+
+
+def _predict_proba_bloco(bloco):
+    return np.asarray(_modelo_processo.predict_proba(bloco))
+
+
+def _pronto() -> bool:
+    return _modelo_processo is not None
+
+
+class ExecutorSaturado(Exception):
+    """A fila de blocos pendentes do pool está cheia (a API responde 503)."""
+
+
+class ExecutorInferencia:
+    """
+    modo: "thread" ou "processos"
+    n_processos: tamanho do pool
+    tamanho_bloco: linhas por tarefa enviada a um processo
+    fila_max: máximo de blocos pendentes no pool (somando todas as requisições)
+    min_linhas: lotes menores que isso rodam na thread (o custo de IPC não compensa)
+    """
+
+    def __init__(self, modo: str, n_processos: int, tamanho_bloco: int, fila_max: int, min_linhas: int):
+        if modo not in MODOS:
+            logger.warning(f"EXECUTOR_INFERENCIA '{modo}' desconhecido; usando 'thread'.")
+            modo = "thread"
+        self.modo = modo
+        self.n_processos = max(int(n_processos), 1)
+        self.tamanho_bloco = max(int(tamanho_bloco), 1)
+        self.fila_max = max(int(fila_max), 1)
+        self.min_linhas = int(min_linhas)
+        self._pool = None
+        self._origem = None
+        self._pendentes = 0
+        # Requisições usando cada pool: um pool substituído só é encerrado quando a última termina
+        self._em_uso = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pendentes(self) -> int:
+        return self._pendentes
+
+    def carregar(self, origem, preditor=None):
+        """
+        Recria o pool com um novo modelo. `origem` é o modelo servido pela API (usado
+        para saber se uma requisição ainda é da versão carregada); `preditor` é o
+        objeto enviado aos processos (padrão: o próprio modelo).
+        """
+        if self.modo != "processos":
+            return
+        preditor = origem if preditor is None else preditor
+        try:
+            modelo_serializado = pickle.dumps(preditor, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.warning(f"Modelo não serializável para o pool de inferência; usando a thread: {e}")
+            self.encerrar()
+            return
+        # spawn: os processos não herdam as threads/locks do servidor
+        pool = ProcessPoolExecutor(
+            max_workers=self.n_processos,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_inicializar_processo,
+            initargs=(modelo_serializado,),
+        )
+        for _ in range(self.n_processos):
+            pool.submit(_pronto)  # sobe os processos já com o modelo carregado
+        with self._lock:
+            antigo, self._pool, self._origem = self._pool, pool, origem
+            livre = antigo not in self._em_uso
+        if antigo is not None and livre:
+            antigo.shutdown(wait=False)
+        logger.info(
+            f"Pool de inferência com {self.n_processos} processos "
+            f"({len(modelo_serializado) / 1e6:.1f} MB de modelo por processo)."
+        )
+
+    def aceita(self, origem, n_linhas: int) -> bool:
+        """Indica se o lote deve ir para o pool (modelo atual e tamanho mínimo)."""
+        return (
+            self._pool is not None
+            and origem is self._origem
+            and n_linhas >= max(self.min_linhas, 1)
+        )
+
+    def predict_proba(self, X) -> np.ndarray:
+        """predict_proba de X (DataFrame ou array) dividido em blocos pelo pool, na ordem original."""
+        n_linhas = len(X)
+        inicios = range(0, n_linhas, self.tamanho_bloco)
+        with self._lock:
+            pool = self._pool
+            if pool is None:
+                raise RuntimeError("Pool de inferência não iniciado.")
+            if self._pendentes + len(inicios) > self.fila_max:
+                raise ExecutorSaturado(
+                    f"Fila do pool de inferência cheia ({self._pendentes} blocos pendentes, máximo {self.fila_max})."
+                )
+            self._pendentes += len(inicios)
+            # Todos os blocos vão para o mesmo pool (mesmo modelo), mesmo que ele seja substituído no meio
+            self._em_uso[pool] = self._em_uso.get(pool, 0) + 1
+
+        try:
+            futuros = []
+            try:
+                for inicio in inicios:
+                    fim = inicio + self.tamanho_bloco
+                    bloco = X.iloc[inicio:fim] if hasattr(X, "iloc") else X[inicio:fim]
+                    futuro = pool.submit(_predict_proba_bloco, bloco)
+                    futuro.add_done_callback(self._liberar)
+                    futuros.append(futuro)
+            finally:
+                # Blocos que não chegaram a ser enviados não ocupam a fila
+                nao_enviados = len(inicios) - len(futuros)
+                if nao_enviados:
+                    with self._lock:
+                        self._pendentes -= nao_enviados
+            return np.vstack([futuro.result() for futuro in futuros])
+        finally:
+            self._devolver(pool)
+
+    def _liberar(self, _futuro):
+        with self._lock:
+            self._pendentes -= 1
+
+    def _devolver(self, pool):
+        """Fim de uma requisição no `pool`; encerra o pool se ele já foi substituído e ninguém mais o usa."""
+        with self._lock:
+            self._em_uso[pool] -= 1
+            if self._em_uso[pool]:
+                return
+            del self._em_uso[pool]
+            substituido = pool is not self._pool
+        if substituido:
+            pool.shutdown(wait=False)
+
+    def encerrar(self):
+        with self._lock:
+            pool, self._pool, self._origem = self._pool, None, None
+            livre = pool not in self._em_uso
+        if pool is not None and livre:
+            pool.shutdown(wait=False, cancel_futures=True)
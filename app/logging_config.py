@@ -0,0 +1,182 @@
+"""
+Configuração de logging da API.
+
+As requisições só enfileiram o LogRecord (QueueHandler); a formatação e a escrita
+em disco acontecem em uma thread separada (ListenerEmLotes), fora do caminho da
+requisição. No arquivo cada evento vira uma linha JSON compacta, que o Promtail
+interpreta sem regex, e o arquivo é rotacionado por tamanho.
+
+Campos estruturados são passados com `extra={"campos": {...}}`:
+    logger.info("predicao", extra={"campos": {"risco": 1, "probabilidade": 0.73}})
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+from prometheus_client import Counter
+
+FORMATO_TEXTO = "%(asctime)s | %(levelname)s | %(message)s"
+
+LOGS_DESCARTADOS = Counter(
+    'logs_descartados_total', 'Eventos de log descartados porque a fila de logging estava cheia'
+)
+
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por evento: ts, nivel, logger, mensagem e os `campos` extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        evento = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage(),
+        }
+        campos = getattr(record, "campos", None)
+        if campos:
+            evento.update(campos)
+        if record.exc_info:
+            evento["excecao"] = self.formatException(record.exc_info)
+        return json.dumps(evento, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class FormatadorTexto(logging.Formatter):
+    """Formato legível de sempre, com os `campos` extras no fim da linha."""
+
+    def __init__(self):
+        super().__init__(FORMATO_TEXTO)
+
+    def format(self, record: logging.LogRecord) -> str:
+        linha = super().format(record)
+        campos = getattr(record, "campos", None)
+        if campos:
+            linha += " | " + " | ".join(f"{chave}: {valor}" for chave, valor in campos.items())
+        return linha
+
+
+class QueueHandlerDescartavel(logging.handlers.QueueHandler):
+    """
+    Enfileira o registro sem formatá-lo (a formatação fica com o listener) e, com a
+    fila cheia, descarta o evento em vez de bloquear a requisição.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOGS_DESCARTADOS.inc()
+
+
+class ListenerEmLotes:
+    """
+    Thread que esvazia a fila de logging em lotes: espera o primeiro registro com
+    `get(timeout=intervalo)`, grava tudo o que acumulou (até `lote_max`) e aguarda
+    `intervalo` segundos antes do próximo lote. Acordar a cada evento faria a thread
+    de logging disputar o GIL com as requisições a todo momento; em lotes a disputa
+    é bem menor. Cada handler só recebe registros do seu nível para cima.
+    """
+
+    def __init__(self, fila, *handlers, intervalo: float = 0.05, lote_max: int = 1000):
+        self.fila = fila
+        self.handlers = handlers
+        self.intervalo = intervalo
+        self.lote_max = lote_max
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="logging-em-lotes", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Grava o que ainda está na fila e encerra a thread. Pode ser chamado mais de uma vez."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._parar.set()
+            thread.join()
+
+    def _executar(self):
+        while True:
+            try:
+                registros = [self.fila.get(timeout=self.intervalo)]
+            except queue.Empty:
+                if self._parar.is_set():
+                    return
+                continue
+            while len(registros) < self.lote_max:
+                try:
+                    registros.append(self.fila.get_nowait())
+                except queue.Empty:
+                    break
+            for registro in registros:
+                self._gravar(registro)
+            # Acumula o próximo lote; stop() interrompe a espera e a fila é esvaziada antes de sair
+            self._parar.wait(self.intervalo)
+
+    def _gravar(self, registro: logging.LogRecord):
+        for handler in self.handlers:
+            if registro.levelno >= handler.level:
+                handler.handle(registro)
+
+
+def configurar_logging(
+    arquivo: str,
+    formato: str = "json",
+    assincrono: bool = True,
+    max_bytes: int = 10_000_000,
+    backups: int = 5,
+    fila_max: int = 10_000,
+    console: bool = True,
+    forcar: bool = False,
+):
+    """
+    Configura o logger raiz. Retorna o ListenerEmLotes (modo assíncrono) ou None.
+    `max_bytes <= 0` desliga a rotação; `forcar` substitui handlers já existentes.
+    """
+    if logging.root.handlers and not forcar:
+        # Mesmo comportamento do logging.basicConfig: logging já configurado não é alterado
+        return None
+    pasta = os.path.dirname(arquivo)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+
+    formatador = FormatadorJSON() if formato == "json" else FormatadorTexto()
+    if max_bytes > 0:
+        arquivo_handler = logging.handlers.RotatingFileHandler(
+            arquivo, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+        )
+    else:
+        arquivo_handler = logging.FileHandler(arquivo, encoding="utf-8")
+    arquivo_handler.setFormatter(formatador)
+    destinos = [arquivo_handler]
+    if console:
+        # O terminal continua no formato legível
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(FormatadorTexto())
+        destinos.append(console_handler)
+
+    if not assincrono:
+        logging.basicConfig(level=logging.INFO, handlers=destinos, force=forcar)
+        return None
+
+    fila = queue.Queue(maxsize=max(fila_max, 0))
+    logging.basicConfig(level=logging.INFO, handlers=[QueueHandlerDescartavel(fila)], force=forcar)
+    listener = ListenerEmLotes(fila, *destinos)
+    listener.start()
+    # Esvazia a fila no encerramento do processo
+    atexit.register(listener.stop)
+    return listener
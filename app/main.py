@@ -1,27 +1,36 @@
 from fastapi import FastAPI, Request
-from app.routes import router
 from prometheus_fastapi_instrumentator import Instrumentator
 import logging
 import time
-import os
 from dotenv import load_dotenv
 
+# O .env precisa ser lido antes de app.config (importado pelas rotas)
 load_dotenv()
 
-# Cria a pasta de logs se não existir
-os.makedirs("logs", exist_ok=True)
-
-# Configuração profissional do Logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s",
-    handlers=[
-        logging.FileHandler("logs/api_events.log"), # Salva no arquivo para o Promtail ler
-        logging.StreamHandler()                     # Mostra no terminal para você ver
-    ]
+from app.config import (  # noqa: E402
+    LOG_ARQUIVO,
+    LOG_FORMATO,
+    LOG_ASSINCRONO,
+    LOG_MAX_BYTES,
+    LOG_BACKUPS,
+    LOG_FILA_MAX,
+)
+from app.logging_config import configurar_logging  # noqa: E402
+
+# Logging configurado antes das rotas, que já carregam o modelo (e logam) no import.
+# Arquivo em JSON para o Promtail ler, rotacionado por tamanho, escrito em thread separada
+configurar_logging(
+    LOG_ARQUIVO,
+    formato=LOG_FORMATO,
+    assincrono=LOG_ASSINCRONO,
+    max_bytes=LOG_MAX_BYTES,
+    backups=LOG_BACKUPS,
+    fila_max=LOG_FILA_MAX,
 )
 logger = logging.getLogger("API_PassosMagicos")
 
+from app.routes import router  # noqa: E402
+
 # Inicializa a API
 app = FastAPI(
     title="Previsão de Risco",
@@ -43,7 +52,13 @@ async def log_requests(request: Request, call_next):
     process_time = (time.time() - start_time) * 1000
     
     logger.info(
-        f"IP: {request.client.host} | Method: {request.method} | Path: {request.url.path} | "
-        f"Status: {response.status_code} | Time: {process_time:.2f}ms"
+        "requisicao",
+        extra={"campos": {
+            "ip": request.client.host if request.client else None,
+            "metodo": request.method,
+            "rota": request.url.path,
+            "status": response.status_code,
+            "duracao_ms": round(process_time, 2),
+        }},
     )
     return response
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""
+Troca de modelo sem bloquear a API (double buffering).
+
+O /reload apenas agenda a recarga: uma thread em segundo plano carrega a nova
+versão, aquece o modelo com algumas predições de teste e só então o publica
+(uma única atribuição de referência, atômica para as requisições). Enquanto
+isso o modelo antigo continua servindo; se qualquer etapa falhar ele permanece ativo.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+
+class RecarregadorModelo:
+    """
+    carregar(): devolve (modelo, versao) da nova versão, ou (None, versao) se ela já é a
+        ativa: nada é aquecido nem publicado (artefatos, pool e cache de predições ficam como estão)
+    aquecer(modelo, versao): prepara o modelo e valida predições de teste (levanta em caso de falha);
+        o retorno é repassado para ativar
+    ativar(modelo, versao, preparado): publica o modelo para as requisições
+    """
+
+    def __init__(self, carregar, aquecer, ativar, versao_ativa=None):
+        self._carregar = carregar
+        self._aquecer = aquecer
+        self._ativar = ativar
+        self._lock = threading.Lock()
+        self._thread = None
+        self.versao_ativa = versao_ativa
+        self.versao_carregando = None
+        self.ultima_recarga = None
+
+    @property
+    def carregando(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def solicitar(self) -> bool:
+        """Agenda uma recarga. Retorna False se já existe uma em andamento."""
+        with self._lock:
+            if self.carregando:
+                return False
+            self.versao_carregando = "resolvendo"
+            self._thread = threading.Thread(target=self._executar, name="recarga-modelo", daemon=True)
+            self._thread.start()
+            return True
+
+    def aguardar(self, timeout: float = None) -> bool:
+        """Espera a recarga em andamento terminar (usado em testes e scripts)."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return not self.carregando
+
+    def status(self) -> dict:
+        return {
+            "estado": "carregando" if self.carregando else "ocioso",
+            "versao_ativa": self.versao_ativa,
+            "versao_carregando": self.versao_carregando if self.carregando else None,
+            "ultima_recarga": self.ultima_recarga,
+        }
+
+    def _executar(self):
+        inicio = time.perf_counter()
+        registro = {
+            "inicio": datetime.now(timezone.utc).isoformat(),
+            "versao": None,
+            "sucesso": False,
+            "duracao_carga_s": None,
+            "duracao_aquecimento_s": None,
+            "duracao_total_s": None,
+            "erro": None,
+            "inalterada": False,
+        }
+        try:
+            modelo, versao = self._carregar()
+            registro["versao"] = self.versao_carregando = versao
+            registro["duracao_carga_s"] = round(time.perf_counter() - inicio, 3)
+            if modelo is None:
+                registro["sucesso"] = registro["inalterada"] = True
+                logger.info(f"Versão {versao} já está ativa; recarga sem mudança.")
+                return
+
+            inicio_aquecimento = time.perf_counter()
+            preparado = self._aquecer(modelo, versao)
+            registro["duracao_aquecimento_s"] = round(time.perf_counter() - inicio_aquecimento, 3)
+
+            self._ativar(modelo, versao, preparado)
+            self.versao_ativa = versao
+            registro["sucesso"] = True
+            logger.info(f"Modelo versão {versao} ativado após recarga em segundo plano.")
+        except Exception as e:
+            registro["erro"] = str(e)
+            logger.error(f"Falha na recarga do modelo; versão {self.versao_ativa} continua ativa: {e}")
+        finally:
+            registro["duracao_total_s"] = round(time.perf_counter() - inicio, 3)
+            self.ultima_recarga = registro
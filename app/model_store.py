@@ -0,0 +1,228 @@
+"""
+Cache local (em disco) das versões de modelo já resolvidas no MLflow.
+
+Cada modelo é serializado com joblib em um arquivo nomeado pelo próprio sha256
+(endereçamento por conteúdo) e um índice JSON guarda versão -> checksum, além da
+versão ativa. Na inicialização a API carrega direto daqui, sem depender do
+tracking server; o checksum é conferido antes de desserializar o arquivo.
+
+Com vários workers do uvicorn, cada versão também pode ter uma cópia "de serviço"
+(RandomForest trocado pela FlorestaCompilada, ver app/forest_engine.py) aberta com
+mmap_mode='r': os arrays da floresta ficam no page cache do sistema operacional e
+são compartilhados por todos os processos, em vez de uma cópia privada por worker.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import joblib
+
+from app.forest_engine import pipeline_com_floresta_compilada
+
+try:
+    import fcntl
+except ImportError:  # Windows: só a trava entre threads
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_INDICE = "indice.json"
+ARQUIVO_TRAVA = "indice.lock"
+
+
+def sha256_arquivo(caminho: str) -> str:
+    """Checksum sha256 de um arquivo, lido em blocos."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+class CacheModelos:
+    """
+    Diretório com os modelos serializados e o índice:
+    {"atual": "4", "versoes": {"4": {"sha256": "...", "compartilhado": "...", "salvo_em": "..."}}}
+    "sha256" é o modelo completo e "compartilhado" a cópia de serviço (ambos opcionais).
+    Um diretório vazio ("") desliga o cache.
+    """
+
+    def __init__(self, diretorio: str, max_versoes: int = 3):
+        self.diretorio = diretorio
+        self.max_versoes = max_versoes
+        self._lock = threading.Lock()
+
+    @property
+    def habilitado(self) -> bool:
+        return bool(self.diretorio)
+
+    def _caminho(self, nome: str) -> str:
+        return os.path.join(self.diretorio, nome)
+
+    @contextmanager
+    def _travar(self):
+        """Serializa alterações no índice entre threads e entre workers (flock)."""
+        with self._lock:
+            os.makedirs(self.diretorio, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self._caminho(ARQUIVO_TRAVA), "w") as trava:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def _ler_indice(self) -> dict:
+        try:
+            with open(self._caminho(ARQUIVO_INDICE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"atual": None, "versoes": {}}
+        except json.JSONDecodeError as e:
+            logger.warning(f"Índice do cache local de modelos corrompido ({e}); ignorando.")
+            return {"atual": None, "versoes": {}}
+
+    def _gravar_indice(self, indice: dict):
+        # Escrita atômica: um processo lendo o índice nunca vê um JSON pela metade
+        fd, temporario = tempfile.mkstemp(dir=self.diretorio, prefix=".tmp-", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(indice, f, indent=2)
+        os.replace(temporario, self._caminho(ARQUIVO_INDICE))
+
+    def versoes(self) -> list:
+        if not self.habilitado:
+            return []
+        return list(self._ler_indice()["versoes"])
+
+    def _gravar_arquivo(self, objeto) -> str:
+        """Serializa sem compressão (requisito do mmap) e renomeia para <sha256>.joblib."""
+        fd, temporario = tempfile.mkstemp(dir=self.diretorio, prefix=".tmp-", suffix=".joblib")
+        os.close(fd)
+        try:
+            joblib.dump(objeto, temporario)
+            checksum = sha256_arquivo(temporario)
+            os.replace(temporario, self._caminho(f"{checksum}.joblib"))
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        return checksum
+
+    def _ler_arquivo(self, checksum: str, versao: str, mmap_mode=None):
+        caminho = self._caminho(f"{checksum}.joblib")
+        try:
+            if sha256_arquivo(caminho) != checksum:
+                logger.warning(f"Checksum divergente no cache local para a versão {versao}; ignorando.")
+                return None
+            return joblib.load(caminho, mmap_mode=mmap_mode)
+        except Exception as e:
+            logger.warning(f"Não foi possível carregar a versão {versao} do cache local: {e}")
+            return None
+
+    def _registrar(self, versao: str, campo: str, checksum: str):
+        indice = self._ler_indice()
+        entrada = indice["versoes"].setdefault(versao, {})
+        entrada[campo] = checksum
+        entrada["salvo_em"] = datetime.now(timezone.utc).isoformat()
+        self._podar(indice)
+        self._gravar_indice(indice)
+
+    def guardar(self, modelo, versao: str) -> str:
+        """Serializa o modelo e registra a versão. Retorna o sha256 do arquivo."""
+        if not self.habilitado:
+            return None
+        with self._travar():
+            checksum = self._gravar_arquivo(modelo)
+            self._registrar(versao, "sha256", checksum)
+        logger.info(f"Modelo versão {versao} salvo no cache local ({checksum[:12]}).")
+        return checksum
+
+    def _carregar_compartilhado(self, versao: str):
+        entrada = self._ler_indice()["versoes"].get(versao) or {}
+        if "compartilhado" not in entrada:
+            return None
+        return self._ler_arquivo(entrada["compartilhado"], versao, mmap_mode="r")
+
+    def compartilhar(self, modelo, versao: str):
+        """
+        Devolve a cópia de serviço da versão aberta com mmap_mode='r', gravando-a
+        na primeira vez. None se o cache estiver desligado ou o modelo não for um
+        pipeline com RandomForest (nesse caso cada worker usa a própria cópia).
+        """
+        if not self.habilitado:
+            return None
+        compartilhado = self._carregar_compartilhado(versao)
+        if compartilhado is not None:
+            return compartilhado
+        servico = pipeline_com_floresta_compilada(modelo)
+        if servico is None:
+            return None
+        with self._travar():
+            # Outro worker pode ter gravado enquanto esperávamos a trava
+            if "compartilhado" not in (self._ler_indice()["versoes"].get(versao) or {}):
+                checksum = self._gravar_arquivo(servico)
+                self._registrar(versao, "compartilhado", checksum)
+                logger.info(f"Cópia compartilhada (mmap) da versão {versao} salva ({checksum[:12]}).")
+        return self._carregar_compartilhado(versao)
+
+    def definir_atual(self, versao: str) -> bool:
+        """Marca a versão ativada na API (é a que a próxima inicialização carrega)."""
+        if not self.habilitado:
+            return False
+        with self._travar():
+            indice = self._ler_indice()
+            if versao not in indice["versoes"]:
+                return False
+            indice["atual"] = versao
+            self._gravar_indice(indice)
+        return True
+
+    def carregar(self, versao: str = None, compartilhado: bool = False):
+        """
+        Devolve (modelo, versao) da versão pedida (ou da atual), ou None se ela não
+        estiver no cache ou se o arquivo não bater com o checksum registrado.
+        Com compartilhado=True devolve a cópia de serviço mapeada em memória.
+        """
+        if not self.habilitado:
+            return None
+        indice = self._ler_indice()
+        versao = versao or indice["atual"]
+        entrada = indice["versoes"].get(versao) if versao else None
+        if entrada is None:
+            return None
+        if compartilhado and "compartilhado" in entrada:
+            modelo = self._ler_arquivo(entrada["compartilhado"], versao, mmap_mode="r")
+            if modelo is not None:
+                return modelo, versao
+        if "sha256" not in entrada:
+            return None
+        modelo = self._ler_arquivo(entrada["sha256"], versao)
+        if modelo is None:
+            return None
+        if compartilhado:
+            modelo = self.compartilhar(modelo, versao) or modelo
+        return modelo, versao
+
+    def _podar(self, indice: dict):
+        """Mantém só as `max_versoes` mais recentes (e a atual) e apaga arquivos órfãos."""
+        ordenadas = sorted(indice["versoes"], key=lambda v: indice["versoes"][v]["salvo_em"], reverse=True)
+        manter = set(ordenadas[:max(self.max_versoes, 1)])
+        if indice.get("atual") in indice["versoes"]:
+            manter.add(indice["atual"])
+        indice["versoes"] = {v: e for v, e in indice["versoes"].items() if v in manter}
+        em_uso = {
+            f"{e[campo]}.joblib"
+            for e in indice["versoes"].values()
+            for campo in ("sha256", "compartilhado")
+            if campo in e
+        }
+        for nome in os.listdir(self.diretorio):
+            # Arquivos ".tmp-*" podem estar sendo escritos por outro processo
+            if nome.endswith(".joblib") and not nome.startswith(".") and nome not in em_uso:
+                os.remove(self._caminho(nome))
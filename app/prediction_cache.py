@@ -0,0 +1,70 @@
+"""
+Cache em memória (LRU + TTL) das probabilidades já calculadas pela API.
+
+A chave é montada em app/routes.py a partir do aluno já canonicalizado (textos
+normalizados, Fase convertida em Fase_Num), da versão do modelo e do limiar, de
+modo que o mesmo aluno escrito de formas diferentes ("Publica", " pública ")
+reaproveita o mesmo resultado.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachePredicoes:
+    """
+    Cache thread-safe e limitado em quantidade de entradas.
+    `tamanho_max <= 0` desliga o cache (nada é guardado).
+    """
+
+    def __init__(self, tamanho_max: int, ttl_segundos: float, relogio=time.monotonic):
+        self.tamanho_max = tamanho_max
+        self.ttl_segundos = ttl_segundos
+        self._relogio = relogio
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def habilitado(self) -> bool:
+        return self.tamanho_max > 0
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def obter(self, chave):
+        """
+        Retorna (valor, expirado). valor é None quando a chave não está no cache;
+        expirado indica que havia uma entrada vencida (que foi removida).
+        """
+        if not self.habilitado:
+            return None, False
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None, False
+            valor, validade = item
+            if validade < self._relogio():
+                del self._itens[chave]
+                return None, True
+            self._itens.move_to_end(chave)
+            return valor, False
+
+    def guardar(self, chave, valor) -> int:
+        """Guarda o valor e retorna quantas entradas foram descartadas por falta de espaço."""
+        if not self.habilitado:
+            return 0
+        removidos = 0
+        with self._lock:
+            self._itens[chave] = (valor, self._relogio() + self.ttl_segundos)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_max:
+                self._itens.popitem(last=False)
+                removidos += 1
+        return removidos
+
+    def limpar(self) -> int:
+        """Esvazia o cache (ex: troca de modelo) e retorna quantas entradas foram descartadas."""
+        with self._lock:
+            removidos = len(self._itens)
+            self._itens.clear()
+        return removidos
@@ -1,17 +1,63 @@
 import pandas as pd
+import numpy as np
 import mlflow
 import mlflow.sklearn
 import logging
-import subprocess
 import os
-import sys
+import random
+import threading
+import time
 import unicodedata
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+import joblib
+from functools import lru_cache
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import ValidationError
 from app.schemas.aluno_request import AlunoRequest
 from app.schemas.risco_response import RiscoResponse
-from prometheus_client import Counter, Histogram, Gauge
+from app.schemas.lote_request import LoteRequest
+from app.schemas.lote_response import LoteResponse
+from prometheus_client import REGISTRY, Counter, Gauge
 from src.feature_engineering import extrair_fase
-from app.config import MLFLOW_TRACKING_URI, LIMIAR_FIXO
+from app.compiled_preprocessing import compilar_preprocessador
+from app.forest_engine import compilar_floresta
+from app.prediction_cache import CachePredicoes
+from app.batch_histogram import HistogramaLote
+from app.model_manager import RecarregadorModelo
+from app.model_store import CacheModelos, sha256_arquivo
+from app.inference_executor import ExecutorInferencia, ExecutorSaturado
+from app.training_jobs import GerenciadorTreinos
+from app.forest_engine import pipeline_com_floresta_compilada
+from src.drift import MonitorDrift, carregar_referencia, FEATURES_NUMERICAS, FEATURES_CATEGORICAS
+from app.config import (
+    MLFLOW_TRACKING_URI,
+    LIMIAR_FIXO,
+    TAMANHO_MAX_LOTE,
+    PREPROCESSAMENTO_COMPILADO,
+    MOTOR_FLORESTA,
+    CACHE_PREDICOES_TAMANHO,
+    CACHE_PREDICOES_TTL_SEGUNDOS,
+    CACHE_MODELOS_DIR,
+    CACHE_MODELOS_MAX_VERSOES,
+    MODELO_FALLBACK_PATH,
+    MODELO_COMPARTILHADO,
+    WEB_CONCURRENCY,
+    EXECUTOR_INFERENCIA,
+    EXECUTOR_PROCESSOS,
+    EXECUTOR_TAMANHO_BLOCO,
+    EXECUTOR_FILA_MAX,
+    EXECUTOR_MIN_LINHAS,
+    AMOSTRAGEM_LOG_PREDICOES,
+    DRIFT_JANELA,
+    DRIFT_BALDES,
+    DRIFT_MIN_AMOSTRAS,
+    DRIFT_REFERENCIA_PATH,
+    MODO_RETREINO,
+    MODOS_RETREINO,
+    TREINO_NUCLEOS,
+    TREINO_NICE,
+    TREINO_HISTORICO_MAX,
+)
 
 # Recupera o logger
 logger = logging.getLogger(__name__)
@@ -27,17 +73,245 @@ def _normalizar_texto(val: str) -> str:
     s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("utf-8")
     return s.upper()
 
+# Categorias (Genero, Instituicao, Fase) têm poucos valores distintos na prática
+_normalizar_categoria = lru_cache(maxsize=1024)(_normalizar_texto)
+
+def _montar_features(alunos) -> pd.DataFrame:
+    """
+    Monta o DataFrame de entrada do modelo (uma linha por aluno), com as
+    mesmas colunas e features derivadas usadas no treino.
+    Pedra é leakage (derivada do INDE) e Fase é substituída por Fase_Num.
+    """
+    df_input = pd.DataFrame({
+        "IAA": [a.IAA for a in alunos],
+        "IEG": [a.IEG for a in alunos],
+        "IPS": [a.IPS for a in alunos],
+        "IDA": [a.IDA for a in alunos],
+        "IPV": [a.IPV for a in alunos],
+        "Idade": [a.Idade for a in alunos],
+        "Instituicao_de_ensino": [_normalizar_categoria(a.Instituicao_de_ensino) for a in alunos],
+        "Genero": [_normalizar_categoria(a.Genero) for a in alunos],
+    })
+
+    # Engenharia de Features (operações por coluna, não por linha)
+    df_input['IEG_x_IDA'] = df_input['IEG'] * df_input['IDA']
+    df_input['IEG_x_IAA'] = df_input['IEG'] * df_input['IAA']
+    df_input['IPS_x_IDA'] = df_input['IPS'] * df_input['IDA']
+
+    # extrair_fase roda uma vez por Fase distinta
+    fases = pd.Series([_normalizar_categoria(a.Fase) for a in alunos])
+    df_input['Fase_Num'] = fases.map({f: extrair_fase(f) for f in fases.unique()})
+    return df_input
+
+@lru_cache(maxsize=256)
+def _fase_num(fase: str):
+    """Fase_Num de um texto de Fase; o regex de extrair_fase roda uma vez por valor distinto."""
+    return extrair_fase(_normalizar_texto(fase))
+
+def _registro_aluno(aluno: AlunoRequest) -> dict:
+    """Mesmas colunas de _montar_features, para um único aluno e sem pandas."""
+    return {
+        "IAA": aluno.IAA,
+        "IEG": aluno.IEG,
+        "IPS": aluno.IPS,
+        "IDA": aluno.IDA,
+        "IPV": aluno.IPV,
+        "Idade": aluno.Idade,
+        "Instituicao_de_ensino": _normalizar_categoria(aluno.Instituicao_de_ensino),
+        "Genero": _normalizar_categoria(aluno.Genero),
+        "IEG_x_IDA": aluno.IEG * aluno.IDA,
+        "IEG_x_IAA": aluno.IEG * aluno.IAA,
+        "IPS_x_IDA": aluno.IPS * aluno.IDA,
+        "Fase_Num": _fase_num(aluno.Fase),
+    }
+
+# Colunas que identificam o aluno canonicalizado (as interações derivam delas)
+_COLUNAS_CHAVE = ("IAA", "IEG", "IPS", "IDA", "IPV", "Idade", "Instituicao_de_ensino", "Genero", "Fase_Num")
+
+def _chave_aluno(registro: dict) -> tuple:
+    """Aluno canonicalizado: alunos com a mesma chave recebem a mesma probabilidade de qualquer modelo."""
+    return tuple(registro[c] for c in _COLUNAS_CHAVE)
+
+def _chave_cache(registro: dict, artefatos: dict):
+    """
+    Chave do cache de predições: aluno canonicalizado + versão do modelo + limiar.
+    None (sem cache) quando a requisição usa um modelo que já foi substituído.
+    """
+    if artefatos.get("versao") is None:
+        return None
+    return _chave_aluno(registro) + (artefatos["versao"], limiar_fixo)
+
+def _montar_resposta(proba: float) -> dict:
+    risco = 1 if proba >= limiar_fixo else 0
+    return {
+        "risco_defasagem": int(risco),
+        "probabilidade_risco": float(round(proba, 4)),
+        "mensagem": "ALERTA: Risco detectado!" if risco == 1 else "Risco baixo"
+    }
+
 # Limiar para resposta (lido de variável de ambiente em app.config)
 limiar_fixo = LIMIAR_FIXO
 
+# Fração das predições do /predict que vão para o log com os dados do aluno
+amostragem_log_predicoes = AMOSTRAGEM_LOG_PREDICOES
+
+def _amostrar_log_predicao() -> bool:
+    return amostragem_log_predicoes >= 1.0 or random.random() < amostragem_log_predicoes
+
 # MÉTRICAS CUSTOMIZADAS PARA O GRAFANA
 # Conta quantas predições de cada tipo foram feitas
 PREDICOES_TOTAL = Counter('modelo_predicoes_total', 'Total de predições', ['risco_detectado'])
-# Guarda a distribuição das probabilidades (bom para ver se o modelo está confiante)
-PROBABILIDADE_HISTOGRAMA = Histogram('modelo_probabilidade_risco', 'Distribuição das probabilidades geradas')
+# Guarda a distribuição das probabilidades (bom para ver se o modelo está confiante);
+# o /predict/batch atualiza o lote inteiro de uma vez
+PROBABILIDADE_HISTOGRAMA = HistogramaLote(
+    'modelo_probabilidade_risco', 'Distribuição das probabilidades geradas', registry=REGISTRY
+)
 # Guarda o valor médio das features (Acompanhamento visual de DRIFT)
 FEATURE_IAA = Gauge('feature_input_iaa', 'Valor da feature IAA recebida')
 FEATURE_IEG = Gauge('feature_input_ieg', 'Valor da feature IEG recebida')
+# Eficiência do cache de predições
+CACHE_HITS = Counter('modelo_cache_hits_total', 'Predições servidas pelo cache')
+CACHE_MISSES = Counter('modelo_cache_misses_total', 'Predições que precisaram avaliar o modelo')
+CACHE_EVICTIONS = Counter(
+    'modelo_cache_evictions_total', 'Entradas removidas do cache de predições', ['motivo']
+)
+# Tempo para ter um modelo pronto na subida da API, por origem do modelo
+MODELO_COLD_START = Gauge(
+    'modelo_cold_start_segundos', 'Tempo de carga do modelo na inicialização da API', ['origem']
+)
+
+# Drift por feature: janela recente de alunos recebidos x distribuição do treino.
+# Os valores são calculados na hora do scrape; a requisição só incrementa contadores.
+monitor_drift = MonitorDrift(DRIFT_JANELA, DRIFT_BALDES, DRIFT_MIN_AMOSTRAS)
+DRIFT_PSI = Gauge('modelo_drift_psi', 'PSI da janela recente contra a distribuição do treino', ['feature'])
+DRIFT_KS = Gauge('modelo_drift_ks', 'Estatística KS da janela recente contra o treino (numéricas)', ['feature'])
+DRIFT_AMOSTRAS = Gauge('modelo_drift_amostras', 'Alunos na janela usada no cálculo do drift')
+for _feature in FEATURES_NUMERICAS + FEATURES_CATEGORICAS:
+    DRIFT_PSI.labels(feature=_feature).set_function(lambda f=_feature: monitor_drift.psi(f))
+    if _feature in FEATURES_NUMERICAS:
+        DRIFT_KS.labels(feature=_feature).set_function(lambda f=_feature: monitor_drift.ks(f))
+DRIFT_AMOSTRAS.set_function(monitor_drift.amostras)
+
+def _referencia_drift(modelo):
+    """Referência de drift gravada no modelo pelo treino ou, se não houver, DRIFT_REFERENCIA_PATH."""
+    referencia = getattr(modelo, "referencia_drift_", None)
+    if isinstance(referencia, dict):
+        return referencia
+    try:
+        return carregar_referencia(DRIFT_REFERENCIA_PATH)
+    except Exception as e:
+        logger.warning(f"Não foi possível ler a referência de drift {DRIFT_REFERENCIA_PATH}: {e}")
+        return None
+
+# Cache de probabilidades por aluno (LRU + TTL), esvaziado sempre que o modelo muda
+CACHE_PREDICOES = CachePredicoes(CACHE_PREDICOES_TAMANHO, CACHE_PREDICOES_TTL_SEGUNDOS)
+
+def _consultar_cache(chave):
+    if chave is None:
+        return None
+    proba, expirado = CACHE_PREDICOES.obter(chave)
+    if expirado:
+        CACHE_EVICTIONS.labels(motivo="expirado").inc()
+    if CACHE_PREDICOES.habilitado:
+        if proba is None:
+            CACHE_MISSES.inc()
+        else:
+            CACHE_HITS.inc()
+    return proba
+
+def _guardar_cache(chave, proba: float):
+    if chave is None:
+        return
+    removidos = CACHE_PREDICOES.guardar(chave, proba)
+    if removidos:
+        CACHE_EVICTIONS.labels(motivo="capacidade").inc(removidos)
+
+def _invalidar_cache():
+    removidos = CACHE_PREDICOES.limpar()
+    if removidos:
+        CACHE_EVICTIONS.labels(motivo="troca_modelo").inc(removidos)
+
+# Lotes grandes do /predict/batch podem ser pontuados por um pool de processos
+executor_inferencia = ExecutorInferencia(
+    EXECUTOR_INFERENCIA, EXECUTOR_PROCESSOS, EXECUTOR_TAMANHO_BLOCO, EXECUTOR_FILA_MAX, EXECUTOR_MIN_LINHAS
+)
+
+# Artefatos de inferência derivados do modelo em memória: (modelo de origem, dict)
+_artefatos = (None, {"preprocessador": None, "floresta": None, "versao": None})
+_lock_artefatos = threading.Lock()
+
+def _compilar_artefatos(modelo, versao) -> dict:
+    """
+    Artefatos de inferência de um modelo:
+    - 'preprocessador': PreprocessadorCompilado ou None (caminho pandas)
+    - 'floresta': FlorestaCompilada ou None (predict_proba do sklearn)
+    - 'versao': versão do modelo (entra na chave do cache de predições)
+    """
+    artefatos = {"preprocessador": None, "floresta": None, "versao": versao}
+    if MOTOR_FLORESTA == "compilado" and hasattr(modelo, "steps"):
+        try:
+            artefatos["floresta"] = compilar_floresta(modelo.steps[-1][1])
+        except Exception as e:
+            logger.warning(f"Não foi possível compilar a floresta: {e}")
+    if PREPROCESSAMENTO_COMPILADO:
+        try:
+            artefatos["preprocessador"] = compilar_preprocessador(modelo)
+        except Exception as e:
+            logger.warning(f"Não foi possível compilar o pré-processamento: {e}")
+    if artefatos["preprocessador"] is not None and artefatos["floresta"] is not None:
+        artefatos["preprocessador"].classificador = artefatos["floresta"]
+    return artefatos
+
+def _publicar_artefatos(modelo, artefatos: dict):
+    """Troca as referências do modelo servido (com _lock_artefatos): só operações rápidas."""
+    global _artefatos
+    _artefatos = (modelo, artefatos)
+    # Modelo novo: probabilidades do modelo anterior não valem mais
+    _invalidar_cache()
+    monitor_drift.definir_referencia(_referencia_drift(modelo))
+
+def _recarregar_executor(modelo, artefatos: dict):
+    """
+    Recria o pool de processos com o modelo publicado, fora do _lock_artefatos: até o
+    pool novo ficar pronto, os lotes do modelo novo rodam na thread (executor.aceita).
+    """
+    if executor_inferencia.modo != "processos" or _artefatos[0] is not modelo:
+        return
+    preditor = modelo
+    if artefatos["floresta"] is not None:
+        preditor = pipeline_com_floresta_compilada(modelo) or modelo
+    executor_inferencia.carregar(modelo, preditor)
+
+def _obter_artefatos(modelo) -> dict:
+    """Devolve os artefatos do modelo em memória, compilando na primeira vez."""
+    origem, artefatos = _artefatos
+    if origem is modelo:
+        return artefatos
+    with _lock_artefatos:
+        origem, artefatos = _artefatos
+        if origem is modelo:
+            return artefatos
+        if modelo is not model:
+            # Requisição que começou antes de uma troca de modelo: termina com o
+            # modelo antigo pelo caminho pandas, sem compilar nada e sem usar o cache
+            return {"preprocessador": None, "floresta": None, "versao": None}
+        artefatos = _compilar_artefatos(modelo, versao_modelo)
+        _publicar_artefatos(modelo, artefatos)
+    _recarregar_executor(modelo, artefatos)
+    return artefatos
+
+def _predict_proba_df(modelo, artefatos: dict, df_input: pd.DataFrame):
+    """predict_proba do caminho pandas, usando a floresta compilada quando disponível."""
+    floresta = artefatos["floresta"]
+    if floresta is not None:
+        return floresta.predict_proba(modelo[:-1].transform(df_input))
+    return modelo.predict_proba(df_input)
+
+def _predict_proba_lote(modelo, artefatos: dict, df_input: pd.DataFrame):
+    """Lotes grandes vão para o pool de processos (quando configurado); o resto roda na thread."""
+    if executor_inferencia.aceita(modelo, len(df_input)):
+        return executor_inferencia.predict_proba(df_input)
+    return _predict_proba_df(modelo, artefatos, df_input)
 
 # Carregamento do Modelo (URI via variável de ambiente)
 mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
@@ -45,43 +319,182 @@ mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
 # Define qual modelo queremos buscar
 model_name = "Modelo_Risco_Defasagem"
 alias = "production" # Pega sempre a última versão treinada
+model_uri = f"models:/{model_name}@{alias}"
 
+def _resolver_versao_modelo() -> str:
+    """Versão registrada no MLflow para o alias (entra na chave do cache de predições)."""
+    try:
+        return str(mlflow.MlflowClient().get_model_version_by_alias(model_name, alias).version)
+    except Exception as e:
+        logger.warning(f"Não foi possível resolver a versão de {model_uri}: {e}")
+        return "desconhecida"
+
+versao_modelo = "desconhecida"
+model = None
+
+# Versões já resolvidas no MLflow ficam em disco para a próxima inicialização
+cache_modelos = CacheModelos(CACHE_MODELOS_DIR, CACHE_MODELOS_MAX_VERSOES)
+
+# Alunos fictícios usados para aquecer/validar um modelo recém-carregado antes da troca
+_ALUNOS_AQUECIMENTO = [
+    AlunoRequest(IAA=5.5, IEG=2.0, IPS=6.0, IDA=4.5, IPV=7.0, Idade=15, Fase="8",
+                 Instituicao_de_ensino="Publica", Genero="Feminino"),
+    AlunoRequest(IAA=9.0, IEG=9.5, IPS=8.0, IDA=8.5, IPV=9.0, Idade=10, Fase="ALFA",
+                 Instituicao_de_ensino="Privada", Genero="Masculino"),
+    AlunoRequest(IAA=7.0, IEG=5.0, IPS=3.0, IDA=2.0, IPV=4.0, Idade=18, Fase="FASE 5",
+                 Instituicao_de_ensino="Rede Decisao", Genero="Masculino"),
+]
+
+def _modelo_para_servir(modelo, versao):
+    """
+    Com MODELO_COMPARTILHADO, troca o modelo pela cópia de serviço do cache local,
+    com a floresta mapeada em memória e compartilhada entre os workers do uvicorn.
+    """
+    if not MODELO_COMPARTILHADO or versao == "desconhecida":
+        return modelo
+    try:
+        compartilhado = cache_modelos.compartilhar(modelo, versao)
+    except Exception as e:
+        logger.warning(f"Não foi possível compartilhar a versão {versao} entre os workers: {e}")
+        compartilhado = None
+    return modelo if compartilhado is None else compartilhado
+
+def _carregar_versao_producao():
+    """
+    Resolve o alias no MLflow; versões que já estão no cache local não são baixadas de novo.
+    Retorna (None, versao) se a versão do alias já é a ativa (nada a recarregar).
+    """
+    versao = _resolver_versao_modelo()
+    if versao != "desconhecida":
+        if model is not None and versao == versao_modelo:
+            logger.info(f"Versão {versao} do alias {alias} já está ativa.")
+            return None, versao
+        local = cache_modelos.carregar(versao, compartilhado=MODELO_COMPARTILHADO)
+        if local is not None:
+            return local
+    modelo = mlflow.sklearn.load_model(model_uri)
+    if versao != "desconhecida":
+        try:
+            cache_modelos.guardar(modelo, versao)
+        except Exception as e:
+            logger.warning(f"Não foi possível salvar a versão {versao} no cache local: {e}")
+    return _modelo_para_servir(modelo, versao), versao
+
+def _carregar_na_inicializacao():
+    """
+    Ordem de carga na subida da API: cache local -> MLflow -> MODELO_FALLBACK_PATH.
+    Retorna (modelo, versao, origem).
+    """
+    local = cache_modelos.carregar(compartilhado=MODELO_COMPARTILHADO)
+    if local is not None:
+        return local[0], local[1], "cache_local"
+    try:
+        modelo, versao = _carregar_versao_producao()
+        cache_modelos.definir_atual(versao)
+        return modelo, versao, "mlflow"
+    except Exception as e:
+        logger.error(f"Erro ao carregar o modelo do MLflow: {e}")
+    if MODELO_FALLBACK_PATH and os.path.exists(MODELO_FALLBACK_PATH):
+        logger.warning(f"Usando o modelo local de fallback: {MODELO_FALLBACK_PATH}")
+        # A versão identifica o conteúdo do arquivo (entra na chave do cache de predições)
+        versao = f"arquivo-{sha256_arquivo(MODELO_FALLBACK_PATH)[:12]}"
+        return _modelo_para_servir(joblib.load(MODELO_FALLBACK_PATH), versao), versao, "arquivo_local"
+    return None, "desconhecida", "indisponivel"
+
+inicio_carga = time.perf_counter()
+logger.info(f"Aplicação iniciando... Modelo a ser carregado: {model_uri}...")
 try:
-    model_uri = f"models:/{model_name}@{alias}"
-    logger.info(f"Aplicação iniciando... Modelo a ser carregado: {model_uri}...")   
-    
-    # Carrega o modelo diretamente do mlflow
-    model = mlflow.sklearn.load_model(model_uri)
-    logger.info(f"Aplicação iniciada! Modelo carregado: {model_uri}...")       
+    model, versao_modelo, origem_modelo = _carregar_na_inicializacao()
+    if model is not None:
+        _obter_artefatos(model)
 except Exception as e:
-    logger.error(f"Erro ao carregar o modelo do MLflow: {e}")
-    model = None
+    logger.error(f"Erro ao carregar o modelo: {e}")
+    model, versao_modelo, origem_modelo = None, "desconhecida", "indisponivel"
+inicializacao = {
+    "origem": origem_modelo,
+    "versao": versao_modelo if model is not None else None,
+    "duracao_s": round(time.perf_counter() - inicio_carga, 3),
+}
+MODELO_COLD_START.labels(origem=origem_modelo).set(inicializacao["duracao_s"])
+logger.info(
+    f"Aplicação iniciada! Modelo {inicializacao['versao']} carregado de {origem_modelo} "
+    f"em {inicializacao['duracao_s']}s."
+)
 
-def executar_treinamento_em_background():
-    logger.info("Iniciando o processo de retreinamento (executando src/train.py)...")
-    try:
-        # Chama o script Python como se estivesse no terminal
-        # capture_output=True permite-nos ler os prints do train.py e guardar no nosso log
-        resultado = subprocess.run(
-            [sys.executable, "-m", "src.train"],
-            capture_output=True,
-            text=True,
-            check=True,
-            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+def _aquecer_modelo(modelo, versao) -> dict:
+    """
+    Compila os artefatos do novo modelo e roda predições de teste pelos dois caminhos.
+    Levanta exceção (e a troca é cancelada) se o modelo não responder como esperado.
+    """
+    artefatos = _compilar_artefatos(modelo, versao)
+    df_input = _montar_features(_ALUNOS_AQUECIMENTO)
+    probas = np.asarray(_predict_proba_df(modelo, artefatos, df_input))[:, 1]
+    if probas.shape != (len(_ALUNOS_AQUECIMENTO),) or not np.all((probas >= 0) & (probas <= 1)):
+        raise ValueError(f"Predições de aquecimento inválidas: {probas}")
+    compilado = artefatos["preprocessador"]
+    if compilado is not None:
+        for aluno, esperado in zip(_ALUNOS_AQUECIMENTO, probas):
+            obtido = compilado.predict_proba(_registro_aluno(aluno))[0][1]
+            if not np.isclose(obtido, esperado):
+                raise ValueError(f"Caminho compilado diverge do pipeline: {obtido} != {esperado}")
+    return artefatos
+
+def _ativar_modelo(modelo, versao, artefatos: dict):
+    """Publica o modelo já aquecido: a partir daqui as novas requisições usam a nova versão."""
+    global model, versao_modelo
+    with _lock_artefatos:
+        _publicar_artefatos(modelo, artefatos)
+        versao_modelo = versao
+        model = modelo
+    _recarregar_executor(modelo, artefatos)
+    cache_modelos.definir_atual(versao)
+
+recarregador = RecarregadorModelo(
+    _carregar_versao_producao,
+    _aquecer_modelo,
+    _ativar_modelo,
+    versao_ativa=versao_modelo if model is not None else None,
+)
+
+# Subiu sem consultar o MLflow (cache local, fallback ou nada): confere o alias em segundo plano
+if origem_modelo != "mlflow":
+    recarregador.solicitar()
+
+# Fila de treinos do /retrain: um treino por vez, num worker com prioridade e núcleos limitados
+gerenciador_treinos = GerenciadorTreinos(
+    nucleos=TREINO_NUCLEOS,
+    nice=TREINO_NICE,
+    cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    historico_max=TREINO_HISTORICO_MAX,
+)
+
+# Progresso do treino em execução (eventos do worker), lido a cada scrape do /metrics; zeros sem treino
+_METRICAS_TREINO = {
+    "em_execucao": Gauge('treino_em_execucao', '1 enquanto um treino da fila está executando'),
+    "etapa": Gauge('treino_etapa', 'Etapa atual do treino em execução'),
+    "etapas": Gauge('treino_etapas_total', 'Total de etapas do treino em execução'),
+    "candidatos_avaliados": Gauge('treino_candidatos_avaliados', 'Candidatos da busca já avaliados em todos os folds'),
+    "candidatos_total": Gauge('treino_candidatos_total', 'Candidatos da busca de hiperparâmetros'),
+    "segundos": Gauge('treino_segundos_decorridos', 'Tempo desde o início do treino em execução'),
+}
+for _medida, _gauge in _METRICAS_TREINO.items():
+    _gauge.set_function(lambda m=_medida: gerenciador_treinos.progresso()[m])
+
+if WEB_CONCURRENCY > 1:
+    logger.warning(
+        f"WEB_CONCURRENCY={WEB_CONCURRENCY}: /reload e /retrain ficam desligados e o /metrics "
+        "mostra só o worker que atendeu o scrape. Para trocar o modelo, reinicie os workers."
+    )
+
+
+def _exigir_worker_unico(rota: str):
+    """Recusa rotas que mudam o estado de um único processo (modelo ativo, fila de treinos) com vários workers."""
+    if WEB_CONCURRENCY > 1:
+        raise HTTPException(
+            status_code=501,
+            detail=f"{rota} não é suportado com WEB_CONCURRENCY={WEB_CONCURRENCY}: cada worker tem seu próprio "
+                   "modelo e sua própria fila de treinos. Reinicie os workers ou use WEB_CONCURRENCY=1.",
         )
-        logger.info("Treinamento concluído com sucesso!")
-        logger.info("Para a utilização do modelo, adicione o alias @production no MLFlow e acione o endpoint /reload!")
-        
-        # Loga as mensagens que o train.py imprimiu na tela
-        for linha in resultado.stdout.split('\n'):
-            if linha.strip():
-                logger.info(f"[train.py] {linha}")
-                
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Erro ao treinar o modelo. Código de falha: {e.returncode}")
-        logger.error(f"Erro do train.py -> {e.stderr}")
-    except Exception as e:
-        logger.error(f"Falha crítica ao tentar iniciar o script de treino: {str(e)}")    
 
 # Rotas
 
@@ -92,37 +505,33 @@ def home():
 @router.post("/predict", response_model=RiscoResponse)
 def predict_risk(aluno: AlunoRequest):
     # Previsão de risco de defasagem
-    if model is None:
+    modelo = model
+    if modelo is None:
         raise HTTPException(status_code=500, detail="Modelo não carregado no servidor.")
         
     # GRAFANA: Atualiza as métricas das features recebidas (Drift)    
     FEATURE_IAA.set(aluno.IAA)
     FEATURE_IEG.set(aluno.IEG)    
     
-    # Converter input para DataFrame (normalizar categorias como no treino)
-    # Pedra é leakage (derivada do INDE) e Fase é substituída por Fase_Num
-    data = {
-        "IAA": [aluno.IAA],
-        "IEG": [aluno.IEG],
-        "IPS": [aluno.IPS],
-        "IDA": [aluno.IDA],
-        "IPV": [aluno.IPV],
-        "Idade": [aluno.Idade],
-        "Instituicao_de_ensino": [_normalizar_texto(aluno.Instituicao_de_ensino)],
-        "Genero": [_normalizar_texto(aluno.Genero)],
-    }
-    df_input = pd.DataFrame(data)
-    
-    # Engenharia de Features
-    df_input['IEG_x_IDA'] = df_input['IEG'] * df_input['IDA']
-    df_input['IEG_x_IAA'] = df_input['IEG'] * df_input['IAA']
-    df_input['IPS_x_IDA'] = df_input['IPS'] * df_input['IDA']
-
-    df_input['Fase_Num'] = extrair_fase(_normalizar_texto(aluno.Fase))
+    artefatos = _obter_artefatos(modelo)
+    compilado = artefatos["preprocessador"]
+    registro = _registro_aluno(aluno)
+    chave = _chave_cache(registro, artefatos)
+    monitor_drift.observar(registro)
     
     # Predição
     try:
-        proba = model.predict_proba(df_input)[0][1]
+        proba = _consultar_cache(chave)
+        em_cache = proba is not None
+        if proba is None:
+            if compilado is not None:
+                # Caminho rápido: aluno -> vetor float32 direto, sem DataFrame
+                proba = compilado.predict_proba(registro)[0][1]
+            else:
+                # Converter input para DataFrame (normalizar categorias como no treino)
+                df_input = _montar_features([aluno])
+                proba = _predict_proba_df(modelo, artefatos, df_input)[0][1]
+            _guardar_cache(chave, proba)
         risco = 1 if proba >= limiar_fixo else 0
 
         # -----------------------------------------------------------------
@@ -131,46 +540,198 @@ def predict_risk(aluno: AlunoRequest):
         PREDICOES_TOTAL.labels(risco_detectado=str(risco)).inc()
         PROBABILIDADE_HISTOGRAMA.observe(proba)      
         
-        logger.info(
-            f"PREDIÇÃO | Dados: {df_input} "
-            f"Risco: {risco} | Probabilidade: {proba:.4f} | Mensagem: {'ALERTA: Risco detectado!' if risco == 1 else 'Risco baixo'}"
-        )
+        # O registro é formatado (JSON) pela thread de logging, não aqui
+        if _amostrar_log_predicao():
+            logger.info(
+                "PREDIÇÃO",
+                extra={"campos": {
+                    "evento": "predicao",
+                    "dados": registro,
+                    "risco": risco,
+                    "probabilidade": round(float(proba), 4),
+                    "cache": em_cache,
+                    "versao_modelo": artefatos["versao"],
+                }},
+            )
         
-        return {
-            "risco_defasagem": int(risco),
-            "probabilidade_risco": float(round(proba, 4)),
-            "mensagem": "ALERTA: Risco detectado!" if risco == 1 else "Risco baixo"
-        }
+        return _montar_resposta(proba)
     except Exception as e:
         logger.error(f"Falha na predição para o aluno {aluno.IAA}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro na predição: {str(e)}")
+
+@router.post("/predict/batch", response_model=LoteResponse)
+def predict_risk_batch(lote: LoteRequest):
+    """
+    Predição de risco para uma turma inteira em uma única chamada.
+    Cada aluno é validado individualmente; os válidos que não estão no cache são
+    pontuados juntos (linhas repetidas são avaliadas uma única vez) em um só predict_proba.
+    """
+    modelo = model
+    if modelo is None:
+        raise HTTPException(status_code=500, detail="Modelo não carregado no servidor.")
+    if len(lote.alunos) > TAMANHO_MAX_LOTE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote com {len(lote.alunos)} alunos excede o máximo de {TAMANHO_MAX_LOTE}.",
+        )
+
+    resultados = [{"indice": i} for i in range(len(lote.alunos))]
+    validos = []
+    indices_validos = []
+    for i, item in enumerate(lote.alunos):
+        try:
+            validos.append(AlunoRequest.model_validate(item))
+            indices_validos.append(i)
+        except ValidationError as e:
+            resultados[i]["erros"] = [
+                {"campo": ".".join(str(p) for p in err["loc"]), "mensagem": err["msg"]}
+                for err in e.errors()
+            ]
+
+    if validos:
+        # GRAFANA: média das features recebidas no lote (Drift)
+        FEATURE_IAA.set(float(np.mean([a.IAA for a in validos])))
+        FEATURE_IEG.set(float(np.mean([a.IEG for a in validos])))
+
+        # Alunos iguais (após canonicalização) são deduplicados pela chave do aluno, que
+        # não depende da versão: cada aluno distinto é respondido pelo cache ou pontuado
+        # uma única vez. A chave do cache é None com um modelo já substituído (sem cache)
+        artefatos = _obter_artefatos(modelo)
+        registros = [_registro_aluno(a) for a in validos]
+        monitor_drift.observar_lote(registros)
+        probas = np.empty(len(validos), dtype=float)
+        pendentes = {}
+        chaves_cache = {}
+        for pos, registro in enumerate(registros):
+            chave_aluno = _chave_aluno(registro)
+            if chave_aluno in pendentes:
+                pendentes[chave_aluno].append(pos)
+                continue
+            chave = _chave_cache(registro, artefatos)
+            proba = _consultar_cache(chave)
+            if proba is None:
+                pendentes[chave_aluno] = [pos]
+                chaves_cache[chave_aluno] = chave
+            else:
+                probas[pos] = proba
+
+        if pendentes:
+            try:
+                df_input = _montar_features([validos[posicoes[0]] for posicoes in pendentes.values()])
+                probas_unicas = np.asarray(_predict_proba_lote(modelo, artefatos, df_input))[:, 1]
+            except ExecutorSaturado as e:
+                logger.warning(f"Lote de {len(validos)} alunos recusado: {e}")
+                raise HTTPException(status_code=503, detail=str(e))
+            except Exception as e:
+                logger.error(f"Falha na predição em lote ({len(validos)} alunos): {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Erro na predição: {str(e)}")
+
+            for (chave_aluno, posicoes), proba in zip(pendentes.items(), probas_unicas):
+                probas[posicoes] = proba
+                _guardar_cache(chaves_cache[chave_aluno], float(proba))
+
+        # GRAFANA: contadores e histograma atualizados de uma vez para o lote
+        n_risco = int((probas >= limiar_fixo).sum())
+        if n_risco:
+            PREDICOES_TOTAL.labels(risco_detectado="1").inc(n_risco)
+        if len(probas) - n_risco:
+            PREDICOES_TOTAL.labels(risco_detectado="0").inc(len(probas) - n_risco)
+        PROBABILIDADE_HISTOGRAMA.observar_lote(probas)
+
+        for i, proba in zip(indices_validos, probas):
+            resultados[i]["resultado"] = _montar_resposta(float(proba))
+
+        logger.info(
+            "PREDIÇÃO EM LOTE",
+            extra={"campos": {
+                "evento": "predicao_lote",
+                "alunos": len(lote.alunos),
+                "validos": len(validos),
+                "avaliados_pelo_modelo": len(pendentes),
+                "em_risco": n_risco,
+                "versao_modelo": artefatos["versao"],
+            }},
+        )
+
+    return {
+        "total": len(lote.alunos),
+        "validos": len(validos),
+        "invalidos": len(lote.alunos) - len(validos),
+        "resultados": resultados,
+    }
     
-@router.post("/reload")
+@router.post("/reload", status_code=202)
 def reload_model():
     """
     Rota administrativa para recarregar o modelo em memória sem precisar reiniciar o servidor Uvicorn.
+    A nova versão é carregada e aquecida em segundo plano; o modelo atual continua
+    servindo até a troca (e permanece ativo se a recarga falhar).
     """
-    global model
-    try:  
-        logger.info(f"Recarga de Modelo solicitada. Modelo a ser carregado: {model_uri}...")   
-        model = mlflow.sklearn.load_model(model_uri)
-        return {"status": "sucesso", "mensagem": "Modelo atualizado com a última versão de produção!"}
-    except Exception as e:
-        logger.error(f"Erro ao recarregar o modelo {model_uri}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erro ao recarregar o modelo: {str(e)}")    
+    _exigir_worker_unico("/reload")
+    logger.info(f"Recarga de Modelo solicitada. Modelo a ser carregado: {model_uri}...")
+    if not recarregador.solicitar():
+        raise HTTPException(status_code=409, detail="Já existe uma recarga de modelo em andamento.")
+    return {
+        "status": "sucesso",
+        "mensagem": "Recarga do modelo iniciada em segundo plano. Acompanhe em /reload/status.",
+    }
+
+@router.get("/reload/status")
+def reload_status():
+    """Versão ativa, versão em carregamento e duração da última troca de modelo."""
+    return {**recarregador.status(), "inicializacao": inicializacao}
     
-@router.post("/retrain")
-def retrain_model(background_tasks: BackgroundTasks):
+@router.post("/retrain", status_code=202)
+def retrain_model(modo: Optional[str] = None):
     """
     Endpoint administrativo para forçar o re-treinamento do modelo.
-    Executa o processo de forma assíncrona (Background Task).
+    O treino entra na fila de treinos (um por vez, em segundo plano); um pedido para um
+    modo que já está na fila ou executando devolve o job existente.
+    modo: completo (busca de hiperparâmetros), sem_busca ou incremental
+    (warm start a partir do modelo de produção); padrão MODO_RETREINO.
     """
-    logger.info("Requisição recebida no endpoint /retrain.")
-    
-    # Envia a função pesada para rodar em segundo plano
-    background_tasks.add_task(executar_treinamento_em_background)
-    
+    _exigir_worker_unico("/retrain")
+    modo = (modo or MODO_RETREINO).strip().lower()
+    if modo not in MODOS_RETREINO:
+        raise HTTPException(status_code=400, detail=f"Modo de retreino inválido: use um de {list(MODOS_RETREINO)}.")
+    logger.info(f"Requisição recebida no endpoint /retrain (modo {modo}).")
+
+    job, criado = gerenciador_treinos.submeter(modo)
+    if criado:
+        mensagem = f"Treinamento iniciado em segundo plano. Acompanhe em /retrain/{job.id} ou nos logs do Grafana/Loki."
+    else:
+        mensagem = "Já existe um treinamento deste modo na fila ou em execução; acompanhe o job existente."
     return {
         "status": "sucesso",
-        "mensagem": "Treinamento iniciado em segundo plano. Acompanhe os logs no Grafana/Loki para ver o progresso e o resultado."
-    }    
\ No newline at end of file
+        "job_id": job.id,
+        "estado": job.estado,
+        "mensagem": mensagem,
+    }
+
+
+@router.get("/retrain/jobs")
+def retrain_jobs():
+    """Jobs de treino na fila, em execução e os últimos encerrados (mais recentes primeiro)."""
+    _exigir_worker_unico("/retrain")
+    return {"jobs": gerenciador_treinos.listar()}
+
+
+@router.get("/retrain/{job_id}")
+def retrain_status(job_id: str):
+    """Estado, duração e últimas linhas de saída de um job de treino."""
+    _exigir_worker_unico("/retrain")
+    status = gerenciador_treinos.obter(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job de treino não encontrado.")
+    return status
+
+
+@router.delete("/retrain/{job_id}")
+def retrain_cancel(job_id: str):
+    """Cancela um job de treino na fila ou em execução (o worker de treino é encerrado)."""
+    _exigir_worker_unico("/retrain")
+    status = gerenciador_treinos.cancelar(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job de treino não encontrado.")
+    logger.info(f"Cancelamento do treino {job_id} solicitado (estado: {status['estado']}).")
+    return status
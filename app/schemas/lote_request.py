@@ -0,0 +1,11 @@
+from typing import Any, Dict, List
+
+from pydantic import BaseModel, Field
+
+
+class LoteRequest(BaseModel):
+    # Cada item é validado individualmente contra AlunoRequest na rota,
+    # para que um aluno inválido não derrube a turma inteira.
+    alunos: List[Dict[str, Any]] = Field(
+        ..., min_length=1, description="Lista de alunos no mesmo formato do /predict"
+    )
@@ -0,0 +1,23 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.risco_response import RiscoResponse
+
+
+class ErroValidacao(BaseModel):
+    campo: str
+    mensagem: str
+
+
+class ItemLoteResponse(BaseModel):
+    indice: int
+    resultado: Optional[RiscoResponse] = None
+    erros: Optional[List[ErroValidacao]] = None
+
+
+class LoteResponse(BaseModel):
+    total: int
+    validos: int
+    invalidos: int
+    resultados: List[ItemLoteResponse]
@@ -0,0 +1,301 @@
+"""
+Fila de treinos da API (/retrain) com um único treino por vez.
+
+Cada pedido vira um job com ID, estado e progresso. Pedidos repetidos para um
+modo que já está na fila ou executando devolvem o job existente (single flight).
+Os jobs rodam em ordem, um de cada vez, num worker de treino de longa duração
+(src/train_worker.py) iniciado no primeiro job com prioridade menor (nice) e
+orçamento de núcleos; as importações pesadas (pandas, sklearn, MLflow) ficam
+carregadas entre um job e outro. A saída do treino é lida linha a linha, à medida
+que é produzida, e registrada no log; só as últimas linhas ficam em memória e
+linhas muito longas são quebradas em pedaços de TAMANHO_MAX_LINHA caracteres.
+Os eventos de progresso do treino (etapa, candidatos avaliados) alimentam
+`progresso()`, exposto como métricas do Prometheus. Cancelar um job em execução encerra o worker (e os processos
+filhos da busca); o próximo job inicia um worker novo.
+"""
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+from src.train_worker import MARCADOR_FIM, MARCADOR_PRONTO, MARCADOR_PROGRESSO
+
+logger = logging.getLogger(__name__)
+
+# Caracteres lidos por vez da saída do worker (limita a memória com linhas sem quebra)
+TAMANHO_MAX_LINHA = 8192
+
+NA_FILA = "na_fila"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+FALHOU = "falhou"
+CANCELADO = "cancelado"
+ESTADOS_ATIVOS = (NA_FILA, EXECUTANDO)
+
+
+def _linhas(stream):
+    """Linhas de `stream` à medida que chegam, sem a quebra, lidas em pedaços de até TAMANHO_MAX_LINHA."""
+    for linha in iter(lambda: stream.readline(TAMANHO_MAX_LINHA), ""):
+        yield linha.rstrip("\n")
+
+
+def _agora() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobTreino:
+    def __init__(self, modo: str, linhas_max: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.modo = modo
+        self.estado = NA_FILA
+        self.criado_em = _agora()
+        self.inicio = None
+        self.fim = None
+        self.duracao_s = None
+        self.erro = None
+        self.ultimas_linhas = deque(maxlen=linhas_max)
+        self.cancelar = False
+        self.inicio_monotonic = None
+        self.progresso = {
+            "etapa": 0,
+            "etapas": None,
+            "descricao": None,
+            "candidatos_total": None,
+            "folds": None,
+            "ajustes_concluidos": 0,
+        }
+
+    def registrar_progresso(self, evento: dict):
+        """Evento do treino: etapa (etapa/etapas/descricao), início da busca (candidatos/folds) ou ajuste concluído."""
+        if "ajuste" in evento:
+            self.progresso["ajustes_concluidos"] += int(evento["ajuste"])
+        if "candidatos" in evento:
+            self.progresso.update(candidatos_total=evento["candidatos"], folds=evento.get("folds"), ajustes_concluidos=0)
+        for chave in ("etapa", "etapas", "descricao"):
+            if chave in evento:
+                self.progresso[chave] = evento[chave]
+
+    @property
+    def candidatos_avaliados(self) -> int:
+        folds = self.progresso["folds"] or 1
+        return self.progresso["ajustes_concluidos"] // folds
+
+    def status(self) -> dict:
+        return {
+            "job_id": self.id,
+            "modo": self.modo,
+            "estado": self.estado,
+            "criado_em": self.criado_em,
+            "inicio": self.inicio,
+            "fim": self.fim,
+            "duracao_s": self.duracao_s,
+            "erro": self.erro,
+            "progresso": {**self.progresso, "candidatos_avaliados": self.candidatos_avaliados},
+            "ultimas_linhas": list(self.ultimas_linhas),
+        }
+
+
+class GerenciadorTreinos:
+    """
+    nucleos: núcleos para o treino (0 ou menos = sem limite)
+    nice: incremento de nice do worker
+    comando: linha de comando do worker (padrão: python -m src.train_worker)
+    historico_max: jobs encerrados mantidos para consulta
+    linhas_max: últimas linhas de saída guardadas por job
+    """
+
+    def __init__(self, nucleos: int = 0, nice: int = 10, comando=None, cwd=None, env=None,
+                 historico_max: int = 50, linhas_max: int = 20):
+        self.comando = list(comando or [sys.executable, "-m", "src.train_worker"])
+        self.comando += ["--nucleos", str(max(int(nucleos), 0)), "--nice", str(max(int(nice), 0))]
+        self.cwd = cwd
+        self.env = env
+        self.historico_max = historico_max
+        self.linhas_max = linhas_max
+        self._jobs = OrderedDict()
+        self._fila = deque()
+        self._condicao = threading.Condition()
+        self._thread = None
+        self._worker = None
+        self._atual = None
+
+    # API pública
+
+    def submeter(self, modo: str):
+        """Enfileira um treino. Retorna (job, criado); criado=False se o modo já estava na fila/executando."""
+        with self._condicao:
+            for job in self._jobs.values():
+                if job.modo == modo and job.estado in ESTADOS_ATIVOS:
+                    return job, False
+            job = JobTreino(modo, self.linhas_max)
+            self._jobs[job.id] = job
+            self._fila.append(job)
+            self._podar_historico()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._despachar, name="fila-treinos", daemon=True)
+                self._thread.start()
+            self._condicao.notify()
+            return job, True
+
+    def obter(self, job_id: str):
+        job = self._jobs.get(job_id)
+        return job.status() if job else None
+
+    def listar(self) -> list:
+        return [job.status() for job in reversed(self._jobs.values())]
+
+    def cancelar(self, job_id: str):
+        """Cancela um job na fila ou em execução. Retorna o status, ou None se o job não existe."""
+        with self._condicao:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.estado == NA_FILA:
+                self._fila.remove(job)
+                self._encerrar(job, CANCELADO)
+            elif job.estado == EXECUTANDO:
+                job.cancelar = True
+                self._parar_worker()
+            return job.status()
+
+    def aguardar(self, job_id: str, timeout: float = None) -> bool:
+        """Espera o job terminar (usado em testes e scripts)."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._condicao:
+            while self._jobs[job_id].estado in ESTADOS_ATIVOS:
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self._condicao.wait(restante)
+            return True
+
+    def progresso(self) -> dict:
+        """Progresso do job em execução (zeros sem treino em execução), lido pelas métricas."""
+        job = self._atual
+        if job is None:
+            return {"em_execucao": 0, "etapa": 0, "etapas": 0, "candidatos_avaliados": 0,
+                    "candidatos_total": 0, "segundos": 0.0}
+        return {
+            "em_execucao": 1,
+            "etapa": job.progresso["etapa"],
+            "etapas": job.progresso["etapas"] or 0,
+            "candidatos_avaliados": job.candidatos_avaliados,
+            "candidatos_total": job.progresso["candidatos_total"] or 0,
+            "segundos": time.monotonic() - job.inicio_monotonic,
+        }
+
+    def encerrar(self):
+        """Para o worker (se houver). Jobs na fila continuam para o próximo worker."""
+        with self._condicao:
+            self._parar_worker()
+
+    # Execução
+
+    def _despachar(self):
+        while True:
+            with self._condicao:
+                while not self._fila:
+                    self._condicao.wait()
+                job = self._fila.popleft()
+                job.estado = EXECUTANDO
+                job.inicio = _agora()
+                job.inicio_monotonic = time.monotonic()
+                self._atual = job
+            inicio = time.perf_counter()
+            try:
+                estado, erro = self._executar(job)
+            except Exception as e:
+                estado, erro = FALHOU, str(e)
+                self._parar_worker()
+            with self._condicao:
+                if job.cancelar:
+                    estado, erro = CANCELADO, None
+                job.duracao_s = round(time.perf_counter() - inicio, 3)
+                job.erro = erro
+                self._atual = None
+                self._encerrar(job, estado)
+            logger.info(f"Treino {job.id} ({job.modo}) terminou: {estado} em {job.duracao_s}s.")
+
+    def _executar(self, job: JobTreino):
+        worker = self._obter_worker()
+        with self._condicao:
+            # Cancelado antes de o worker existir (_parar_worker não tinha o que encerrar): não despacha
+            if job.cancelar:
+                return CANCELADO, None
+            worker.stdin.write(json.dumps({"id": job.id, "modo": job.modo}) + "\n")
+            worker.stdin.flush()
+        for linha in _linhas(worker.stdout):
+            if linha.startswith(MARCADOR_PROGRESSO):
+                try:
+                    job.registrar_progresso(json.loads(linha[len(MARCADOR_PROGRESSO):]))
+                except ValueError:
+                    logger.warning(f"Evento de progresso inválido: {linha[:200]}")
+                continue
+            if linha.startswith(MARCADOR_FIM):
+                resultado = json.loads(linha[len(MARCADOR_FIM):])
+                return (CONCLUIDO, None) if resultado["ok"] else (FALHOU, resultado["erro"])
+            if linha.strip():
+                job.ultimas_linhas.append(linha)
+                logger.info(f"[train.py] {linha}")
+        # EOF: o worker morreu (ou foi encerrado pelo cancelamento)
+        codigo = worker.wait()
+        with self._condicao:
+            if self._worker is worker:
+                self._worker = None
+        return FALHOU, f"Worker de treino encerrado (código {codigo})."
+
+    def _obter_worker(self):
+        with self._condicao:
+            if self._worker is not None and self._worker.poll() is None:
+                return self._worker
+            inicio = time.perf_counter()
+            self._worker = subprocess.Popen(
+                self.comando,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                cwd=self.cwd,
+                env={**(self.env or os.environ), "PYTHONUNBUFFERED": "1"},
+                # Grupo de processos próprio: o cancelamento alcança os filhos da busca (loky)
+                start_new_session=os.name == "posix",
+            )
+            worker = self._worker
+        # Aguarda as importações pesadas (uma única vez por worker)
+        for linha in _linhas(worker.stdout):
+            if linha.startswith(MARCADOR_PRONTO):
+                logger.info(f"Worker de treino pronto em {time.perf_counter() - inicio:.1f}s: {linha[len(MARCADOR_PRONTO):].strip()}")
+                return worker
+            if linha.strip():
+                logger.info(f"[train_worker] {linha.rstrip()}")
+        raise RuntimeError(f"Worker de treino não iniciou (código {worker.wait()}).")
+
+    def _parar_worker(self):
+        worker, self._worker = self._worker, None
+        if worker is None or worker.poll() is not None:
+            return
+        try:
+            if os.name == "posix":
+                os.killpg(worker.pid, signal.SIGTERM)
+            else:
+                worker.terminate()
+        except ProcessLookupError:
+            pass
+
+    def _encerrar(self, job: JobTreino, estado: str):
+        job.estado = estado
+        job.fim = _agora()
+        self._condicao.notify_all()
+
+    def _podar_historico(self):
+        encerrados = [j for j in self._jobs.values() if j.estado not in ESTADOS_ATIVOS]
+        for job in encerrados[: max(len(encerrados) - self.historico_max, 0)]:
+            del self._jobs[job.id]
@@ -0,0 +1,94 @@
+"""
+Benchmark: busca de hiperparâmetros do treino (src/train.construir_busca).
+
+Roda, sobre o mesmo split do treino, as duas estratégias de ESTRATEGIA_BUSCA e
+mede o tempo total (busca + refit) e o melhor recall de validação cruzada:
+- aleatoria_sem_cache: RandomizedSearchCV sem cache do pré-processamento
+  (comportamento anterior)
+- aleatoria: RandomizedSearchCV com o pré-processamento de cada fold em cache
+- halving: successive halving sobre o número de árvores, com o mesmo cache
+
+Também mede o recall do melhor modelo no conjunto de teste. Com --mlflow cada
+variante vira uma run no experimento "PassosMagicos_Busca" com as mesmas
+métricas registradas pelo treino (busca_segundos, busca_melhor_recall_cv).
+
+Uso:
+    python -m benchmarks.bench_busca
+    python -m benchmarks.bench_busca --variantes aleatoria halving --mlflow
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import mlflow
+from sklearn.metrics import recall_score
+from sklearn.model_selection import train_test_split
+
+from app.config import MLFLOW_TRACKING_URI
+from src.feature_engineering import create_features
+from src.preprocessing import COLUNAS_TEXTO_CONSUMIDAS, clean_data
+from src.train import construir_busca, construir_pipeline, registrar_busca
+from src.utils import load_data
+
+ARQUIVOS = {"2022": "files/PEDE2022.csv", "2023": "files/PEDE2023.csv", "2024": "files/PEDE2024.csv"}
+VARIANTES = ("aleatoria_sem_cache", "aleatoria", "halving")
+
+
+def rodar(variante, X_train, y_train, X_test, y_test):
+    estrategia = variante.replace("_sem_cache", "")
+    with tempfile.TemporaryDirectory(prefix="bench_busca_") as cache:
+        memoria = None if variante.endswith("_sem_cache") else cache
+        busca = construir_busca(estrategia, construir_pipeline(memory=memoria))
+        busca.set_params(verbose=0)
+        inicio = time.perf_counter()
+        busca.fit(X_train, y_train)
+        segundos = time.perf_counter() - inicio
+    busca.best_estimator_.set_params(memory=None)
+    return busca, segundos, {
+        "segundos": round(segundos, 1),
+        "melhor_recall_cv": round(float(busca.best_score_), 4),
+        "recall_teste": round(float(recall_score(y_test, busca.best_estimator_.predict(X_test))), 4),
+        "candidatos": len(busca.cv_results_["params"]),
+        "melhores_parametros": {k.replace("classifier__", ""): v for k, v in busca.best_params_.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--variantes", nargs="+", choices=VARIANTES, default=list(VARIANTES))
+    parser.add_argument("--mlflow", action="store_true", help="Registra cada variante como uma run")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    df = clean_data(load_data(ARQUIVOS), colunas_texto=COLUNAS_TEXTO_CONSUMIDAS)
+    X, y = create_features(df)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    if args.mlflow:
+        mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+        mlflow.set_experiment("PassosMagicos_Busca")
+
+    resultados = {"cpus": os.cpu_count(), "linhas_treino": len(X_train), "variantes": {}}
+    for variante in args.variantes:
+        busca, segundos, resultado = rodar(variante, X_train, y_train, X_test, y_test)
+        resultados["variantes"][variante] = resultado
+        if args.mlflow:
+            with mlflow.start_run(run_name=variante):
+                registrar_busca(busca, variante, segundos)
+                mlflow.log_metric("recall_teste", resultado["recall_teste"])
+
+    if "aleatoria_sem_cache" in resultados["variantes"]:
+        base = resultados["variantes"]["aleatoria_sem_cache"]["segundos"]
+        for variante, resultado in resultados["variantes"].items():
+            resultado["speedup"] = round(base / resultado["segundos"], 2)
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False, default=str))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False, default=str)
+
+
+if __name__ == "__main__":
+    main()
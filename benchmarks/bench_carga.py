@@ -0,0 +1,261 @@
+"""
+Teste de carga: vazão, latência e erros da API por nível de concorrência.
+
+Sobe `uvicorn app.main:app` localmente (ou usa --url de uma API já no ar) e, para
+cada nível de --concorrencias, mantém N clientes fazendo requisições sem pausa
+(cada cliente só envia a próxima depois da resposta) por --duracao segundos. O
+relatório traz, por nível, requisições/s, alunos/s, p50/p95/p99 da latência e a
+taxa de erros (status fora de 2xx, timeouts e falhas de conexão).
+
+As requisições vêm de:
+- alunos sorteados dos CSVs do PEDE (padrão): linhas reais, com os valores
+  normalizados como a API espera, para /predict ou, com --tamanho-lote, /predict/batch
+- uma gravação JSONL (--gravacao), repetida em ciclo. Cada linha é
+  {"rota": "/predict", "corpo": {...}}, ou só o corpo (um aluno vai para /predict,
+  {"alunos": [...]} vai para /predict/batch). --gravar salva as requisições
+  sorteadas nesse formato, para repetir exatamente a mesma carga depois.
+
+A API sobe com o modelo de --modelo, sem MLflow e, sem --com-cache, com o cache
+de predições desligado (mede o caminho do modelo). O cliente roda no mesmo host e
+disputa CPU com a API; com poucos núcleos a vazão medida é um limite inferior.
+
+Uso:
+    python -m benchmarks.bench_carga --concorrencias 1 2 4 8 16 --duracao 15
+    python -m benchmarks.bench_carga --tamanho-lote 100 --concorrencias 1 4 --saida carga_lote.json
+    python -m benchmarks.bench_carga --gravacao carga.jsonl --url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_workers import RAIZ, aguardar_api
+
+ARQUIVOS = {"2022": "files/PEDE2022.csv", "2023": "files/PEDE2023.csv", "2024": "files/PEDE2024.csv"}
+INDICADORES = ("IAA", "IEG", "IPS", "IDA", "IPV")
+# Nomes originais, nos CSVs, de campos da API que RENAME_MAPS não cobre
+COLUNAS_ORIGINAIS = {"Gênero": "Genero", "Instituição de ensino": "Instituicao_de_ensino", "Idade 22": "Idade"}
+
+
+def alunos_do_pede(arquivos=None) -> list:
+    """Alunos reais dos CSVs no formato do AlunoRequest; linhas incompletas ou fora das faixas ficam de fora."""
+    from app.schemas.aluno_request import GENEROS_VALIDOS, INSTITUICOES_VALIDAS
+    from src.feature_engineering import create_features
+    from src.preprocessing import COLUNAS_TEXTO_CONSUMIDAS, clean_data
+    from src.utils import mapa_renomeacao
+
+    anos = []
+    for ano, path in (arquivos or ARQUIVOS).items():
+        df = pd.read_csv(path, sep=";", dtype=str, encoding="utf-8")
+        df.columns = df.columns.str.strip()
+        df = df.rename(columns={**mapa_renomeacao(ano), **COLUNAS_ORIGINAIS})
+        anos.append(df.loc[:, ~df.columns.duplicated()].reindex(columns=[*INDICADORES, "Idade", *COLUNAS_TEXTO_CONSUMIDAS]))
+    df = clean_data(pd.concat(anos, ignore_index=True), colunas_texto=COLUNAS_TEXTO_CONSUMIDAS)
+    # Mesmo agrupamento de Gênero e Instituição do treino (MENINA -> FEMININO, ESCOLA PUBLICA -> PUBLICA...)
+    X, _ = create_features(df)
+    df["Genero"], df["Instituicao_de_ensino"] = X["Genero"], X["Instituicao_de_ensino"]
+
+    validos = (
+        df[list(INDICADORES)].apply(lambda c: c.between(0, 10)).all(axis=1)
+        & df["Idade"].between(5, 30)
+        & df["Genero"].isin(GENEROS_VALIDOS)
+        & df["Instituicao_de_ensino"].isin(INSTITUICOES_VALIDAS)
+        & df["Fase"].notna()
+    )
+    df = df[validos]
+    return [
+        {**{k: float(linha[k]) for k in INDICADORES}, "Idade": int(linha["Idade"]), "Fase": str(linha["Fase"]),
+         "Instituicao_de_ensino": linha["Instituicao_de_ensino"], "Genero": linha["Genero"]}
+        for linha in df.to_dict("records")
+    ]
+
+
+def sortear_requisicoes(alunos: list, n: int, tamanho_lote: int = 0, seed: int = 0) -> list:
+    """n requisições [(rota, corpo)] com alunos sorteados com reposição."""
+    rng = np.random.default_rng(seed)
+    if tamanho_lote <= 0:
+        return [("/predict", alunos[i]) for i in rng.integers(0, len(alunos), n)]
+    return [
+        ("/predict/batch", {"alunos": [alunos[i] for i in rng.integers(0, len(alunos), tamanho_lote)]})
+        for _ in range(n)
+    ]
+
+
+def ler_gravacao(path: str) -> list:
+    """Requisições [(rota, corpo)] de um arquivo JSONL gravado (ver docstring do módulo)."""
+    requisicoes = []
+    with open(path, encoding="utf-8") as f:
+        for numero, linha in enumerate(f, start=1):
+            if not linha.strip():
+                continue
+            registro = json.loads(linha)
+            if not isinstance(registro, dict):
+                raise ValueError(f"{path}:{numero}: esperado um objeto JSON.")
+            if "rota" in registro:
+                requisicoes.append((registro["rota"], registro["corpo"]))
+            else:
+                requisicoes.append(("/predict/batch" if "alunos" in registro else "/predict", registro))
+    if not requisicoes:
+        raise ValueError(f"Nenhuma requisição em {path}.")
+    return requisicoes
+
+
+def gravar(path: str, requisicoes: list):
+    with open(path, "w", encoding="utf-8") as f:
+        for rota, corpo in requisicoes:
+            f.write(json.dumps({"rota": rota, "corpo": corpo}, ensure_ascii=False) + "\n")
+
+
+def _alunos_na_requisicao(corpo: dict) -> int:
+    return len(corpo["alunos"]) if "alunos" in corpo else 1
+
+
+async def executar_nivel(url: str, requisicoes: list, concorrencia: int, duracao: float,
+                         timeout: float = 30.0) -> dict:
+    """N clientes em laço fechado por `duracao` segundos; as requisições são usadas em ciclo."""
+    latencias, status = [], []
+    alunos = 0
+    proxima = 0
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limites) as client:
+        async def cliente(fim: float):
+            nonlocal proxima, alunos
+            while time.perf_counter() < fim:
+                rota, corpo = requisicoes[proxima % len(requisicoes)]
+                proxima += 1
+                inicio = time.perf_counter()
+                try:
+                    resposta = await client.post(rota, json=corpo)
+                    codigo = resposta.status_code
+                except httpx.HTTPError:
+                    codigo = 0
+                latencias.append(time.perf_counter() - inicio)
+                status.append(codigo)
+                if 200 <= codigo < 300:
+                    alunos += _alunos_na_requisicao(corpo)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(inicio + duracao) for _ in range(concorrencia)))
+        decorrido = time.perf_counter() - inicio
+
+    ms = np.array(latencias) * 1000
+    codigos = np.array(status)
+    erros = int(((codigos < 200) | (codigos >= 300)).sum())
+    return {
+        "concorrencia": concorrencia,
+        "requisicoes": len(latencias),
+        "segundos": round(decorrido, 2),
+        "requisicoes_por_segundo": round(len(latencias) / decorrido, 1),
+        "alunos_por_segundo": round(alunos / decorrido, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "erros": erros,
+        "taxa_erros": round(erros / max(len(latencias), 1), 4),
+        "status": {str(c): int((codigos == c).sum()) for c in np.unique(codigos)},
+    }
+
+
+def subir_api(modelo: str, porta: int, workers: int, com_cache: bool, tmp: str):
+    env = dict(
+        os.environ,
+        MODELO_FALLBACK_PATH=os.path.abspath(modelo),
+        MLFLOW_TRACKING_URI=f"sqlite:///{os.path.join(tmp, 'mlflow.db')}",
+        CACHE_MODELOS_DIR=os.path.join(tmp, "cache"),
+        LOG_ARQUIVO=os.path.join(tmp, "api.log"),
+    )
+    if not com_cache:
+        env["CACHE_PREDICOES_TAMANHO"] = "0"
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(porta),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=RAIZ, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concorrencias", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duracao", type=float, default=10.0, help="Segundos por nível")
+    parser.add_argument("--aquecimento", type=float, default=2.0, help="Segundos de aquecimento (fora do relatório)")
+    parser.add_argument("--tamanho-lote", type=int, default=0, help="Alunos por requisição ao /predict/batch (0 = /predict)")
+    parser.add_argument("--gravacao", default=None, help="Arquivo JSONL com as requisições a repetir")
+    parser.add_argument("--gravar", default=None, help="Salva as requisições sorteadas neste JSONL")
+    parser.add_argument("--requisicoes-distintas", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", default=None, help="API já no ar (não sobe o uvicorn)")
+    parser.add_argument("--modelo", default="app/model/modelo.pkl")
+    parser.add_argument("--porta", type=int, default=8766)
+    parser.add_argument("--workers", type=int, default=1, help="Workers do uvicorn")
+    parser.add_argument("--com-cache", action="store_true", help="Mantém o cache de predições da API")
+    parser.add_argument("--timeout", type=float, default=180.0, help="Espera pela subida da API")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    if args.gravacao:
+        requisicoes = ler_gravacao(args.gravacao)
+    else:
+        requisicoes = sortear_requisicoes(alunos_do_pede(), args.requisicoes_distintas, args.tamanho_lote, args.seed)
+        if args.gravar:
+            gravar(args.gravar, requisicoes)
+
+    with tempfile.TemporaryDirectory(prefix="bench_carga_") as tmp:
+        processo = None
+        url = args.url
+        if url is None:
+            url = f"http://127.0.0.1:{args.porta}"
+            processo = subir_api(args.modelo, args.porta, args.workers, args.com_cache, tmp)
+        try:
+            if processo is not None:
+                aguardar_api(url, processo, args.timeout)
+            asyncio.run(executar_nivel(url, requisicoes, max(args.concorrencias), args.aquecimento))
+            niveis = []
+            for concorrencia in args.concorrencias:
+                nivel = asyncio.run(executar_nivel(url, requisicoes, concorrencia, args.duracao))
+                niveis.append(nivel)
+                print(f"{concorrencia:>4} clientes | {nivel['requisicoes_por_segundo']:>8} req/s "
+                      f"| p50 {nivel['p50_ms']} ms | p95 {nivel['p95_ms']} ms | p99 {nivel['p99_ms']} ms "
+                      f"| erros {nivel['taxa_erros']:.2%}", file=sys.stderr)
+        finally:
+            if processo is not None:
+                processo.terminate()
+                try:
+                    processo.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    processo.kill()
+
+    # Saturação: primeiro nível com 95% da maior vazão; a partir dele mais clientes só aumentam a latência
+    maior_vazao = max(n["requisicoes_por_segundo"] for n in niveis)
+    saturacao = next(n for n in niveis if n["requisicoes_por_segundo"] >= 0.95 * maior_vazao)
+    resultados = {
+        "cpus": os.cpu_count(),
+        "url": url if args.url else None,
+        "workers": None if args.url else args.workers,
+        "origem": args.gravacao or "pede",
+        "requisicoes_distintas": len(requisicoes),
+        "tamanho_lote": args.tamanho_lote,
+        "cache_predicoes": None if args.url else args.com_cache,
+        "niveis": niveis,
+        "saturacao": {
+            "concorrencia": saturacao["concorrencia"],
+            "requisicoes_por_segundo": saturacao["requisicoes_por_segundo"],
+            "maior_vazao": maior_vazao,
+        },
+    }
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: compactação da floresta (src/compaction.py).
+
+Ajusta no treino o pipeline do --modelo com --arvores árvores e compara, para
+cada tolerância de --tolerancias (com e sem poda de profundidade até
+--profundidade-minima):
+- árvores, profundidade, tamanho serializado e latência do predict_proba
+  (1 aluno e todo o conjunto de teste)
+- recall e F1 no LIMIAR_FIXO no conjunto de teste (fora da seleção)
+- tempo da compactação
+
+Uso:
+    python -m benchmarks.bench_compactacao --arvores 500 --tolerancias 0 0.01 0.02
+"""
+import argparse
+import json
+import os
+import time
+
+import joblib
+from sklearn.base import clone
+from sklearn.metrics import f1_score, recall_score
+from sklearn.model_selection import train_test_split
+
+from app.config import LIMIAR_FIXO
+from src.compaction import compactar_floresta, medir_modelo
+from src.feature_engineering import create_features
+from src.preprocessing import COLUNAS_TEXTO_CONSUMIDAS, clean_data
+from src.train import construir_pipeline
+from src.utils import load_data
+
+ARQUIVOS = {"2022": "files/PEDE2022.csv", "2023": "files/PEDE2023.csv", "2024": "files/PEDE2024.csv"}
+
+
+def _descrever(modelo, X_test, y_test) -> dict:
+    y_pred = modelo.predict_proba(X_test)[:, 1] >= LIMIAR_FIXO
+    arvores = modelo.named_steps["classifier"].estimators_
+    return {
+        "arvores": len(arvores),
+        "profundidade": max(arvore.tree_.max_depth for arvore in arvores),
+        **{chave: round(valor, 3) for chave, valor in medir_modelo(modelo, X_test).items()},
+        "recall_teste": round(recall_score(y_test, y_pred), 4),
+        "f1_teste": round(f1_score(y_test, y_pred), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modelo", default="app/model/modelo.pkl")
+    parser.add_argument("--arvores", type=int, default=500)
+    parser.add_argument("--tolerancias", type=float, nargs="+", default=[0.0, 0.01, 0.02])
+    parser.add_argument("--profundidade-minima", type=int, default=3)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    X, y = create_features(clean_data(load_data(ARQUIVOS), colunas_texto=COLUNAS_TEXTO_CONSUMIDAS))
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    base = joblib.load(args.modelo) if os.path.exists(args.modelo) else construir_pipeline()
+    modelo = clone(base).set_params(memory=None, classifier__n_estimators=args.arvores).fit(X_train, y_train)
+
+    resultados = {"cpus": os.cpu_count(), "limiar": LIMIAR_FIXO, "completo": _descrever(modelo, X_test, y_test),
+                  "variantes": {}}
+    for tolerancia in args.tolerancias:
+        for profundidade_minima in (0, args.profundidade_minima):
+            inicio = time.perf_counter()
+            compacto, resumo = compactar_floresta(modelo, X_train, y_train, limiar=LIMIAR_FIXO,
+                                                  tolerancia=tolerancia, profundidade_minima=profundidade_minima)
+            resultados["variantes"][f"tolerancia_{tolerancia}_profundidade_{profundidade_minima}"] = {
+                "segundos_compactacao": round(time.perf_counter() - inicio, 2),
+                **_descrever(compacto, X_test, y_test),
+                "recall_oob": round(resumo["recall_oob_depois"], 4),
+                "f1_oob": round(resumo["f1_oob_depois"], 4),
+            }
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: custo do monitoramento de drift (src/drift.py) por requisição.
+
+Mede o tempo de MonitorDrift.observar (um aluno, caminho do /predict), de
+observar_lote por aluno (caminho do /predict/batch) e do cálculo de PSI/KS de
+todas as features (feito a cada scrape do /metrics), para janelas de tamanhos
+diferentes: o custo por aluno e a memória não dependem do tamanho da janela.
+
+Uso:
+    python -m benchmarks.bench_drift
+    python -m benchmarks.bench_drift --alunos 50000 --janelas 1000 100000
+"""
+import argparse
+import json
+import time
+
+from benchmarks.bench_inference_executor import alunos_sinteticos
+from src.drift import MonitorDrift, construir_referencia
+
+
+def _registros(n: int, seed: int) -> list:
+    df = alunos_sinteticos(n, seed)
+    return df.to_dict(orient="records")
+
+
+def medir(referencia: dict, registros: list, janela: int, tamanho_lote: int) -> dict:
+    monitor = MonitorDrift(janela=janela, baldes=5, min_amostras=1)
+    monitor.definir_referencia(referencia)
+    for registro in registros[:1000]:  # aquecimento
+        monitor.observar(registro)
+
+    inicio = time.perf_counter()
+    for registro in registros:
+        monitor.observar(registro)
+    por_aluno = (time.perf_counter() - inicio) / len(registros)
+
+    inicio = time.perf_counter()
+    for i in range(0, len(registros), tamanho_lote):
+        monitor.observar_lote(registros[i:i + tamanho_lote])
+    por_aluno_lote = (time.perf_counter() - inicio) / len(registros)
+
+    inicio = time.perf_counter()
+    for _ in range(100):
+        monitor.pontuacoes()
+    scrape = (time.perf_counter() - inicio) / 100
+
+    return {
+        "janela": janela,
+        "observar_us": round(por_aluno * 1e6, 2),
+        "observar_lote_us_por_aluno": round(por_aluno_lote * 1e6, 2),
+        "psi_ks_todas_features_us": round(scrape * 1e6, 1),
+        "memoria_contagens_bytes": int(monitor._contagens.nbytes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--alunos", type=int, default=20000)
+    parser.add_argument("--tamanho-lote", type=int, default=500)
+    parser.add_argument("--janelas", type=int, nargs="+", default=[1000, 5000, 50000])
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    referencia = construir_referencia(alunos_sinteticos(5000, seed=0))
+    registros = _registros(args.alunos, seed=1)
+    resultados = {
+        "alunos": args.alunos,
+        "tamanho_lote": args.tamanho_lote,
+        "janelas": [medir(referencia, registros, janela, args.tamanho_lote) for janela in args.janelas],
+    }
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: create_features (src/feature_engineering.py) antes x depois.
+
+Compara a implementação anterior (df.copy(), extrair_fase via apply linha a
+linha, coluna de alvo criada e removida com drop, reproduzida aqui) com a atual
+(cópia rasa, Fase extraída uma vez por valor distinto) e com `inplace=True`.
+Os dados são a saída de clean_data sobre load_data, repetida 1x, 10x e 100x.
+Para cada variante mede o tempo e o pico de memória alocada (tracemalloc). As
+saídas precisam ser idênticas coluna a coluna.
+
+Uso:
+    python -m benchmarks.bench_feature_engineering
+    python -m benchmarks.bench_feature_engineering --escalas 1 10 --repeticoes 5
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering import create_features, extrair_fase
+from src.preprocessing import COLUNAS_TEXTO_CONSUMIDAS, clean_data
+from src.utils import load_data
+
+ARQUIVOS = {"2022": "files/PEDE2022.csv", "2023": "files/PEDE2023.csv", "2024": "files/PEDE2024.csv"}
+
+
+def create_features_antigo(df):
+    """create_features antes da vetorização (referência de resultado e de tempo)."""
+    df = df.copy()
+    if "Defasagem" in df.columns:
+        df["alvo_risco"] = np.where(df["Defasagem"] < 0, 1, 0)
+    if "Genero" in df.columns:
+        df["Genero"] = df["Genero"].replace({"MENINO": "MASCULINO", "MENINA": "FEMININO"})
+    if "Instituicao_de_ensino" in df.columns:
+        mapa_instituicao = {
+            "ESCOLA PUBLICA": "PUBLICA",
+            "ESCOLA JP II": "PUBLICA",
+            "CONCLUIU O 3O EM": "PUBLICA",
+            "NENHUMA DAS OPCOES ACIMA": "PUBLICA",
+            "PRIVADA *PARCERIAS COM BOLSA 100%": "PRIVADA",
+            "PRIVADA - PAGAMENTO POR *EMPRESA PARCEIRA": "PRIVADA",
+            "PRIVADA - PROGRAMA DE APADRINHAMENTO": "PRIVADA",
+            "BOLSISTA UNIVERSITARIO *FORMADO (A)": "PRIVADA",
+        }
+        df["Instituicao_de_ensino"] = df["Instituicao_de_ensino"].replace(mapa_instituicao)
+    if all(c in df.columns for c in ["IEG", "IDA", "IAA", "IPS"]):
+        df["IEG_x_IDA"] = df["IEG"] * df["IDA"]
+        df["IEG_x_IAA"] = df["IEG"] * df["IAA"]
+        df["IPS_x_IDA"] = df["IPS"] * df["IDA"]
+    if "Fase" in df.columns:
+        df["Fase_Num"] = df["Fase"].apply(extrair_fase)
+    cols_to_drop = ["Defasagem", "Ano_Base", "RA", "Nome", "Nome Anonimizado", "Data de Nasc", "Pedra", "Fase"]
+    cols_to_drop.extend(c for c in df.columns if "INDE" in str(c).upper() or "IAN" in str(c).upper())
+    X = df.drop(columns=[c for c in cols_to_drop if c in df.columns], errors="ignore")
+    y = None
+    if "alvo_risco" in X.columns:
+        y = X["alvo_risco"]
+        X = X.drop(columns=["alvo_risco"])
+    return X, y
+
+
+def medir(funcao, preparar, repeticoes: int):
+    """Tempo mínimo e pico de memória de funcao(preparar()); preparar fica fora da medição."""
+    tempos = []
+    for _ in range(repeticoes):
+        entrada = preparar()
+        inicio = time.perf_counter()
+        resultado = funcao(entrada)
+        tempos.append(time.perf_counter() - inicio)
+    entrada = preparar()
+    tracemalloc.start()
+    funcao(entrada)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, {"segundos": round(min(tempos), 4), "pico_memoria_mb": round(pico / 1e6, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    base = clean_data(load_data(ARQUIVOS), colunas_texto=COLUNAS_TEXTO_CONSUMIDAS)
+    resultados = {"escalas": []}
+    for escala in args.escalas:
+        df = pd.concat([base] * escala, ignore_index=True)
+        (X_antigo, y_antigo), antigo = medir(create_features_antigo, lambda: df, args.repeticoes)
+        (X_novo, y_novo), novo = medir(create_features, lambda: df, args.repeticoes)
+        (X_inplace, _), inplace = medir(
+            lambda entrada: create_features(entrada, inplace=True), df.copy, args.repeticoes
+        )
+        pd.testing.assert_frame_equal(X_antigo, X_novo)
+        pd.testing.assert_frame_equal(X_antigo, X_inplace)
+        pd.testing.assert_series_equal(y_antigo, y_novo)
+        resultados["escalas"].append({
+            "escala": escala,
+            "linhas": len(df),
+            "antigo": antigo,
+            "novo": novo,
+            "novo_inplace": inplace,
+            "speedup": round(antigo["segundos"] / novo["segundos"], 1),
+        })
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
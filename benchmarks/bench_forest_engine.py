@@ -0,0 +1,107 @@
+"""
+Benchmark: FlorestaCompilada (app/forest_engine.py) x predict_proba do sklearn.
+
+Mede latência (mediana e p95) para 1 e 1.000 linhas, memória dos arrays do
+modelo e pico de memória alocada durante a predição (tracemalloc), além do RSS
+do processo antes/depois de compilar a floresta.
+
+Uso:
+    python -m benchmarks.bench_forest_engine
+    python -m benchmarks.bench_forest_engine --modelo models:/Modelo_Risco_Defasagem@production
+"""
+import argparse
+import json
+import pickle
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+
+from app.forest_engine import compilar_floresta
+
+
+def rss_mb() -> float:
+    """RSS atual do processo em MB (Linux, /proc/self/status)."""
+    with open("/proc/self/status") as f:
+        for linha in f:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) / 1024
+    return float("nan")
+
+
+def carregar_classificador(origem: str):
+    if origem.startswith("models:/") or origem.startswith("runs:/"):
+        import mlflow.sklearn
+        from app.config import MLFLOW_TRACKING_URI
+
+        mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+        modelo = mlflow.sklearn.load_model(origem)
+    else:
+        modelo = joblib.load(origem)
+    return modelo.steps[-1][1] if hasattr(modelo, "steps") else modelo
+
+
+def dados_transformados(n_linhas: int, n_features: int, seed: int = 0) -> np.ndarray:
+    """Matriz já pré-processada com valores na faixa típica das notas (0-10)."""
+    rng = np.random.default_rng(seed)
+    return rng.uniform(0, 10, (n_linhas, n_features)).astype(np.float32)
+
+
+def medir(funcao, X, repeticoes: int) -> dict:
+    funcao(X)  # aquecimento
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(X)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tracemalloc.start()
+    funcao(X)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "mediana_ms": round(float(np.median(tempos)), 3),
+        "p95_ms": round(float(np.percentile(tempos, 95)), 3),
+        "pico_alocado_mb": round(pico / 1e6, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modelo", default="app/model/modelo.pkl")
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    classificador = carregar_classificador(args.modelo)
+    rss_antes = rss_mb()
+    floresta = compilar_floresta(classificador)
+    if floresta is None:
+        raise SystemExit("O modelo informado não é um RandomForestClassifier treinado.")
+    rss_depois = rss_mb()
+
+    resultados = {
+        "modelo": args.modelo,
+        "n_arvores": floresta.n_arvores,
+        "n_nos": int(len(floresta.folha)),
+        "tamanho_sklearn_pickle_mb": round(len(pickle.dumps(classificador)) / 1e6, 3),
+        "tamanho_arrays_compilados_mb": round(floresta.nbytes / 1e6, 3),
+        "rss_incremento_compilacao_mb": round(rss_depois - rss_antes, 3),
+        "latencia": {},
+    }
+    for n_linhas in (1, 1000):
+        X = dados_transformados(n_linhas, floresta.n_features_in_)
+        np.testing.assert_array_equal(floresta.predict_proba(X), classificador.predict_proba(X))
+        resultados["latencia"][str(n_linhas)] = {
+            "sklearn": medir(classificador.predict_proba, X, args.repeticoes),
+            "compilado": medir(floresta.predict_proba, X, args.repeticoes),
+        }
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
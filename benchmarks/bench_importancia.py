@@ -0,0 +1,73 @@
+"""
+Benchmark: importância por permutação (src/evaluate.importancia_permutacao).
+
+Compara, no conjunto de teste do treino e nas colunas originais, o tempo de:
+- sklearn: sklearn.inspection.permutation_importance no pipeline (scoring recall,
+  processos do joblib, cada um com uma cópia do modelo)
+- threads: importancia_permutacao, com o mesmo modelo e o mesmo X_test lidos por
+  todas as threads e recall/F1 no LIMIAR_FIXO
+
+com 1 e --nucleos núcleos. O modelo tem os hiperparâmetros do --modelo com
+--arvores árvores, reajustado no treino.
+
+Uso:
+    python -m benchmarks.bench_importancia --arvores 500 --repeticoes 10
+"""
+import argparse
+import json
+import os
+import time
+
+import joblib
+from sklearn.base import clone
+from sklearn.inspection import permutation_importance
+from sklearn.model_selection import train_test_split
+
+from app.config import LIMIAR_FIXO
+from src.evaluate import importancia_permutacao
+from src.feature_engineering import create_features
+from src.preprocessing import COLUNAS_TEXTO_CONSUMIDAS, clean_data
+from src.train import construir_pipeline
+from src.utils import load_data
+
+ARQUIVOS = {"2022": "files/PEDE2022.csv", "2023": "files/PEDE2023.csv", "2024": "files/PEDE2024.csv"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modelo", default="app/model/modelo.pkl")
+    parser.add_argument("--arvores", type=int, default=500)
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--nucleos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    X, y = create_features(clean_data(load_data(ARQUIVOS), colunas_texto=COLUNAS_TEXTO_CONSUMIDAS))
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    base = joblib.load(args.modelo) if os.path.exists(args.modelo) else construir_pipeline()
+    modelo = clone(base).set_params(memory=None, classifier__n_estimators=args.arvores).fit(X_train, y_train)
+
+    resultados = {"cpus": os.cpu_count(), "arvores": args.arvores, "linhas_teste": len(X_test),
+                  "repeticoes": args.repeticoes, "variantes": {}}
+    for nucleos in sorted({1, args.nucleos}):
+        inicio = time.perf_counter()
+        permutation_importance(modelo, X_test, y_test, scoring="recall", n_repeats=args.repeticoes,
+                               n_jobs=nucleos, random_state=0)
+        resultados["variantes"][f"sklearn_{nucleos}"] = {"segundos": round(time.perf_counter() - inicio, 2)}
+
+        inicio = time.perf_counter()
+        ranking = importancia_permutacao(modelo, X_test, y_test, limiar=LIMIAR_FIXO, repeticoes=args.repeticoes,
+                                         n_jobs=nucleos)
+        resultados["variantes"][f"threads_{nucleos}"] = {
+            "segundos": round(time.perf_counter() - inicio, 2),
+            "ranking": ranking["coluna"].tolist(),
+        }
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: vazão do executor de inferência (app/inference_executor.py).
+
+Simula requisições simultâneas ao /predict/batch (threads clientes, como o
+thread pool do FastAPI) e mede linhas pontuadas por segundo no modo "thread"
+e no modo "processos" com 1..N processos.
+
+Uso:
+    python -m benchmarks.bench_inference_executor
+    python -m benchmarks.bench_inference_executor --max-processos 8 --linhas 20000 --clientes 4
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.inference_executor import ExecutorInferencia
+
+
+def carregar_modelo(origem: str):
+    if origem.startswith("models:/") or origem.startswith("runs:/"):
+        import mlflow.sklearn
+        from app.config import MLFLOW_TRACKING_URI
+
+        mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+        return mlflow.sklearn.load_model(origem)
+    return joblib.load(origem)
+
+
+def alunos_sinteticos(n: int, seed: int = 0) -> pd.DataFrame:
+    """Linhas no formato de entrada do pipeline (mesmas colunas de routes._montar_features)."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "IAA": rng.uniform(0, 10, n).round(1),
+        "IEG": rng.uniform(0, 10, n).round(1),
+        "IPS": rng.uniform(0, 10, n).round(1),
+        "IDA": rng.uniform(0, 10, n).round(1),
+        "IPV": rng.uniform(0, 10, n).round(1),
+        "Idade": rng.integers(7, 20, n),
+        "Instituicao_de_ensino": rng.choice(["PUBLICA", "PRIVADA", "REDE DECISAO"], n),
+        "Genero": rng.choice(["FEMININO", "MASCULINO"], n),
+    })
+    df["IEG_x_IDA"] = df["IEG"] * df["IDA"]
+    df["IEG_x_IAA"] = df["IEG"] * df["IAA"]
+    df["IPS_x_IDA"] = df["IPS"] * df["IDA"]
+    df["Fase_Num"] = rng.integers(0, 9, n)
+    return df
+
+
+def medir_vazao(pontuar, lotes: list, clientes: int, repeticoes: int) -> dict:
+    pontuar(lotes[0])  # aquecimento
+    vazoes = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clientes) as pool:
+            list(pool.map(pontuar, lotes))
+        duracao = time.perf_counter() - inicio
+        vazoes.append(sum(len(lote) for lote in lotes) / duracao)
+    return {
+        "linhas_por_segundo": round(float(np.median(vazoes))),
+        "melhor_linhas_por_segundo": round(float(np.max(vazoes))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modelo", default="app/model/modelo.pkl")
+    parser.add_argument("--linhas", type=int, default=20000, help="Linhas por requisição")
+    parser.add_argument("--clientes", type=int, default=4, help="Requisições simultâneas")
+    parser.add_argument("--max-processos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--tamanho-bloco", type=int, default=2000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    modelo = carregar_modelo(args.modelo)
+    lotes = [alunos_sinteticos(args.linhas, seed) for seed in range(args.clientes)]
+    esperado = modelo.predict_proba(lotes[0])
+
+    resultados = {
+        "modelo": args.modelo,
+        "cpus": os.cpu_count(),
+        "linhas_por_requisicao": args.linhas,
+        "clientes": args.clientes,
+        "tamanho_bloco": args.tamanho_bloco,
+        "thread": medir_vazao(modelo.predict_proba, lotes, args.clientes, args.repeticoes),
+        "processos": {},
+    }
+    for n_processos in range(1, args.max_processos + 1):
+        executor = ExecutorInferencia(
+            "processos", n_processos, args.tamanho_bloco, fila_max=10_000, min_linhas=1
+        )
+        executor.carregar(modelo)
+        try:
+            np.testing.assert_array_equal(executor.predict_proba(lotes[0]), esperado)
+            resultados["processos"][str(n_processos)] = medir_vazao(
+                executor.predict_proba, lotes, args.clientes, args.repeticoes
+            )
+        finally:
+            executor.encerrar()
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
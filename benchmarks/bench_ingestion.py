@@ -0,0 +1,111 @@
+"""
+Benchmark: leitura dos CSVs do PEDE (src/utils.load_data) em escala.
+
+Gera cópias sintéticas dos arquivos de `files/` com as linhas repetidas 1x, 10x
+e 100x e compara:
+- antigo: leitura sequencial de todas as colunas, separador por tentativa e erro
+  (comportamento anterior de load_data, reproduzido aqui)
+- novo_sequencial: load_data com 1 thread (só colunas usadas, numéricas já convertidas)
+- novo_paralelo: load_data com uma thread por ano
+
+Para cada um mede o tempo e o pico de memória alocada (tracemalloc) e confere
+que clean_data produz o mesmo resultado nas duas leituras.
+
+Uso:
+    python -m benchmarks.bench_ingestion
+    python -m benchmarks.bench_ingestion --escalas 1 10 --repeticoes 3
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from src import utils
+from src.preprocessing import clean_data
+
+ARQUIVOS = {"2022": "files/PEDE2022.csv", "2023": "files/PEDE2023.csv", "2024": "files/PEDE2024.csv"}
+
+
+def gerar_copias(destino: str, escala: int) -> dict:
+    """Cópias dos CSVs com as linhas de dados repetidas `escala` vezes."""
+    paths = {}
+    for ano, origem in ARQUIVOS.items():
+        with open(origem, encoding="utf-8") as f:
+            cabecalho, *linhas = [linha + "\n" for linha in f.read().splitlines()]
+        caminho = os.path.join(destino, f"PEDE{ano}_x{escala}.csv")
+        with open(caminho, "w", encoding="utf-8") as f:
+            f.write(cabecalho)
+            for _ in range(escala):
+                f.writelines(linhas)
+        paths[ano] = caminho
+    return paths
+
+
+def load_data_antigo(file_paths) -> pd.DataFrame:
+    dfs = []
+    for ano, path in file_paths.items():
+        try:
+            df = pd.read_csv(path, sep=";", encoding="utf-8")
+        except (pd.errors.ParserError, UnicodeDecodeError):
+            df = pd.read_csv(path, sep=",", encoding="utf-8")
+        df.columns = df.columns.str.strip()
+        df = df.rename(columns={k: v for k, v in utils.RENAME_MAPS[ano].items() if k in df.columns})
+        df["Ano_Base"] = int(ano)
+        dfs.append(df)
+    df_full = pd.concat(dfs, ignore_index=True)
+    return df_full[[c for c in utils.TARGET_COLS if c in df_full.columns]]
+
+
+def medir(funcao, repeticoes: int) -> dict:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, {"segundos": round(min(tempos), 3), "pico_memoria_mb": round(pico / 1e6, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    resultados = {"cpus": os.cpu_count(), "escalas": []}
+    with tempfile.TemporaryDirectory(prefix="bench_ingestion_") as tmp:
+        for escala in args.escalas:
+            paths = gerar_copias(tmp, escala)
+            antigo, t_antigo = medir(lambda: load_data_antigo(paths), args.repeticoes)
+            novo, t_seq = medir(lambda: utils.load_data(paths, max_workers=1), args.repeticoes)
+            _, t_par = medir(lambda: utils.load_data(paths, max_workers=len(paths)), args.repeticoes)
+            pd.testing.assert_frame_equal(clean_data(antigo), clean_data(novo))
+            linha = {
+                "escala": escala,
+                "linhas": len(novo),
+                "mb_em_disco": round(sum(os.path.getsize(p) for p in paths.values()) / 1e6, 1),
+                "antigo": t_antigo,
+                "novo_sequencial": t_seq,
+                "novo_paralelo": t_par,
+                "speedup_paralelo": round(t_antigo["segundos"] / t_par["segundos"], 2),
+            }
+            resultados["escalas"].append(linha)
+            for p in paths.values():
+                os.remove(p)
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
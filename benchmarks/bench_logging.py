@@ -0,0 +1,126 @@
+"""
+Benchmark: latência do /predict com o logging antigo x fila de logging.
+
+Compara três configurações (app/logging_config.py):
+- sincrono_texto: FileHandler na thread da requisição, formato texto (comportamento antigo)
+- fila_json: QueueHandler + QueueListener, JSON e rotação por tamanho
+- fila_json_amostrado: igual, registrando só AMOSTRAGEM das predições
+
+Para cada uma mede p50/p99 da requisição completa (TestClient, alunos variados e
+cache de predições desligado) e o custo das chamadas de log dentro da requisição.
+
+Uso:
+    python -m benchmarks.bench_logging
+    python -m benchmarks.bench_logging --requisicoes 5000 --amostragem 0.05
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+
+
+def _preparar_ambiente(modelo: str, tmp: str):
+    """A API sobe com o modelo informado, sem MLflow e sem cache de modelos em disco."""
+    os.environ["MODELO_FALLBACK_PATH"] = os.path.abspath(modelo)
+    os.environ["MLFLOW_TRACKING_URI"] = f"sqlite:///{os.path.join(tmp, 'mlflow.db')}"
+    os.environ["CACHE_MODELOS_DIR"] = ""
+    os.environ["CACHE_PREDICOES_TAMANHO"] = "0"
+    # Floresta compilada: a predição fica em ~0,3 ms e o custo do log aparece na latência
+    os.environ["MOTOR_FLORESTA"] = "compilado"
+    os.environ["LOG_ARQUIVO"] = os.path.join(tmp, "inicializacao.log")
+
+
+def _alunos(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "IAA": round(float(rng.uniform(0, 10)), 1), "IEG": round(float(rng.uniform(0, 10)), 1),
+            "IPS": round(float(rng.uniform(0, 10)), 1), "IDA": round(float(rng.uniform(0, 10)), 1),
+            "IPV": round(float(rng.uniform(0, 10)), 1), "Idade": int(rng.integers(7, 20)),
+            "Fase": str(rng.integers(0, 9)), "Instituicao_de_ensino": "Publica", "Genero": "Feminino",
+        }
+        for _ in range(n)
+    ]
+
+
+def medir(client, alunos: list) -> dict:
+    for aluno in alunos[:50]:  # aquecimento
+        client.post("/predict", json=aluno)
+
+    # Tempo gasto dentro de logger.info na thread da requisição
+    custo_log = []
+    logger_info_original = logging.Logger.info
+
+    def info_cronometrado(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        logger_info_original(self, *args, **kwargs)
+        custo_log.append(time.perf_counter() - inicio)
+
+    latencias = []
+    logging.Logger.info = info_cronometrado
+    try:
+        for aluno in alunos:
+            inicio = time.perf_counter()
+            resposta = client.post("/predict", json=aluno)
+            latencias.append(time.perf_counter() - inicio)
+            assert resposta.status_code == 200
+    finally:
+        logging.Logger.info = logger_info_original
+
+    latencias_ms = np.array(latencias) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(latencias_ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencias_ms, 99)), 3),
+        "custo_log_por_requisicao_us": round(sum(custo_log) / len(alunos) * 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modelo", default="app/model/modelo.pkl")
+    parser.add_argument("--requisicoes", type=int, default=3000)
+    parser.add_argument("--amostragem", type=float, default=0.1)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_logging_") as tmp:
+        _preparar_ambiente(args.modelo, tmp)
+        from fastapi.testclient import TestClient
+
+        from app import routes
+        from app.logging_config import configurar_logging
+        from app.main import app
+
+        routes.recarregador.aguardar(timeout=60)
+        client = TestClient(app)
+        alunos = _alunos(args.requisicoes)
+
+        variantes = {
+            "sincrono_texto": ({"assincrono": False, "formato": "texto", "max_bytes": 0}, 1.0),
+            "fila_json": ({"assincrono": True, "formato": "json"}, 1.0),
+            "fila_json_amostrado": ({"assincrono": True, "formato": "json"}, args.amostragem),
+        }
+        resultados = {"modelo": args.modelo, "requisicoes": args.requisicoes, "variantes": {}}
+        for nome, (parametros, amostragem) in variantes.items():
+            arquivo = os.path.join(tmp, f"{nome}.log")
+            listener = configurar_logging(arquivo, console=False, forcar=True, **parametros)
+            routes.amostragem_log_predicoes = amostragem
+            resultado = medir(client, alunos)
+            if listener is not None:
+                listener.stop()
+            resultado["amostragem"] = amostragem
+            resultado["bytes_de_log"] = os.path.getsize(arquivo)
+            resultados["variantes"][nome] = resultado
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
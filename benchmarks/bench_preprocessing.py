@@ -0,0 +1,132 @@
+"""
+Benchmark: clean_data (src/preprocessing.py) linha a linha x por valor distinto.
+
+Compara a implementação anterior (apply por linha e duas voltas de string por
+coluna numérica, reproduzida aqui) com a atual, que roda cada conversão uma vez
+por valor distinto (factorize -> map -> take), normalizando todas as colunas de
+texto ou só as consumidas por create_features. Os dados são a saída de load_data
+repetida 1x, 10x e 100x. O resultado precisa ser idêntico ao da implementação
+anterior.
+
+Com --exigir-speedup o script termina com erro se o ganho na maior escala ficar
+abaixo do valor informado (guarda contra regressões de desempenho).
+
+Uso:
+    python -m benchmarks.bench_preprocessing
+    python -m benchmarks.bench_preprocessing --escalas 1 10 --exigir-speedup 2
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing import COLUNAS_TEXTO_CONSUMIDAS, clean_data
+from src.utils import load_data
+
+ARQUIVOS = {"2022": "files/PEDE2022.csv", "2023": "files/PEDE2023.csv", "2024": "files/PEDE2024.csv"}
+
+
+def clean_data_antigo(df):
+    """clean_data antes da vetorização (referência de resultado e de tempo)."""
+    df = df.copy()
+
+    if 'Defasagem' in df.columns:
+        df['Defasagem'] = pd.to_numeric(df['Defasagem'], errors='coerce')
+        df = df.dropna(subset=['Defasagem'])
+
+    if 'Idade' in df.columns:
+        def corrigir_idade_excel(valor):
+            valor = str(valor).strip()
+            if '/' in valor:
+                partes = valor.split('/')
+                if len(partes) >= 2:
+                    return partes[1]
+            return valor
+
+        df['Idade'] = df['Idade'].apply(corrigir_idade_excel)
+
+    numeric_cols = ['IAA', 'IEG', 'IPS', 'IDA', 'IPV', 'IAN', 'INDE', 'Idade']
+    for col in numeric_cols:
+        if col in df.columns:
+            col_str = df[col].astype(str)
+            has_comma = col_str.str.contains(',', na=False)
+            br_converted = col_str.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+            df[col] = col_str.where(~has_comma, br_converted)
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    if 'Idade' in df.columns:
+        df.loc[(df['Idade'] < 5) | (df['Idade'] > 30), 'Idade'] = np.nan
+
+    for col in ['IAA', 'IEG', 'IPS', 'IDA', 'IPV']:
+        if col in df.columns:
+            df[col] = df[col].clip(lower=0, upper=10)
+
+    for col in df.select_dtypes(include=['object']).columns:
+        df[col] = (
+            df[col].astype(str)
+            .str.normalize('NFKD')
+            .str.encode('ascii', errors='ignore')
+            .str.decode('utf-8')
+            .str.strip()
+            .str.upper()
+        )
+        df[col] = df[col].replace('NAN', np.nan)
+
+    return df
+
+
+def medir(funcao, repeticoes: int):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return resultado, round(min(tempos), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--exigir-speedup", type=float, default=None)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    base = load_data(ARQUIVOS)
+    resultados = {"escalas": []}
+    for escala in args.escalas:
+        df = pd.concat([base] * escala, ignore_index=True)
+        antigo, t_antigo = medir(lambda: clean_data_antigo(df), args.repeticoes)
+        novo, t_novo = medir(lambda: clean_data(df), args.repeticoes)
+        consumidas, t_consumidas = medir(
+            lambda: clean_data(df, colunas_texto=COLUNAS_TEXTO_CONSUMIDAS), args.repeticoes
+        )
+        pd.testing.assert_frame_equal(antigo, novo)
+        pd.testing.assert_frame_equal(antigo.drop(columns=["Pedra"]), consumidas.drop(columns=["Pedra"]))
+        resultados["escalas"].append({
+            "escala": escala,
+            "linhas": len(df),
+            "antigo_s": t_antigo,
+            "por_valor_unico_s": t_novo,
+            "so_colunas_consumidas_s": t_consumidas,
+            "speedup": round(t_antigo / t_novo, 1),
+            "speedup_so_consumidas": round(t_antigo / t_consumidas, 1),
+        })
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+    if args.exigir_speedup is not None:
+        obtido = resultados["escalas"][-1]["speedup"]
+        if obtido < args.exigir_speedup:
+            print(f"Speedup {obtido}x abaixo do exigido ({args.exigir_speedup}x).", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: retreino completo x sem busca x incremental (src/train.py).
+
+Simula a chegada de um ano novo do PEDE: o "modelo de produção" é ajustado só com
+2022 e 2023, com os hiperparâmetros do modelo informado em --modelo. Depois, com
+os três anos (mesmo split do treino), mede o tempo de cada modo de retreino e o
+resultado do portão de qualidade no conjunto de teste:
+- completo: busca de hiperparâmetros (ESTRATEGIA_BUSCA) + refit, só com --incluir-completo
+- sem_busca: mesmos hiperparâmetros, pipeline reajustado do zero
+- incremental: warm start, com as árvores de produção mais --arvores novas
+
+Uso:
+    python -m benchmarks.bench_retreino --modelo app/model/modelo.pkl
+    python -m benchmarks.bench_retreino --incluir-completo --saida resultado.json
+"""
+import argparse
+import json
+import os
+import time
+
+import joblib
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+
+from app.config import ESTRATEGIA_BUSCA, LIMIAR_FIXO, TOLERANCIA_RECALL
+from src.feature_engineering import create_features
+from src.preprocessing import COLUNAS_TEXTO_CONSUMIDAS, clean_data
+from src.train import ajustar_incremental, construir_busca, construir_pipeline, portao_qualidade
+from src.utils import load_data
+
+ARQUIVOS = {"2022": "files/PEDE2022.csv", "2023": "files/PEDE2023.csv", "2024": "files/PEDE2024.csv"}
+
+
+def preparar(arquivos):
+    X, y = create_features(clean_data(load_data(arquivos), colunas_texto=COLUNAS_TEXTO_CONSUMIDAS))
+    return train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modelo", default="app/model/modelo.pkl",
+                        help="Modelo cujos hiperparâmetros viram a produção simulada")
+    parser.add_argument("--arvores", type=int, default=100, help="Árvores novas no modo incremental")
+    parser.add_argument("--incluir-completo", action="store_true")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    base = joblib.load(args.modelo) if os.path.exists(args.modelo) else construir_pipeline()
+    X_antigo, _, y_antigo, _ = preparar({ano: ARQUIVOS[ano] for ano in ("2022", "2023")})
+    producao = clone(base).set_params(memory=None)
+    producao.fit(X_antigo, y_antigo)
+
+    X_train, X_test, y_train, y_test = preparar(ARQUIVOS)
+    resultados = {
+        "cpus": os.cpu_count(),
+        "linhas_producao": len(X_antigo),
+        "linhas_treino": len(X_train),
+        "arvores_producao": len(producao.named_steps["classifier"].estimators_),
+        "modos": {},
+    }
+
+    modos = (["completo"] if args.incluir_completo else []) + ["sem_busca", "incremental"]
+    for modo in modos:
+        inicio = time.perf_counter()
+        if modo == "completo":
+            busca = construir_busca(ESTRATEGIA_BUSCA, construir_pipeline()).set_params(verbose=0)
+            candidato = busca.fit(X_train, y_train).best_estimator_
+        else:
+            candidato = ajustar_incremental(producao, X_train, y_train, modo, arvores_novas=args.arvores)
+        segundos = time.perf_counter() - inicio
+        portao = portao_qualidade(producao, candidato, X_test, y_test, LIMIAR_FIXO, TOLERANCIA_RECALL)
+        resultados["modos"][modo] = {
+            "segundos": round(segundos, 2),
+            "arvores": len(candidato.named_steps["classifier"].estimators_),
+            **{k: round(v, 4) if isinstance(v, float) else v for k, v in portao.items()},
+        }
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
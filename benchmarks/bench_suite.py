@@ -0,0 +1,256 @@
+"""
+Suíte de benchmarks: todas as etapas do pipeline e o caminho quente da API.
+
+Mede tempo (mínimo de --repeticoes) e pico de memória alocada (tracemalloc) de:
+- load_data, clean_data e create_features com os CSVs reais do PEDE (escala 1)
+  e, nas demais escalas, com cópias de N vezes as linhas (--gerador copias) ou com
+  bases sintéticas de N mil linhas por ano (--gerador sintetico, src/synthetic_data.py)
+- ajuste do pipeline de src/train.py com hiperparâmetros fixos
+- predict_proba com 1, 100 e 10.000 alunos
+- ida e volta do /predict pelo TestClient (p50/p99, cache de predições desligado)
+
+Roda offline e em CPU: o modelo usado no predict_proba e na API é o ajustado aqui,
+sem MLflow. Os resultados saem em JSON (--saida). Com --comparar, cada medida é
+comparada com a de um baseline gravado antes (--gravar-baseline); medidas acima
+de (1 + --tolerancia) vezes o baseline são regressões e o script termina com erro.
+O baseline guarda o ambiente (CPUs, versões, gerador); se o ambiente atual for
+outro, os tempos não são comparáveis e o script recusa a comparação (código 2),
+a menos que --ignorar-ambiente seja passado (aí só avisa).
+
+Uso:
+    python -m benchmarks.bench_suite --gravar-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_suite --comparar benchmarks/baseline.json --saida resultado.json
+    python -m benchmarks.bench_suite --escalas 1 --requisicoes 200 --comparar benchmarks/baseline.json
+    python -m benchmarks.bench_suite --gerador sintetico --escalas 1 10 100 1000 --saida curva.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ARQUIVOS = {"2022": "files/PEDE2022.csv", "2023": "files/PEDE2023.csv", "2024": "files/PEDE2024.csv"}
+LINHAS_PREDICT = (1, 100, 10_000)
+# Hiperparâmetros fixos: o ajuste medido não depende da busca
+PARAMETROS_AJUSTE = {
+    "classifier__n_estimators": 100,
+    "classifier__max_depth": 20,
+    "classifier__class_weight": "balanced_subsample",
+}
+# Diferenças absolutas abaixo disso não contam como regressão (ruído de medida)
+MINIMO_SEGUNDOS = 0.002
+MINIMO_MB = 1.0
+# Itens do ambiente que precisam coincidir para os tempos serem comparáveis
+CHAVES_AMBIENTE = ("cpus", "maquina", "python", "pandas", "sklearn", "numpy", "gerador")
+
+
+def medir(funcao, repeticoes: int) -> tuple:
+    """(resultado, {"segundos": mínimo das repetições, "pico_memoria_mb": pico de uma execução extra})."""
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, {"segundos": round(min(tempos), 5), "pico_memoria_mb": round(pico / 1e6, 2)}
+
+
+def _arquivos(escala: int, gerador: str, tmp: str) -> dict:
+    from benchmarks.bench_ingestion import gerar_copias
+    from src.synthetic_data import gerar
+
+    if escala == 1:
+        return ARQUIVOS
+    if gerador == "sintetico":
+        return gerar(os.path.join(tmp, f"x{escala}"), linhas=escala * 1000)
+    return gerar_copias(tmp, escala)
+
+
+def medir_pipeline(escalas, repeticoes: int, tmp: str, gerador: str = "copias") -> tuple:
+    from src.feature_engineering import create_features
+    from src.preprocessing import COLUNAS_TEXTO_CONSUMIDAS, clean_data
+    from src.train import construir_pipeline
+    from src.utils import load_data
+
+    medidas = {}
+    base = None
+    for escala in escalas:
+        paths = _arquivos(escala, gerador, tmp)
+        rotulo = f"x{escala}" if escala == 1 or gerador == "copias" else f"sintetico{escala}"
+        df_raw, medidas[f"load_data@{rotulo}"] = medir(lambda: load_data(paths), repeticoes)
+        df_clean, medidas[f"clean_data@{rotulo}"] = medir(
+            lambda: clean_data(df_raw, colunas_texto=COLUNAS_TEXTO_CONSUMIDAS), repeticoes
+        )
+        (X, y), medidas[f"create_features@{rotulo}"] = medir(lambda: create_features(df_clean), repeticoes)
+        medidas[f"load_data@{rotulo}"]["linhas"] = len(df_raw)
+        if escala == 1:
+            base = (X, y)
+        else:
+            for p in paths.values():
+                os.remove(p)
+
+    # O ajuste e as predições usam sempre os dados reais
+    X, y = base or create_features(clean_data(load_data(ARQUIVOS), colunas_texto=COLUNAS_TEXTO_CONSUMIDAS))
+    pipeline = construir_pipeline().set_params(**PARAMETROS_AJUSTE)
+    _, medidas["fit@x1"] = medir(lambda: pipeline.fit(X, y), 1)
+
+    rng = np.random.default_rng(0)
+    for linhas in LINHAS_PREDICT:
+        amostra = X.iloc[rng.integers(0, len(X), linhas)].reset_index(drop=True)
+        _, medidas[f"predict_proba@{linhas}"] = medir(
+            lambda: pipeline.predict_proba(amostra), repeticoes * (10 if linhas == 1 else 1)
+        )
+    return pipeline, medidas
+
+
+def medir_api(requisicoes: int) -> dict:
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from benchmarks.bench_logging import _alunos
+
+    alunos = _alunos(requisicoes, seed=1)
+    client = TestClient(app)
+    for aluno in alunos[:20]:  # aquecimento
+        client.post("/predict", json=aluno)
+    latencias = []
+    for aluno in alunos:
+        inicio = time.perf_counter()
+        resposta = client.post("/predict", json=aluno)
+        latencias.append(time.perf_counter() - inicio)
+        assert resposta.status_code == 200, resposta.text
+    ms = np.array(latencias) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "requisicoes": requisicoes,
+    }
+
+
+def diferencas_ambiente(atual: dict, baseline: dict) -> list:
+    """Itens de CHAVES_AMBIENTE que diferem entre os dois resultados ("chave: baseline -> atual")."""
+    ambiente_atual, ambiente_base = atual.get("ambiente", {}), baseline.get("ambiente", {})
+    return [
+        f"{chave}: {ambiente_base.get(chave, 'ausente')} -> {ambiente_atual.get(chave, 'ausente')}"
+        for chave in CHAVES_AMBIENTE
+        if ambiente_base.get(chave) != ambiente_atual.get(chave)
+    ]
+
+
+def comparar(atual: dict, baseline: dict, tolerancia: float) -> list:
+    """
+    Compara as medidas de dois resultados da suíte. Retorna uma linha por medida
+    em comum com a razão atual/baseline e se é regressão (razão acima de 1 + tolerância
+    e diferença absoluta acima do ruído).
+    """
+    linhas = []
+    for nome, base in baseline.get("medidas", {}).items():
+        agora = atual.get("medidas", {}).get(nome)
+        if agora is None:
+            continue
+        for metrica, minimo in (("segundos", MINIMO_SEGUNDOS), ("pico_memoria_mb", MINIMO_MB),
+                                ("p50_ms", MINIMO_SEGUNDOS * 1000), ("p99_ms", MINIMO_SEGUNDOS * 1000)):
+            if metrica not in base or metrica not in agora:
+                continue
+            razao = agora[metrica] / base[metrica] if base[metrica] else float("inf")
+            regressao = razao > 1 + tolerancia and agora[metrica] - base[metrica] > minimo
+            linhas.append({
+                "medida": nome,
+                "metrica": metrica,
+                "baseline": base[metrica],
+                "atual": agora[metrica],
+                "razao": round(razao, 3),
+                "regressao": bool(regressao),
+            })
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--gerador", choices=("copias", "sintetico"), default="copias",
+                        help="Dados das escalas acima de 1")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--requisicoes", type=int, default=500, help="Requisições ao /predict")
+    parser.add_argument("--comparar", default=None, help="Baseline JSON para comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Piora relativa aceita (0.25 = 25%%)")
+    parser.add_argument("--ignorar-ambiente", action="store_true",
+                        help="Compara mesmo com ambiente diferente do baseline (só avisa)")
+    parser.add_argument("--gravar-baseline", default=None, help="Grava o resultado como baseline")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_suite_") as tmp:
+        # A API sobe com o modelo ajustado aqui: sem MLflow, sem cache de modelos e sem cache de predições
+        caminho_modelo = os.path.join(tmp, "modelo.pkl")
+        os.environ["MODELO_FALLBACK_PATH"] = caminho_modelo
+        os.environ["MLFLOW_TRACKING_URI"] = f"sqlite:///{os.path.join(tmp, 'mlflow.db')}"
+        os.environ["CACHE_MODELOS_DIR"] = ""
+        os.environ["CACHE_PREDICOES_TAMANHO"] = "0"
+        os.environ["LOG_ARQUIVO"] = os.path.join(tmp, "api.log")
+        os.environ["CACHE_DADOS_DIR"] = ""
+
+        import joblib
+        import sklearn
+
+        from app.logging_config import configurar_logging
+
+        # Mesmo logging da API (fila + arquivo), sem a cópia no terminal
+        configurar_logging(os.environ["LOG_ARQUIVO"], console=False)
+
+        pipeline, medidas = medir_pipeline(args.escalas, args.repeticoes, tmp, args.gerador)
+        joblib.dump(pipeline, caminho_modelo)
+        medidas["api_predict"] = medir_api(args.requisicoes)
+
+    resultados = {
+        "ambiente": {
+            "cpus": os.cpu_count(),
+            "maquina": platform.machine(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "numpy": np.__version__,
+            "gerador": args.gerador,
+        },
+        "medidas": medidas,
+    }
+
+    regressoes = []
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            baseline = json.load(f)
+        diferencas = diferencas_ambiente(resultados, baseline)
+        if diferencas:
+            print(f"Ambiente diferente do baseline ({'; '.join(diferencas)}): os tempos não são comparáveis. "
+                  "Grave um baseline neste ambiente (--gravar-baseline).", file=sys.stderr)
+            if not args.ignorar_ambiente:
+                sys.exit(2)
+            resultados["ambiente_divergente"] = diferencas
+        resultados["comparacao"] = comparar(resultados, baseline, args.tolerancia)
+        regressoes = [linha for linha in resultados["comparacao"] if linha["regressao"]]
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    for destino in (args.saida, args.gravar_baseline):
+        if destino:
+            with open(destino, "w", encoding="utf-8") as f:
+                json.dump({k: v for k, v in resultados.items() if k != "comparacao" or destino == args.saida},
+                          f, indent=2, ensure_ascii=False)
+
+    if regressoes:
+        for linha in regressoes:
+            print(f"Regressão: {linha['medida']} {linha['metrica']} {linha['baseline']} -> {linha['atual']} "
+                  f"({linha['razao']}x)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
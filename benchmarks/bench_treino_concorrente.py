@@ -0,0 +1,95 @@
+"""
+Benchmark: latência das predições enquanto um treino roda na mesma máquina.
+
+Mede p50/p99 de predict_proba com 1 aluno (o caminho do /predict) por alguns
+segundos em três cenários:
+- sem_treino: a API sozinha
+- treino_sem_limites: job da fila de treinos (app/training_jobs.py) com nice 0 e todos os núcleos
+- treino_limitado: mesmo job com TREINO_NICE e TREINO_NUCLEOS (o padrão da API)
+
+O job é um treino completo de verdade (src/train_worker.py) com o MLflow
+apontado para um banco temporário; a medição começa depois que o worker termina
+as importações e o job é cancelado ao final.
+
+Uso:
+    python -m benchmarks.bench_treino_concorrente --modelo app/model/modelo.pkl
+    python -m benchmarks.bench_treino_concorrente --segundos 20 --nice 19 --nucleos 1
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.config import TREINO_NICE, TREINO_NUCLEOS
+from app.training_jobs import GerenciadorTreinos
+
+ALUNO = {
+    "IAA": 5.5, "IEG": 2.0, "IPS": 6.0, "IDA": 4.5, "IPV": 7.0, "Idade": 15.0,
+    "Instituicao_de_ensino": "PUBLICA", "Genero": "FEMININO",
+    "IEG_x_IDA": 9.0, "IEG_x_IAA": 11.0, "IPS_x_IDA": 27.0, "Fase_Num": 8,
+}
+
+
+def medir_latencias(modelo, segundos: float) -> dict:
+    df = pd.DataFrame([ALUNO])
+    latencias = []
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        inicio = time.perf_counter()
+        modelo.predict_proba(df)
+        latencias.append(time.perf_counter() - inicio)
+    ms = np.array(latencias) * 1000
+    return {
+        "predicoes": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+    }
+
+
+def medir_com_treino(modelo, segundos: float, nucleos: int, nice: int, env: dict) -> dict:
+    gerenciador = GerenciadorTreinos(nucleos=nucleos, nice=nice, env=env)
+    job, _ = gerenciador.submeter("completo")
+    # Espera o worker importar as bibliotecas e o treino começar de fato
+    while not gerenciador.obter(job.id)["ultimas_linhas"]:
+        if gerenciador.obter(job.id)["estado"] != "executando" and gerenciador.obter(job.id)["estado"] != "na_fila":
+            raise RuntimeError(f"Treino terminou antes da medição: {gerenciador.obter(job.id)}")
+        time.sleep(0.1)
+    time.sleep(2)
+    resultado = medir_latencias(modelo, segundos)
+    gerenciador.cancelar(job.id)
+    gerenciador.aguardar(job.id, timeout=60)
+    return {**resultado, "estado_treino": gerenciador.obter(job.id)["estado"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modelo", default="app/model/modelo.pkl")
+    parser.add_argument("--segundos", type=float, default=15)
+    parser.add_argument("--nice", type=int, default=TREINO_NICE)
+    parser.add_argument("--nucleos", type=int, default=max(TREINO_NUCLEOS, 0))
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    modelo = joblib.load(args.modelo)
+    resultados = {"cpus": os.cpu_count(), "nice": args.nice, "nucleos": args.nucleos, "cenarios": {}}
+    with tempfile.TemporaryDirectory(prefix="bench_treino_") as tmp:
+        env = {**os.environ, "MLFLOW_TRACKING_URI": f"sqlite:///{tmp}/mlflow.db", "CACHE_DADOS_DIR": ""}
+        resultados["cenarios"]["sem_treino"] = medir_latencias(modelo, args.segundos)
+        resultados["cenarios"]["treino_sem_limites"] = medir_com_treino(modelo, args.segundos, 0, 0, env)
+        resultados["cenarios"]["treino_limitado"] = medir_com_treino(
+            modelo, args.segundos, args.nucleos, args.nice, env
+        )
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
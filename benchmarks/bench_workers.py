@@ -0,0 +1,171 @@
+"""
+Benchmark: memória da API com 1, 2, 4 e 8 workers do uvicorn.
+
+Sobe `uvicorn app.main:app --workers N` com o modelo privado em cada worker
+(MODELO_COMPARTILHADO=false) e com a floresta compartilhada via mmap
+(MODELO_COMPARTILHADO=true), aquece os workers com requisições ao /predict e
+mede, por processo, o RSS e o PSS (/proc/<pid>/smaps_rollup). O RSS conta as
+páginas compartilhadas em todos os processos; o PSS divide cada página
+compartilhada entre eles e é a medida justa do total consumido.
+
+O MLflow não é consultado: cada execução usa um diretório temporário como
+CACHE_MODELOS_DIR e o modelo informado como MODELO_FALLBACK_PATH.
+
+Uso (Linux):
+    python -m benchmarks.bench_workers
+    python -m benchmarks.bench_workers --workers 1 2 4 --saida workers.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ALUNO = {
+    "IAA": 5.5, "IEG": 2.0, "IPS": 6.0, "IDA": 4.5, "IPV": 7.0,
+    "Idade": 15, "Fase": "8", "Instituicao_de_ensino": "Publica", "Genero": "Feminino",
+}
+
+
+def _ler_kb(caminho: str, campo: str) -> int:
+    try:
+        with open(caminho) as f:
+            for linha in f:
+                if linha.startswith(campo):
+                    return int(linha.split()[1])
+    except (FileNotFoundError, ProcessLookupError):
+        pass
+    return 0
+
+
+def memoria_processo(pid: int) -> dict:
+    return {
+        "rss_mb": round(_ler_kb(f"/proc/{pid}/status", "VmRSS:") / 1024, 1),
+        "pss_mb": round(_ler_kb(f"/proc/{pid}/smaps_rollup", "Pss:") / 1024, 1),
+    }
+
+
+def filhos(pid: int) -> list:
+    """PIDs dos workers (filhos diretos), ignorando o resource_tracker do multiprocessing."""
+    encontrados = []
+    for nome in os.listdir("/proc"):
+        if not nome.isdigit():
+            continue
+        try:
+            with open(f"/proc/{nome}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{nome}/cmdline", "rb") as f:
+                comando = f.read().decode(errors="ignore")
+        except (FileNotFoundError, ProcessLookupError, IndexError):
+            continue
+        if ppid == pid and "resource_tracker" not in comando:
+            encontrados.append(int(nome))
+    return sorted(encontrados)
+
+
+def _post(url: str, corpo: dict) -> int:
+    requisicao = urllib.request.Request(
+        url, data=json.dumps(corpo).encode(), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(requisicao, timeout=30) as resposta:
+        return resposta.status
+
+
+def aguardar_api(url: str, processo, timeout: float):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError("O uvicorn terminou antes de ficar pronto.")
+        try:
+            with urllib.request.urlopen(f"{url}/", timeout=2):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f"API não respondeu em {timeout}s.")
+
+
+def medir(n_workers: int, compartilhado: bool, modelo: str, porta: int, timeout: float) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench_workers_") as tmp:
+        env = dict(
+            os.environ,
+            CACHE_MODELOS_DIR=os.path.join(tmp, "cache"),
+            MODELO_FALLBACK_PATH=os.path.abspath(modelo),
+            MLFLOW_TRACKING_URI=f"sqlite:///{os.path.join(tmp, 'mlflow.db')}",
+            MODELO_COMPARTILHADO="true" if compartilhado else "false",
+            CACHE_PREDICOES_TAMANHO="0",
+        )
+        if compartilhado:
+            # Grava a cópia compartilhada antes de subir os workers (evita N gravações na 1a subida)
+            subprocess.run(
+                [sys.executable, "-c", "import app.routes"], cwd=RAIZ, env=env, check=True,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+
+        url = f"http://127.0.0.1:{porta}"
+        processo = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(porta), "--workers", str(n_workers), "--log-level", "warning"],
+            cwd=RAIZ, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            aguardar_api(url, processo, timeout)
+            # Aquece: requisições suficientes para passar por todos os workers
+            for _ in range(20 * n_workers):
+                _post(f"{url}/predict", ALUNO)
+            time.sleep(2)
+
+            workers = filhos(processo.pid) if n_workers > 1 else [processo.pid]
+            por_worker = [memoria_processo(pid) for pid in workers]
+            mestre = memoria_processo(processo.pid) if n_workers > 1 else {"rss_mb": 0.0, "pss_mb": 0.0}
+        finally:
+            processo.terminate()
+            try:
+                processo.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                processo.kill()
+
+    rss = [m["rss_mb"] for m in por_worker]
+    pss = [m["pss_mb"] for m in por_worker]
+    return {
+        "workers": n_workers,
+        "processos_medidos": len(por_worker),
+        "rss_por_worker_mb": round(sum(rss) / max(len(rss), 1), 1),
+        "pss_por_worker_mb": round(sum(pss) / max(len(pss), 1), 1),
+        "rss_total_mb": round(sum(rss) + mestre["rss_mb"], 1),
+        "pss_total_mb": round(sum(pss) + mestre["pss_mb"], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modelo", default="app/model/modelo.pkl")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=180.0)
+    parser.add_argument("--saida", default=None, help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        raise SystemExit("Este benchmark lê /proc e só funciona no Linux.")
+
+    resultados = {"modelo": args.modelo, "privado": [], "compartilhado": []}
+    for modo in ("privado", "compartilhado"):
+        for n_workers in args.workers:
+            linha = medir(n_workers, modo == "compartilhado", args.modelo, args.porta, args.timeout)
+            resultados[modo].append(linha)
+            print(f"{modo:>13} | {n_workers} worker(s) | RSS total {linha['rss_total_mb']} MB "
+                  f"| PSS total {linha['pss_total_mb']} MB", file=sys.stderr)
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Compactação da floresta depois do treino: menos árvores (e, opcionalmente, menos
+profundidade) com recall e F1 próximos aos da floresta completa.
+
+A seleção usa as probabilidades out-of-bag do treino (as mesmas de
+`probabilidades_fora_da_amostra`): cada aluno só é avaliado pelas árvores que não
+o sortearam no bootstrap, então o conjunto de teste fica de fora e continua
+servindo para avaliar o modelo compactado.
+
+1. A probabilidade de cada árvore para cada aluno do treino é calculada uma vez
+   (matriz árvores x alunos) com a máscara out-of-bag.
+2. Seleção gulosa: a cada passo entra a árvore que mais melhora o pior dos dois
+   desvios (recall e F1 no limiar, contra a floresta completa), avaliando todas as
+   candidatas de uma vez com somas acumuladas. Para no primeiro subconjunto com os
+   dois desvios dentro da tolerância e com ao menos VOTOS_MINIMOS árvores out-of-bag
+   por aluno.
+3. Poda de profundidade (opcional): as árvores escolhidas são truncadas em
+   profundidades cada vez menores, até `profundidade_minima`, enquanto recall e F1
+   continuarem dentro da tolerância.
+
+O modelo compactado é um Pipeline novo: o pré-processamento é o mesmo objeto e
+a floresta original não é alterada. `n_estimators` passa a ser a quantidade de
+árvores servidas; o valor da busca fica em `n_estimators_busca_`, para que o
+retreino `sem_busca` reajuste a floresta completa antes de compactá-la de novo.
+"""
+import copy
+import pickle
+import time
+
+import numpy as np
+from sklearn.pipeline import Pipeline
+from sklearn.tree._tree import TREE_LEAF, TREE_UNDEFINED, Tree
+
+# Árvores out-of-bag mínimas por aluno do treino no subconjunto escolhido. Com 1 ou 2
+# votos, o out-of-bag mede uma floresta bem menor que a servida e a seleção gulosa se
+# ajusta ao ruído desses poucos votos (o recall cai no conjunto de teste)
+VOTOS_MINIMOS = 5
+
+
+def _contagens(positivos, y, cobertos):
+    """VP, FP e FN por linha de `positivos` (candidatos x alunos), só nos alunos cobertos."""
+    positivos = positivos & cobertos
+    vp = (positivos & y).sum(axis=1)
+    fp = (positivos & ~y).sum(axis=1)
+    fn = (~positivos & y & cobertos).sum(axis=1)
+    return vp, fp, fn
+
+
+def _recall_f1(vp, fp, fn):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        recall = np.where(vp + fn > 0, vp / (vp + fn), 0.0)
+        f1 = np.where(vp > 0, 2 * vp / (2 * vp + fp + fn), 0.0)
+    return recall, f1
+
+
+def _metricas_oob(soma, votos, y, limiar):
+    """Recall e F1 out-of-bag de cada linha de `soma`/`votos` (candidatos x alunos)."""
+    return _recall_f1(*_contagens(soma >= limiar * votos, y, votos > 0))
+
+
+def probabilidades_por_arvore(floresta, Xt):
+    """(probabilidade da classe positiva, máscara out-of-bag), ambas árvores x alunos."""
+    positiva = list(floresta.classes_).index(1)
+    probas = np.vstack([arvore.predict_proba(Xt)[:, positiva] for arvore in floresta.estimators_])
+    fora = np.vstack([np.bincount(amostras, minlength=Xt.shape[0]) == 0
+                      for amostras in floresta.estimators_samples_])
+    return probas, fora
+
+
+def selecionar_arvores(probas, fora, y, limiar, tolerancia):
+    """
+    Índices das árvores escolhidas pela seleção gulosa e as métricas out-of-bag da
+    floresta completa ({"recall", "f1"}) usadas como referência.
+    """
+    y = np.asarray(y).astype(bool)
+    contribuicao = np.where(fora, probas, 0.0)
+    votos_totais = fora.sum(axis=0)
+    recall_ref, f1_ref = _metricas_oob(contribuicao.sum(axis=0)[None], votos_totais[None], y, limiar)
+    # Alunos com menos votos na floresta completa exigem só os que têm
+    votos_exigidos = np.minimum(VOTOS_MINIMOS, votos_totais)
+    referencia = {"recall": float(recall_ref[0]), "f1": float(f1_ref[0])}
+
+    restantes = np.arange(len(probas))
+    escolhidas = []
+    soma = np.zeros(probas.shape[1])
+    votos = np.zeros(probas.shape[1])
+    while len(restantes):
+        recall, f1 = _metricas_oob(soma + contribuicao[restantes], votos + fora[restantes], y, limiar)
+        desvio = np.minimum(recall - referencia["recall"], f1 - referencia["f1"])
+        melhor = int(np.argmax(desvio))
+        arvore = restantes[melhor]
+        escolhidas.append(int(arvore))
+        soma += contribuicao[arvore]
+        votos += fora[arvore]
+        restantes = np.delete(restantes, melhor)
+        if desvio[melhor] >= -tolerancia and np.all(votos >= votos_exigidos):
+            break
+    return escolhidas, referencia
+
+
+def truncar_arvore(estimador, profundidade: int):
+    """Cópia da árvore com os nós abaixo de `profundidade` removidos (nós nessa profundidade viram folhas)."""
+    tree = estimador.tree_
+    estado = tree.__getstate__()
+    nos, valores = estado["nodes"], estado["values"]
+
+    # Percurso em largura: só os nós alcançáveis até a profundidade, renumerados em ordem
+    ordem, profundidades = [0], [0]
+    novo_indice = {0: 0}
+    for atual, nivel in zip(ordem, profundidades):
+        if nos[atual]["left_child"] == TREE_LEAF or nivel >= profundidade:
+            continue
+        for filho in (nos[atual]["left_child"], nos[atual]["right_child"]):
+            novo_indice[int(filho)] = len(ordem)
+            ordem.append(int(filho))
+            profundidades.append(nivel + 1)
+
+    novos_nos = nos[ordem].copy()
+    for posicao, nivel in enumerate(profundidades):
+        if novos_nos[posicao]["left_child"] == TREE_LEAF or nivel >= profundidade:
+            novos_nos[posicao]["left_child"] = novos_nos[posicao]["right_child"] = TREE_LEAF
+            novos_nos[posicao]["feature"] = TREE_UNDEFINED
+            novos_nos[posicao]["threshold"] = TREE_UNDEFINED
+        else:
+            novos_nos[posicao]["left_child"] = novo_indice[int(novos_nos[posicao]["left_child"])]
+            novos_nos[posicao]["right_child"] = novo_indice[int(novos_nos[posicao]["right_child"])]
+
+    nova = Tree(tree.n_features, np.asarray(tree.n_classes), tree.n_outputs)
+    nova.__setstate__({
+        "max_depth": min(int(estado["max_depth"]), profundidade),
+        "node_count": len(ordem),
+        "nodes": novos_nos,
+        "values": valores[ordem].copy(),
+    })
+    truncada = copy.copy(estimador)
+    truncada.tree_ = nova
+    return truncada
+
+
+def _montar(modelo, arvores):
+    floresta = copy.copy(modelo.named_steps["classifier"])
+    floresta.n_estimators_busca_ = getattr(floresta, "n_estimators_busca_", floresta.n_estimators)
+    floresta.estimators_ = list(arvores)
+    floresta.n_estimators = len(floresta.estimators_)
+    return Pipeline(modelo.steps[:-1] + [("classifier", floresta)], memory=modelo.memory)
+
+
+def compactar_floresta(modelo, X_train, y_train, limiar: float, tolerancia: float, profundidade_minima: int = 0):
+    """
+    Pipeline com a menor floresta encontrada cujo recall e F1 out-of-bag (no `limiar`)
+    não caem mais que `tolerancia` em relação à floresta completa de `modelo`.
+    Com `profundidade_minima` > 0, as árvores escolhidas também são truncadas.
+
+    Retorna (modelo_compacto, resumo). Florestas sem bootstrap (sem out-of-bag) são
+    devolvidas sem alteração.
+    """
+    floresta = modelo.named_steps["classifier"]
+    arvores_antes = len(floresta.estimators_)
+    profundidade_antes = max(arvore.tree_.max_depth for arvore in floresta.estimators_)
+    if not getattr(floresta, "bootstrap", False):
+        return modelo, {"arvores_antes": arvores_antes, "arvores_depois": arvores_antes,
+                        "profundidade_antes": profundidade_antes, "profundidade_depois": profundidade_antes}
+
+    Xt = modelo.named_steps["preprocessor"].transform(X_train)
+    y = np.asarray(y_train).astype(bool)
+    probas, fora = probabilidades_por_arvore(floresta, Xt)
+    escolhidas, referencia = selecionar_arvores(probas, fora, y, limiar, tolerancia)
+    arvores = [floresta.estimators_[i] for i in escolhidas]
+
+    def metricas(probas_subconjunto):
+        fora_subconjunto = fora[escolhidas]
+        soma = np.where(fora_subconjunto, probas_subconjunto, 0.0).sum(axis=0)
+        recall, f1 = _metricas_oob(soma[None], fora_subconjunto.sum(axis=0)[None], y, limiar)
+        return float(recall[0]), float(f1[0])
+
+    recall, f1 = metricas(probas[escolhidas])
+    profundidade = max(arvore.tree_.max_depth for arvore in arvores)
+    if profundidade_minima > 0:
+        positiva = list(floresta.classes_).index(1)
+        for candidata in range(profundidade - 1, profundidade_minima - 1, -1):
+            truncadas = [truncar_arvore(arvore, candidata) for arvore in arvores]
+            recall_t, f1_t = metricas(np.vstack([a.predict_proba(Xt)[:, positiva] for a in truncadas]))
+            if recall_t < referencia["recall"] - tolerancia or f1_t < referencia["f1"] - tolerancia:
+                break
+            arvores, profundidade, recall, f1 = truncadas, candidata, recall_t, f1_t
+
+    resumo = {
+        "arvores_antes": arvores_antes,
+        "arvores_depois": len(arvores),
+        "profundidade_antes": profundidade_antes,
+        "profundidade_depois": profundidade,
+        "recall_oob_antes": referencia["recall"],
+        "recall_oob_depois": recall,
+        "f1_oob_antes": referencia["f1"],
+        "f1_oob_depois": f1,
+    }
+    return _montar(modelo, arvores), resumo
+
+
+def medir_modelo(modelo, X, repeticoes: int = 20) -> dict:
+    """Tamanho serializado (MB) e latência do predict_proba (ms, mínimo das repetições) com 1 aluno e com `X`."""
+    def latencia(amostra):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            modelo.predict_proba(amostra)
+            tempos.append(time.perf_counter() - inicio)
+        return min(tempos) * 1000
+
+    return {
+        "tamanho_mb": len(pickle.dumps(modelo, protocol=pickle.HIGHEST_PROTOCOL)) / 1e6,
+        "latencia_1_ms": latencia(X.iloc[:1]),
+        "latencia_lote_ms": latencia(X),
+    }
@@ -0,0 +1,266 @@
+"""
+Monitoramento de drift das features de entrada do modelo.
+
+No treino (src/train.py) a distribuição de cada feature do conjunto de treino
+vira uma referência: histograma de faixas fixas (quantis do treino) para as
+numéricas e frequência por categoria para as categóricas. Na API, cada aluno
+recebido incrementa um contador da faixa correspondente em uma janela
+deslizante de tamanho fixo; a memória não cresce com o tráfego e o custo por
+aluno é O(1) (uma busca binária em ~10 limites por feature numérica).
+
+A janela é dividida em `baldes`: quando o balde atual enche, o mais antigo é
+zerado e reaproveitado. PSI e KS são calculados sob demanda (scrape do /metrics)
+comparando a janela com a referência.
+"""
+import bisect
+import json
+import math
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+FEATURES_NUMERICAS = ("IAA", "IEG", "IPS", "IDA", "IPV", "Idade", "Fase_Num")
+FEATURES_CATEGORICAS = ("Instituicao_de_ensino", "Genero")
+
+# Proporção mínima usada no PSI (faixas vazias tornariam o log infinito)
+_EPSILON = 1e-4
+
+
+def construir_referencia(X: pd.DataFrame, n_faixas: int = 10) -> dict:
+    """
+    Referência de drift (JSON) a partir do conjunto de treino (saída de create_features).
+    Numéricas: limites internos dos quantis e proporção por faixa + faixa de nulos.
+    Categóricas: proporção por categoria + faixa "outros" (nulos e categorias novas).
+    """
+    referencia = {"versao": 1, "n": int(len(X)), "numericas": {}, "categoricas": {}}
+    for coluna in FEATURES_NUMERICAS:
+        if coluna not in X.columns:
+            continue
+        valores = pd.to_numeric(X[coluna], errors="coerce").to_numpy(dtype=float)
+        presentes = valores[~np.isnan(valores)]
+        limites = []
+        if len(presentes):
+            quantis = np.quantile(presentes, np.linspace(0, 1, n_faixas + 1)[1:-1])
+            limites = [float(v) for v in np.unique(quantis)]
+        contagens = _contar_numerica(valores, limites)
+        referencia["numericas"][coluna] = {
+            "limites": limites,
+            "proporcoes": _proporcoes(contagens),
+        }
+    for coluna in FEATURES_CATEGORICAS:
+        if coluna not in X.columns:
+            continue
+        frequencias = X[coluna].dropna().astype(str).value_counts()
+        categorias = sorted(frequencias.index)
+        contagens = np.array([frequencias[c] for c in categorias] + [X[coluna].isna().sum()], dtype=float)
+        referencia["categoricas"][coluna] = {
+            "categorias": categorias,
+            "proporcoes": _proporcoes(contagens),
+        }
+    return referencia
+
+
+def salvar_referencia(referencia: dict, caminho: str):
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(referencia, f, ensure_ascii=False, indent=2)
+
+
+def carregar_referencia(caminho: str):
+    """Referência salva por salvar_referencia, ou None se o arquivo não existir."""
+    if not caminho or not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _proporcoes(contagens) -> list:
+    total = float(np.sum(contagens))
+    if total == 0:
+        return [0.0] * len(contagens)
+    return [float(c) / total for c in contagens]
+
+
+def _contar_numerica(valores: np.ndarray, limites: list) -> np.ndarray:
+    """Contagem por faixa; a última posição conta os nulos."""
+    faixas = np.searchsorted(limites, valores, side="right")
+    faixas[np.isnan(valores)] = len(limites) + 1
+    return np.bincount(faixas, minlength=len(limites) + 2).astype(float)
+
+
+def psi(referencia, atual) -> float:
+    """Population Stability Index entre duas distribuições (proporções por faixa)."""
+    p = np.clip(np.asarray(referencia, dtype=float), _EPSILON, None)
+    q = np.clip(np.asarray(atual, dtype=float), _EPSILON, None)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def ks(referencia, atual) -> float:
+    """Estatística KS sobre as faixas ordenadas: maior distância entre as CDFs."""
+    return float(np.max(np.abs(np.cumsum(atual) - np.cumsum(referencia))))
+
+
+class MonitorDrift:
+    """
+    Contagens da janela deslizante por feature, comparadas a uma referência do treino.
+
+    janela: quantidade de alunos considerada no cálculo do drift
+    baldes: em quantas partes a janela é dividida (a janela "anda" um balde por vez)
+    min_amostras: abaixo disso as pontuações são NaN (amostra pequena demais)
+    """
+
+    def __init__(self, janela: int = 5000, baldes: int = 5, min_amostras: int = 200):
+        self.baldes = max(int(baldes), 1)
+        self.capacidade_balde = max(int(janela) // self.baldes, 1)
+        self.min_amostras = max(int(min_amostras), 1)
+        self._lock = threading.Lock()
+        self.definir_referencia(None)
+
+    @property
+    def habilitado(self) -> bool:
+        return self._referencia is not None
+
+    def definir_referencia(self, referencia):
+        """Troca a referência e zera a janela (não faz nada se a referência for a mesma)."""
+        with self._lock:
+            if referencia is not None and referencia == getattr(self, "_referencia", None):
+                return
+            self._referencia = referencia
+            self._limites = {}
+            self._categorias = {}
+            self._esperado = {}
+            self._faixas = {}  # feature -> slice das colunas da matriz de contagens
+            inicio = 0
+            if referencia is not None:
+                for coluna, dados in referencia.get("numericas", {}).items():
+                    self._limites[coluna] = dados["limites"]
+                    self._esperado[coluna] = np.asarray(dados["proporcoes"], dtype=float)
+                    fim = inicio + len(dados["limites"]) + 2
+                    self._faixas[coluna] = slice(inicio, fim)
+                    inicio = fim
+                for coluna, dados in referencia.get("categoricas", {}).items():
+                    self._categorias[coluna] = {c: i for i, c in enumerate(dados["categorias"])}
+                    self._esperado[coluna] = np.asarray(dados["proporcoes"], dtype=float)
+                    fim = inicio + len(dados["categorias"]) + 1
+                    self._faixas[coluna] = slice(inicio, fim)
+                    inicio = fim
+            # Baldes fechados em numpy; o balde atual é uma lista (incremento barato por aluno)
+            self._contagens = np.zeros((self.baldes, inicio), dtype=np.int64)
+            self._tamanhos = np.zeros(self.baldes, dtype=np.int64)
+            self._balde = 0
+            self._atual = [0] * inicio
+            self._n_atual = 0
+            self._posicao_numericas = [
+                (coluna, limites, self._faixas[coluna].start, self._faixas[coluna].stop - 1)
+                for coluna, limites in self._limites.items()
+            ]
+            self._posicao_categoricas = [
+                (coluna, categorias, self._faixas[coluna].start, self._faixas[coluna].stop - 1)
+                for coluna, categorias in self._categorias.items()
+            ]
+
+    def _avancar(self):
+        """Balde atual cheio: fecha o balde e reaproveita o mais antigo como o novo atual."""
+        self._contagens[self._balde] = self._atual
+        self._tamanhos[self._balde] = self._n_atual
+        self._balde = (self._balde + 1) % self.baldes
+        self._contagens[self._balde] = 0
+        self._tamanhos[self._balde] = 0
+        self._atual = [0] * len(self._atual)
+        self._n_atual = 0
+
+    def observar(self, registro: dict):
+        """Conta um aluno (mesmas chaves de _registro_aluno na API)."""
+        if self._referencia is None:
+            return
+        with self._lock:
+            if self._referencia is None:
+                return
+            if self._n_atual >= self.capacidade_balde:
+                self._avancar()
+            atual = self._atual
+            for coluna, limites, inicio, nulos in self._posicao_numericas:
+                valor = registro.get(coluna)
+                if valor is None or valor != valor:
+                    atual[nulos] += 1
+                else:
+                    atual[inicio + bisect.bisect_right(limites, valor)] += 1
+            for coluna, categorias, inicio, outros in self._posicao_categoricas:
+                posicao = categorias.get(registro.get(coluna))
+                atual[outros if posicao is None else inicio + posicao] += 1
+            self._n_atual += 1
+
+    def observar_lote(self, registros: list):
+        """Conta vários alunos de uma vez (contagem vetorizada por feature)."""
+        if self._referencia is None or not registros:
+            return
+        with self._lock:
+            if self._referencia is None:
+                return
+            inicio = 0
+            while inicio < len(registros):
+                if self._n_atual >= self.capacidade_balde:
+                    self._avancar()
+                parte = registros[inicio:inicio + self.capacidade_balde - self._n_atual]
+                self._atual = (np.asarray(self._atual) + self._contar_lote(parte)).tolist()
+                self._n_atual += len(parte)
+                inicio += len(parte)
+
+    def _contar_lote(self, registros: list) -> np.ndarray:
+        contagens = np.zeros(len(self._atual), dtype=np.int64)
+        for coluna, limites in self._limites.items():
+            valores = np.array(
+                [np.nan if r.get(coluna) is None else r.get(coluna) for r in registros], dtype=float
+            )
+            contagens[self._faixas[coluna]] += _contar_numerica(valores, limites).astype(np.int64)
+        for coluna, categorias in self._categorias.items():
+            indices = [categorias.get(r.get(coluna), len(categorias)) for r in registros]
+            contagens[self._faixas[coluna]] += np.bincount(indices, minlength=len(categorias) + 1)
+        return contagens
+
+    def _janela(self) -> np.ndarray:
+        """Contagens somadas de todos os baldes (chamar com o lock)."""
+        return self._contagens.sum(axis=0) + np.asarray(self._atual, dtype=np.int64)
+
+    def _distribuicao(self, coluna: str):
+        """(proporções da referência, proporções da janela) da feature, ou None com amostra insuficiente."""
+        with self._lock:
+            n = int(self._tamanhos.sum()) + self._n_atual
+            faixa = self._faixas.get(coluna)
+            if faixa is None or n < self.min_amostras:
+                return None
+            return self._esperado[coluna], self._janela()[faixa] / n
+
+    def amostras(self) -> int:
+        """Quantidade de alunos na janela atual."""
+        return int(self._tamanhos.sum()) + self._n_atual
+
+    def psi(self, coluna: str) -> float:
+        distribuicoes = self._distribuicao(coluna)
+        if distribuicoes is None:
+            return math.nan
+        return psi(*distribuicoes)
+
+    def ks(self, coluna: str) -> float:
+        """KS só faz sentido para features numéricas (faixas ordenadas); NaN nas categóricas."""
+        if coluna not in self._limites:
+            return math.nan
+        distribuicoes = self._distribuicao(coluna)
+        if distribuicoes is None:
+            return math.nan
+        # A faixa de nulos (última) fica de fora: as CDFs comparam só valores presentes
+        esperado, atual = (d[:-1] for d in distribuicoes)
+        if esperado.sum() == 0 or atual.sum() == 0:
+            return math.nan
+        return ks(esperado / esperado.sum(), atual / atual.sum())
+
+    def pontuacoes(self) -> dict:
+        """PSI e KS de todas as features da referência (útil para depuração e testes)."""
+        return {
+            coluna: {"psi": self.psi(coluna), "ks": self.ks(coluna)}
+            for coluna in self._faixas
+        }
@@ -1,6 +1,10 @@
+import time
+
+import numpy as np
 import pandas as pd
 import mlflow
 import matplotlib.pyplot as plt
+from joblib import Parallel, delayed, effective_n_jobs
 from sklearn.metrics import (
     classification_report,
     recall_score,
@@ -12,9 +16,226 @@ from sklearn.metrics import (
 from sklearn.metrics import ConfusionMatrixDisplay
 
 
-def evaluate_model(model, X_test, y_test, threshold=0.5):
+def varredura_limiares(y_true, y_proba):
+    """
+    Métricas para todos os limiares distintos de uma vez: ordena as probabilidades uma
+    única vez e acumula verdadeiros/falsos positivos (cumsum). Cada linha vale para
+    "risco se probabilidade >= limiar". Probabilidades nulas (NaN) são ignoradas.
+
+    Retorna um DataFrame com limiar, vp, fp, fn, vn, recall, precisao e f1, do maior
+    limiar para o menor.
+    """
+    y_proba = np.asarray(y_proba, dtype=float)
+    y_true = np.asarray(y_true).astype(bool)
+    validos = ~np.isnan(y_proba)
+    y_proba, y_true = y_proba[validos], y_true[validos]
+
+    ordem = np.argsort(-y_proba, kind="mergesort")
+    y_proba, y_true = y_proba[ordem], y_true[ordem]
+    # Última posição de cada valor distinto: todos os alunos com aquela probabilidade entram juntos
+    fim = np.r_[np.flatnonzero(np.diff(y_proba)), len(y_proba) - 1]
+    vp = np.cumsum(y_true)[fim]
+    fp = (fim + 1) - vp
+
+    positivos = int(y_true.sum())
+    negativos = len(y_true) - positivos
+    fn = positivos - vp
+    vn = negativos - fp
+    with np.errstate(divide="ignore", invalid="ignore"):
+        recall = np.where(positivos > 0, vp / max(positivos, 1), 0.0)
+        precisao = vp / (vp + fp)
+        f1 = np.where(vp > 0, 2 * vp / (2 * vp + fp + fn), 0.0)
+    return pd.DataFrame({
+        "limiar": y_proba[fim],
+        "vp": vp, "fp": fp, "fn": fn, "vn": vn,
+        "recall": recall, "precisao": precisao, "f1": f1,
+    })
+
+
+def limiar_para_recall(curva, recall_alvo):
+    """Linha da curva com o maior limiar cujo recall atinge `recall_alvo` (menos alunos sinalizados)."""
+    atingem = curva[curva["recall"] >= recall_alvo]
+    if atingem.empty:
+        return None
+    return atingem.iloc[0].to_dict()
+
+
+def registrar_varredura(curva, nome, recall_alvo=None, limiar_atual=None):
+    """
+    Grava a curva no MLflow (limiares/curva_<nome>.csv e o gráfico). Com `recall_alvo`,
+    registra também o limiar recomendado e o recall/precisão dele; retorna essa linha.
+    """
+    mlflow.log_text(curva.to_csv(index=False), f"limiares/curva_{nome}.csv")
+    recomendado = limiar_para_recall(curva, recall_alvo) if recall_alvo is not None else None
+
+    fig, ax = plt.subplots(figsize=(7, 4))
+    for coluna, rotulo in (("recall", "Recall"), ("precisao", "Precisão"), ("f1", "F1")):
+        ax.plot(curva["limiar"], curva[coluna], label=rotulo)
+    if limiar_atual is not None:
+        ax.axvline(limiar_atual, color="gray", linestyle=":", label=f"Limiar atual ({limiar_atual:.2f})")
+    if recomendado is not None:
+        ax.axvline(recomendado["limiar"], color="red", linestyle="--",
+                   label=f"Recomendado ({recomendado['limiar']:.2f})")
+    ax.set_xlabel("Limiar")
+    ax.legend()
+    plt.title(f"Métricas por limiar ({nome})")
+    mlflow.log_figure(fig, f"limiares/curva_{nome}.png")
+    plt.close(fig)
+
+    if recomendado is not None:
+        mlflow.log_param("recall_alvo", recall_alvo)
+        mlflow.log_metrics({
+            "limiar_recomendado": recomendado["limiar"],
+            f"limiar_recomendado_recall_{nome}": recomendado["recall"],
+            f"limiar_recomendado_precisao_{nome}": recomendado["precisao"],
+            f"limiar_recomendado_f1_{nome}": recomendado["f1"],
+        })
+    return recomendado
+
+
+# Elementos (reamostragens x alunos) sorteados por vez no bootstrap (~40 MB de índices)
+_BOOTSTRAP_ELEMENTOS_POR_BLOCO = 5_000_000
+
+
+def intervalos_bootstrap(y_true, y_pred, reamostragens=2000, confianca=0.95, seed=42):
     """
-    Calcula métricas com base em um limiar de decisão customizado e loga no MLFlow
+    Intervalos de confiança (percentis do bootstrap) de acurácia, precisão, recall e F1.
+
+    Sem laço por reamostragem: cada aluno vira um código de 0 a 3 (VN, FP, FN, VP), uma
+    matriz de índices sorteia todas as reamostragens de uma vez e um único `bincount`,
+    com deslocamento de 4 * número da reamostragem, conta a matriz de confusão de todas.
+    As matrizes de índices são sorteadas em blocos para limitar a memória.
+
+    Retorna {metrica: (inferior, superior)}. Reamostragens sem positivos previstos
+    (precisão indefinida) ficam de fora do intervalo da precisão; sem nenhuma reamostragem
+    válida (ex: o modelo nunca prevê risco) a métrica fica fora do resultado.
+    """
+    codigos = 2 * np.asarray(y_true).astype(np.int64) + np.asarray(y_pred).astype(np.int64)
+    n = len(codigos)
+    rng = np.random.default_rng(seed)
+    por_bloco = max(1, _BOOTSTRAP_ELEMENTOS_POR_BLOCO // max(n, 1))
+
+    contagens = []
+    for inicio in range(0, reamostragens, por_bloco):
+        tamanho = min(por_bloco, reamostragens - inicio)
+        amostras = codigos[rng.integers(0, n, size=(tamanho, n))]
+        amostras += 4 * np.arange(tamanho)[:, None]
+        contagens.append(np.bincount(amostras.ravel(), minlength=4 * tamanho).reshape(tamanho, 4))
+    vn, fp, fn, vp = np.concatenate(contagens).T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metricas = {
+            "accuracy": (vp + vn) / n,
+            "precision": np.where(vp + fp > 0, vp / (vp + fp), np.nan),
+            "recall": np.where(vp + fn > 0, vp / (vp + fn), 0.0),
+            "f1": np.where(vp > 0, 2 * vp / (2 * vp + fp + fn), 0.0),
+        }
+    caudas = [50 * (1 - confianca), 100 - 50 * (1 - confianca)]
+    intervalos = {}
+    for nome, valores in metricas.items():
+        validos = valores[~np.isnan(valores)]
+        if validos.size:
+            intervalos[nome] = tuple(float(v) for v in np.percentile(validos, caudas))
+    return intervalos
+
+
+def _quedas_permutando(model, X_test, y_test, colunas, sementes, limiar, base):
+    """
+    Queda de recall e F1 com cada coluna de `colunas` embaralhada, uma de cada vez.
+    X_test é copiado uma vez por bloco: cada coluna é embaralhada na cópia e volta
+    ao original antes da próxima (`assign` copiaria o DataFrame inteiro por coluna).
+    """
+    permutado = X_test.copy()
+    quedas = []
+    for coluna, semente in zip(colunas, sementes):
+        original = permutado[coluna]
+        valores = original.to_numpy()
+        permutado[coluna] = valores[np.random.default_rng(semente).permutation(len(valores))]
+        y_pred = (model.predict_proba(permutado)[:, 1] >= limiar).astype(int)
+        permutado[coluna] = original
+        quedas.append((
+            base["recall"] - recall_score(y_test, y_pred, zero_division=0),
+            base["f1"] - f1_score(y_test, y_pred, zero_division=0),
+        ))
+    return quedas
+
+
+def importancia_permutacao(model, X_test, y_test, limiar=0.5, repeticoes=10, orcamento_segundos=None,
+                           n_jobs=-1, seed=42, y_proba=None):
+    """
+    Importância por permutação nas colunas originais de X_test: o pipeline refaz o
+    pré-processamento, então as colunas do one-hot de uma mesma variável (ex: Genero)
+    são embaralhadas juntas. A importância é a queda de recall (e de F1) no limiar.
+
+    As predições sem permutação são calculadas uma vez (ou recebidas em `y_proba`, como
+    as de evaluate_model). Cada rodada embaralha todas as colunas uma vez, em paralelo em
+    threads (a predição das árvores libera o GIL): as colunas são divididas em um bloco
+    por thread e cada bloco reaproveita uma única cópia de X_test, sem cópia do modelo
+    por processo. Novas rodadas só começam se couberem em `orcamento_segundos`; a
+    primeira sempre roda.
+
+    Retorna um DataFrame ordenado pela queda média de recall, com a quantidade de
+    rodadas concluídas em `attrs["repeticoes"]`.
+    """
+    inicio = time.perf_counter()
+    if y_proba is None:
+        y_proba = model.predict_proba(X_test)[:, 1]
+    y_pred = (y_proba >= limiar).astype(int)
+    base = {"recall": recall_score(y_test, y_pred, zero_division=0), "f1": f1_score(y_test, y_pred, zero_division=0)}
+
+    colunas = list(X_test.columns)
+    blocos = np.array_split(np.arange(len(colunas)), min(effective_n_jobs(n_jobs), len(colunas)))
+    quedas = []
+    with Parallel(n_jobs=n_jobs, prefer="threads") as paralelo:
+        for rodada in range(repeticoes):
+            decorrido = time.perf_counter() - inicio
+            if quedas and orcamento_segundos is not None and decorrido * (rodada + 1) / rodada > orcamento_segundos:
+                break
+            # Semente por (rodada, coluna): o resultado não depende da divisão em blocos
+            por_bloco = paralelo(
+                delayed(_quedas_permutando)(model, X_test, y_test, [colunas[j] for j in bloco],
+                                            [[seed, rodada, int(j)] for j in bloco], limiar, base)
+                for bloco in blocos
+            )
+            quedas.append([queda for bloco in por_bloco for queda in bloco])
+
+    quedas = np.array(quedas)  # rodadas x colunas x (recall, f1)
+    resultado = pd.DataFrame({
+        "coluna": colunas,
+        "queda_recall": quedas[:, :, 0].mean(axis=0),
+        "queda_recall_desvio": quedas[:, :, 0].std(axis=0),
+        "queda_f1": quedas[:, :, 1].mean(axis=0),
+        "queda_f1_desvio": quedas[:, :, 1].std(axis=0),
+    }).sort_values(["queda_recall", "queda_f1"], ascending=False, ignore_index=True)
+    resultado.attrs["repeticoes"] = len(quedas)
+    resultado.attrs["segundos"] = time.perf_counter() - inicio
+    return resultado
+
+
+def registrar_importancia(resultado):
+    """Ranking no MLflow: importancia/permutacao.csv, gráfico e uma métrica por coluna."""
+    mlflow.log_text(resultado.to_csv(index=False), "importancia/permutacao.csv")
+    mlflow.log_metrics({
+        "importancia_repeticoes": resultado.attrs.get("repeticoes", 0),
+        "importancia_segundos": resultado.attrs.get("segundos", 0.0),
+        **{f"importancia_permutacao_{linha.coluna}": linha.queda_recall for linha in resultado.itertuples()},
+    })
+
+    fig, ax = plt.subplots(figsize=(7, 0.4 * len(resultado) + 1))
+    ordenado = resultado.iloc[::-1]
+    ax.barh(ordenado["coluna"], ordenado["queda_recall"], xerr=ordenado["queda_recall_desvio"], color="steelblue")
+    ax.set_xlabel("Queda de recall com a coluna embaralhada")
+    plt.title(f"Importância por permutação ({resultado.attrs.get('repeticoes', 0)} repetições)")
+    plt.tight_layout()
+    mlflow.log_figure(fig, "importancia/permutacao.png")
+    plt.close(fig)
+
+
+def evaluate_model(model, X_test, y_test, threshold=0.5, reamostragens_bootstrap=2000):
+    """
+    Calcula métricas com base em um limiar de decisão customizado e loga no MLFlow.
+    Com `reamostragens_bootstrap` > 0, registra também os intervalos de confiança de
+    95% de cada métrica (<metrica>_ic_inferior / <metrica>_ic_superior).
     """
 
     print("\n" + "=" * 100)
@@ -66,6 +287,10 @@ def evaluate_model(model, X_test, y_test, threshold=0.5):
     precision = precision_score(y_test, y_pred, zero_division=0)
     f1 = f1_score(y_test, y_pred, zero_division=0)
     cm = confusion_matrix(y_test, y_pred)
+    intervalos = (
+        intervalos_bootstrap(y_test, y_pred, reamostragens=reamostragens_bootstrap)
+        if reamostragens_bootstrap > 0 else {}
+    )
 
     fig, ax = plt.subplots(figsize=(6, 5))
     ConfusionMatrixDisplay.from_predictions(
@@ -82,10 +307,10 @@ def evaluate_model(model, X_test, y_test, threshold=0.5):
     print("\n" + "=" * 100)
     print(f"RESULTADOS DA AVALIAÇÃO DO MODELO (Limiar: {threshold})")
     print("=" * 100)
-    print(f"ACURÁCIA:              {accuracy:.2%}")
-    print(f"PRECISÃO:              {precision:.2%}")
-    print(f"* RECALL:              {recall:.2%}")
-    print(f"F1-SCORE:              {f1:.2%}")
+    for rotulo, nome, valor in (("ACURÁCIA:      ", "accuracy", accuracy), ("PRECISÃO:      ", "precision", precision),
+                                ("* RECALL:      ", "recall", recall), ("F1-SCORE:      ", "f1", f1)):
+        ic = f"  (IC 95%: {intervalos[nome][0]:.2%} a {intervalos[nome][1]:.2%})" if nome in intervalos else ""
+        print(f"{rotulo}        {valor:.2%}{ic}")
     print(
         "* RECALL É A MÉTRICA MAIS IMPORANTE POIS ELA REPRESENTA A SENSIBILIDADE DO NOSSO MODELO"
     )
@@ -99,8 +324,27 @@ def evaluate_model(model, X_test, y_test, threshold=0.5):
     print(classification_report(y_test, y_pred, zero_division=0))
 
     mlflow.log_param("threshold", threshold)
-    mlflow.log_metrics(
-        {"accuracy": accuracy, "precision": precision, "recall": recall, "f1": f1}
-    )
+    if intervalos:
+        mlflow.log_param("bootstrap_reamostragens", reamostragens_bootstrap)
+    mlflow.log_metrics({
+        "accuracy": accuracy,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        **{f"{nome}_ic_inferior": ic[0] for nome, ic in intervalos.items()},
+        **{f"{nome}_ic_superior": ic[1] for nome, ic in intervalos.items()},
+    })
+
+    # Curva de todos os limiares no teste (só para consulta; a recomendação vem do treino)
+    curva = varredura_limiares(y_test, y_proba)
+    registrar_varredura(curva, "teste", limiar_atual=threshold)
 
-    return {"recall": recall, "f1": f1, "accuracy": accuracy, "confusion_matrix": cm}
+    return {
+        "recall": recall,
+        "f1": f1,
+        "accuracy": accuracy,
+        "confusion_matrix": cm,
+        "curva_limiares": curva,
+        "intervalos": intervalos,
+        "y_proba": y_proba,
+    }
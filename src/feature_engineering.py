@@ -3,16 +3,22 @@ import numpy as np
 import re
 
 
-def create_features(df):
+def create_features(df, inplace=False):
     """
     Cria o target, aplica engenharia de atributos (interações/hierarquia),
     remove identificadores e colunas de leakage.
+
+    Sem `inplace` o DataFrame recebido não é alterado: as colunas novas e as
+    substituídas vão para uma cópia rasa (os dados das demais colunas não são
+    copiados). Com `inplace=True` o próprio `df` vira o X retornado.
     """
-    df = df.copy()
+    if not inplace:
+        df = df.copy(deep=False)
 
     # Criação do Target (Risco) só ocorre se a coluna existir (treinamento)
+    y = None
     if "Defasagem" in df.columns:
-        df["alvo_risco"] = np.where(df["Defasagem"] < 0, 1, 0)
+        y = pd.Series(np.where(df["Defasagem"] < 0, 1, 0), index=df.index, name="alvo_risco")
 
     # Padronização do Gênero: unifica MENINO/MENINA em MASCULINO/FEMININO
     if "Genero" in df.columns:
@@ -40,7 +46,7 @@ def create_features(df):
 
     # Fase
     if "Fase" in df.columns:
-        df["Fase_Num"] = df["Fase"].apply(extrair_fase)
+        df["Fase_Num"] = extrair_fase_coluna(df["Fase"])
 
     # Seleção de Features e Remoção de Vazamento (Data Leakage)
     cols_to_drop = [
@@ -61,13 +67,12 @@ def create_features(df):
     cols_to_drop.extend(leakage_cols)
 
     # Executa a remoção
-    X = df.drop(columns=[c for c in cols_to_drop if c in df.columns], errors="ignore")
-
-    # Isola o Y
-    y = None
-    if "alvo_risco" in X.columns:
-        y = X["alvo_risco"]
-        X = X.drop(columns=["alvo_risco"])
+    remover = [c for c in cols_to_drop if c in df.columns]
+    if inplace:
+        df.drop(columns=remover, inplace=True)
+        X = df
+    else:
+        X = df.drop(columns=remover)
 
     return X, y
 
@@ -80,3 +85,19 @@ def extrair_fase(fase_str):
     if match:
         return int(match.group())
     return np.nan
+
+
+def extrair_fase_coluna(fases: pd.Series) -> pd.Series:
+    """
+    Mesmo resultado de `fases.apply(extrair_fase)`, com o regex aplicado uma vez
+    por valor distinto de Fase (str.extract) em vez de uma vez por linha.
+    """
+    codigos, unicos = pd.factorize(fases, use_na_sentinel=False)
+    textos = pd.Series(unicos, dtype=object).map(str).str.upper()
+    numeros = pd.to_numeric(textos.str.extract(r"(\d+)", expand=False), errors="coerce")
+    alfa = textos.str.contains("ALFA", regex=False) | textos.str.contains("ALPHA", regex=False)
+    valores = np.where(alfa, 0, numeros.to_numpy(dtype=float))[codigos]
+    if not np.isnan(valores).any():
+        # apply devolve int64 quando nenhuma Fase ficou sem número
+        valores = valores.astype(np.int64)
+    return pd.Series(valores, index=fases.index)
@@ -1,9 +1,77 @@
 import pandas as pd
 import numpy as np
 
-def clean_data(df):
+# Colunas de texto que create_features de fato usa (Pedra, Nome etc. são descartadas)
+COLUNAS_TEXTO_CONSUMIDAS = ("Fase", "Instituicao_de_ensino", "Genero")
+
+# Colunas numéricas convertidas por clean_data (e já na leitura, por load_data)
+COLUNAS_NUMERICAS = ('IAA', 'IEG', 'IPS', 'IDA', 'IPV', 'IAN', 'INDE', 'Idade')
+
+
+def _por_valor_unico(serie, funcao):
+    """
+    Aplica `funcao` (operação elemento a elemento sobre uma Series) uma única vez por
+    valor distinto e espalha o resultado de volta nas linhas: factorize -> map -> take.
+    As colunas do PEDE têm poucas dezenas de valores distintos para milhares de linhas.
+    """
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+    convertidos = funcao(pd.Series(unicos, dtype=serie.dtype))
+    resultado = convertidos.take(codigos)
+    resultado.index = serie.index
+    return resultado
+
+
+def corrigir_idade_excel(idades):
+    """Idade no formato de data do Excel (1/17/00) vira o número do meio (17)."""
+    idades = idades.astype(str).str.strip()
+    tem_barra = idades.str.contains('/', regex=False, na=False)
+    return idades.where(~tem_barra, idades.str.split('/').str[1])
+
+
+def converter_numero(valores):
+    """Texto numérico (com vírgula decimal brasileira ou não) vira número; inválidos viram NaN."""
+    col_str = valores.astype(str)
+    has_comma = col_str.str.contains(',', na=False)
+    br_converted = col_str.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    return pd.to_numeric(col_str.where(~has_comma, br_converted), errors='coerce')
+
+
+def normalizar_texto(valores):
+    """NFKD, remove acentos, strip e upper; 'NAN' vira nulo."""
+    normalizado = (
+        valores.astype(str)
+        .str.normalize('NFKD')
+        .str.encode('ascii', errors='ignore')
+        .str.decode('utf-8')
+        .str.strip()
+        .str.upper()
+    )
+    return normalizado.replace('NAN', np.nan)
+
+
+def converter_colunas_numericas(df):
+    """
+    Converte Defasagem (pd.to_numeric) e as COLUNAS_NUMERICAS (float64) com as regras de
+    clean_data, uma vez por valor distinto. Altera `df`. Usada por load_data em cada bloco
+    lido; clean_data aceita tanto o texto original quanto o resultado desta conversão.
+    """
+    if 'Defasagem' in df.columns:
+        df['Defasagem'] = pd.to_numeric(df['Defasagem'], errors='coerce')
+    if 'Idade' in df.columns:
+        df['Idade'] = _por_valor_unico(df['Idade'], corrigir_idade_excel)
+    for col in COLUNAS_NUMERICAS:
+        if col in df.columns:
+            df[col] = _por_valor_unico(df[col], converter_numero).astype('float64')
+    return df
+
+
+def clean_data(df, colunas_texto=None):
     """
     Realiza a limpeza profunda e conversão de tipos dos dados.
+
+    As conversões rodam uma vez por valor distinto de cada coluna (_por_valor_unico).
+    colunas_texto: colunas de texto a normalizar; None normaliza todas as colunas de
+    texto (o treino passa COLUNAS_TEXTO_CONSUMIDAS e pula as que serão descartadas).
     """
     df = df.copy()
 
@@ -15,51 +83,30 @@ def clean_data(df):
 
     # Tratamento de idade no formato 1/17/00
     if 'Idade' in df.columns:
-        def corrigir_idade_excel(valor):
-            valor = str(valor).strip()
-            if '/' in valor:
-                partes = valor.split('/')
-                if len(partes) >= 2:
-                    return partes[1] # Retorna o 17
-            return valor
-            
-        df['Idade'] = df['Idade'].apply(corrigir_idade_excel)        
+        df['Idade'] = _por_valor_unico(df['Idade'], corrigir_idade_excel)
 
     # Tratamento das Colunas Numéricas
-    numeric_cols = ['IAA', 'IEG', 'IPS', 'IDA', 'IPV', 'IAN', 'INDE', 'Idade']
-    
-    for col in numeric_cols:
+    for col in COLUNAS_NUMERICAS:
         if col in df.columns:
-            col_str = df[col].astype(str)
-            has_comma = col_str.str.contains(',', na=False)
-            br_converted = col_str.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
-            df[col] = col_str.where(~has_comma, br_converted)
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+            df[col] = _por_valor_unico(df[col], converter_numero)
 
     # Transforma Idades incorretas e notas erradas em nulo (NaN)
     if 'Idade' in df.columns:
-        df.loc[(df['Idade'] < 5) | (df['Idade'] > 30), 'Idade'] = np.nan    
+        df.loc[(df['Idade'] < 5) | (df['Idade'] > 30), 'Idade'] = np.nan
 
 
     notas_cols = ['IAA', 'IEG', 'IPS', 'IDA', 'IPV']
     for col in notas_cols:
         if col in df.columns:
             # Notas nunca podem passar de 10
-            df[col] = df[col].clip(lower=0, upper=10) 
+            df[col] = df[col].clip(lower=0, upper=10)
 
     # Limpeza Geral de Colunas de Texto (Categóricas)
-    colunas_texto = df.select_dtypes(include=['object']).columns                        
-    
-    for col in colunas_texto:        
-        df[col] = (
-            df[col].astype(str)
-            .str.normalize('NFKD')
-            .str.encode('ascii', errors='ignore')
-            .str.decode('utf-8')
-            .str.strip()
-            .str.upper()
-        )
-        
-        df[col] = df[col].replace('NAN', np.nan)
-
-    return df
\ No newline at end of file
+    colunas_texto_df = df.select_dtypes(include=['object']).columns
+    if colunas_texto is not None:
+        colunas_texto_df = [c for c in colunas_texto_df if c in colunas_texto]
+
+    for col in colunas_texto_df:
+        df[col] = _por_valor_unico(df[col], normalizar_texto)
+
+    return df
@@ -0,0 +1,155 @@
+"""
+Gerador de bases sintéticas do PEDE para testes de escala.
+
+Aprende, de cada CSV de files/PEDE20XX.csv, a distribuição marginal de cada coluna:
+- numéricas com casas decimais: quantis empíricos (novos valores por interpolação
+  da inversa da distribuição acumulada, com as mesmas casas decimais)
+- inteiras e textuais: frequência de cada valor
+- a fração de células vazias
+
+e gera arquivos no mesmo formato lido por `load_data` (separador ';', vírgula
+decimal, cabeçalho original do ano), com qualquer número de linhas e de anos.
+Anos sem arquivo de origem usam o perfil do último ano conhecido, com o ano
+trocado nos nomes das colunas (o mesmo formato de `mapa_renomeacao`).
+
+As colunas são sorteadas de forma independente: as distribuições de cada coluna
+se mantêm, mas as correlações entre elas não. A base serve para medir tempo e
+memória de cada etapa, não a qualidade do modelo. A mesma semente gera os mesmos
+arquivos. A escrita é feita em blocos, com memória limitada para milhões de linhas.
+
+Uso:
+    python -m src.synthetic_data --destino /tmp/pede --linhas 1000000
+    python -m src.synthetic_data --destino /tmp/pede --linhas 200000 --anos 2022 2023 2024 2025 2026 --seed 7
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+ARQUIVOS_ORIGEM = {"2022": "files/PEDE2022.csv", "2023": "files/PEDE2023.csv", "2024": "files/PEDE2024.csv"}
+LINHAS_POR_BLOCO = 100_000
+
+_NUMERO = re.compile(r"^-?\d+(,\d+)?$")
+
+
+def _perfil_coluna(valores: pd.Series) -> dict:
+    valores = valores.str.strip()
+    preenchidos = valores[valores.notna() & (valores != "")]
+    perfil = {"taxa_nulos": 1 - len(preenchidos) / max(len(valores), 1)}
+    if preenchidos.empty:
+        return {**perfil, "tipo": "vazia"}
+
+    if preenchidos.str.fullmatch(_NUMERO).all():
+        decimais = int(preenchidos.str.partition(",")[2].str.len().max())
+        if decimais > 0:
+            numeros = np.sort(preenchidos.str.replace(",", ".", regex=False).astype(float).to_numpy())
+            return {**perfil, "tipo": "continua", "quantis": numeros, "decimais": decimais}
+
+    frequencias = preenchidos.value_counts(sort=False)
+    return {
+        **perfil,
+        "tipo": "categorica",
+        "valores": frequencias.index.to_numpy(dtype=object),
+        "probabilidades": (frequencias / frequencias.sum()).to_numpy(),
+    }
+
+
+def aprender_perfil(path: str) -> dict:
+    """Cabeçalho original (com os espaços) e o perfil de cada coluna de um CSV do PEDE."""
+    with open(path, encoding="utf-8") as f:
+        cabecalho = f.readline().rstrip("\r\n")
+    # Sem header: há nomes repetidos no arquivo ("Destaque IPV", "Ativo/ Inativo")
+    dados = pd.read_csv(path, sep=";", header=None, skiprows=1, dtype=str, encoding="utf-8",
+                        keep_default_na=False)
+    colunas = cabecalho.split(";")
+    return {
+        "cabecalho": colunas,
+        "colunas": [_perfil_coluna(dados[i]) if i in dados.columns else {"tipo": "vazia", "taxa_nulos": 1.0}
+                    for i in range(len(colunas))],
+    }
+
+
+def _sortear(perfil: dict, linhas: int, rng: np.random.Generator) -> np.ndarray:
+    if perfil["tipo"] == "vazia":
+        return np.full(linhas, "", dtype=object)
+    if perfil["tipo"] == "continua":
+        quantis = perfil["quantis"]
+        posicoes = rng.random(linhas) * (len(quantis) - 1)
+        numeros = np.interp(posicoes, np.arange(len(quantis)), quantis)
+        valores = np.char.replace(np.char.mod(f"%.{perfil['decimais']}f", numeros), ".", ",").astype(object)
+    else:
+        valores = rng.choice(perfil["valores"], size=linhas, p=perfil["probabilidades"])
+    if perfil["taxa_nulos"] > 0:
+        valores[rng.random(linhas) < perfil["taxa_nulos"]] = ""
+    return valores
+
+
+def _cabecalho_do_ano(cabecalho: list, ano_origem: str, ano: str) -> list:
+    if ano == ano_origem:
+        return cabecalho
+    return [nome.replace(ano_origem, ano) for nome in cabecalho]
+
+
+def gerar_ano(perfil: dict, destino: str, linhas: int, seed: int, ano: str, ano_origem: str,
+              linhas_por_bloco: int = LINHAS_POR_BLOCO) -> str:
+    """Grava `linhas` linhas sorteadas do perfil em `destino`; a semente e o ano fixam o resultado."""
+    rng = np.random.default_rng([seed, int(ano)])
+    with open(destino, "w", encoding="utf-8", newline="") as f:
+        f.write(";".join(_cabecalho_do_ano(perfil["cabecalho"], ano_origem, ano)) + "\n")
+        for inicio in range(0, linhas, linhas_por_bloco):
+            tamanho = min(linhas_por_bloco, linhas - inicio)
+            bloco = pd.DataFrame({i: _sortear(coluna, tamanho, rng) for i, coluna in enumerate(perfil["colunas"])})
+            bloco.to_csv(f, sep=";", header=False, index=False, lineterminator="\n")
+    return destino
+
+
+def gerar(destino: str, linhas: int, anos=None, seed: int = 42, origens=None,
+          linhas_por_bloco: int = LINHAS_POR_BLOCO) -> dict:
+    """
+    Gera um CSV sintético por ano em `destino` (PEDE{ano}.csv, `linhas` linhas cada).
+    Retorna {ano: caminho}, no formato aceito por `load_data`.
+
+    anos: anos a gerar (padrão: os de `origens`)
+    origens: {ano: CSV de origem} usados para aprender os perfis (padrão: ARQUIVOS_ORIGEM)
+    """
+    origens = origens or ARQUIVOS_ORIGEM
+    anos = [str(ano) for ano in (anos or origens)]
+    os.makedirs(destino, exist_ok=True)
+
+    perfis = {}
+    paths = {}
+    for ano in anos:
+        # Anos sem origem usam o último ano conhecido anterior a eles (ou o primeiro)
+        anteriores = [a for a in sorted(origens) if a <= ano]
+        ano_origem = anteriores[-1] if anteriores else sorted(origens)[0]
+        if ano_origem not in perfis:
+            perfis[ano_origem] = aprender_perfil(origens[ano_origem])
+        paths[ano] = gerar_ano(perfis[ano_origem], os.path.join(destino, f"PEDE{ano}.csv"), linhas, seed,
+                               ano, ano_origem, linhas_por_bloco)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--destino", required=True, help="Pasta dos CSVs gerados")
+    parser.add_argument("--linhas", type=int, default=100_000, help="Linhas por ano")
+    parser.add_argument("--anos", nargs="+", default=None, help="Anos a gerar (padrão: 2022 2023 2024)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    paths = gerar(args.destino, args.linhas, args.anos, args.seed)
+    print(json.dumps({
+        "arquivos": paths,
+        "linhas_por_ano": args.linhas,
+        "segundos": round(time.perf_counter() - inicio, 2),
+        "megabytes": round(sum(os.path.getsize(p) for p in paths.values()) / 1e6, 1),
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
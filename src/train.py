@@ -1,61 +1,81 @@
+import argparse
+import copy
+from contextlib import nullcontext
+import math
 import joblib
+import numpy as np
 import pandas as pd
 import os
+import tempfile
+import time
 import mlflow
 import mlflow.sklearn
 from mlflow.models.signature import infer_signature
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, RandomizedSearchCV
+from sklearn.metrics import get_scorer, precision_score, recall_score
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (habilita HalvingRandomSearchCV)
+from sklearn.model_selection import train_test_split, RandomizedSearchCV, HalvingRandomSearchCV
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer, make_column_selector
 from sklearn.preprocessing import OneHotEncoder
 from src.utils import load_data
-from src.preprocessing import clean_data
+from src.preprocessing import clean_data, COLUNAS_TEXTO_CONSUMIDAS
 from src.feature_engineering import create_features
-from src.evaluate import evaluate_model
-from app.config import MLFLOW_TRACKING_URI, LIMIAR_FIXO
+from src.evaluate import (
+    evaluate_model,
+    importancia_permutacao,
+    registrar_importancia,
+    registrar_varredura,
+    varredura_limiares,
+)
+from src.drift import construir_referencia, salvar_referencia
+from src.compaction import compactar_floresta, medir_modelo
+from src.train_worker import emitir_progresso, progresso_habilitado
+from app.config import (
+    MLFLOW_TRACKING_URI,
+    LIMIAR_FIXO,
+    RECALL_ALVO,
+    IMPORTANCIA_REPETICOES,
+    IMPORTANCIA_ORCAMENTO_SEGUNDOS,
+    BOOTSTRAP_REAMOSTRAGENS,
+    COMPACTAR_FLORESTA,
+    COMPACTACAO_TOLERANCIA,
+    COMPACTACAO_PROFUNDIDADE_MINIMA,
+    CACHE_DADOS_DIR,
+    ESTRATEGIA_BUSCA,
+    COMPARAR_BUSCAS,
+    MODELO_FALLBACK_PATH,
+    MODO_RETREINO,
+    MODOS_RETREINO,
+    ARVORES_INCREMENTAIS,
+    TOLERANCIA_RECALL,
+    TREINO_NUCLEOS,
+)
 from dotenv import load_dotenv
 
 load_dotenv()
 
+ARQUIVOS_PEDE = {
+    '2022': 'files/PEDE2022.csv',
+    '2023': 'files/PEDE2023.csv',
+    '2024': 'files/PEDE2024.csv'
+}
+MODELO_PRODUCAO_URI = "models:/Modelo_Risco_Defasagem@production"
+ESTRATEGIAS_BUSCA = ("aleatoria", "halving")
 
-def run_training():
-    print("Iniciando Pipeline de Treinamento com MLFLOW...")
-    
-    # Cria uma pasta 'mlruns' localmente para salvar os dados
-    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
-    mlflow.set_experiment("PassosMagicos_Risco_Defasagem")
-
-    # Habilita o log automático (salva params, métricas e o modelo .pkl)
-    mlflow.sklearn.autolog(log_models=False, log_input_examples=False)
-
-    # Definição de Caminhos
-    paths = {
-        '2022': 'files/PEDE2022.csv',
-        '2023': 'files/PEDE2023.csv',
-        '2024': 'files/PEDE2024.csv'
-    }
-    
-    # Pipeline de Dados
-    print("   [1/6] Carregando dados (Utils)...")
-    try:
-        df_raw = load_data(paths)
-    except FileNotFoundError as e:
-        print(f"Erro: {e}")
-        return
 
-    print("   [2/6] Limpando dados (Preprocessing)...")
-    df_clean = clean_data(df_raw)
-    
-    print("   [3/6] Engenharia de Features...")
-    X, y = create_features(df_clean)
-    
-    print(f"         Features finais: {len(X.columns)} colunas identificadas.")
+def construir_pipeline(memory=None):
+    """
+    Monta o Pipeline (pré-processamento + RandomForest) ainda não treinado.
+    A API compila o passo 'preprocessor' deste pipeline (app/compiled_preprocessing.py),
+    portanto mudanças aqui devem manter os dois lados compatíveis.
 
-    # Split de Dados
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-    
+    memory: diretório de cache do Pipeline; na busca de hiperparâmetros o
+    pré-processamento de cada fold é ajustado uma vez e reaproveitado por todos
+    os candidatos (todos usam o mesmo 'preprocessor').
+    """
     # Transformador para variáveis numéricas (preenche nulos com a mediana)
     numeric_transformer = Pipeline(steps=[
         ('imputer', SimpleImputer(strategy='median'))
@@ -76,62 +96,486 @@ def run_training():
         ])
 
     # Criação do Pipeline Final
-    model_pipeline = Pipeline([
+    return Pipeline([
         ('preprocessor', preprocessor),
         ('classifier', RandomForestClassifier(random_state=42))
-    ])
+    ], memory=memory)
+
+
+# Espaço de busca comum às duas estratégias; na halving o n_estimators é o recurso
+PARAM_DIST = {
+    'classifier__n_estimators': [100, 200, 300, 500],
+    'classifier__max_depth': [10, 20, 30, None],
+    'classifier__min_samples_leaf': [1, 2, 4],
+    'classifier__max_features': ['sqrt', 'log2'], # Importante para diversificar as árvores
+    'classifier__class_weight': ['balanced', 'balanced_subsample']
+}
+
+
+def _n_jobs():
+    return TREINO_NUCLEOS if TREINO_NUCLEOS > 0 else -1
+
+
+class _RecallComProgresso:
+    """Scorer de recall que emite um evento de progresso por ajuste avaliado (roda nos processos da busca)."""
+
+    def __call__(self, estimator, X, y):
+        valor = get_scorer('recall')(estimator, X, y)
+        emitir_progresso(ajuste=1)
+        return valor
+
+
+def _scoring():
+    # No worker da API a busca informa cada ajuste concluído; fora dele, o scorer padrão
+    return _RecallComProgresso() if progresso_habilitado() else 'recall'
+
+
+def total_candidatos(busca):
+    """Candidatos avaliados pela busca, somando as rodadas da halving (27 + 9 + 3 + 1)."""
+    if isinstance(busca, HalvingRandomSearchCV):
+        total, n = 0, busca.n_candidates
+        while True:
+            total += n
+            if n <= 1:
+                return total
+            n = math.ceil(n / busca.factor)
+    return busca.n_iter
+
+
+def construir_busca(estrategia, pipeline):
+    """
+    Busca de hiperparâmetros otimizando Recall (encontrar o maior número possível
+    de alunos em risco).
+
+    - "aleatoria": RandomizedSearchCV, 20 candidatos x 3 folds com o número de
+      árvores sorteado junto com os demais parâmetros.
+    - "halving": successive halving (HalvingRandomSearchCV) com o número de
+      árvores como recurso: 27 candidatos começam com poucas árvores e a cada
+      rodada só o terço de maior recall segue, com 3x mais árvores, até ~500.
+    """
+    if estrategia == "halving":
+        param_dist = {k: v for k, v in PARAM_DIST.items() if k != 'classifier__n_estimators'}
+        return HalvingRandomSearchCV(
+            estimator=pipeline,
+            param_distributions=param_dist,
+            n_candidates=27,
+            factor=3,
+            resource='classifier__n_estimators',
+            max_resources=500,
+            min_resources='exhaust', # a última rodada usa exatamente max_resources árvores
+            cv=3,
+            verbose=1,
+            random_state=42,
+            n_jobs=_n_jobs(),
+            scoring=_scoring()
+        )
+    if estrategia != "aleatoria":
+        raise ValueError(f"ESTRATEGIA_BUSCA inválida: {estrategia!r} (use 'aleatoria' ou 'halving')")
+    # Aumentamos o n_iter para 20 para testar mais combinações e encontrar o melhor modelo
+    return RandomizedSearchCV(
+        estimator=pipeline,
+        param_distributions=PARAM_DIST,
+        n_iter=20,
+        cv=3,
+        verbose=1,
+        random_state=42,
+        n_jobs=_n_jobs(), # Todos os núcleos, ou o orçamento TREINO_NUCLEOS
+        scoring=_scoring()
+    )
+
+
+def registrar_busca(busca, estrategia, segundos):
+    """Registra no MLflow a estratégia, o tempo total, o melhor recall e os parâmetros escolhidos (compara runs)."""
+    mlflow.log_param("busca_estrategia", estrategia)
+    mlflow.log_params({f"busca_melhor_{nome}": valor for nome, valor in busca.best_params_.items()})
+    mlflow.log_metric("busca_segundos", segundos)
+    mlflow.log_metric("busca_melhor_recall_cv", busca.best_score_)
+    mlflow.log_metric("busca_ajustes", len(busca.cv_results_["params"]) * busca.n_splits_)
+
+
+def executar_busca(estrategia, X_train, y_train):
+    """Ajusta a busca de `estrategia` com um cache de pré-processamento próprio. Retorna (busca, segundos)."""
+    # O cache do pré-processamento por fold só vale durante a busca
+    with tempfile.TemporaryDirectory(prefix="cache_busca_") as cache_busca:
+        busca = construir_busca(estrategia, construir_pipeline(memory=cache_busca))
+        inicio = time.perf_counter()
+        busca.fit(X_train, y_train)
+        segundos = time.perf_counter() - inicio
+    # O modelo salvo não aponta para o diretório de cache (já removido)
+    busca.best_estimator_.set_params(memory=None)
+    return busca, segundos
+
+
+def registrar_carga_dados(carga: dict):
+    """Registra no MLflow, por ano, se o cache de dados foi usado e o tempo de carga."""
+    if not carga:
+        return
+    mlflow.log_metric("carga_dados_segundos", sum(c["segundos"] for c in carga.values()))
+    mlflow.log_metric("carga_dados_cache_hits", sum(c["cache"] == "hit" for c in carga.values()))
+    for ano, c in carga.items():
+        mlflow.log_metric(f"carga_dados_{ano}_segundos", c["segundos"])
+        mlflow.log_param(f"dados_{ano}_cache", c["cache"])
+        if "sha256" in c:
+            mlflow.log_param(f"dados_{ano}_sha256", c["sha256"][:12])
+
+
+def _etapa(numero, descricao):
+    print(f"   [{numero}/6] {descricao}")
+    emitir_progresso(etapa=numero, etapas=6, descricao=descricao.rstrip("."))
+
+
+def _configurar_mlflow():
+    # Cria uma pasta 'mlruns' localmente para salvar os dados
+    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    mlflow.set_experiment("PassosMagicos_Risco_Defasagem")
+
+    # Habilita o log automático (salva params, métricas e o modelo .pkl)
+    mlflow.sklearn.autolog(log_models=False, log_input_examples=False)
+
+
+def chaves_alunos(df):
+    """Identificador de cada linha, "<Ano_Base>:<RA>" (o RA se repete entre anos); None sem essas colunas."""
+    if "RA" not in df.columns or "Ano_Base" not in df.columns:
+        return None
+    return df["Ano_Base"].astype(str) + ":" + df["RA"].astype(str).str.strip()
+
+
+def _preparar_dados(carga: dict, chaves_holdout=None):
+    """
+    Carga, limpeza, features e split; None se faltar algum CSV.
+
+    Com `chaves_holdout` (as do modelo de produção), o teste é esse holdout fixo e todas as
+    demais linhas, inclusive as novas, vão para o treino. Sem ele (ou se nenhuma chave for
+    encontrada), o split é estratificado e aleatório. Retorna também as chaves do teste,
+    salvas com o modelo para os próximos retreinos.
+    """
+    _etapa(1, "Carregando dados (Utils)...")
+    try:
+        df_raw = load_data(ARQUIVOS_PEDE, cache_dir=CACHE_DADOS_DIR or None, estatisticas=carga)
+    except FileNotFoundError as e:
+        print(f"Erro: {e}")
+        return None
 
-    # Otimização (Random Search)
-    print("   [4/6] Buscando melhores hiperparâmetros...")
+    _etapa(2, "Limpando dados (Preprocessing)...")
+    df_clean = clean_data(df_raw, colunas_texto=COLUNAS_TEXTO_CONSUMIDAS)
+    
+    _etapa(3, "Engenharia de Features...")
+    X, y = create_features(df_clean)
     
-    # Grade de hiperparâmetros expandida para extrair a máxima performance
-    param_dist = {
-        'classifier__n_estimators': [100, 200, 300, 500],
-        'classifier__max_depth': [10, 20, 30, None],
-        'classifier__min_samples_leaf': [1, 2, 4],
-        'classifier__max_features': ['sqrt', 'log2'], # Importante para diversificar as árvores
-        'classifier__class_weight': ['balanced', 'balanced_subsample']
-    }    
+    print(f"         Features finais: {len(X.columns)} colunas identificadas.")
+
+    chaves = chaves_alunos(df_clean)
+    if chaves is not None:
+        chaves = chaves.loc[X.index]
+        if chaves_holdout:
+            no_holdout = chaves.isin(set(chaves_holdout)).to_numpy()
+            if no_holdout.any():
+                print(f"         Holdout fixo: {no_holdout.sum()} alunos de teste, {(~no_holdout).sum()} de treino")
+                return X[~no_holdout], X[no_holdout], y[~no_holdout], y[no_holdout], list(chaves_holdout)
+
+    # O random_state só reproduz o split com os mesmos dados: linhas novas mudam o sorteio.
+    # Por isso as chaves do teste são salvas com o modelo e os retreinos reutilizam esse holdout
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    chaves_teste = chaves.loc[X_test.index].tolist() if chaves is not None else None
+    return X_train, X_test, y_train, y_test, chaves_teste
+
+
+def _salvar_modelo(modelo, X_test, referencia_drift, chaves_holdout=None):
+    """
+    Registra o modelo no MLflow (nova versão) e grava app/model/modelo.pkl e a referência de drift.
+    `chaves_holdout`: chaves do conjunto de teste, o holdout fixo do portão de qualidade dos retreinos.
+    """
+    assinatura = infer_signature(X_test, modelo.predict(X_test))
+
+    # A referência e o holdout viajam junto com o modelo (MLflow, cache local e modelo.pkl)
+    modelo.referencia_drift_ = referencia_drift
+    mlflow.log_dict(referencia_drift, "drift/referencia.json")
+    if chaves_holdout is not None:
+        modelo.chaves_holdout_ = chaves_holdout
+        mlflow.log_dict({"chaves": chaves_holdout}, "holdout/chaves.json")
+    
+    # Grava o modelo no MLflow com a assinatura e registra oficialmente
+    mlflow.sklearn.log_model(
+        sk_model=modelo,
+        name="modelo",
+        signature=assinatura,
+        registered_model_name="Modelo_Risco_Defasagem"
+    )
+    
+    # Salvar
+    output_dir = 'app/model'
+    os.makedirs(output_dir, exist_ok=True)
+    joblib.dump(modelo, 'app/model/modelo.pkl')
+    salvar_referencia(referencia_drift, 'app/model/referencia_drift.json')
+    print("\nModelo salvo com sucesso em app/model/modelo.pkl")
+
+
+def run_training():
+    print("Iniciando Pipeline de Treinamento com MLFLOW...")
+    _configurar_mlflow()
+
+    carga = {}
+    dados = _preparar_dados(carga)
+    if dados is None:
+        return
+    # O treino completo sorteia um holdout novo, que passa a ser o dos retreinos
+    X_train, X_test, y_train, y_test, chaves_holdout = dados
     
+    # Distribuição de referência das features para o monitoramento de drift na API
+    referencia_drift = construir_referencia(X_train)
+
+    # Otimização (Random Search ou Successive Halving, conforme ESTRATEGIA_BUSCA)
+    _etapa(4, f"Buscando melhores hiperparâmetros ({ESTRATEGIA_BUSCA})...")
+
     with mlflow.start_run() as run:
         print(f"   [MLflow] Run iniciada. ID: {run.info.run_id}")
-        
-        # Aumentamos o n_iter para 20 para testar mais combinações e encontrar o melhor modelo
-        random_search = RandomizedSearchCV(
-            estimator=model_pipeline, 
-            param_distributions=param_dist, 
-            n_iter=20, 
-            cv=3, 
-            verbose=1, 
-            random_state=42, 
-            n_jobs=-1, # Usa todos os núcleos do processador para treinar mais rápido
-            scoring='recall' # Otimizando para Recall (encontrar o maior número possível de alunos em risco)
-        )
-        
-        print("   [5/6] Treinando o modelo...")
+        registrar_carga_dados(carga)
+        mlflow.log_param("retreino_modo", "completo")
 
-        random_search.fit(X_train, y_train)
-        best_model = random_search.best_estimator_
+        _etapa(5, "Treinando o modelo...")
+        # Com COMPARAR_BUSCAS, a outra estratégia também roda, cada uma numa run aninhada
+        estrategias = [ESTRATEGIA_BUSCA] + [e for e in ESTRATEGIAS_BUSCA if COMPARAR_BUSCAS and e != ESTRATEGIA_BUSCA]
+        if progresso_habilitado():
+            previstas = [construir_busca(e, construir_pipeline()) for e in estrategias]
+            emitir_progresso(candidatos=sum(total_candidatos(b) for b in previstas), folds=previstas[0].cv)
+        buscas = {}
+        for estrategia in estrategias:
+            with mlflow.start_run(run_name=f"busca_{estrategia}", nested=True) if COMPARAR_BUSCAS else nullcontext():
+                busca, segundos_busca = buscas[estrategia] = executar_busca(estrategia, X_train, y_train)
+                if COMPARAR_BUSCAS:
+                    registrar_busca(busca, estrategia, segundos_busca)
+        busca, segundos_busca = buscas[ESTRATEGIA_BUSCA]
+        best_model = busca.best_estimator_
+        registrar_busca(busca, ESTRATEGIA_BUSCA, segundos_busca)
+        # O modelo servido é o compactado; a floresta completa só serve de referência
+        modelo = registrar_compactacao(best_model, X_train, y_train, X_test)
         
-        print("   [6/6] Avaliando...")
+        _etapa(6, "Avaliando...")
         # Avaliação (limiar lido de variável de ambiente)
-        evaluate_model(best_model, X_test, y_test, threshold=LIMIAR_FIXO)
+        avaliacao = evaluate_model(modelo, X_test, y_test, threshold=LIMIAR_FIXO,
+                                   reamostragens_bootstrap=BOOTSTRAP_REAMOSTRAGENS)
+        # Curva no out-of-bag da floresta completa: o das árvores mantidas foi usado para escolhê-las
+        registrar_limiares(best_model, X_train, y_train)
+        registrar_importancia_permutacao(modelo, X_test, y_test, avaliacao["y_proba"])
+        _salvar_modelo(modelo, X_test, referencia_drift, chaves_holdout)
+
+
+def registrar_compactacao(modelo, X_train, y_train, X_test):
+    """
+    Compacta a floresta (src/compaction.py) e registra no MLflow árvores, profundidade,
+    recall/F1 out-of-bag, tamanho e latência antes e depois. Retorna o modelo a servir
+    (o próprio `modelo` com COMPACTAR_FLORESTA desligado).
+    """
+    mlflow.log_param("compactacao", "sim" if COMPACTAR_FLORESTA else "desligada")
+    if not COMPACTAR_FLORESTA:
+        return modelo
+    inicio = time.perf_counter()
+    compacto, resumo = compactar_floresta(
+        modelo, X_train, y_train, limiar=LIMIAR_FIXO, tolerancia=COMPACTACAO_TOLERANCIA,
+        profundidade_minima=COMPACTACAO_PROFUNDIDADE_MINIMA,
+    )
+    segundos = time.perf_counter() - inicio
+    for sufixo, medidas in (("antes", medir_modelo(modelo, X_test)), ("depois", medir_modelo(compacto, X_test))):
+        for chave, valor in medidas.items():
+            resumo[f"{chave}_{sufixo}"] = valor
+
+    mlflow.log_param("compactacao_tolerancia", COMPACTACAO_TOLERANCIA)
+    mlflow.log_param("compactacao_profundidade_minima", COMPACTACAO_PROFUNDIDADE_MINIMA)
+    mlflow.log_metric("compactacao_segundos", segundos)
+    for chave, valor in resumo.items():
+        mlflow.log_metric(f"compactacao_{chave}", float(valor))
+    print(f"         Floresta compactada em {segundos:.1f}s: {resumo['arvores_antes']} -> {resumo['arvores_depois']} "
+          f"árvores, profundidade {resumo['profundidade_antes']} -> {resumo['profundidade_depois']}, "
+          f"{resumo['tamanho_mb_antes']:.1f} -> {resumo['tamanho_mb_depois']:.1f} MB, "
+          f"1 aluno {resumo['latencia_1_ms_antes']:.1f} -> {resumo['latencia_1_ms_depois']:.1f} ms")
+    return compacto
+
+
+def probabilidades_fora_da_amostra(modelo, X_train):
+    """
+    Probabilidade de risco de cada aluno do treino dada só pelas árvores que não o
+    sortearam no bootstrap (out-of-bag), a partir do modelo já ajustado: nenhum
+    reajuste. Alunos sorteados por todas as árvores ficam com NaN.
+    """
+    floresta = modelo.named_steps["classifier"]
+    Xt = modelo.named_steps["preprocessor"].transform(X_train)
+    soma = np.zeros(Xt.shape[0])
+    votos = np.zeros(Xt.shape[0])
+    positiva = list(floresta.classes_).index(1)
+    for arvore, amostras in zip(floresta.estimators_, floresta.estimators_samples_):
+        fora = np.bincount(amostras, minlength=Xt.shape[0]) == 0
+        soma[fora] += arvore.predict_proba(Xt[fora])[:, positiva]
+        votos[fora] += 1
+    with np.errstate(invalid="ignore"):
+        return soma / votos
+
+
+def registrar_limiares(modelo, X_train, y_train):
+    """
+    Curva de limiares nas probabilidades fora da amostra do treino e o limiar recomendado para RECALL_ALVO.
+    Recebe a floresta antes da compactação: o out-of-bag das árvores mantidas guiou a seleção, e a
+    curva calculada só com elas ficaria otimista perto do LIMIAR_FIXO. `limiares_origem` registra
+    se as probabilidades vieram da floresta completa ou de uma já compactada.
+    """
+    floresta = modelo.named_steps["classifier"]
+    compactada = hasattr(floresta, "n_estimators_busca_")
+    mlflow.log_param("limiares_origem", "oob_floresta_compactada" if compactada else "oob_floresta_completa")
+    mlflow.log_param("limiares_oob_arvores", len(floresta.estimators_))
+    curva = varredura_limiares(y_train, probabilidades_fora_da_amostra(modelo, X_train))
+    recomendado = registrar_varredura(curva, "oob", recall_alvo=RECALL_ALVO, limiar_atual=LIMIAR_FIXO)
+    if recomendado is not None:
+        print(f"         Limiar recomendado para recall >= {RECALL_ALVO:.0%}: {recomendado['limiar']:.3f} "
+              f"(precisão {recomendado['precisao']:.2%}; limiar atual {LIMIAR_FIXO})")
+    return recomendado
+
+
+def registrar_importancia_permutacao(modelo, X_test, y_test, y_proba=None):
+    """
+    Importância por permutação no teste (colunas originais), dentro de IMPORTANCIA_ORCAMENTO_SEGUNDOS.
+    `y_proba`: probabilidades de `modelo` em X_test já calculadas por evaluate_model.
+    """
+    if IMPORTANCIA_REPETICOES <= 0:
+        return None
+    resultado = importancia_permutacao(
+        modelo, X_test, y_test, limiar=LIMIAR_FIXO, repeticoes=IMPORTANCIA_REPETICOES,
+        orcamento_segundos=IMPORTANCIA_ORCAMENTO_SEGUNDOS, n_jobs=_n_jobs(), y_proba=y_proba,
+    )
+    registrar_importancia(resultado)
+    print(f"         Importância por permutação ({resultado.attrs['repeticoes']} repetições, "
+          f"{resultado.attrs['segundos']:.1f}s):")
+    print(resultado.head(10).to_string(index=False))
+    return resultado
+
+
+def carregar_modelo_producao():
+    """Modelo @production do MLflow; sem MLflow, o modelo local (MODELO_FALLBACK_PATH). None se não houver."""
+    try:
+        return mlflow.sklearn.load_model(MODELO_PRODUCAO_URI)
+    except Exception as e:
+        print(f"Aviso: não foi possível carregar {MODELO_PRODUCAO_URI}: {e}")
+    if MODELO_FALLBACK_PATH and os.path.exists(MODELO_FALLBACK_PATH):
+        print(f"         Usando o modelo local {MODELO_FALLBACK_PATH}")
+        return joblib.load(MODELO_FALLBACK_PATH)
+    return None
+
+
+def ajustar_incremental(producao, X_train, y_train, modo, arvores_novas=ARVORES_INCREMENTAIS):
+    """
+    Novo modelo a partir do de produção, sem busca de hiperparâmetros.
+
+    - "sem_busca": mesmos hiperparâmetros (clone), pipeline reajustado do zero nos dados atuais.
+      Se a produção foi compactada, volta ao n_estimators da busca (`n_estimators_busca_`).
+    - "incremental": warm start. Mantém o pré-processamento e as árvores do modelo de
+      produção e acrescenta `arvores_novas` árvores ajustadas nos dados atuais.
+    O modelo de produção não é alterado.
+    """
+    if modo == "sem_busca":
+        candidato = clone(producao)
+        n_estimators_busca = getattr(producao.named_steps['classifier'], "n_estimators_busca_", None)
+        if n_estimators_busca is not None:
+            candidato.set_params(classifier__n_estimators=n_estimators_busca)
+        candidato.fit(X_train, y_train)
+        return candidato
+    if modo != "incremental":
+        raise ValueError(f"Modo de retreino inválido: {modo!r} (use 'completo', 'sem_busca' ou 'incremental')")
+
+    candidato = copy.deepcopy(producao)
+    floresta = candidato.named_steps['classifier']
+    # Mesmo pré-processamento já ajustado: as colunas vistas pelas árvores antigas não mudam
+    X_transformado = candidato.named_steps['preprocessor'].transform(X_train)
+    floresta.set_params(warm_start=True, n_estimators=len(floresta.estimators_) + arvores_novas)
+    floresta.fit(X_transformado, y_train)
+    floresta.set_params(warm_start=False)
+    return candidato
+
+
+def portao_qualidade(producao, candidato, X_test, y_test, limiar=LIMIAR_FIXO, tolerancia=TOLERANCIA_RECALL):
+    """
+    Compara produção e candidato no conjunto de teste (mesmo limiar de decisão); no retreino
+    é o holdout fixo salvo com o modelo de produção, que nenhum dos dois viu no treino.
+    O candidato é aprovado se o recall não cair mais que `tolerancia`.
+    """
+    resultado = {}
+    for nome, modelo in (("producao", producao), ("candidato", candidato)):
+        y_pred = (modelo.predict_proba(X_test)[:, 1] >= limiar).astype(int)
+        resultado[f"recall_{nome}"] = recall_score(y_test, y_pred)
+        resultado[f"precisao_{nome}"] = precision_score(y_test, y_pred, zero_division=0)
+    resultado["aprovado"] = bool(resultado["recall_candidato"] >= resultado["recall_producao"] - tolerancia)
+    return resultado
+
+
+def run_retreino_incremental(modo="incremental"):
+    """
+    Retreino rápido para atualização de dados: parte do modelo de produção, pula a
+    busca de hiperparâmetros e só registra o resultado se passar no portão de qualidade.
+    Sem modelo de produção, faz o treino completo.
+    """
+    print(f"Iniciando retreino {modo} com MLFLOW...")
+    _configurar_mlflow()
+
+    producao = carregar_modelo_producao()
+    if producao is None:
+        print("Nenhum modelo de produção disponível: executando o treino completo.")
+        return run_training()
+
+    carga = {}
+    holdout_producao = getattr(producao, "chaves_holdout_", None)
+    dados = _preparar_dados(carga, holdout_producao)
+    if dados is None:
+        return
+    X_train, X_test, y_train, y_test, chaves_holdout = dados
+    referencia_drift = construir_referencia(X_train)
+
+    with mlflow.start_run() as run:
+        print(f"   [MLflow] Run iniciada. ID: {run.info.run_id}")
+        registrar_carga_dados(carga)
+        mlflow.log_param("retreino_modo", modo)
+        # "fixo": portão no holdout do modelo de produção; "novo": modelo antigo sem holdout salvo
+        holdout_fixo = holdout_producao is not None and chaves_holdout == list(holdout_producao)
+        mlflow.log_param("portao_holdout", "fixo" if holdout_fixo else "novo")
+
+        _etapa(4, f"Ajustando a partir do modelo de produção ({modo})...")
+        inicio = time.perf_counter()
+        candidato = ajustar_incremental(producao, X_train, y_train, modo)
+        mlflow.log_metric("retreino_segundos", time.perf_counter() - inicio)
+        ajustado = candidato
+        if modo == "sem_busca":
+            # Mesma compactação do treino completo, antes do portão: ele julga o modelo que será servido
+            candidato = registrar_compactacao(candidato, X_train, y_train, X_test)
+        else:
+            # As árvores herdadas foram ajustadas em outros dados: sem out-of-bag para a seleção
+            mlflow.log_param("compactacao", "nao_aplicavel_incremental")
+
+        _etapa(5, "Portão de qualidade (conjunto de teste)...")
+        portao = portao_qualidade(producao, candidato, X_test, y_test)
+        for chave, valor in portao.items():
+            mlflow.log_metric(f"portao_{chave}", float(valor))
+        print(f"         Recall produção {portao['recall_producao']:.4f} | candidato {portao['recall_candidato']:.4f}")
+        if not portao["aprovado"]:
+            print("Candidato reprovado no portão de qualidade: modelo não registrado.")
+            return portao
+
+        _etapa(6, "Avaliando...")
+        avaliacao = evaluate_model(candidato, X_test, y_test, threshold=LIMIAR_FIXO,
+                                   reamostragens_bootstrap=BOOTSTRAP_REAMOSTRAGENS)
+        # No incremental as árvores antigas viram outros dados: o out-of-bag não vale
+        if modo == "sem_busca":
+            registrar_limiares(ajustado, X_train, y_train)
+        registrar_importancia_permutacao(candidato, X_test, y_test, avaliacao["y_proba"])
+        _salvar_modelo(candidato, X_test, referencia_drift, chaves_holdout)
+        return portao
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Treinamento do modelo de risco de defasagem")
+    parser.add_argument("--modo", choices=MODOS_RETREINO, default=MODO_RETREINO,
+                        help="completo (busca de hiperparâmetros), sem_busca ou incremental (warm start)")
+    args = parser.parse_args(argv)
+    if args.modo == "completo":
+        run_training()
+    else:
+        run_retreino_incremental(args.modo)
 
-        assinatura = infer_signature(X_test, best_model.predict(X_test))
-        
-        # Grava o modelo no MLflow com a assinatura e registra oficialmente
-        mlflow.sklearn.log_model(
-            sk_model=best_model,
-            name="modelo",
-            signature=assinatura,
-            registered_model_name="Modelo_Risco_Defasagem"
-        )
-        
-        # Salvar
-        output_dir = 'app/model'
-        os.makedirs(output_dir, exist_ok=True)
-        joblib.dump(best_model, 'app/model/modelo.pkl')
-        print("\nModelo salvo com sucesso em app/model/modelo.pkl")
 
 if __name__ == "__main__":
-    run_training()
\ No newline at end of file
+    main()
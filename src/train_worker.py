@@ -0,0 +1,115 @@
+"""
+Processo de treino de longa duração usado pela API (app/training_jobs.py).
+
+Aplica o orçamento de CPU (nice, afinidade e threads nativas) antes de importar
+as bibliotecas pesadas, importa src.train uma única vez e então atende um treino
+por linha JSON recebida no stdin ({"id": ..., "modo": ...}). Tudo o que o treino
+imprime sai no stdout, linha a linha. Eventos de progresso saem como
+`@@progresso {...}` (etapa do treino, total de candidatos e um evento por ajuste
+avaliado na busca) e, ao fim de cada treino, o worker escreve
+`@@fim {"id": ..., "ok": ..., "erro": ...}`. O worker termina quando o stdin fecha.
+
+Uso (normalmente iniciado pela própria API):
+    python -m src.train_worker --nucleos 2 --nice 10
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+
+MARCADOR_PRONTO = "@@pronto"
+MARCADOR_FIM = "@@fim "
+MARCADOR_PROGRESSO = "@@progresso "
+# Liga os eventos de progresso no treino (herdada pelos processos da busca)
+VARIAVEL_PROGRESSO = "TREINO_EVENTOS_PROGRESSO"
+
+# Bibliotecas numéricas que abrem um pool de threads próprio
+_VARIAVEIS_THREADS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "LOKY_MAX_CPU_COUNT")
+
+
+def progresso_habilitado() -> bool:
+    return os.environ.get(VARIAVEL_PROGRESSO) == "1"
+
+
+def emitir_progresso(**campos):
+    """Evento de progresso do treino (uma linha JSON no stdout); só quando roda no worker."""
+    if progresso_habilitado():
+        print(MARCADOR_PROGRESSO + json.dumps(campos), flush=True)
+
+
+def limitar_cpu(nucleos: int, nice: int) -> dict:
+    """
+    Reduz a prioridade do processo (nice) e, com nucleos > 0, restringe o processo e
+    os filhos que ele criar (loky/joblib) aos últimos `nucleos` núcleos disponíveis.
+    Precisa rodar antes de importar numpy/sklearn.
+    """
+    aplicado = {"nice": 0, "nucleos": os.cpu_count()}
+    if nice > 0 and hasattr(os, "nice"):
+        aplicado["nice"] = os.nice(nice)
+        _nice_autogroup(aplicado["nice"])
+    if nucleos > 0:
+        for variavel in _VARIAVEIS_THREADS:
+            os.environ[variavel] = str(nucleos)
+        if hasattr(os, "sched_setaffinity"):
+            disponiveis = sorted(os.sched_getaffinity(0))
+            escolhidos = disponiveis[-nucleos:]
+            os.sched_setaffinity(0, escolhidos)
+            aplicado["nucleos"] = len(escolhidos)
+        else:
+            aplicado["nucleos"] = min(nucleos, os.cpu_count() or nucleos)
+    return aplicado
+
+
+def _nice_autogroup(nice: int):
+    """
+    Com o autogroup do Linux (sched_autogroup_enabled), cada sessão disputa a CPU como
+    um grupo e o nice só vale dentro da própria sessão; o worker roda em sessão própria,
+    então o nice também precisa ir para o grupo (/proc/self/autogroup).
+    """
+    try:
+        with open("/proc/self/autogroup", "w") as f:
+            f.write(str(nice))
+    except OSError:
+        pass
+
+
+def atender(entrada, saida, treino):
+    """Executa um treino por linha de `entrada` até o EOF."""
+    for linha in entrada:
+        if not linha.strip():
+            continue
+        pedido = json.loads(linha)
+        resultado = {"id": pedido.get("id"), "ok": True, "erro": None}
+        inicio = time.perf_counter()
+        try:
+            treino.main(["--modo", pedido.get("modo", "completo")])
+        except BaseException as e:  # SystemExit do argparse também vira falha do job
+            traceback.print_exc(file=saida)
+            resultado.update(ok=False, erro=f"{type(e).__name__}: {e}")
+        resultado["duracao_s"] = round(time.perf_counter() - inicio, 3)
+        print(MARCADOR_FIM + json.dumps(resultado), file=saida, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker de treino da API")
+    parser.add_argument("--nucleos", type=int, default=0, help="Núcleos para o treino (0 = sem limite)")
+    parser.add_argument("--nice", type=int, default=0, help="Incremento de nice (prioridade menor)")
+    args = parser.parse_args(argv)
+
+    sys.stdout.reconfigure(line_buffering=True)
+    limites = limitar_cpu(args.nucleos, args.nice)
+    os.environ["TREINO_NUCLEOS"] = str(args.nucleos if args.nucleos > 0 else -1)
+    os.environ[VARIAVEL_PROGRESSO] = "1"
+
+    inicio = time.perf_counter()
+    treino = importlib.import_module("src.train")
+    print(MARCADOR_PRONTO + " " + json.dumps({**limites, "importacao_s": round(time.perf_counter() - inicio, 3)}),
+          flush=True)
+    atender(sys.stdin, sys.stdout, treino)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,93 +1,260 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
+from src.preprocessing import COLUNAS_NUMERICAS, converter_colunas_numericas
+
+logger = logging.getLogger(__name__)
+
+# Mapas de renomeação para padronizar colunas
+RENAME_MAPS = {
+    "2022": {
+        "INDE 22": "INDE",
+        "Pedra 22": "Pedra",
+        "Matem": "Mat",
+        "Portug": "Por",
+        "Inglês": "Ing",
+        "Defas": "Defasagem",
+        "IAA 2022": "IAA",
+        "IEG 2022": "IEG",
+        "IPS 2022": "IPS",
+        "IDA 2022": "IDA",
+        "IPV 2022": "IPV",
+        "IAN 2022": "IAN",
+    },
+    "2023": {
+        "INDE 2023": "INDE",
+        "Pedra 2023": "Pedra",
+        "IAA 2023": "IAA",
+        "IEG 2023": "IEG",
+        "IPS 2023": "IPS",
+        "IDA 2023": "IDA",
+        "IPV 2023": "IPV",
+        "IAN 2023": "IAN",
+        "Defasagem 2023": "Defasagem",
+    },
+    "2024": {
+        "INDE 2024": "INDE",
+        "Pedra 2024": "Pedra",
+        "IAA 2024": "IAA",
+        "IEG 2024": "IEG",
+        "IPS 2024": "IPS",
+        "IDA 2024": "IDA",
+        "IPV 2024": "IPV",
+        "IAN 2024": "IAN",
+        "Defasagem 2024": "Defasagem",
+    },
+}
+
+# Anos sem mapa próprio seguem o formato de nomes deste ano ("IAA 2025", "Defasagem 2025"...)
+ANO_FORMATO_PADRAO = "2024"
+
+
+def mapa_renomeacao(ano):
+    """Mapa de renomeação do ano: o de RENAME_MAPS ou, para outros anos, o de ANO_FORMATO_PADRAO com o ano trocado."""
+    ano = str(ano)
+    if ano in RENAME_MAPS:
+        return RENAME_MAPS[ano]
+    return {
+        orig.replace(ANO_FORMATO_PADRAO, ano): novo
+        for orig, novo in RENAME_MAPS.get(ANO_FORMATO_PADRAO, {}).items()
+    }
+
+
+# Colunas entregues por load_data (nomes já padronizados); as demais nem são lidas do CSV
+TARGET_COLS = [
+    "INDE",
+    "IAA",
+    "IEG",
+    "IPS",
+    "IDA",
+    "IPV",
+    "IAN",
+    "Defasagem",
+    "Ano_Base",
+    "Idade",
+    "Fase",
+    "Pedra",
+    "Instituicao_de_ensino",
+    "Genero",
+    # Identificador do aluno no ano: não vira feature (create_features descarta), identifica o holdout fixo
+    "RA",
+]
+
+# Arquivos acima deste tamanho são lidos em blocos de linhas (memória do parser limitada)
+LIMIAR_LEITURA_EM_BLOCOS_BYTES = 64 * 1024 * 1024
+LINHAS_POR_BLOCO = 100_000
+
+
+def _detectar_separador(path, padrao=";"):
+    """Separador do CSV pelo cabeçalho: o mais frequente entre ';' e ','."""
+    try:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            cabecalho = f.readline()
+    except OSError:
+        return padrao
+    pontos_e_virgulas, virgulas = cabecalho.count(";"), cabecalho.count(",")
+    if pontos_e_virgulas == virgulas:
+        return padrao
+    return ";" if pontos_e_virgulas > virgulas else ","
 
-def load_data(file_paths):
+
+def _colunas_necessarias(ano):
+    """Nomes originais (sem espaços) das colunas do ano que viram alguma das TARGET_COLS."""
+    mapa = mapa_renomeacao(ano)
+    return {orig for orig, novo in mapa.items() if novo in TARGET_COLS} | set(TARGET_COLS)
+
+
+def _tamanho_arquivo(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _ler_csv(path, ano=None):
     """
-    Carrega e unifica os dados dos anos 2022, 2023 e 2024,
-    garantindo a padronização dos nomes das colunas.
+    Lê do CSV do ano só as colunas usadas, padroniza os nomes e converte as colunas
+    numéricas (converter_colunas_numericas, mesmas regras de clean_data). Arquivos grandes
+    são lidos e convertidos bloco a bloco.
     """
-    dfs = []
+    necessarias = _colunas_necessarias(ano)
+    opcoes = {
+        "encoding": "utf-8",
+        # Os nomes no arquivo têm espaços sobrando ("RA    ", "IAA ")
+        "usecols": lambda coluna: coluna.strip() in necessarias,
+        "dtype": str,
+    }
+    if _tamanho_arquivo(path) > LIMIAR_LEITURA_EM_BLOCOS_BYTES:
+        opcoes["chunksize"] = LINHAS_POR_BLOCO
+
+    separador = _detectar_separador(path)
+    try:
+        return _ler_com_separador(path, separador, opcoes, ano)
+    except (pd.errors.ParserError, UnicodeDecodeError):
+        # Cabeçalho enganoso: tenta o outro separador
+        return _ler_com_separador(path, "," if separador == ";" else ";", opcoes, ano)
+
+
+def _ler_com_separador(path, separador, opcoes, ano):
+    leitura = pd.read_csv(path, sep=separador, **opcoes)
+    if "chunksize" in opcoes:
+        # Cada bloco é convertido antes da união: o texto das colunas numéricas não se acumula
+        return pd.concat((_preparar(bloco, ano) for bloco in leitura), ignore_index=True)
+    return _preparar(leitura, ano)
+
 
-    # Mapas de renomeação para padronizar colunas
-    rename_maps = {
-        "2022": {
-            "INDE 22": "INDE",
-            "Pedra 22": "Pedra",
-            "Matem": "Mat",
-            "Portug": "Por",
-            "Inglês": "Ing",
-            "Defas": "Defasagem",
-            "IAA 2022": "IAA",
-            "IEG 2022": "IEG",
-            "IPS 2022": "IPS",
-            "IDA 2022": "IDA",
-            "IPV 2022": "IPV",
-            "IAN 2022": "IAN",
-        },
-        "2023": {
-            "INDE 2023": "INDE",
-            "Pedra 2023": "Pedra",
-            "IAA 2023": "IAA",
-            "IEG 2023": "IEG",
-            "IPS 2023": "IPS",
-            "IDA 2023": "IDA",
-            "IPV 2023": "IPV",
-            "IAN 2023": "IAN",
-            "Defasagem 2023": "Defasagem",
-        },
-        "2024": {
-            "INDE 2024": "INDE",
-            "Pedra 2024": "Pedra",
-            "IAA 2024": "IAA",
-            "IEG 2024": "IEG",
-            "IPS 2024": "IPS",
-            "IDA 2024": "IDA",
-            "IPV 2024": "IPV",
-            "IAN 2024": "IAN",
-            "Defasagem 2024": "Defasagem",
-        },
+def _preparar(df, ano):
+    # CORREÇÃO CRÍTICA: Remove espaços invisíveis dos nomes das colunas antes de mapear
+    df.columns = df.columns.str.strip()
+    return converter_colunas_numericas(_renomear(df, ano))
+
+
+def _renomear(df, ano):
+    cols_to_rename = {
+        k: v for k, v in mapa_renomeacao(ano).items() if k in df.columns
     }
+    if cols_to_rename:
+        df = df.rename(columns=cols_to_rename)
+    return df
+
+
+def _chave_cache(path, ano):
+    """
+    sha256 do conteúdo do CSV + mapa de renomeação do ano + colunas lidas e convertidas
+    (mudar qualquer um invalida o cache).
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            digest.update(bloco)
+    arquivo = digest.hexdigest()
+    mapa = json.dumps(mapa_renomeacao(ano), sort_keys=True, ensure_ascii=False)
+    colunas = ",".join(TARGET_COLS) + ";" + ",".join(COLUNAS_NUMERICAS)
+    chave = hashlib.sha256(f"{arquivo}:{mapa}:{colunas}".encode("utf-8")).hexdigest()
+    return chave, arquivo
 
-    if not file_paths:
-        raise ValueError("file_paths não pode ser vazio.")
 
-    for ano, path in file_paths.items():
+def _ler_ano_com_cache(path, ano, cache_dir):
+    """
+    DataFrame do ano (já renomeado) a partir do cache Parquet, lendo e parseando o
+    CSV só quando o conteúdo do arquivo ou o mapa de renomeação mudaram.
+    Retorna (df, estatisticas).
+    """
+    inicio = time.perf_counter()
+    chave, sha256 = _chave_cache(path, ano)
+    caminho_cache = os.path.join(cache_dir, f"PEDE{ano}-{chave[:16]}.parquet")
+    if os.path.exists(caminho_cache):
         try:
-            df = pd.read_csv(path, sep=";", encoding="utf-8")
-        except (pd.errors.ParserError, UnicodeDecodeError):
-            df = pd.read_csv(path, sep=",", encoding="utf-8")
+            df = pd.read_parquet(caminho_cache)
+            return df, {"cache": "hit", "segundos": time.perf_counter() - inicio, "sha256": sha256}
+        except Exception as e:
+            logger.warning(f"Cache de dados corrompido ({caminho_cache}); relendo o CSV: {e}")
 
-        # CORREÇÃO CRÍTICA: Remove espaços invisíveis dos nomes das colunas antes de mapear
-        df.columns = df.columns.str.strip()
+    df = _ler_csv(path, ano)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temporario = f"{caminho_cache}.tmp-{os.getpid()}-{threading.get_ident()}"
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, caminho_cache)
+        # Versões antigas do mesmo ano não servem mais
+        for nome in os.listdir(cache_dir):
+            if nome.startswith(f"PEDE{ano}-") and nome.endswith(".parquet") and nome != os.path.basename(caminho_cache):
+                os.remove(os.path.join(cache_dir, nome))
+    except Exception as e:
+        logger.warning(f"Não foi possível gravar o cache de dados de {ano}: {e}")
+    return df, {"cache": "miss", "segundos": time.perf_counter() - inicio, "sha256": sha256}
 
-        if ano in rename_maps:
-            cols_to_rename = {
-                k: v for k, v in rename_maps[ano].items() if k in df.columns
-            }
-            df = df.rename(columns=cols_to_rename)
 
-        df["Ano_Base"] = int(ano)
-        dfs.append(df)
+def _carregar_ano(ano, path, cache_dir):
+    if cache_dir:
+        df, carga = _ler_ano_com_cache(path, ano, cache_dir)
+    else:
+        inicio = time.perf_counter()
+        df = _ler_csv(path, ano)
+        carga = {"cache": "desligado", "segundos": time.perf_counter() - inicio}
+    df["Ano_Base"] = int(ano)
+    return df, carga
+
 
-    target_cols = [
-        "INDE",
-        "IAA",
-        "IEG",
-        "IPS",
-        "IDA",
-        "IPV",
-        "IAN",
-        "Defasagem",
-        "Ano_Base",
-        "Idade",
-        "Fase",
-        "Pedra",
-        "Instituicao_de_ensino",
-        "Genero",
-    ]
+def load_data(file_paths, cache_dir=None, estatisticas=None, max_workers=None):
+    """
+    Carrega e unifica os dados dos anos 2022, 2023 e 2024,
+    garantindo a padronização dos nomes das colunas. Outros anos (bases
+    sintéticas, anos novos do PEDE) usam o formato de nomes de 2024.
+
+    Os anos são lidos em paralelo (threads; o parser C do pandas libera o GIL) e
+    cada arquivo só tem lidas as colunas que viram alguma das TARGET_COLS.
+
+    cache_dir: pasta do cache colunar (Parquet) dos CSVs já parseados; None desliga.
+    estatisticas: dict opcional preenchido com {ano: {"cache", "segundos", "sha256"}}.
+    max_workers: threads de leitura (padrão: uma por ano, até a quantidade de CPUs).
+    """
+    if not file_paths:
+        raise ValueError("file_paths não pode ser vazio.")
+
+    itens = list(file_paths.items())
+    n_threads = max_workers or min(len(itens), os.cpu_count() or 1)
+    if n_threads <= 1:
+        resultados = [_carregar_ano(ano, path, cache_dir) for ano, path in itens]
+    else:
+        with ThreadPoolExecutor(max_workers=n_threads) as pool:
+            resultados = list(pool.map(lambda item: _carregar_ano(item[0], item[1], cache_dir), itens))
+
+    dfs = []
+    for (ano, _), (df, carga) in zip(itens, resultados):
+        if estatisticas is not None:
+            estatisticas[ano] = carga
+        dfs.append(df)
 
     df_full = pd.concat(dfs, ignore_index=True)
-    cols_existentes = [c for c in target_cols if c in df_full.columns]
+    cols_existentes = [c for c in TARGET_COLS if c in df_full.columns]
 
     # Trava de segurança para garantir que a defasagem foi mapeada
     if "Defasagem" not in cols_existentes:
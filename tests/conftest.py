@@ -1,6 +1,16 @@
+import os
+import sys
+
+# Testes não leem nem gravam o cache de modelos em disco (ver test_model_store.py)
+os.environ.setdefault("CACHE_MODELOS_DIR", "")
+
+import numpy as np
+import pandas as pd
 import pytest
 from unittest.mock import patch
 
+from src.train import construir_pipeline
+
 
 @pytest.fixture(autouse=True)
 def bloquear_mlflow_globalmente():
@@ -12,3 +22,77 @@ def bloquear_mlflow_globalmente():
         "app.routes.mlflow"
     ):
         yield
+
+
+COLUNAS_MODELO = [
+    "IAA", "IEG", "IPS", "IDA", "IPV", "Idade", "Instituicao_de_ensino", "Genero",
+    "IEG_x_IDA", "IEG_x_IAA", "IPS_x_IDA", "Fase_Num",
+]
+
+
+def _gerar_dados_sinteticos(n, seed=0):
+    """Alunos sintéticos já no formato de create_features (entrada do pipeline)."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "IAA": rng.uniform(0, 10, n).round(1),
+        "IEG": rng.uniform(0, 10, n).round(1),
+        "IPS": rng.uniform(0, 10, n).round(1),
+        "IDA": rng.uniform(0, 10, n).round(1),
+        "IPV": rng.uniform(0, 10, n).round(1),
+        "Idade": rng.integers(7, 20, n).astype(float),
+        "Instituicao_de_ensino": rng.choice(["PUBLICA", "PRIVADA", "REDE DECISAO"], n).astype(object),
+        "Genero": rng.choice(["FEMININO", "MASCULINO"], n).astype(object),
+    })
+    df.loc[rng.random(n) < 0.1, "IAA"] = np.nan
+    df.loc[rng.random(n) < 0.1, "Genero"] = np.nan
+    df["IEG_x_IDA"] = df["IEG"] * df["IDA"]
+    df["IEG_x_IAA"] = df["IEG"] * df["IAA"]
+    df["IPS_x_IDA"] = df["IPS"] * df["IDA"]
+    df["Fase_Num"] = rng.integers(0, 9, n)
+    y = ((df["IDA"] + rng.normal(0, 2, n)) < 5).astype(int)
+    return df[COLUNAS_MODELO], y
+
+
+@pytest.fixture
+def dados_sinteticos():
+    """Gerador de alunos sintéticos: dados_sinteticos(n, seed) -> (X, y)."""
+    return _gerar_dados_sinteticos
+
+
+@pytest.fixture(scope="module")
+def pipeline_sintetico():
+    """Pipeline real de src/train.py treinado em dados sintéticos (rápido)."""
+    X, y = _gerar_dados_sinteticos(400)
+    pipeline = construir_pipeline()
+    pipeline.set_params(classifier__n_estimators=25)
+    pipeline.fit(X, y)
+    return pipeline
+
+
+_WORKER_FALSO = """
+import json, os, sys, time
+print("@@pronto {}", flush=True)
+for linha in sys.stdin:
+    pedido = json.loads(linha)
+    print(f"treinando {pedido['modo']} pid={os.getpid()}", flush=True)
+    for evento in ({"etapa": 5, "etapas": 6, "descricao": "Treinando o modelo"}, {"candidatos": 4, "folds": 2},
+                   {"ajuste": 1}, {"ajuste": 1}, {"ajuste": 1}):
+        print("@@progresso " + json.dumps(evento), flush=True)
+    if pedido["modo"] == "linha_longa":
+        print("x" * 20000, flush=True)
+    if pedido["modo"] == "lento":
+        time.sleep(60)
+    ok = pedido["modo"] != "falha"
+    print("@@fim " + json.dumps({"id": pedido["id"], "ok": ok, "erro": None if ok else "falhou"}), flush=True)
+"""
+
+
+@pytest.fixture
+def worker_falso(tmp_path):
+    """Comando de um worker de treino falso: mesmo protocolo de src/train_worker.py, sem treinar.
+    Emite eventos de progresso (etapa 5/6, 4 candidatos x 2 folds, 3 ajustes concluídos).
+    O modo "lento" fica 60 s executando, "falha" termina com erro e "linha_longa" imprime
+    uma linha de 20.000 caracteres."""
+    script = tmp_path / "worker_falso.py"
+    script.write_text(_WORKER_FALSO, encoding="utf-8")
+    return [sys.executable, str(script)]
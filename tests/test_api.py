@@ -2,12 +2,10 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, patch
 import importlib
-import sys
-import subprocess
 
 from app.main import app
 from app import routes
-from app.routes import executar_treinamento_em_background
+from app.training_jobs import GerenciadorTreinos
 
 client = TestClient(app)
 
@@ -170,8 +168,11 @@ def test_model_loading_exception():
     # Arrange & Act & Assert
     with patch("mlflow.sklearn.load_model", side_effect=Exception("Erro MLflow")):
         with patch.dict("sys.modules", {"prometheus_client": MagicMock()}):
-            importlib.reload(routes)
-            assert routes.model is None
+            with patch("app.config.MODELO_FALLBACK_PATH", "arquivo_inexistente.pkl"):
+                importlib.reload(routes)
+                assert routes.model is None
+                assert routes.inicializacao["origem"] == "indisponivel"
+                routes.recarregador.aguardar(timeout=30)
 
     # LIMPEZA SEGURA (TEARDOWN)
     with patch("mlflow.sklearn.load_model", return_value="Modelo Recuperado"):
@@ -181,69 +182,433 @@ def test_model_loading_exception():
     assert routes.model == "Modelo Recuperado"
 
 
-def test_reload_model_success():
-    # Arrange & Act
-    with patch(
-        "app.routes.mlflow.sklearn.load_model", return_value="Novo Modelo Atualizado"
-    ):
-        response = client.post("/reload")
+def _recarregar_routes_sem_mlflow(**config):
+    """Reimporta app.routes com o MLflow indisponível e a configuração informada."""
+    with patch("mlflow.sklearn.load_model", side_effect=Exception("MLflow fora do ar")):
+        with patch.dict("sys.modules", {"prometheus_client": MagicMock()}):
+            with patch.multiple("app.config", **config):
+                importlib.reload(routes)
+                # A conferência do alias em segundo plano também falha e o modelo é mantido
+                assert routes.recarregador.aguardar(timeout=30)
+                return routes.model, routes.versao_modelo, routes.inicializacao
 
-    # Assert
-    assert response.status_code == 200
-    assert response.json()["status"] == "sucesso"
-    assert "Modelo atualizado" in response.json()["mensagem"]
-    assert routes.model == "Novo Modelo Atualizado"
 
+def _restaurar_routes():
+    with patch("mlflow.sklearn.load_model", return_value="Modelo Recuperado"):
+        with patch.dict("sys.modules", {"prometheus_client": MagicMock()}):
+            importlib.reload(routes)
+
+
+def test_inicializacao_usa_cache_local_de_modelos(tmp_path, pipeline_sintetico):
+    from app.model_store import CacheModelos
+
+    cache = CacheModelos(str(tmp_path))
+    cache.guardar(pipeline_sintetico, "7")
+    cache.definir_atual("7")
+
+    try:
+        modelo, versao, inicializacao = _recarregar_routes_sem_mlflow(CACHE_MODELOS_DIR=str(tmp_path))
+    finally:
+        _restaurar_routes()
+
+    assert hasattr(modelo, "predict_proba")
+    assert versao == "7"
+    assert inicializacao["origem"] == "cache_local"
+    assert inicializacao["duracao_s"] >= 0
 
-def test_reload_model_exception():
+
+def test_inicializacao_cai_para_modelo_pkl(tmp_path, pipeline_sintetico):
+    import joblib
+
+    caminho = tmp_path / "modelo.pkl"
+    joblib.dump(pipeline_sintetico, caminho)
+
+    try:
+        modelo, versao, inicializacao = _recarregar_routes_sem_mlflow(
+            CACHE_MODELOS_DIR="", MODELO_FALLBACK_PATH=str(caminho)
+        )
+    finally:
+        _restaurar_routes()
+
+    assert hasattr(modelo, "predict_proba")
+    assert versao.startswith("arquivo-")
+    assert inicializacao["origem"] == "arquivo_local"
+
+
+@pytest.fixture
+def nova_versao():
+    """Versão inédita devolvida pelo registro do MLflow (mockado no conftest)."""
+    import uuid
+
+    versao = uuid.uuid4().hex
+    routes.mlflow.MlflowClient.return_value.get_model_version_by_alias.return_value.version = versao
+    return versao
+
+
+def test_reload_model_success(mock_model, pipeline_sintetico, nova_versao):
     # Arrange & Act
-    with patch(
-        "app.routes.mlflow.sklearn.load_model",
-        side_effect=Exception("Conexão com MLflow perdida"),
-    ):
-        response = client.post("/reload")
+    with patch.object(routes, "model", mock_model):
+        with patch(
+            "app.routes.mlflow.sklearn.load_model", return_value=pipeline_sintetico
+        ):
+            response = client.post("/reload")
+            assert routes.recarregador.aguardar(timeout=30)
+
+        # Assert
+        assert response.status_code == 202
+        assert response.json()["status"] == "sucesso"
+        assert "segundo plano" in response.json()["mensagem"]
+        assert routes.model is pipeline_sintetico
+        assert routes.versao_modelo == nova_versao
+        status = client.get("/reload/status").json()
+        assert status["estado"] == "ocioso"
+        assert status["ultima_recarga"]["sucesso"] is True
+        assert status["ultima_recarga"]["duracao_aquecimento_s"] is not None
+        assert client.post("/predict", json=ALUNO_VALIDO).status_code == 200
+
+
+def test_reload_model_exception(mock_model):
+    # Arrange & Act
+    with patch.object(routes, "model", mock_model):
+        with patch(
+            "app.routes.mlflow.sklearn.load_model",
+            side_effect=Exception("Conexão com MLflow perdida"),
+        ):
+            response = client.post("/reload")
+            assert routes.recarregador.aguardar(timeout=30)
 
-    # Assert
-    assert response.status_code == 500
-    assert "Erro ao recarregar o modelo" in response.json()["detail"]
+        # Assert: a recarga falhou em segundo plano e o modelo anterior continua servindo
+        assert response.status_code == 202
+        assert routes.model is mock_model
+        ultima = client.get("/reload/status").json()["ultima_recarga"]
+        assert ultima["sucesso"] is False
+        assert "Conexão com MLflow perdida" in ultima["erro"]
+
+
+def test_reload_modelo_que_falha_no_aquecimento_nao_e_ativado(mock_model):
+    modelo_quebrado = MagicMock()
+    modelo_quebrado.predict_proba.side_effect = ValueError("features incompatíveis")
+
+    with patch.object(routes, "model", mock_model):
+        with patch("app.routes.mlflow.sklearn.load_model", return_value=modelo_quebrado):
+            client.post("/reload")
+            assert routes.recarregador.aguardar(timeout=30)
+
+        assert routes.model is mock_model
+        assert "features incompatíveis" in routes.recarregador.status()["ultima_recarga"]["erro"]
 
 
-def test_retrain_endpoint():
-    # O TestClient do FastAPI gerencia BackgroundTasks automaticamente
+def test_reload_concorrente_retorna_409(mock_model):
+    import threading
+
+    liberar = threading.Event()
+
+    def carga_lenta(_uri):
+        liberar.wait(timeout=30)
+        raise Exception("cancelada")
+
+    with patch.object(routes, "model", mock_model):
+        with patch("app.routes.mlflow.sklearn.load_model", side_effect=carga_lenta):
+            assert client.post("/reload").status_code == 202
+            assert client.get("/reload/status").json()["estado"] == "carregando"
+            # O modelo atual continua respondendo durante a recarga
+            assert client.post("/predict", json=ALUNO_VALIDO).status_code == 200
+            assert client.post("/reload").status_code == 409
+            liberar.set()
+            assert routes.recarregador.aguardar(timeout=30)
+
+
+@pytest.fixture
+def fila_treinos(worker_falso):
+    """Fila de treinos da API usando o worker falso (sem treino de verdade)."""
+    gerenciador = GerenciadorTreinos(comando=worker_falso)
+    with patch.object(routes, "gerenciador_treinos", gerenciador):
+        yield gerenciador
+    gerenciador.encerrar()
+
+
+def test_retrain_endpoint(fila_treinos):
     response = client.post("/retrain")
 
-    assert response.status_code == 200
+    assert response.status_code == 202
     assert response.json()["status"] == "sucesso"
     assert "Treinamento iniciado" in response.json()["mensagem"]
+    job_id = response.json()["job_id"]
+    assert fila_treinos.aguardar(job_id, timeout=30)
+
+    status = client.get(f"/retrain/{job_id}").json()
+    assert status["estado"] == "concluido"
+    assert status["modo"] == "completo"
+    assert any("treinando completo" in linha for linha in status["ultimas_linhas"])
+    assert client.get("/retrain/jobs").json()["jobs"][0]["job_id"] == job_id
+
+
+def test_retrain_single_flight_e_cancelamento(fila_treinos):
+    with patch("app.routes.MODOS_RETREINO", ("completo", "sem_busca", "incremental", "lento")):
+        primeiro = client.post("/retrain", params={"modo": "lento"}).json()
+        repetido = client.post("/retrain", params={"modo": "lento"}).json()
+
+    # O mesmo modo não é enfileirado duas vezes
+    assert repetido["job_id"] == primeiro["job_id"]
+    assert "Já existe" in repetido["mensagem"]
+
+    response = client.delete(f"/retrain/{primeiro['job_id']}")
+    assert response.status_code == 200
+    assert fila_treinos.aguardar(primeiro["job_id"], timeout=30)
+    assert client.get(f"/retrain/{primeiro['job_id']}").json()["estado"] == "cancelado"
+
+
+def test_retrain_modo_incremental():
+    with patch.object(routes, "gerenciador_treinos") as mock_gerenciador:
+        mock_gerenciador.submeter.return_value = (MagicMock(id="abc", estado="na_fila"), True)
+        response = client.post("/retrain", params={"modo": "incremental"})
+
+    assert response.status_code == 202
+    assert response.json()["job_id"] == "abc"
+    mock_gerenciador.submeter.assert_called_once_with("incremental")
+
+
+def test_retrain_modo_invalido():
+    response = client.post("/retrain", params={"modo": "turbo"})
+
+    assert response.status_code == 400
+
+
+def test_retrain_job_inexistente():
+    assert client.get("/retrain/naoexiste").status_code == 404
+    assert client.delete("/retrain/naoexiste").status_code == 404
+
+
+def test_reload_e_retrain_recusados_com_varios_workers():
+    with patch.object(routes, "WEB_CONCURRENCY", 2), \
+         patch.object(routes.recarregador, "solicitar") as mock_solicitar, \
+         patch.object(routes.gerenciador_treinos, "submeter") as mock_submeter:
+        assert client.post("/reload").status_code == 501
+        assert client.post("/retrain").status_code == 501
+        assert client.get("/retrain/jobs").status_code == 501
+        assert client.get("/retrain/qualquer").status_code == 501
+        assert client.delete("/retrain/qualquer").status_code == 501
+        # O status da recarga (só leitura) continua disponível
+        assert client.get("/reload/status").status_code == 200
+    mock_solicitar.assert_not_called()
+    mock_submeter.assert_not_called()
+
+
+ALUNO_VALIDO = {
+    "IAA": 5.5, "IEG": 2.0, "IPS": 6.0, "IDA": 4.5, "IPV": 7.0,
+    "Idade": 15, "Fase": "8",
+    "Instituicao_de_ensino": "Publica", "Genero": "Feminino",
+}
+
+
+def test_predict_batch_erros_por_linha_e_deduplicacao():
+    # Arrange: dois alunos idênticos, um diferente e um inválido
+    batch_model = MagicMock()
+    batch_model.predict_proba.side_effect = lambda df: [[0.2, 0.8], [0.9, 0.1]][: len(df)]
+    outro = {**ALUNO_VALIDO, "IEG": 9.0, "Fase": "ALFA"}
+    invalido = {**ALUNO_VALIDO, "Genero": "X"}
+
+    with patch.object(routes, "model", batch_model):
+        response = client.post(
+            "/predict/batch", json={"alunos": [ALUNO_VALIDO, outro, invalido, ALUNO_VALIDO]}
+        )
+
+    # Assert
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 4
+    assert data["validos"] == 3
+    assert data["invalidos"] == 1
+
+    # Uma única chamada ao modelo, só com as linhas distintas
+    batch_model.predict_proba.assert_called_once()
+    df_enviado = batch_model.predict_proba.call_args[0][0]
+    assert len(df_enviado) == 2
+    assert sorted(df_enviado["Fase_Num"].tolist()) == [0, 8]
+
+    resultados = data["resultados"]
+    assert [r["indice"] for r in resultados] == [0, 1, 2, 3]
+    assert resultados[2]["resultado"] is None
+    assert resultados[2]["erros"][0]["campo"] == "Genero"
+    assert resultados[0]["resultado"] == resultados[3]["resultado"]
+    probas = {resultados[0]["resultado"]["probabilidade_risco"], resultados[1]["resultado"]["probabilidade_risco"]}
+    assert probas == {0.8, 0.1}
+
+
+def test_predict_batch_durante_troca_de_modelo_nao_mistura_alunos():
+    # O lote começa com o modelo antigo e a troca acontece antes dos artefatos serem obtidos:
+    # sem versão não há cache, mas cada aluno distinto continua com a própria probabilidade
+    antigo, novo = MagicMock(), MagicMock()
+    antigo.predict_proba.side_effect = lambda df: [[1 - p, p] for p in (df["IEG"] / 10).tolist()]
+    alunos = [{**ALUNO_VALIDO, "IEG": ieg} for ieg in (1.0, 5.0, 9.0)] + [ALUNO_VALIDO]
+
+    def trocar_modelo(_):
+        routes.model = novo
+
+    with patch.object(routes, "model", antigo), patch.object(routes, "FEATURE_IAA") as feature_iaa:
+        feature_iaa.set.side_effect = trocar_modelo
+        data = client.post("/predict/batch", json={"alunos": alunos}).json()
+
+    probas = [r["resultado"]["probabilidade_risco"] for r in data["resultados"]]
+    assert probas == [0.1, 0.5, 0.9, ALUNO_VALIDO["IEG"] / 10]
+    novo.predict_proba.assert_not_called()
+    assert len(antigo.predict_proba.call_args[0][0]) == 4
+
+
+def test_predict_batch_todos_invalidos_nao_chama_modelo(mock_model):
+    with patch.object(routes, "model", mock_model):
+        response = client.post("/predict/batch", json={"alunos": [{"IAA": 1.0}]})
+
+    assert response.status_code == 200
+    assert response.json()["validos"] == 0
+    mock_model.predict_proba.assert_not_called()
+
+
+def test_predict_batch_excede_tamanho_maximo(mock_model):
+    with patch.object(routes, "model", mock_model), patch.object(routes, "TAMANHO_MAX_LOTE", 1):
+        response = client.post("/predict/batch", json={"alunos": [ALUNO_VALIDO, ALUNO_VALIDO]})
+
+    assert response.status_code == 413
+
+
+def test_predict_batch_model_not_loaded():
+    with patch.object(routes, "model", None):
+        response = client.post("/predict/batch", json={"alunos": [ALUNO_VALIDO]})
+
+    assert response.status_code == 500
+    assert "Modelo não carregado" in response.json()["detail"]
+
+
+def test_predict_caminho_compilado_igual_ao_caminho_pandas(pipeline_sintetico):
+    # Arrange: pipeline real (pequeno) para exercitar o pré-processamento compilado
+    pipeline = pipeline_sintetico
+
+    with patch.object(routes, "model", pipeline):
+        assert routes._obter_artefatos(pipeline)["preprocessador"] is not None
+        resposta_compilada = client.post("/predict", json=ALUNO_VALIDO).json()
+
+        with patch.object(routes, "PREPROCESSAMENTO_COMPILADO", False), patch.object(
+            routes, "_artefatos", (None, {})
+        ):
+            resposta_pandas = client.post("/predict", json=ALUNO_VALIDO).json()
+
+    # Assert
+    assert resposta_compilada == resposta_pandas
+
+
+def test_predict_com_floresta_compilada(pipeline_sintetico):
+    # Arrange: mesma resposta com o motor compilado, nos caminhos compilado e pandas
+    with patch.object(routes, "model", pipeline_sintetico):
+        with patch.object(routes, "_artefatos", (None, {})):
+            esperado = client.post("/predict", json=ALUNO_VALIDO).json()
+
+        with patch.object(routes, "MOTOR_FLORESTA", "compilado"), patch.object(
+            routes, "_artefatos", (None, {})
+        ):
+            artefatos = routes._obter_artefatos(pipeline_sintetico)
+            rapido = client.post("/predict", json=ALUNO_VALIDO).json()
+            lote = client.post("/predict/batch", json={"alunos": [ALUNO_VALIDO]}).json()
+
+    # Assert
+    assert artefatos["floresta"] is not None
+    assert artefatos["preprocessador"].classificador is artefatos["floresta"]
+    assert rapido == esperado
+    assert lote["resultados"][0]["resultado"] == esperado
+
+
+def test_predict_usa_cache_para_aluno_canonicalizado_igual(mock_model):
+    # "Publica"/" pública " e "8"/"FASE 8" viram o mesmo aluno após canonicalização
+    variante = {**ALUNO_VALIDO, "Instituicao_de_ensino": " pública ", "Fase": "FASE 8"}
+    with patch.object(routes, "model", mock_model), patch.object(routes, "CACHE_HITS") as hits:
+        primeira = client.post("/predict", json=ALUNO_VALIDO).json()
+        segunda = client.post("/predict", json=variante).json()
+        lote = client.post("/predict/batch", json={"alunos": [ALUNO_VALIDO, variante]}).json()
+
+    assert primeira == segunda
+    assert lote["resultados"][0]["resultado"] == primeira
+    mock_model.predict_proba.assert_called_once()
+    assert hits.inc.call_count == 3
+
+
+def test_troca_de_modelo_invalida_cache(mock_model):
+    outro_modelo = MagicMock()
+    outro_modelo.predict_proba.return_value = [[0.9, 0.1]]
+
+    with patch.object(routes, "model", mock_model):
+        assert client.post("/predict", json=ALUNO_VALIDO).json()["risco_defasagem"] == 1
+    with patch.object(routes, "model", outro_modelo):
+        assert client.post("/predict", json=ALUNO_VALIDO).json()["risco_defasagem"] == 0
+
+
+def test_reload_invalida_cache(mock_model, pipeline_sintetico, nova_versao):
+    with patch.object(routes, "model", mock_model):
+        client.post("/predict", json=ALUNO_VALIDO)
+        assert len(routes.CACHE_PREDICOES) > 0
+
+        with patch("app.routes.mlflow.sklearn.load_model", return_value=pipeline_sintetico):
+            client.post("/reload")
+            assert routes.recarregador.aguardar(timeout=30)
+
+    assert len(routes.CACHE_PREDICOES) == 0
+
+
+def test_predict_batch_com_pool_saturado_retorna_503(mock_model):
+    from app.inference_executor import ExecutorSaturado
+
+    executor = MagicMock()
+    executor.aceita.return_value = True
+    executor.predict_proba.side_effect = ExecutorSaturado("Fila do pool de inferência cheia")
+
+    with patch.object(routes, "model", mock_model), patch.object(routes, "executor_inferencia", executor):
+        response = client.post("/predict/batch", json={"alunos": [ALUNO_VALIDO]})
+
+    assert response.status_code == 503
+    assert "Fila" in response.json()["detail"]
+    mock_model.predict_proba.assert_not_called()
+
 
+def test_amostragem_do_log_de_predicoes(mock_model):
+    with patch.object(routes, "model", mock_model), patch.object(routes, "logger") as logger:
+        with patch.object(routes, "amostragem_log_predicoes", 0.0):
+            assert client.post("/predict", json=ALUNO_VALIDO).status_code == 200
+        assert logger.info.call_count == 0
 
-@patch("app.routes.subprocess.run")
-def test_executar_treinamento_em_background_success(mock_subprocess_run):
-    mock_result = MagicMock()
-    mock_result.stdout = "Iniciando...\nModelo salvo com sucesso no MLflow!"
-    mock_subprocess_run.return_value = mock_result
+        with patch.object(routes, "amostragem_log_predicoes", 1.0):
+            client.post("/predict", json=ALUNO_VALIDO)
+        campos = logger.info.call_args.kwargs["extra"]["campos"]
+        assert campos["evento"] == "predicao"
+        assert campos["dados"]["Genero"] == "FEMININO"
 
-    executar_treinamento_em_background()
 
-    mock_subprocess_run.assert_called_once()
-    args, kwargs = mock_subprocess_run.call_args
-    assert args[0] == [sys.executable, "-m", "src.train"]
-    assert kwargs["capture_output"] is True
+def test_drift_por_feature_exposto_no_metrics(pipeline_sintetico, dados_sinteticos):
+    import copy
+    from src.drift import construir_referencia
 
+    # O treino grava a referência no próprio modelo; a API a adota ao publicar o modelo
+    X, _ = dados_sinteticos(500)
+    modelo = copy.copy(pipeline_sintetico)
+    modelo.referencia_drift_ = construir_referencia(X)
+    monitor = routes.MonitorDrift(janela=1000, baldes=5, min_amostras=1)
 
-@patch("app.routes.subprocess.run")
-def test_executar_treinamento_em_background_calledprocesserror(mock_subprocess_run):
-    mock_subprocess_run.side_effect = subprocess.CalledProcessError(
-        returncode=1, cmd=[sys.executable, "-m", "src.train"], stderr="Traceback: Memory Error"
-    )
+    with patch.object(routes, "model", modelo), patch.object(routes, "monitor_drift", monitor):
+        client.post("/predict", json=ALUNO_VALIDO)
+        client.post("/predict/batch", json={"alunos": [ALUNO_VALIDO, {**ALUNO_VALIDO, "IEG": 9.5}]})
+        assert monitor.amostras() == 3
+        psi_ieg = monitor.psi("IEG")
+        texto = client.get("/metrics").text
 
-    executar_treinamento_em_background()
-    mock_subprocess_run.assert_called_once()
+    assert psi_ieg > 0
+    assert 'modelo_drift_psi{feature="IEG"}' in texto
+    assert 'modelo_drift_ks{feature="Fase_Num"}' in texto
+    assert 'modelo_drift_ks{feature="Genero"}' not in texto
 
 
-@patch("app.routes.subprocess.run")
-def test_executar_treinamento_em_background_general_exception(mock_subprocess_run):
-    mock_subprocess_run.side_effect = Exception("Permissão negada")
+def test_progresso_do_treino_exposto_no_metrics(fila_treinos):
+    job_id = client.post("/retrain").json()["job_id"]
+    assert fila_treinos.aguardar(job_id, timeout=30)
 
-    executar_treinamento_em_background()
-    mock_subprocess_run.assert_called_once()
+    texto = client.get("/metrics").text
+    assert "treino_em_execucao 0.0" in texto
+    assert "treino_candidatos_total 0.0" in texto
+    # O status do job guarda o último progresso recebido do worker
+    assert client.get(f"/retrain/{job_id}").json()["progresso"]["candidatos_avaliados"] == 1
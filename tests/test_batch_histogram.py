@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from prometheus_client import CollectorRegistry, Histogram
+
+from app.batch_histogram import HistogramaLote
+
+
+def _amostras(registry, nome):
+    return {
+        (amostra.name, amostra.labels.get("le")): amostra.value
+        for familia in registry.collect()
+        for amostra in familia.samples
+        if amostra.name.startswith(nome) and not amostra.name.endswith("_created")
+    }
+
+
+def test_observar_lote_igual_ao_histogram_observando_um_a_um():
+    valores = np.concatenate([np.random.default_rng(0).random(500), [0.0, 0.25, 0.5, 1.0, 20.0]])
+    referencia = CollectorRegistry()
+    histograma = Histogram("probabilidade", "Referência", registry=referencia)
+    for valor in valores:
+        histograma.observe(float(valor))
+
+    registry = CollectorRegistry()
+    lote = HistogramaLote("probabilidade", "Em lote", registry=registry)
+    lote.observar_lote(valores[:300])
+    lote.observar_lote(valores[300:])
+
+    esperado = _amostras(referencia, "probabilidade")
+    obtido = _amostras(registry, "probabilidade")
+    assert obtido == pytest.approx(esperado)
+
+
+def test_observe_individual_e_lote_vazio():
+    registry = CollectorRegistry()
+    lote = HistogramaLote("proba", "Teste", limites=(0.5, 1.0), registry=registry)
+
+    lote.observe(0.5)
+    lote.observar_lote([])
+    lote.observar_lote(np.array([0.2, 0.9, 3.0]))
+
+    assert registry.get_sample_value("proba_bucket", {"le": "0.5"}) == 2
+    assert registry.get_sample_value("proba_bucket", {"le": "1.0"}) == 3
+    assert registry.get_sample_value("proba_bucket", {"le": "+Inf"}) == 4
+    assert registry.get_sample_value("proba_count") == 4
+    assert registry.get_sample_value("proba_sum") == pytest.approx(4.6)
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from app.schemas.aluno_request import AlunoRequest
+from benchmarks.bench_carga import alunos_do_pede, gravar, ler_gravacao, sortear_requisicoes
+
+
+def test_alunos_do_pede_sao_payloads_validos():
+    alunos = alunos_do_pede()
+
+    assert len(alunos) > 2000
+    for aluno in alunos:
+        AlunoRequest(**aluno)
+
+
+def test_gravacao_ida_e_volta_e_formatos_aceitos(tmp_path):
+    alunos = alunos_do_pede()[:50]
+    requisicoes = sortear_requisicoes(alunos, 10, seed=1) + sortear_requisicoes(alunos, 2, tamanho_lote=5, seed=1)
+    arquivo = tmp_path / "carga.jsonl"
+    gravar(str(arquivo), requisicoes)
+
+    assert ler_gravacao(str(arquivo)) == requisicoes
+
+    # Só o corpo: a rota vem do formato
+    arquivo.write_text(json.dumps(alunos[0]) + "\n\n" + json.dumps({"alunos": alunos[:3]}) + "\n", encoding="utf-8")
+    assert [rota for rota, _ in ler_gravacao(str(arquivo))] == ["/predict", "/predict/batch"]
+
+
+def test_gravacao_vazia_falha(tmp_path):
+    arquivo = tmp_path / "vazio.jsonl"
+    arquivo.write_text("", encoding="utf-8")
+
+    with pytest.raises(ValueError, match="Nenhuma requisição"):
+        ler_gravacao(str(arquivo))
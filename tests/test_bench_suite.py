@@ -0,0 +1,38 @@
+from benchmarks.bench_suite import comparar, diferencas_ambiente
+
+
+def _resultado(**medidas):
+    return {"medidas": medidas}
+
+
+def test_comparar_sinaliza_regressao_acima_da_tolerancia():
+    baseline = _resultado(fit={"segundos": 1.0, "pico_memoria_mb": 10.0}, api_predict={"p99_ms": 10.0})
+    atual = _resultado(fit={"segundos": 1.5, "pico_memoria_mb": 10.5}, api_predict={"p99_ms": 11.0})
+
+    linhas = {(l["medida"], l["metrica"]): l for l in comparar(atual, baseline, tolerancia=0.25)}
+
+    assert linhas[("fit", "segundos")]["regressao"]
+    assert linhas[("fit", "segundos")]["razao"] == 1.5
+    assert not linhas[("fit", "pico_memoria_mb")]["regressao"]
+    assert not linhas[("api_predict", "p99_ms")]["regressao"]
+
+
+def test_comparar_ignora_ruido_e_medidas_ausentes():
+    baseline = _resultado(create_features={"segundos": 0.001}, removida={"segundos": 1.0})
+    atual = _resultado(create_features={"segundos": 0.0025}, nova={"segundos": 5.0})
+
+    linhas = comparar(atual, baseline, tolerancia=0.25)
+
+    # 2,5x mais lento, mas só 1,5 ms de diferença: abaixo do ruído de medida
+    assert [(l["medida"], l["regressao"]) for l in linhas] == [("create_features", False)]
+
+
+def test_diferencas_ambiente_aponta_o_que_mudou():
+    ambiente = {"cpus": 1, "maquina": "x86_64", "python": "3.11.7", "pandas": "3.0.6",
+                "sklearn": "1.9.1", "numpy": "2.4.6", "gerador": "copias"}
+    baseline = {"ambiente": ambiente, "medidas": {}}
+
+    assert diferencas_ambiente({"ambiente": dict(ambiente)}, baseline) == []
+    assert diferencas_ambiente({"ambiente": {**ambiente, "cpus": 8}}, baseline) == ["cpus: 1 -> 8"]
+    # Baseline antigo, sem ambiente: nada garante que os tempos são comparáveis
+    assert "cpus: ausente -> 1" in diferencas_ambiente({"ambiente": ambiente}, {"medidas": {}})
@@ -0,0 +1,123 @@
+import copy
+import pickle
+
+import numpy as np
+
+from app.forest_engine import pipeline_com_floresta_compilada
+from src.compaction import (
+    VOTOS_MINIMOS,
+    compactar_floresta,
+    medir_modelo,
+    probabilidades_por_arvore,
+    selecionar_arvores,
+    truncar_arvore,
+)
+from src.train import probabilidades_fora_da_amostra
+
+
+def _profundidade_dos_nos(tree):
+    profundidade = np.zeros(tree.node_count, dtype=int)
+    for no in range(tree.node_count):
+        for filho in (tree.children_left[no], tree.children_right[no]):
+            if filho != -1:
+                profundidade[filho] = profundidade[no] + 1
+    return profundidade
+
+
+def test_truncar_arvore_para_no_ancestral_da_profundidade(pipeline_sintetico, dados_sinteticos):
+    X, _ = dados_sinteticos(400)
+    Xt = pipeline_sintetico.named_steps["preprocessor"].transform(X)
+    arvore = pipeline_sintetico.named_steps["classifier"].estimators_[0]
+
+    # Acima da profundidade da árvore nada muda
+    profunda = truncar_arvore(arvore, arvore.tree_.max_depth + 5)
+    np.testing.assert_array_equal(profunda.predict_proba(Xt), arvore.predict_proba(Xt))
+
+    # Truncada: cada aluno recebe o valor do nó do seu caminho na profundidade de corte
+    truncada = truncar_arvore(arvore, 3)
+    profundidade = _profundidade_dos_nos(arvore.tree_)
+    esperado = []
+    for caminho in arvore.decision_path(Xt).toarray().astype(bool):
+        nos = np.flatnonzero(caminho & (profundidade <= 3))
+        esperado.append(arvore.tree_.value[nos[np.argmax(profundidade[nos])], 0])
+    np.testing.assert_allclose(truncada.predict_proba(Xt), esperado)
+    assert truncada.tree_.max_depth == 3
+    assert truncada.tree_.node_count < arvore.tree_.node_count
+    # A árvore original não é alterada
+    assert arvore.tree_.max_depth > 3
+
+
+def test_probabilidades_por_arvore_reproduzem_o_out_of_bag(pipeline_sintetico, dados_sinteticos):
+    X, _ = dados_sinteticos(400)
+    Xt = pipeline_sintetico.named_steps["preprocessor"].transform(X)
+
+    probas, fora = probabilidades_por_arvore(pipeline_sintetico.named_steps["classifier"], Xt)
+
+    with np.errstate(invalid="ignore"):
+        oob = np.where(fora, probas, 0.0).sum(axis=0) / fora.sum(axis=0)
+    np.testing.assert_allclose(oob, probabilidades_fora_da_amostra(pipeline_sintetico, X), equal_nan=True)
+
+
+def test_selecionar_arvores_exige_votos_minimos_e_tolerancia():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, 200)
+    # Árvores boas (acertam a classe) e ruins (sorteiam), cada uma out-of-bag em ~37% dos alunos
+    probas = np.vstack([np.where(y == 1, 0.9, 0.1)] * 20 + [rng.random(200) for _ in range(20)])
+    fora = rng.random((40, 200)) < 0.37
+
+    escolhidas, referencia = selecionar_arvores(probas, fora, y, limiar=0.4, tolerancia=0.0)
+
+    assert len(set(escolhidas)) == len(escolhidas) < 40
+    votos = fora[escolhidas].sum(axis=0)
+    assert np.all(votos >= np.minimum(VOTOS_MINIMOS, fora.sum(axis=0)))
+    assert 0 < referencia["recall"] <= 1
+
+
+def test_compactar_floresta_menor_sem_alterar_o_original(pipeline_sintetico, dados_sinteticos):
+    X, y = dados_sinteticos(400)
+    X_teste, _ = dados_sinteticos(100, seed=7)
+    floresta = pipeline_sintetico.named_steps["classifier"]
+    arvores_originais = list(floresta.estimators_)
+
+    compacto, resumo = compactar_floresta(pipeline_sintetico, X, y, limiar=0.4, tolerancia=0.05,
+                                          profundidade_minima=2)
+
+    assert floresta.estimators_ == arvores_originais
+    arvores = compacto.named_steps["classifier"].estimators_
+    assert resumo["arvores_antes"] == 25
+    assert resumo["arvores_depois"] == len(arvores) <= 25
+    assert resumo["profundidade_depois"] <= resumo["profundidade_antes"]
+    assert resumo["recall_oob_depois"] >= resumo["recall_oob_antes"] - 0.05
+    assert resumo["f1_oob_depois"] >= resumo["f1_oob_antes"] - 0.05
+    # Mesmo pré-processamento; n_estimators descreve a floresta servida e o da busca fica guardado
+    assert compacto.named_steps["preprocessor"] is pipeline_sintetico.named_steps["preprocessor"]
+    assert compacto.get_params()["classifier__n_estimators"] == len(arvores)
+    assert compacto.named_steps["classifier"].n_estimators_busca_ == 25
+    assert floresta.n_estimators == 25
+
+    # O modelo compactado funciona como o original: predição, motor compilado e serialização
+    proba = compacto.predict_proba(X_teste)
+    assert proba.shape == (100, 2)
+    np.testing.assert_allclose(pipeline_com_floresta_compilada(compacto).predict_proba(X_teste), proba)
+    np.testing.assert_array_equal(pickle.loads(pickle.dumps(compacto)).predict_proba(X_teste), proba)
+
+
+def test_compactar_floresta_sem_bootstrap_devolve_o_modelo(pipeline_sintetico, dados_sinteticos):
+    X, y = dados_sinteticos(400)
+    modelo = copy.deepcopy(pipeline_sintetico)
+    modelo.named_steps["classifier"].bootstrap = False
+
+    compacto, resumo = compactar_floresta(modelo, X, y, limiar=0.4, tolerancia=0.01)
+
+    assert compacto is modelo
+    assert resumo["arvores_depois"] == resumo["arvores_antes"]
+
+
+def test_medir_modelo(pipeline_sintetico, dados_sinteticos):
+    X, _ = dados_sinteticos(400)
+
+    medidas = medir_modelo(pipeline_sintetico, X, repeticoes=2)
+
+    assert set(medidas) == {"tamanho_mb", "latencia_1_ms", "latencia_lote_ms"}
+    assert all(valor > 0 for valor in medidas.values())
+
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import RandomForestClassifier
+
+from app.compiled_preprocessing import compilar_preprocessador
+
+COLUNAS = [
+    "IAA", "IEG", "IPS", "IDA", "IPV", "Idade", "Instituicao_de_ensino", "Genero",
+    "IEG_x_IDA", "IEG_x_IAA", "IPS_x_IDA", "Fase_Num",
+]
+
+
+def test_paridade_com_pipeline_original(pipeline_sintetico, dados_sinteticos):
+    # Arrange
+    compilado = compilar_preprocessador(pipeline_sintetico)
+    X, _ = dados_sinteticos(200, seed=1)
+
+    # Act & Assert: probabilidades idênticas às do caminho pandas + ColumnTransformer
+    assert compilado is not None
+    for registro in X.to_dict(orient="records"):
+        esperado = pipeline_sintetico.predict_proba(pd.DataFrame([registro], columns=COLUNAS))
+        obtido = compilado.predict_proba(registro)
+        np.testing.assert_array_equal(obtido, esperado)
+
+
+def test_vetor_imputa_nulos_e_ignora_categoria_desconhecida(pipeline_sintetico):
+    compilado = compilar_preprocessador(pipeline_sintetico)
+    registro = dict(zip(COLUNAS, [np.nan, 5.0, 5.0, 5.0, 5.0, 12, "NOVA", np.nan, 25.0, np.nan, 25.0, 3]))
+
+    vetor = compilado.vetorizar(registro)
+    esperado = pipeline_sintetico.named_steps["preprocessor"].transform(
+        pd.DataFrame([registro], columns=COLUNAS)
+    )
+
+    assert vetor.dtype == np.float32
+    np.testing.assert_array_equal(vetor, np.asarray(esperado, dtype=np.float32))
+
+
+def test_pipeline_nao_suportado_retorna_none(dados_sinteticos):
+    X, y = dados_sinteticos(50)
+    X = X.drop(columns=["Instituicao_de_ensino", "Genero"]).fillna(0)
+    pipeline = Pipeline([("preprocessor", StandardScaler()), ("classifier", RandomForestClassifier(n_estimators=2))])
+    pipeline.fit(X, y)
+
+    assert compilar_preprocessador(pipeline) is None
+    assert compilar_preprocessador("não é um pipeline") is None
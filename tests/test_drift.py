@@ -0,0 +1,125 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.drift import MonitorDrift, construir_referencia, carregar_referencia, salvar_referencia, psi, ks
+
+
+def _registros(X: pd.DataFrame) -> list:
+    return [
+        {c: (None if pd.isna(v) else v) for c, v in linha.items()}
+        for linha in X.to_dict(orient="records")
+    ]
+
+
+@pytest.fixture
+def referencia(dados_sinteticos):
+    X, _ = dados_sinteticos(2000, seed=0)
+    return construir_referencia(X)
+
+
+def test_referencia_do_treino(dados_sinteticos, referencia):
+    numerica = referencia["numericas"]["IAA"]
+    # 10 faixas por quantil + faixa de nulos (IAA tem ~10% de nulos)
+    assert len(numerica["proporcoes"]) == len(numerica["limites"]) + 2
+    assert math.isclose(sum(numerica["proporcoes"]), 1.0)
+    assert 0.05 < numerica["proporcoes"][-1] < 0.15
+
+    genero = referencia["categoricas"]["Genero"]
+    assert genero["categorias"] == ["FEMININO", "MASCULINO"]
+    assert len(genero["proporcoes"]) == 3  # + outros/nulos
+
+
+def test_salvar_e_carregar_referencia(tmp_path, referencia):
+    caminho = tmp_path / "drift" / "referencia.json"
+    salvar_referencia(referencia, str(caminho))
+    assert carregar_referencia(str(caminho)) == referencia
+    assert carregar_referencia(str(tmp_path / "inexistente.json")) is None
+
+
+def test_psi_e_ks_de_distribuicoes():
+    assert psi([0.5, 0.5], [0.5, 0.5]) == 0.0
+    assert psi([0.5, 0.5], [0.9, 0.1]) > 0.25
+    assert ks([0.25, 0.25, 0.5], [0.5, 0.25, 0.25]) == pytest.approx(0.25)
+
+
+def test_mesma_distribuicao_nao_acusa_drift(dados_sinteticos, referencia):
+    X, _ = dados_sinteticos(2000, seed=1)
+    monitor = MonitorDrift(janela=2000, baldes=4, min_amostras=100)
+    monitor.definir_referencia(referencia)
+    for registro in _registros(X):
+        monitor.observar(registro)
+
+    pontuacoes = monitor.pontuacoes()
+    assert set(pontuacoes) == {"IAA", "IEG", "IPS", "IDA", "IPV", "Idade", "Fase_Num", "Instituicao_de_ensino", "Genero"}
+    assert all(p["psi"] < 0.1 for p in pontuacoes.values())
+    assert pontuacoes["IAA"]["ks"] < 0.1
+    assert math.isnan(pontuacoes["Genero"]["ks"])  # KS só nas numéricas
+
+
+def test_distribuicao_deslocada_acusa_drift(dados_sinteticos, referencia):
+    X, _ = dados_sinteticos(1000, seed=2)
+    X["IEG"] = (X["IEG"] / 2).round(1)  # engajamento caiu pela metade
+    X["Genero"] = "NAO INFORMADO"  # categoria nunca vista no treino
+    monitor = MonitorDrift(janela=1000, baldes=4, min_amostras=100)
+    monitor.definir_referencia(referencia)
+    monitor.observar_lote(_registros(X))
+
+    assert monitor.psi("IEG") > 0.25
+    assert monitor.ks("IEG") > 0.3
+    assert monitor.psi("Genero") > 1.0
+    assert monitor.psi("IDA") < 0.1
+
+
+def test_lote_e_individual_contam_igual(dados_sinteticos, referencia):
+    X, _ = dados_sinteticos(700, seed=3)
+    individual = MonitorDrift(janela=500, baldes=5, min_amostras=1)
+    lote = MonitorDrift(janela=500, baldes=5, min_amostras=1)
+    individual.definir_referencia(referencia)
+    lote.definir_referencia(referencia)
+
+    registros = _registros(X)
+    for registro in registros:
+        individual.observar(registro)
+    lote.observar_lote(registros[:250])
+    lote.observar_lote(registros[250:])
+
+    np.testing.assert_array_equal(individual._janela(), lote._janela())
+    assert individual.pontuacoes() == lote.pontuacoes()
+
+
+def test_janela_deslizante_tem_memoria_constante(dados_sinteticos, referencia):
+    X, _ = dados_sinteticos(1000, seed=4)
+    monitor = MonitorDrift(janela=500, baldes=5, min_amostras=1)
+    monitor.definir_referencia(referencia)
+    forma = monitor._contagens.shape
+    faixas = len(monitor._atual)
+
+    registros = _registros(X)
+    for _ in range(3):
+        monitor.observar_lote(registros)
+
+    # Só os últimos 400-500 alunos ficam na janela e a matriz de contagens não cresce
+    assert 400 < monitor.amostras() <= 500
+    assert monitor._contagens.shape == forma
+    assert len(monitor._atual) == faixas
+
+
+def test_sem_referencia_ou_amostra_pequena_retorna_nan(referencia):
+    monitor = MonitorDrift(janela=1000, baldes=5, min_amostras=10)
+    monitor.observar({"IAA": 5.0})  # ignorado: ainda sem referência
+    assert not monitor.habilitado
+    assert math.isnan(monitor.psi("IAA"))
+
+    monitor.definir_referencia(referencia)
+    monitor.observar({"IAA": 5.0, "Genero": "FEMININO"})
+    assert monitor.amostras() == 1
+    assert math.isnan(monitor.psi("IAA"))
+
+    # A mesma referência não zera a janela; uma referência nova zera
+    monitor.definir_referencia(dict(referencia))
+    assert monitor.amostras() == 1
+    monitor.definir_referencia(None)
+    assert monitor.amostras() == 0
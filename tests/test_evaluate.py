@@ -2,7 +2,16 @@ import pytest
 import pandas as pd
 import numpy as np
 from unittest.mock import MagicMock, patch
-from src.evaluate import evaluate_model
+from sklearn.metrics import confusion_matrix, f1_score, precision_score, recall_score
+from src.evaluate import (
+    evaluate_model,
+    importancia_permutacao,
+    intervalos_bootstrap,
+    limiar_para_recall,
+    registrar_importancia,
+    registrar_varredura,
+    varredura_limiares,
+)
 
 
 @pytest.fixture
@@ -23,11 +32,15 @@ def test_evaluate_model_metrics(mock_cmd, mock_mlflow, mock_model):
 
     assert results["f1"] == 1.0
     assert results["recall"] == 1.0
+    # Probabilidades reaproveitadas pela importância por permutação
+    np.testing.assert_array_equal(results["y_proba"], [0.2, 0.8, 0.41])
     cm = results["confusion_matrix"]
     assert cm[0][0] == 1
     assert cm[1][1] == 2
     mock_cmd.assert_called_once()
     mock_mlflow.log_metrics.assert_called_once()
+    metricas = mock_mlflow.log_metrics.call_args[0][0]
+    assert {"recall_ic_inferior", "recall_ic_superior", "f1_ic_inferior", "f1_ic_superior"} <= set(metricas)
 
 
 @patch("src.evaluate.mlflow")
@@ -66,3 +79,158 @@ def test_evaluate_model_with_pipeline_and_no_importance(mock_cmd, mock_mlflow):
 
     # Assert
     assert "f1" in results
+
+
+def test_varredura_limiares_igual_a_avaliar_cada_limiar():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, 500)
+    # Probabilidades com empates (como as de uma floresta) e um NaN ignorado
+    proba = np.round(rng.random(500) * 0.6 + y * 0.3, 2)
+    proba[7] = np.nan
+
+    curva = varredura_limiares(y, proba)
+
+    validos = ~np.isnan(proba)
+    assert curva["limiar"].tolist() == sorted(np.unique(proba[validos]), reverse=True)
+    for linha in curva.sample(40, random_state=0).itertuples():
+        y_pred = (proba[validos] >= linha.limiar).astype(int)
+        cm = confusion_matrix(y[validos], y_pred)
+        assert (linha.vn, linha.fp, linha.fn, linha.vp) == tuple(cm.ravel())
+        assert linha.recall == pytest.approx(recall_score(y[validos], y_pred))
+        assert linha.precisao == pytest.approx(precision_score(y[validos], y_pred))
+        assert linha.f1 == pytest.approx(f1_score(y[validos], y_pred))
+
+
+def test_limiar_para_recall_escolhe_o_maior_limiar_que_atinge_o_alvo():
+    curva = varredura_limiares([1, 1, 0, 1, 0], [0.9, 0.8, 0.7, 0.4, 0.1])
+
+    assert limiar_para_recall(curva, 0.6)["limiar"] == 0.8
+    assert limiar_para_recall(curva, 1.0)["limiar"] == 0.4
+    assert limiar_para_recall(curva, 1.1) is None
+
+
+@patch("src.evaluate.mlflow")
+def test_registrar_varredura_grava_curva_e_recomendacao(mock_mlflow):
+    curva = varredura_limiares([1, 1, 0, 1, 0], [0.9, 0.8, 0.7, 0.4, 0.1])
+
+    recomendado = registrar_varredura(curva, "oob", recall_alvo=0.6, limiar_atual=0.4)
+
+    assert recomendado["limiar"] == 0.8
+    mock_mlflow.log_text.assert_called_once()
+    assert mock_mlflow.log_text.call_args.args[1] == "limiares/curva_oob.csv"
+    mock_mlflow.log_figure.assert_called_once()
+    metricas = mock_mlflow.log_metrics.call_args.args[0]
+    assert metricas["limiar_recomendado"] == 0.8
+    assert metricas["limiar_recomendado_recall_oob"] == pytest.approx(2 / 3)
+
+
+def test_importancia_permutacao_colunas_originais_e_reprodutivel(pipeline_sintetico, dados_sinteticos):
+    X, y = dados_sinteticos(200, seed=1)
+    X_original = X.copy()
+
+    resultado = importancia_permutacao(pipeline_sintetico, X, y, limiar=0.4, repeticoes=3, n_jobs=2)
+    repetido = importancia_permutacao(pipeline_sintetico, X, y, limiar=0.4, repeticoes=3, n_jobs=1)
+
+    # Uma linha por coluna original (Genero inteiro, não cada coluna do one-hot)
+    assert sorted(resultado["coluna"]) == sorted(X.columns)
+    assert resultado["queda_recall"].is_monotonic_decreasing
+    assert resultado.attrs["repeticoes"] == 3
+    pd.testing.assert_frame_equal(resultado, repetido)
+    pd.testing.assert_frame_equal(X, X_original)
+
+
+def test_importancia_permutacao_reaproveita_probabilidades_base(pipeline_sintetico, dados_sinteticos):
+    X, y = dados_sinteticos(200, seed=1)
+    y_proba = pipeline_sintetico.predict_proba(X)[:, 1]
+    chamadas = []
+
+    class Contador:
+        def predict_proba(self, dados):
+            chamadas.append(len(dados))
+            return pipeline_sintetico.predict_proba(dados)
+
+    recebido = importancia_permutacao(Contador(), X, y, limiar=0.4, repeticoes=2, n_jobs=1, y_proba=y_proba)
+    calculado = importancia_permutacao(pipeline_sintetico, X, y, limiar=0.4, repeticoes=2, n_jobs=1)
+
+    # Só as predições com coluna embaralhada: a de base veio de fora
+    assert len(chamadas) == 2 * X.shape[1]
+    pd.testing.assert_frame_equal(recebido, calculado)
+
+
+def test_importancia_permutacao_respeita_orcamento(pipeline_sintetico, dados_sinteticos):
+    X, y = dados_sinteticos(200, seed=1)
+
+    resultado = importancia_permutacao(pipeline_sintetico, X, y, repeticoes=1000, orcamento_segundos=0.0)
+
+    # Só a primeira rodada (sempre executada) coube
+    assert resultado.attrs["repeticoes"] == 1
+
+
+@patch("src.evaluate.mlflow")
+def test_registrar_importancia(mock_mlflow):
+    resultado = pd.DataFrame({"coluna": ["IEG", "Genero"], "queda_recall": [0.2, 0.01], "queda_recall_desvio": [0.02, 0.01],
+                              "queda_f1": [0.1, 0.0], "queda_f1_desvio": [0.01, 0.0]})
+    resultado.attrs["repeticoes"] = 5
+
+    registrar_importancia(resultado)
+
+    assert mock_mlflow.log_text.call_args.args[1] == "importancia/permutacao.csv"
+    metricas = mock_mlflow.log_metrics.call_args.args[0]
+    assert metricas["importancia_permutacao_IEG"] == 0.2
+    assert metricas["importancia_repeticoes"] == 5
+    mock_mlflow.log_figure.assert_called_once()
+
+
+def test_intervalos_bootstrap_igual_ao_laco_por_reamostragem():
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 2, 300)
+    y_pred = np.where(rng.random(300) < 0.8, y_true, 1 - y_true)
+
+    intervalos = intervalos_bootstrap(y_true, y_pred, reamostragens=50, confianca=0.9, seed=3)
+
+    # Mesmos índices, sorteados pela mesma semente, avaliados um a um pelo sklearn
+    indices = np.random.default_rng(3).integers(0, 300, size=(50, 300))
+    for nome, funcao in (("recall", recall_score), ("precision", precision_score), ("f1", f1_score)):
+        valores = [funcao(y_true[i], y_pred[i]) for i in indices]
+        assert intervalos[nome] == pytest.approx(tuple(np.percentile(valores, [5, 95])))
+
+
+@pytest.mark.filterwarnings("error::RuntimeWarning")
+def test_intervalos_bootstrap_com_predicao_constante_omite_a_precisao():
+    y_true = np.random.default_rng(2).integers(0, 2, 200)
+    y_pred = np.zeros(200, dtype=int)  # o modelo nunca prevê risco
+
+    intervalos = intervalos_bootstrap(y_true, y_pred, reamostragens=500)
+
+    # Nenhuma reamostragem tem positivos previstos: sem intervalo (e sem NaN) para a precisão
+    assert "precision" not in intervalos
+    assert intervalos["recall"] == (0.0, 0.0)
+    assert all(np.isfinite(v) for ic in intervalos.values() for v in ic)
+
+
+@patch("src.evaluate.mlflow")
+@patch("src.evaluate.ConfusionMatrixDisplay.from_predictions")
+def test_evaluate_model_com_predicao_constante_nao_registra_intervalo_nan(mock_cmd, mock_mlflow, mock_model):
+    X_test = pd.DataFrame({"col1": [1, 2, 3], "col2": [4, 5, 6], "col3": [7, 8, 9]})
+    y_test = pd.Series([0, 1, 1])
+
+    evaluate_model(mock_model, X_test, y_test, threshold=0.90)
+
+    metricas = mock_mlflow.log_metrics.call_args[0][0]
+    assert "precision_ic_inferior" not in metricas
+    assert "recall_ic_inferior" in metricas
+    assert all(np.isfinite(valor) for valor in metricas.values())
+
+
+def test_intervalos_bootstrap_contem_as_metricas_e_sao_reprodutiveis():
+    rng = np.random.default_rng(1)
+    y_true = rng.integers(0, 2, 2000)
+    y_pred = np.where(rng.random(2000) < 0.85, y_true, 1 - y_true)
+
+    intervalos = intervalos_bootstrap(y_true, y_pred, reamostragens=5000)
+
+    inferior, superior = intervalos["recall"]
+    assert inferior < recall_score(y_true, y_pred) < superior
+    inferior, superior = intervalos["accuracy"]
+    assert inferior < np.mean(y_true == y_pred) < superior
+    assert intervalos_bootstrap(y_true, y_pred, reamostragens=5000) == intervalos
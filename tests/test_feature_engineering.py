@@ -70,3 +70,88 @@ def test_extrair_fase_edge_cases():
     assert extrair_fase("FASE 2") == 2
     assert extrair_fase("Alpha") == 0
     assert pd.isna(extrair_fase("Texto Sem Numero"))
+
+
+def _dados_limpos(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "RA": [f"RA-{i}" for i in range(n)],
+        "IAA": rng.uniform(0, 10, n), "IEG": rng.uniform(0, 10, n),
+        "IPS": rng.uniform(0, 10, n), "IDA": rng.uniform(0, 10, n), "IPV": rng.uniform(0, 10, n),
+        "IAN": rng.uniform(0, 10, n), "INDE": rng.uniform(0, 10, n),
+        "Defasagem": rng.integers(-3, 3, n), "Ano_Base": rng.choice([2022, 2023, 2024], n),
+        "Fase": rng.choice(np.array(["ALFA", "FASE 3", "7", "1A", "SEM FASE", None], dtype=object), n),
+        "Pedra": rng.choice(["AGATA", "QUARTZO"], n),
+        "Genero": rng.choice(["MENINO", "MENINA", "FEMININO"], n),
+        "Instituicao_de_ensino": rng.choice(["ESCOLA PUBLICA", "PRIVADA", "REDE DECISAO"], n),
+    })
+
+
+def _create_features_anterior(df):
+    """
+    Oráculo: create_features antes da vetorização (cópia, apply por linha, drop do alvo).
+    Fica congelado aqui; benchmarks/bench_feature_engineering.py tem a mesma cópia para medir o tempo.
+    """
+    df = df.copy()
+    if "Defasagem" in df.columns:
+        df["alvo_risco"] = np.where(df["Defasagem"] < 0, 1, 0)
+    if "Genero" in df.columns:
+        df["Genero"] = df["Genero"].replace({"MENINO": "MASCULINO", "MENINA": "FEMININO"})
+    if "Instituicao_de_ensino" in df.columns:
+        mapa_instituicao = {
+            "ESCOLA PUBLICA": "PUBLICA",
+            "ESCOLA JP II": "PUBLICA",
+            "CONCLUIU O 3O EM": "PUBLICA",
+            "NENHUMA DAS OPCOES ACIMA": "PUBLICA",
+            "PRIVADA *PARCERIAS COM BOLSA 100%": "PRIVADA",
+            "PRIVADA - PAGAMENTO POR *EMPRESA PARCEIRA": "PRIVADA",
+            "PRIVADA - PROGRAMA DE APADRINHAMENTO": "PRIVADA",
+            "BOLSISTA UNIVERSITARIO *FORMADO (A)": "PRIVADA",
+        }
+        df["Instituicao_de_ensino"] = df["Instituicao_de_ensino"].replace(mapa_instituicao)
+    if all(c in df.columns for c in ["IEG", "IDA", "IAA", "IPS"]):
+        df["IEG_x_IDA"] = df["IEG"] * df["IDA"]
+        df["IEG_x_IAA"] = df["IEG"] * df["IAA"]
+        df["IPS_x_IDA"] = df["IPS"] * df["IDA"]
+    if "Fase" in df.columns:
+        df["Fase_Num"] = df["Fase"].apply(extrair_fase)
+    cols_to_drop = ["Defasagem", "Ano_Base", "RA", "Nome", "Nome Anonimizado", "Data de Nasc", "Pedra", "Fase"]
+    cols_to_drop.extend(c for c in df.columns if "INDE" in str(c).upper() or "IAN" in str(c).upper())
+    X = df.drop(columns=[c for c in cols_to_drop if c in df.columns], errors="ignore")
+    y = None
+    if "alvo_risco" in X.columns:
+        y = X["alvo_risco"]
+        X = X.drop(columns=["alvo_risco"])
+    return X, y
+
+
+def test_create_features_igual_a_implementacao_anterior():
+    df = _dados_limpos(300)
+    original = df.copy()
+    X, y = create_features(df)
+    X_antigo, y_antigo = _create_features_anterior(df)
+
+    pd.testing.assert_frame_equal(X, X_antigo)
+    pd.testing.assert_series_equal(y, y_antigo)
+    # Sem inplace a entrada não muda
+    pd.testing.assert_frame_equal(df, original)
+
+
+def test_create_features_inplace():
+    df = _dados_limpos(100, seed=1)
+    esperado, y_esperado = create_features(df.copy())
+
+    X, y = create_features(df, inplace=True)
+
+    assert X is df
+    pd.testing.assert_frame_equal(X, esperado)
+    pd.testing.assert_series_equal(y, y_esperado)
+
+
+def test_extrair_fase_coluna_igual_ao_apply():
+    from src.feature_engineering import extrair_fase_coluna
+
+    com_nulos = pd.Series(["ALFA", "alpha 2", "FASE 10", "8", None, "SEM"], index=[5, 3, 9, 1, 0, 2])
+    sem_nulos = pd.Series([7, "FASE 1", "ALFA"], dtype=object)
+    for fases in (com_nulos, sem_nulos):
+        pd.testing.assert_series_equal(extrair_fase_coluna(fases), fases.apply(extrair_fase))
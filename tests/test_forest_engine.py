@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from app.forest_engine import FlorestaCompilada, compilar_floresta, pipeline_com_floresta_compilada
+
+
+@pytest.fixture(scope="module")
+def floresta_sklearn():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 10, (500, 6))
+    y = ((X[:, 0] + X[:, 1] * X[:, 2] / 10 + rng.normal(0, 1, 500)) > 8).astype(int)
+    floresta = RandomForestClassifier(
+        n_estimators=30, class_weight="balanced_subsample", random_state=42
+    )
+    return floresta.fit(X, y)
+
+
+def test_paridade_com_predict_proba_do_sklearn(floresta_sklearn):
+    # Arrange
+    compilada = compilar_floresta(floresta_sklearn)
+    X = np.random.default_rng(1).uniform(0, 10, (300, 6))
+
+    # Act & Assert: resultado bit a bit igual ao do sklearn
+    np.testing.assert_array_equal(compilada.predict_proba(X), floresta_sklearn.predict_proba(X))
+    np.testing.assert_array_equal(compilada.predict(X), floresta_sklearn.predict(X))
+    np.testing.assert_array_equal(compilada.predict_proba(X[:1]), floresta_sklearn.predict_proba(X[:1]))
+
+
+def test_limiares_float32_em_cima_do_valor_de_corte(floresta_sklearn):
+    # Valores exatamente iguais aos limiares (arredondados para float32) são o caso de borda
+    compilada = compilar_floresta(floresta_sklearn)
+    limiares = floresta_sklearn.estimators_[0].tree_.threshold
+    limiares = limiares[limiares != -2].astype(np.float32)
+    X = np.tile(limiares[:, None], (1, 6))
+
+    np.testing.assert_array_equal(compilada.predict_proba(X), floresta_sklearn.predict_proba(X))
+
+
+def test_blocos_e_valores_faltantes(floresta_sklearn, monkeypatch):
+    compilada = compilar_floresta(floresta_sklearn)
+    X = np.random.default_rng(2).uniform(0, 10, (50, 6))
+    X[::4, 2] = np.nan
+    monkeypatch.setattr("app.forest_engine.TAMANHO_BLOCO", 7)
+
+    np.testing.assert_array_equal(compilada.predict_proba(X), floresta_sklearn.predict_proba(X))
+
+
+def test_arrays_compactos_e_validacao_de_shape(floresta_sklearn):
+    compilada = compilar_floresta(floresta_sklearn)
+
+    assert isinstance(compilada, FlorestaCompilada)
+    assert compilada.n_arvores == 30
+    assert compilada.feature.dtype == np.int16
+    assert compilada.limiar.dtype == np.float32
+    with pytest.raises(ValueError):
+        compilada.predict_proba(np.zeros((2, 3)))
+
+
+def test_fit_treina_um_clone_da_floresta_e_compila(floresta_sklearn):
+    rng = np.random.default_rng(3)
+    X = rng.uniform(0, 10, (200, 6))
+    y = (X[:, 0] > 5).astype(int)
+    base = RandomForestClassifier(n_estimators=10, random_state=0)
+
+    compilada = FlorestaCompilada(base).fit(X, y)
+
+    assert not hasattr(base, "estimators_")
+    assert compilada.get_params(deep=False) == {"floresta": base}
+    np.testing.assert_array_equal(compilada.predict_proba(X), clone(base).fit(X, y).predict_proba(X))
+    # de_sklearn guarda só os hiperparâmetros da floresta treinada
+    parametro = compilar_floresta(floresta_sklearn).get_params()["floresta"]
+    assert parametro.get_params() == floresta_sklearn.get_params()
+    assert not hasattr(parametro, "estimators_")
+
+
+def test_estimador_nao_suportado_retorna_none():
+    modelo = LogisticRegression().fit(np.array([[0.0], [1.0]]), [0, 1])
+
+    assert compilar_floresta(modelo) is None
+    assert compilar_floresta(RandomForestClassifier()) is None  # não treinado
+
+
+def test_pipeline_com_floresta_compilada(pipeline_sintetico, dados_sinteticos):
+    X, _ = dados_sinteticos(100, seed=3)
+
+    servico = pipeline_com_floresta_compilada(pipeline_sintetico)
+
+    assert isinstance(servico.steps[-1][1], FlorestaCompilada)
+    assert servico.steps[0][1] is pipeline_sintetico.steps[0][1]
+    np.testing.assert_array_equal(servico.predict_proba(X), pipeline_sintetico.predict_proba(X))
+    assert compilar_floresta(servico.steps[-1][1]) is servico.steps[-1][1]
+    assert pipeline_com_floresta_compilada(LogisticRegression()) is None
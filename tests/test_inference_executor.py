@@ -0,0 +1,81 @@
+import threading
+
+import numpy as np
+import pytest
+from sklearn.dummy import DummyClassifier
+
+from app.inference_executor import ExecutorInferencia, ExecutorSaturado, _pronto
+
+
+def test_pool_de_processos_devolve_blocos_na_ordem(pipeline_sintetico, dados_sinteticos):
+    X, _ = dados_sinteticos(250, seed=5)
+    executor = ExecutorInferencia("processos", n_processos=2, tamanho_bloco=70, fila_max=10, min_linhas=100)
+    executor.carregar(pipeline_sintetico)
+    try:
+        assert executor.aceita(pipeline_sintetico, len(X))
+        proba = executor.predict_proba(X)
+    finally:
+        executor.encerrar()
+
+    np.testing.assert_array_equal(proba, pipeline_sintetico.predict_proba(X))
+    assert executor.pendentes == 0
+
+
+def test_fila_cheia_recusa_lote(pipeline_sintetico, dados_sinteticos):
+    X, _ = dados_sinteticos(50)
+    executor = ExecutorInferencia("processos", n_processos=1, tamanho_bloco=10, fila_max=2, min_linhas=1)
+    executor.carregar(pipeline_sintetico)
+    try:
+        with pytest.raises(ExecutorSaturado):
+            executor.predict_proba(X)  # 5 blocos > fila de 2
+    finally:
+        executor.encerrar()
+    assert executor.pendentes == 0
+
+
+def test_aceita_apenas_modelo_carregado_e_lotes_grandes(pipeline_sintetico):
+    em_thread = ExecutorInferencia("thread", 2, 1000, 64, 10)
+    em_thread.carregar(pipeline_sintetico)
+    assert not em_thread.aceita(pipeline_sintetico, 10_000)
+
+    assert ExecutorInferencia("gpu", 2, 1000, 64, 10).modo == "thread"
+
+    executor = ExecutorInferencia("processos", 1, 1000, 64, 10)
+    executor.carregar(threading.Lock())  # não serializável: continua na thread
+    assert not executor.aceita(pipeline_sintetico, 10_000)
+
+    executor.carregar(pipeline_sintetico)
+    try:
+        assert executor.aceita(pipeline_sintetico, 10)
+        assert not executor.aceita(pipeline_sintetico, 9)
+        assert not executor.aceita(object(), 10_000)  # requisição de um modelo já substituído
+    finally:
+        executor.encerrar()
+
+
+def test_troca_de_modelo_durante_lote_termina_no_pool_antigo(pipeline_sintetico, dados_sinteticos):
+    X, y = dados_sinteticos(250, seed=6)
+    novo = DummyClassifier(strategy="prior").fit(X, y)
+    executor = ExecutorInferencia("processos", n_processos=1, tamanho_bloco=50, fila_max=10, min_linhas=1)
+    executor.carregar(pipeline_sintetico)
+    antigo = executor._pool
+    submit = antigo.submit
+
+    def submit_e_trocar(*args, **kwargs):
+        futuro = submit(*args, **kwargs)
+        if executor._pool is antigo:
+            executor.carregar(novo)  # /reload no meio do lote
+        return futuro
+
+    antigo.submit = submit_e_trocar
+    try:
+        proba = executor.predict_proba(X)
+        # Todos os blocos foram pontuados pelo modelo com que o lote começou
+        np.testing.assert_array_equal(proba, pipeline_sintetico.predict_proba(X))
+        # A última requisição do pool substituído o encerrou
+        with pytest.raises(RuntimeError):
+            submit(_pronto)
+        np.testing.assert_array_equal(executor.predict_proba(X), novo.predict_proba(X))
+    finally:
+        executor.encerrar()
+    assert executor.pendentes == 0
@@ -0,0 +1,102 @@
+import json
+import logging
+import queue
+
+import pytest
+
+from app.logging_config import (
+    FormatadorJSON,
+    FormatadorTexto,
+    ListenerEmLotes,
+    QueueHandlerDescartavel,
+    configurar_logging,
+)
+
+
+def _registro(mensagem="PREDIÇÃO", campos=None):
+    registro = logging.LogRecord("app.routes", logging.INFO, __file__, 1, mensagem, None, None)
+    if campos is not None:
+        registro.campos = campos
+    return registro
+
+
+@pytest.fixture
+def logging_raiz_isolado():
+    """Restaura os handlers do logger raiz depois do teste."""
+    handlers, nivel = logging.root.handlers[:], logging.root.level
+    yield
+    for handler in logging.root.handlers:
+        handler.close()
+    logging.root.handlers[:] = handlers
+    logging.root.setLevel(nivel)
+
+
+def test_formatador_json_gera_uma_linha_com_os_campos():
+    linha = FormatadorJSON().format(_registro(campos={"risco": 1, "dados": {"IAA": 5.5}}))
+
+    evento = json.loads(linha)
+    assert "\n" not in linha
+    assert evento["nivel"] == "INFO"
+    assert evento["mensagem"] == "PREDIÇÃO"
+    assert evento["risco"] == 1
+    assert evento["dados"] == {"IAA": 5.5}
+
+
+def test_formatador_texto_mantem_formato_legivel():
+    linha = FormatadorTexto().format(_registro(campos={"risco": 1}))
+    assert linha.endswith("| INFO | PREDIÇÃO | risco: 1")
+
+
+def test_fila_cheia_descarta_sem_bloquear():
+    fila = queue.Queue(maxsize=1)
+    handler = QueueHandlerDescartavel(fila)
+
+    handler.emit(_registro("primeiro"))
+    handler.emit(_registro("segundo"))
+
+    assert fila.qsize() == 1
+    assert fila.get_nowait().getMessage() == "primeiro"
+
+
+def test_logging_assincrono_grava_json_e_rotaciona(tmp_path, logging_raiz_isolado):
+    arquivo = tmp_path / "logs" / "api_events.log"
+    listener = configurar_logging(
+        str(arquivo), formato="json", max_bytes=2_000, backups=2, console=False, forcar=True
+    )
+    assert listener is not None
+
+    logger = logging.getLogger("teste_logging")
+    for i in range(100):
+        logger.info("requisicao", extra={"campos": {"rota": "/predict", "i": i}})
+    listener.stop()
+
+    assert (tmp_path / "logs" / "api_events.log.1").exists()
+    assert not (tmp_path / "logs" / "api_events.log.3").exists()
+    ultima = arquivo.read_text(encoding="utf-8").strip().splitlines()[-1]
+    assert json.loads(ultima)["i"] == 99
+
+
+class _Coletor(logging.Handler):
+    def __init__(self, nivel=logging.NOTSET):
+        super().__init__(nivel)
+        self.mensagens = []
+
+    def emit(self, record):
+        self.mensagens.append(record.getMessage())
+
+
+def test_listener_respeita_nivel_e_esvazia_a_fila_ao_parar():
+    fila = queue.Queue()
+    todos, so_avisos = _Coletor(), _Coletor(logging.WARNING)
+    listener = ListenerEmLotes(fila, todos, so_avisos, intervalo=0.01)
+    listener.start()
+
+    fila.put(_registro("info"))
+    aviso = _registro("aviso")
+    aviso.levelno = logging.WARNING
+    fila.put(aviso)
+    listener.stop()
+    listener.stop()
+
+    assert todos.mensagens == ["info", "aviso"]
+    assert so_avisos.mensagens == ["aviso"]
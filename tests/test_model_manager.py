@@ -0,0 +1,62 @@
+from app.model_manager import RecarregadorModelo
+
+
+def test_recarga_ativa_modelo_aquecido():
+    ativados = []
+    recarregador = RecarregadorModelo(
+        carregar=lambda: ("modelo novo", "7"),
+        aquecer=lambda modelo, versao: {"aquecido": modelo},
+        ativar=lambda modelo, versao, preparado: ativados.append((modelo, versao, preparado)),
+        versao_ativa="6",
+    )
+
+    assert recarregador.solicitar()
+    assert recarregador.aguardar(timeout=5)
+
+    assert ativados == [("modelo novo", "7", {"aquecido": "modelo novo"})]
+    status = recarregador.status()
+    assert status["versao_ativa"] == "7"
+    assert status["ultima_recarga"]["sucesso"] is True
+    assert status["ultima_recarga"]["duracao_total_s"] >= 0
+
+
+def test_falha_no_aquecimento_mantem_versao_ativa():
+    ativados = []
+
+    def aquecer(modelo, versao):
+        raise ValueError("probabilidade fora de [0, 1]")
+
+    recarregador = RecarregadorModelo(
+        carregar=lambda: ("modelo novo", "7"),
+        aquecer=aquecer,
+        ativar=lambda *args: ativados.append(args),
+        versao_ativa="6",
+    )
+
+    recarregador.solicitar()
+    recarregador.aguardar(timeout=5)
+
+    assert ativados == []
+    status = recarregador.status()
+    assert status["versao_ativa"] == "6"
+    assert status["ultima_recarga"]["versao"] == "7"
+    assert "fora de [0, 1]" in status["ultima_recarga"]["erro"]
+
+
+def test_versao_ja_ativa_nao_e_republicada():
+    chamadas = []
+    recarregador = RecarregadorModelo(
+        carregar=lambda: (None, "6"),
+        aquecer=lambda *args: chamadas.append("aquecer"),
+        ativar=lambda *args: chamadas.append("ativar"),
+        versao_ativa="6",
+    )
+
+    recarregador.solicitar()
+    recarregador.aguardar(timeout=5)
+
+    assert chamadas == []
+    status = recarregador.status()
+    assert status["versao_ativa"] == "6"
+    assert status["ultima_recarga"]["sucesso"] is True
+    assert status["ultima_recarga"]["inalterada"] is True
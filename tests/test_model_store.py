@@ -0,0 +1,86 @@
+import json
+
+from app.model_store import CacheModelos, sha256_arquivo
+
+
+def test_guardar_e_carregar_versao_atual(tmp_path, pipeline_sintetico, dados_sinteticos):
+    cache = CacheModelos(str(tmp_path))
+    checksum = cache.guardar(pipeline_sintetico, "3")
+    assert cache.carregar() is None  # nenhuma versão ativada ainda
+
+    cache.definir_atual("3")
+    modelo, versao = cache.carregar()
+
+    X, _ = dados_sinteticos(20)
+    assert versao == "3"
+    assert (tmp_path / f"{checksum}.joblib").exists()
+    assert sha256_arquivo(tmp_path / f"{checksum}.joblib") == checksum
+    assert (modelo.predict_proba(X) == pipeline_sintetico.predict_proba(X)).all()
+
+
+def test_checksum_divergente_e_ignorado(tmp_path, pipeline_sintetico):
+    cache = CacheModelos(str(tmp_path))
+    checksum = cache.guardar(pipeline_sintetico, "3")
+    cache.definir_atual("3")
+
+    with open(tmp_path / f"{checksum}.joblib", "ab") as f:
+        f.write(b"corrompido")
+
+    assert cache.carregar() is None
+
+
+def test_mantem_apenas_as_versoes_mais_recentes(tmp_path):
+    cache = CacheModelos(str(tmp_path), max_versoes=2)
+    for versao in ("1", "2", "3"):
+        cache.guardar({"versao": versao}, versao)
+    cache.definir_atual("3")
+
+    assert sorted(cache.versoes()) == ["2", "3"]
+    assert len(list(tmp_path.glob("*.joblib"))) == 2
+    assert cache.carregar("1") is None
+    assert cache.carregar("2") == ({"versao": "2"}, "2")
+    indice = json.loads((tmp_path / "indice.json").read_text())
+    assert indice["atual"] == "3"
+
+
+def test_diretorio_vazio_desliga_cache(pipeline_sintetico):
+    cache = CacheModelos("")
+    assert cache.guardar(pipeline_sintetico, "1") is None
+    assert cache.carregar() is None
+    assert not cache.definir_atual("1")
+
+
+def test_compartilhar_mapeia_floresta_em_memoria(tmp_path, pipeline_sintetico, dados_sinteticos):
+    import numpy as np
+
+    cache = CacheModelos(str(tmp_path))
+    compartilhado = cache.compartilhar(pipeline_sintetico, "5")
+    floresta = compartilhado.steps[-1][1]
+
+    X, _ = dados_sinteticos(50)
+    assert isinstance(floresta.valores, np.memmap)
+    assert not floresta.valores.flags.writeable
+    np.testing.assert_array_equal(compartilhado.predict_proba(X), pipeline_sintetico.predict_proba(X))
+
+    # Segundo worker: reaproveita o mesmo arquivo, sem gravar outro
+    arquivos = sorted(p.name for p in tmp_path.glob("*.joblib"))
+    cache.compartilhar(pipeline_sintetico, "5")
+    assert sorted(p.name for p in tmp_path.glob("*.joblib")) == arquivos
+
+
+def test_carregar_compartilhado_cria_copia_a_partir_do_modelo_completo(tmp_path, pipeline_sintetico):
+    import numpy as np
+
+    cache = CacheModelos(str(tmp_path))
+    cache.guardar(pipeline_sintetico, "5")
+    cache.definir_atual("5")
+
+    modelo, versao = cache.carregar(compartilhado=True)
+
+    assert versao == "5"
+    assert isinstance(modelo.steps[-1][1].feature, np.memmap)
+    assert len(list(tmp_path.glob("*.joblib"))) == 2
+
+
+def test_compartilhar_ignora_modelo_sem_random_forest(tmp_path):
+    assert CacheModelos(str(tmp_path)).compartilhar({"nao": "pipeline"}, "1") is None
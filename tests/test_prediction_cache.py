@@ -0,0 +1,48 @@
+from app.prediction_cache import CachePredicoes
+
+
+class RelogioFalso:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def test_lru_descarta_o_menos_usado():
+    cache = CachePredicoes(tamanho_max=2, ttl_segundos=60)
+    cache.guardar("a", 0.1)
+    cache.guardar("b", 0.2)
+    cache.obter("a")  # "a" passa a ser o mais recente
+
+    removidos = cache.guardar("c", 0.3)
+
+    assert removidos == 1
+    assert cache.obter("b") == (None, False)
+    assert cache.obter("a") == (0.1, False)
+    assert cache.obter("c") == (0.3, False)
+
+
+def test_ttl_expira_entrada():
+    relogio = RelogioFalso()
+    cache = CachePredicoes(tamanho_max=10, ttl_segundos=5, relogio=relogio)
+    cache.guardar("a", 0.5)
+
+    relogio.agora = 4.0
+    assert cache.obter("a") == (0.5, False)
+    relogio.agora = 6.0
+    assert cache.obter("a") == (None, True)
+    assert len(cache) == 0
+
+
+def test_limpar_e_cache_desligado():
+    cache = CachePredicoes(tamanho_max=10, ttl_segundos=60)
+    cache.guardar("a", 0.5)
+    cache.guardar("b", 0.5)
+    assert cache.limpar() == 2
+    assert len(cache) == 0
+
+    desligado = CachePredicoes(tamanho_max=0, ttl_segundos=60)
+    desligado.guardar("a", 0.5)
+    assert not desligado.habilitado
+    assert desligado.obter("a") == (None, False)
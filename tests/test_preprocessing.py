@@ -70,3 +70,93 @@ def test_clean_data_full_cleaning():
     assert df_clean["Texto_Cat"].iloc[0] == "JOAO" 
     assert df_clean["Texto_Cat"].iloc[1] == "ACAO"
     assert pd.isna(df_clean["Texto_Cat"].iloc[2])  
+
+
+def _dados_brutos_baguncados(n, seed=0):
+    """Mistura de tipos e formatos como nos CSVs do PEDE (vírgula decimal, datas do Excel, acentos)."""
+    rng = np.random.default_rng(seed)
+    notas = np.array(["5,5", "7.0", "10", "11,2", "-1", "NaN", None, 8.25, 3, "abc"], dtype=object)
+    idades = np.array([15, "1/17/00", " 9 ", 4, 35, None, "1/8/00 ", 12.0, "x/y"], dtype=object)
+    textos = np.array(["Pública ", "ESCOLA PUBLICA", "Privada", None, "nan", "  ágata", 7], dtype=object)
+    return pd.DataFrame({
+        "Defasagem": rng.choice(np.array(["-1", "0", "2", None, "x", 1], dtype=object), n),
+        "IAA": rng.choice(notas, n),
+        "IEG": rng.choice(notas, n),
+        "INDE": rng.choice(np.array(["7,055", "5.783", "1.234,5", None], dtype=object), n),
+        "Idade": rng.choice(idades, n),
+        "Fase": rng.choice(np.array(["ALFA", "Fase 2", 7, None], dtype=object), n),
+        "Instituicao_de_ensino": rng.choice(textos, n),
+        "Pedra": rng.choice(textos, n),
+    })
+
+
+def _clean_data_linha_a_linha(df):
+    """
+    Oráculo: clean_data antes da vetorização (apply por linha). Fica congelado aqui;
+    benchmarks/bench_preprocessing.py tem a mesma cópia para medir o tempo.
+    """
+    df = df.copy()
+
+    if 'Defasagem' in df.columns:
+        df['Defasagem'] = pd.to_numeric(df['Defasagem'], errors='coerce')
+        df = df.dropna(subset=['Defasagem'])
+
+    if 'Idade' in df.columns:
+        def corrigir_idade_excel(valor):
+            valor = str(valor).strip()
+            if '/' in valor:
+                partes = valor.split('/')
+                if len(partes) >= 2:
+                    return partes[1]
+            return valor
+
+        df['Idade'] = df['Idade'].apply(corrigir_idade_excel)
+
+    numeric_cols = ['IAA', 'IEG', 'IPS', 'IDA', 'IPV', 'IAN', 'INDE', 'Idade']
+    for col in numeric_cols:
+        if col in df.columns:
+            col_str = df[col].astype(str)
+            has_comma = col_str.str.contains(',', na=False)
+            br_converted = col_str.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+            df[col] = col_str.where(~has_comma, br_converted)
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    if 'Idade' in df.columns:
+        df.loc[(df['Idade'] < 5) | (df['Idade'] > 30), 'Idade'] = np.nan
+
+    for col in ['IAA', 'IEG', 'IPS', 'IDA', 'IPV']:
+        if col in df.columns:
+            df[col] = df[col].clip(lower=0, upper=10)
+
+    for col in df.select_dtypes(include=['object']).columns:
+        df[col] = (
+            df[col].astype(str)
+            .str.normalize('NFKD')
+            .str.encode('ascii', errors='ignore')
+            .str.decode('utf-8')
+            .str.strip()
+            .str.upper()
+        )
+        df[col] = df[col].replace('NAN', np.nan)
+
+    return df
+
+
+def test_clean_data_igual_a_implementacao_linha_a_linha():
+    df_raw = _dados_brutos_baguncados(500)
+    # Mesmo resultado da versão com apply por linha, inclusive com colunas de texto (str)
+    pd.testing.assert_frame_equal(clean_data(df_raw), _clean_data_linha_a_linha(df_raw))
+    df_str = df_raw.astype({"Fase": "str", "Pedra": "str"})
+    pd.testing.assert_frame_equal(clean_data(df_str), _clean_data_linha_a_linha(df_str))
+
+
+def test_clean_data_normaliza_so_colunas_consumidas():
+    from src.preprocessing import COLUNAS_TEXTO_CONSUMIDAS
+
+    df_raw = _dados_brutos_baguncados(200, seed=1)
+    completo = clean_data(df_raw)
+    consumidas = clean_data(df_raw, colunas_texto=COLUNAS_TEXTO_CONSUMIDAS)
+
+    # Pedra é descartada em create_features: fica como veio
+    pd.testing.assert_series_equal(consumidas["Pedra"], df_raw.loc[consumidas.index, "Pedra"])
+    pd.testing.assert_frame_equal(consumidas.drop(columns="Pedra"), completo.drop(columns="Pedra"))
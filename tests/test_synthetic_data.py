@@ -0,0 +1,50 @@
+import pandas as pd
+
+from src.feature_engineering import create_features
+from src.preprocessing import COLUNAS_TEXTO_CONSUMIDAS, clean_data
+from src.synthetic_data import ARQUIVOS_ORIGEM, aprender_perfil, gerar
+from src.utils import load_data
+
+
+def test_gerar_mesmo_formato_e_reprodutivel(tmp_path):
+    paths = gerar(str(tmp_path / "a"), linhas=1500, anos=["2022", "2023", "2024", "2026"], seed=3,
+                  linhas_por_bloco=400)
+    repetido = gerar(str(tmp_path / "b"), linhas=1500, anos=["2022"], seed=3, linhas_por_bloco=400)
+
+    with open(paths["2022"], encoding="utf-8") as f, open(ARQUIVOS_ORIGEM["2022"], encoding="utf-8") as origem:
+        assert f.readline() == origem.readline()
+    with open(paths["2026"], encoding="utf-8") as f:
+        assert "INDE 2026" in f.readline()
+    with open(paths["2022"], "rb") as a, open(repetido["2022"], "rb") as b:
+        assert a.read() == b.read()
+
+    # O pipeline inteiro aceita os arquivos, inclusive o ano sem mapa de renomeação
+    df = load_data(paths)
+    assert len(df) == 4 * 1500
+    assert sorted(df["Ano_Base"].unique()) == [2022, 2023, 2024, 2026]
+    X, y = create_features(clean_data(df, colunas_texto=COLUNAS_TEXTO_CONSUMIDAS))
+    assert len(X) > 0 and set(y.unique()) == {0, 1}
+
+
+def test_gerar_preserva_as_marginais(tmp_path):
+    paths = gerar(str(tmp_path), linhas=20000, anos=["2024"], seed=0)
+
+    real = clean_data(load_data({"2024": ARQUIVOS_ORIGEM["2024"]}), colunas_texto=COLUNAS_TEXTO_CONSUMIDAS)
+    sintetico = clean_data(load_data(paths), colunas_texto=COLUNAS_TEXTO_CONSUMIDAS)
+
+    for coluna in ("IAA", "IDA", "INDE", "Idade"):
+        assert abs(sintetico[coluna].mean() - real[coluna].mean()) < 0.1 * real[coluna].std()
+        assert abs(sintetico[coluna].isna().mean() - real[coluna].isna().mean()) < 0.02
+    frequencias = pd.concat(
+        [real["Fase"].value_counts(normalize=True), sintetico["Fase"].value_counts(normalize=True)], axis=1
+    )
+    assert (frequencias.iloc[:, 0] - frequencias.iloc[:, 1]).abs().max() < 0.02
+
+
+def test_aprender_perfil_tipos_das_colunas():
+    perfil = aprender_perfil(ARQUIVOS_ORIGEM["2023"])
+    tipos = {nome.strip(): coluna["tipo"] for nome, coluna in zip(perfil["cabecalho"], perfil["colunas"])}
+
+    assert tipos["IAA"] == "continua"
+    assert tipos["Gênero"] == "categorica"
+    assert tipos["Defasagem"] == "categorica"  # inteiros: frequência de cada valor
@@ -1,8 +1,16 @@
+import copy
+
 import pytest
 from unittest.mock import patch, MagicMock
+import numpy as np
 import pandas as pd
 from src.train import run_training
 
+@patch('src.train.registrar_compactacao')
+@patch('src.train.registrar_importancia_permutacao')
+@patch('src.train.registrar_limiares')
+@patch('src.train.salvar_referencia')
+@patch('src.train.construir_referencia')
 @patch('src.train.load_data')
 @patch('src.train.clean_data')
 @patch('src.train.create_features')
@@ -14,7 +22,9 @@ from src.train import run_training
 @patch('src.train.infer_signature') 
 @patch('os.makedirs') 
 def test_run_training_pipeline(mock_makedirs, mock_infer, mock_mlflow, mock_dump, mock_eval, mock_search, 
-                               mock_split, mock_features, mock_clean, mock_load):
+                               mock_split, mock_features, mock_clean, mock_load,
+                               mock_referencia, mock_salvar_referencia, mock_limiares,
+                               mock_importancia, mock_compactacao):
     
     # 1. Configurando os retornos dos Mocks para o fluxo seguir
     mock_load.return_value = pd.DataFrame({'raw': [1]})
@@ -45,6 +55,23 @@ def test_run_training_pipeline(mock_makedirs, mock_infer, mock_mlflow, mock_dump
     # Garante que o MLflow inferiu a assinatura e registrou o modelo
     mock_infer.assert_called_once()
     mock_mlflow.sklearn.log_model.assert_called_once()
+
+    # A floresta é compactada e o modelo compactado é o avaliado e o servido
+    X_train, X_test, y_train, y_test = mock_split.return_value
+    mock_compactacao.assert_called_once_with(mock_best_estimator, X_train, y_train, X_test)
+    compacto = mock_compactacao.return_value
+    assert mock_eval.call_args[0][0] is compacto
+    assert mock_mlflow.sklearn.log_model.call_args.kwargs["sk_model"] is compacto
+
+    # A referência de drift é capturada do treino e acompanha o modelo
+    mock_referencia.assert_called_once_with(X_train)
+    assert compacto.referencia_drift_ is mock_referencia.return_value
+    mock_mlflow.log_dict.assert_called_once_with(mock_referencia.return_value, "drift/referencia.json")
+    mock_salvar_referencia.assert_called_once()
+
+    # Limiar recomendado no out-of-bag da floresta completa (sem reajuste), não no da compactada
+    mock_limiares.assert_called_once_with(mock_best_estimator, X_train, y_train)
+    mock_importancia.assert_called_once_with(compacto, X_test, y_test, mock_eval.return_value["y_proba"])
     
 
 @patch('src.train.load_data')
@@ -57,4 +84,419 @@ def test_run_training_file_error(mock_mlflow, mock_load):
     run_training()
     
     # Assert
-    mock_load.assert_called_once()
\ No newline at end of file
+    mock_load.assert_called_once()
+
+@patch('src.train.mlflow')
+def test_registrar_carga_dados(mock_mlflow):
+    from src.train import registrar_carga_dados
+
+    registrar_carga_dados({
+        "2023": {"cache": "hit", "segundos": 0.01, "sha256": "a" * 64},
+        "2024": {"cache": "miss", "segundos": 0.05, "sha256": "b" * 64},
+    })
+
+    metricas = {c.args[0]: c.args[1] for c in mock_mlflow.log_metric.call_args_list}
+    assert metricas["carga_dados_cache_hits"] == 1
+    assert metricas["carga_dados_segundos"] == pytest.approx(0.06)
+    mock_mlflow.log_param.assert_any_call("dados_2024_cache", "miss")
+
+@patch('src.train.ESTRATEGIA_BUSCA', 'halving')
+@patch('src.train.registrar_compactacao')
+@patch('src.train.registrar_importancia_permutacao')
+@patch('src.train.registrar_limiares')
+@patch('src.train.salvar_referencia')
+@patch('src.train.construir_referencia')
+@patch('src.train.load_data')
+@patch('src.train.clean_data')
+@patch('src.train.create_features')
+@patch('src.train.train_test_split')
+@patch('src.train.HalvingRandomSearchCV')
+@patch('src.train.RandomizedSearchCV')
+@patch('src.train.evaluate_model')
+@patch('src.train.joblib.dump')
+@patch('src.train.mlflow')
+@patch('src.train.infer_signature')
+@patch('os.makedirs')
+def test_run_training_busca_halving(mock_makedirs, mock_infer, mock_mlflow, mock_dump, mock_eval, mock_random,
+                                    mock_halving, mock_split, mock_features, mock_clean, mock_load,
+                                    mock_referencia, mock_salvar_referencia, mock_limiares,
+                                    mock_importancia, mock_compactacao):
+    mock_load.return_value = pd.DataFrame({'raw': [1]})
+    mock_clean.return_value = pd.DataFrame({'clean': [1]})
+    mock_features.return_value = (pd.DataFrame({'X': [1]}), pd.Series([1]))
+    mock_split.return_value = (MagicMock(), MagicMock(), MagicMock(), MagicMock())
+    mock_best_estimator = mock_halving.return_value.best_estimator_
+    mock_best_estimator.predict.return_value = [0]
+
+    run_training()
+
+    mock_random.assert_not_called()
+    mock_halving.return_value.fit.assert_called_once()
+    # O modelo salvo não carrega o diretório de cache da busca
+    mock_best_estimator.set_params.assert_called_once_with(memory=None)
+    mock_mlflow.log_param.assert_any_call("busca_estrategia", "halving")
+    metricas = {c.args[0] for c in mock_mlflow.log_metric.call_args_list}
+    assert {"busca_segundos", "busca_melhor_recall_cv"} <= metricas
+
+
+@patch('src.train.COMPARAR_BUSCAS', True)
+@patch('src.train.registrar_compactacao')
+@patch('src.train.registrar_importancia_permutacao')
+@patch('src.train.registrar_limiares')
+@patch('src.train.salvar_referencia')
+@patch('src.train.construir_referencia')
+@patch('src.train.load_data')
+@patch('src.train.clean_data')
+@patch('src.train.create_features')
+@patch('src.train.train_test_split')
+@patch('src.train.HalvingRandomSearchCV')
+@patch('src.train.RandomizedSearchCV')
+@patch('src.train.evaluate_model')
+@patch('src.train.joblib.dump')
+@patch('src.train.mlflow')
+@patch('src.train.infer_signature')
+@patch('os.makedirs')
+def test_run_training_compara_as_duas_buscas_em_runs_aninhadas(mock_makedirs, mock_infer, mock_mlflow, mock_dump,
+                                                                mock_eval, mock_random, mock_halving, mock_split,
+                                                                mock_features, mock_clean, mock_load, mock_referencia,
+                                                                mock_salvar_referencia, mock_limiares,
+                                                                mock_importancia, mock_compactacao):
+    mock_load.return_value = pd.DataFrame({'raw': [1]})
+    mock_clean.return_value = pd.DataFrame({'clean': [1]})
+    mock_features.return_value = (pd.DataFrame({'X': [1]}), pd.Series([1]))
+    mock_split.return_value = (MagicMock(), MagicMock(), MagicMock(), MagicMock())
+    mock_random.return_value.best_params_ = {'classifier__max_depth': 10}
+    mock_halving.return_value.best_params_ = {'classifier__max_depth': 20}
+
+    run_training()
+
+    # As duas estratégias rodam; o modelo servido é o de ESTRATEGIA_BUSCA (aleatoria)
+    mock_random.return_value.fit.assert_called_once()
+    mock_halving.return_value.fit.assert_called_once()
+    assert mock_compactacao.call_args.args[0] is mock_random.return_value.best_estimator_
+    aninhadas = [c.kwargs for c in mock_mlflow.start_run.call_args_list if c.kwargs.get("nested")]
+    assert [c["run_name"] for c in aninhadas] == ["busca_aleatoria", "busca_halving"]
+    mock_mlflow.log_param.assert_any_call("busca_estrategia", "halving")
+    mock_mlflow.log_params.assert_any_call({"busca_melhor_classifier__max_depth": 20})
+    # Depois das runs aninhadas, a run principal registra a estratégia escolhida
+    estrategias = [c.args[1] for c in mock_mlflow.log_param.call_args_list if c.args[0] == "busca_estrategia"]
+    assert estrategias == ["aleatoria", "halving", "aleatoria"]
+
+
+def test_construir_busca_halving_usa_arvores_como_recurso(dados_sinteticos, tmp_path):
+    from src.train import construir_busca, construir_pipeline
+
+    X, y = dados_sinteticos(300)
+    busca = construir_busca("halving", construir_pipeline(memory=str(tmp_path)))
+    assert busca.scoring == 'recall'
+    assert 'classifier__n_estimators' not in busca.param_distributions
+
+    busca.set_params(n_candidates=9, max_resources=18, n_jobs=1, verbose=0)
+    busca.fit(X, y)
+
+    # 9 candidatos com 2 árvores, 3 com 6 e o vencedor com 18
+    assert busca.n_resources_ == [2, 6, 18]
+    assert busca.best_params_['classifier__n_estimators'] == 18
+    assert busca.best_estimator_.predict_proba(X).shape == (300, 2)
+    # Pré-processamento de cada fold em cache, reaproveitado entre os candidatos
+    assert any(tmp_path.iterdir())
+
+
+def test_construir_busca_estrategia_invalida():
+    from src.train import construir_busca, construir_pipeline
+
+    with pytest.raises(ValueError, match="ESTRATEGIA_BUSCA"):
+        construir_busca("grade", construir_pipeline())
+
+
+def test_ajustar_incremental_acrescenta_arvores_sem_alterar_producao(pipeline_sintetico, dados_sinteticos):
+    from src.train import ajustar_incremental
+
+    X, y = dados_sinteticos(300, seed=1)
+    arvores_producao = list(pipeline_sintetico.named_steps['classifier'].estimators_)
+
+    candidato = ajustar_incremental(pipeline_sintetico, X, y, "incremental", arvores_novas=10)
+
+    floresta = candidato.named_steps['classifier']
+    assert len(floresta.estimators_) == len(arvores_producao) + 10
+    assert floresta.warm_start is False
+    # Produção intacta; o candidato reaproveita o pré-processamento já ajustado
+    assert pipeline_sintetico.named_steps['classifier'].estimators_ == arvores_producao
+    assert candidato.predict_proba(X).shape == (300, 2)
+
+
+def test_ajustar_incremental_sem_busca_mantem_hiperparametros(pipeline_sintetico, dados_sinteticos):
+    from src.train import ajustar_incremental
+
+    X, y = dados_sinteticos(300, seed=1)
+    candidato = ajustar_incremental(pipeline_sintetico, X, y, "sem_busca")
+
+    assert candidato is not pipeline_sintetico
+    assert candidato.named_steps['classifier'].get_params() == pipeline_sintetico.named_steps['classifier'].get_params()
+    assert len(candidato.named_steps['classifier'].estimators_) == 25
+
+    with pytest.raises(ValueError, match="Modo de retreino"):
+        ajustar_incremental(pipeline_sintetico, X, y, "turbo")
+
+
+def test_ajustar_incremental_sem_busca_volta_ao_n_estimators_da_busca(pipeline_sintetico, dados_sinteticos):
+    from src.compaction import compactar_floresta
+    from src.train import ajustar_incremental
+
+    X, y = dados_sinteticos(400)
+    compacto, _ = compactar_floresta(pipeline_sintetico, X, y, limiar=0.4, tolerancia=0.05)
+
+    candidato = ajustar_incremental(compacto, X, y, "sem_busca")
+
+    assert len(candidato.named_steps['classifier'].estimators_) == 25
+
+
+def _dados_brutos(n, ano, seed=0):
+    rng = np.random.default_rng(seed)
+    notas = {c: rng.uniform(0, 10, n).round(1).astype(str) for c in ("IAA", "IEG", "IPS", "IDA", "IPV")}
+    return pd.DataFrame({
+        **notas,
+        "Defasagem": rng.choice(["-1", "0", "1"], n),
+        "Ano_Base": ano,
+        "Idade": "12",
+        "Fase": "FASE 2",
+        "RA": [f"RA-{i}  " for i in range(n)],
+    })
+
+
+@patch('src.train.load_data')
+def test_preparar_dados_reutiliza_o_holdout_fixo(mock_load):
+    from src.train import _preparar_dados
+
+    mock_load.return_value = _dados_brutos(60, 2023)
+    _, X_test, _, y_test, chaves = _preparar_dados({})
+    assert len(chaves) == len(X_test) == 12
+    assert all(chave.startswith("2023:RA-") for chave in chaves)
+
+    # Chega um ano novo: o sorteio mudaria, mas o teste continua o mesmo holdout
+    mock_load.return_value = pd.concat([_dados_brutos(60, 2023), _dados_brutos(60, 2024, seed=1)],
+                                       ignore_index=True)
+    X_train_novo, X_test_novo, _, y_test_novo, chaves_novo = _preparar_dados({}, chaves)
+
+    assert chaves_novo == chaves
+    pd.testing.assert_frame_equal(X_test_novo, X_test.sort_index())
+    pd.testing.assert_series_equal(y_test_novo, y_test.sort_index())
+    assert len(X_train_novo) == 120 - 12
+    assert "RA" not in X_train_novo.columns
+
+
+def test_portao_qualidade():
+    from src.train import portao_qualidade
+
+    y = pd.Series([1, 1, 1, 1, 0, 0])
+    producao, candidato = MagicMock(), MagicMock()
+    producao.predict_proba.return_value = np.array([[0.2, 0.8]] * 4 + [[0.9, 0.1]] * 2)
+    # Candidato perde um dos quatro alunos em risco
+    candidato.predict_proba.return_value = np.array([[0.2, 0.8]] * 3 + [[0.9, 0.1]] * 3)
+
+    portao = portao_qualidade(producao, candidato, pd.DataFrame(index=range(6)), y, limiar=0.5, tolerancia=0.01)
+    assert portao["recall_producao"] == 1.0
+    assert portao["recall_candidato"] == 0.75
+    assert portao["aprovado"] is False
+
+    assert portao_qualidade(producao, candidato, pd.DataFrame(index=range(6)), y,
+                            limiar=0.5, tolerancia=0.3)["aprovado"] is True
+
+
+@pytest.mark.parametrize("aprovado", [True, False])
+@patch('src.train.registrar_compactacao')
+@patch('src.train.registrar_importancia_permutacao')
+@patch('src.train._salvar_modelo')
+@patch('src.train.evaluate_model')
+@patch('src.train.portao_qualidade')
+@patch('src.train.ajustar_incremental')
+@patch('src.train._preparar_dados')
+@patch('src.train.construir_referencia')
+@patch('src.train.carregar_modelo_producao')
+@patch('src.train.mlflow')
+def test_run_retreino_incremental_registra_so_se_aprovado(mock_mlflow, mock_producao, mock_referencia, mock_dados,
+                                                          mock_ajustar, mock_portao, mock_eval, mock_salvar, mock_importancia,
+                                                          mock_compactacao, aprovado):
+    from src.train import run_retreino_incremental
+
+    mock_dados.return_value = (MagicMock(), MagicMock(), MagicMock(), MagicMock(), ["2023:RA-1"])
+    mock_portao.return_value = {"recall_producao": 0.9, "recall_candidato": 0.9, "aprovado": aprovado}
+
+    run_retreino_incremental("incremental")
+
+    mock_ajustar.assert_called_once()
+    assert mock_ajustar.call_args.args[0] is mock_producao.return_value
+    # O portão usa o holdout salvo com o modelo de produção
+    assert mock_dados.call_args.args[1] is mock_producao.return_value.chaves_holdout_
+    mock_mlflow.log_param.assert_any_call("retreino_modo", "incremental")
+    assert mock_salvar.called is aprovado
+    assert mock_importancia.called is aprovado
+    # Incremental não é compactado (sem out-of-bag nas árvores herdadas)
+    mock_compactacao.assert_not_called()
+    mock_mlflow.log_param.assert_any_call("compactacao", "nao_aplicavel_incremental")
+
+
+@patch('src.train.registrar_limiares')
+@patch('src.train.registrar_compactacao')
+@patch('src.train.registrar_importancia_permutacao')
+@patch('src.train._salvar_modelo')
+@patch('src.train.evaluate_model')
+@patch('src.train.portao_qualidade')
+@patch('src.train.ajustar_incremental')
+@patch('src.train._preparar_dados')
+@patch('src.train.construir_referencia')
+@patch('src.train.carregar_modelo_producao')
+@patch('src.train.mlflow')
+def test_run_retreino_sem_busca_compacta_antes_do_portao(mock_mlflow, mock_producao, mock_referencia, mock_dados,
+                                                         mock_ajustar, mock_portao, mock_eval, mock_salvar,
+                                                         mock_importancia, mock_compactacao, mock_limiares):
+    from src.train import run_retreino_incremental
+
+    X_train, X_test, y_train, y_test = MagicMock(), MagicMock(), MagicMock(), MagicMock()
+    mock_dados.return_value = (X_train, X_test, y_train, y_test, None)
+    mock_portao.return_value = {"recall_producao": 0.9, "recall_candidato": 0.9, "aprovado": True}
+
+    run_retreino_incremental("sem_busca")
+
+    compacto = mock_compactacao.return_value
+    mock_compactacao.assert_called_once_with(mock_ajustar.return_value, X_train, y_train, X_test)
+    assert mock_portao.call_args.args[1] is compacto
+    assert mock_salvar.call_args.args[0] is compacto
+    mock_limiares.assert_called_once_with(mock_ajustar.return_value, X_train, y_train)
+
+
+@patch('src.train.run_training')
+@patch('src.train.carregar_modelo_producao', return_value=None)
+@patch('src.train.mlflow')
+def test_run_retreino_incremental_sem_producao_faz_treino_completo(mock_mlflow, mock_producao, mock_run_training):
+    from src.train import run_retreino_incremental
+
+    run_retreino_incremental("sem_busca")
+
+    mock_run_training.assert_called_once()
+
+
+@patch('src.train.run_retreino_incremental')
+@patch('src.train.run_training')
+def test_main_despacha_pelo_modo(mock_run_training, mock_incremental):
+    from src.train import main
+
+    main(["--modo", "completo"])
+    mock_run_training.assert_called_once()
+    main(["--modo", "incremental"])
+    mock_incremental.assert_called_once_with("incremental")
+
+
+def test_total_candidatos_e_scorer_com_progresso(monkeypatch, dados_sinteticos, capsys):
+    from src.train import construir_busca, construir_pipeline, total_candidatos
+
+    assert total_candidatos(construir_busca("aleatoria", construir_pipeline())) == 20
+    # Rodadas da halving: 27 + 9 + 3 + 1
+    assert total_candidatos(construir_busca("halving", construir_pipeline())) == 40
+
+    monkeypatch.setenv("TREINO_EVENTOS_PROGRESSO", "1")
+    busca = construir_busca("aleatoria", construir_pipeline())
+    busca.set_params(n_iter=2, cv=2, n_jobs=1, verbose=0, estimator__classifier__n_estimators=5)
+    busca.set_params(param_distributions={'classifier__max_depth': [3, 5]})
+    X, y = dados_sinteticos(200)
+    busca.fit(X, y)
+
+    # Um evento por ajuste avaliado (2 candidatos x 2 folds); a seleção continua por recall
+    assert capsys.readouterr().out.count('@@progresso {"ajuste": 1}') == 4
+    assert 0 <= busca.best_score_ <= 1
+
+
+def test_probabilidades_fora_da_amostra_iguais_ao_oob_do_sklearn(dados_sinteticos):
+    from src.train import construir_pipeline, probabilidades_fora_da_amostra
+
+    X, y = dados_sinteticos(300)
+    modelo = construir_pipeline().set_params(classifier__n_estimators=30, classifier__oob_score=True).fit(X, y)
+
+    proba = probabilidades_fora_da_amostra(modelo, X)
+
+    referencia = modelo.named_steps["classifier"].oob_decision_function_[:, 1]
+    np.testing.assert_allclose(proba, referencia)
+
+
+@patch('src.train.RECALL_ALVO', 0.9)
+@patch('src.train.registrar_varredura')
+@patch('src.train.mlflow')
+def test_registrar_limiares_usa_a_curva_fora_da_amostra(mock_mlflow, mock_registrar, pipeline_sintetico,
+                                                        dados_sinteticos):
+    from src.train import registrar_limiares
+
+    X, y = dados_sinteticos(400)  # mesmos dados do pipeline_sintetico
+    mock_registrar.return_value = {"limiar": 0.5, "precisao": 0.8}
+
+    assert registrar_limiares(pipeline_sintetico, X, y) == mock_registrar.return_value
+
+    mock_mlflow.log_param.assert_any_call("limiares_origem", "oob_floresta_completa")
+    curva, nome = mock_registrar.call_args.args
+    assert nome == "oob"
+    assert mock_registrar.call_args.kwargs["recall_alvo"] == 0.9
+    assert curva["limiar"].is_monotonic_decreasing
+    assert curva["recall"].iloc[-1] == 1.0
+
+
+@patch('src.train.registrar_varredura')
+@patch('src.train.mlflow')
+def test_registrar_limiares_do_modelo_compactado_usa_so_as_arvores_mantidas(mock_mlflow, mock_registrar,
+                                                                              pipeline_sintetico, dados_sinteticos):
+    from src.compaction import probabilidades_por_arvore
+    from src.evaluate import varredura_limiares
+    from src.train import registrar_limiares
+
+    X, y = dados_sinteticos(400)
+    # Floresta servida com parte das árvores, como a do modelo compactado
+    compacto = copy.deepcopy(pipeline_sintetico)
+    floresta = compacto.named_steps["classifier"]
+    floresta.n_estimators_busca_ = floresta.n_estimators
+    floresta.estimators_ = floresta.estimators_[::2]
+    floresta.n_estimators = len(floresta.estimators_)
+    mock_registrar.return_value = None
+
+    registrar_limiares(compacto, X, y)
+
+    # A origem fica registrada: a curva das árvores mantidas é otimista
+    mock_mlflow.log_param.assert_any_call("limiares_origem", "oob_floresta_compactada")
+
+    probas, fora = probabilidades_por_arvore(compacto.named_steps["classifier"],
+                                             compacto.named_steps["preprocessor"].transform(X))
+    with np.errstate(invalid="ignore"):
+        oob = np.where(fora, probas, 0.0).sum(axis=0) / fora.sum(axis=0)
+    pd.testing.assert_frame_equal(mock_registrar.call_args.args[0], varredura_limiares(y, oob))
+
+
+@patch('src.train.IMPORTANCIA_REPETICOES', 0)
+@patch('src.train.importancia_permutacao')
+def test_importancia_permutacao_desligada(mock_importancia):
+    from src.train import registrar_importancia_permutacao
+
+    assert registrar_importancia_permutacao(MagicMock(), MagicMock(), MagicMock()) is None
+    mock_importancia.assert_not_called()
+
+
+@patch('src.train.mlflow')
+def test_registrar_compactacao_registra_deltas(mock_mlflow, pipeline_sintetico, dados_sinteticos):
+    from src.train import registrar_compactacao
+    X, y = dados_sinteticos(400)
+    X_test, _ = dados_sinteticos(50, seed=3)
+
+    compacto = registrar_compactacao(pipeline_sintetico, X, y, X_test)
+
+    assert len(compacto.named_steps['classifier'].estimators_) <= 25
+    metricas = {c.args[0] for c in mock_mlflow.log_metric.call_args_list}
+    assert {"compactacao_arvores_antes", "compactacao_arvores_depois", "compactacao_tamanho_mb_antes",
+            "compactacao_tamanho_mb_depois", "compactacao_latencia_1_ms_antes",
+            "compactacao_latencia_1_ms_depois", "compactacao_recall_oob_depois"} <= metricas
+    mock_mlflow.log_param.assert_any_call("compactacao_tolerancia", 0.01)
+
+
+@patch('src.train.COMPACTAR_FLORESTA', False)
+@patch('src.train.mlflow')
+def test_registrar_compactacao_desligada(mock_mlflow, pipeline_sintetico, dados_sinteticos):
+    from src.train import registrar_compactacao
+    X, y = dados_sinteticos(50)
+
+    assert registrar_compactacao(pipeline_sintetico, X, y, X) is pipeline_sintetico
+    mock_mlflow.log_metric.assert_not_called()
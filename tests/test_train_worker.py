@@ -0,0 +1,40 @@
+import io
+import json
+from unittest.mock import MagicMock
+
+from src.train_worker import (
+    MARCADOR_FIM,
+    MARCADOR_PROGRESSO,
+    VARIAVEL_PROGRESSO,
+    atender,
+    emitir_progresso,
+    limitar_cpu,
+)
+
+
+def test_atender_um_treino_por_linha():
+    treino = MagicMock()
+    treino.main.side_effect = [None, RuntimeError("sem dados")]
+    entrada = io.StringIO('{"id": "a", "modo": "incremental"}\n\n{"id": "b", "modo": "completo"}\n')
+    saida = io.StringIO()
+
+    atender(entrada, saida, treino)
+
+    treino.main.assert_any_call(["--modo", "incremental"])
+    fins = [json.loads(l[len(MARCADOR_FIM):]) for l in saida.getvalue().splitlines() if l.startswith(MARCADOR_FIM)]
+    assert [(f["id"], f["ok"]) for f in fins] == [("a", True), ("b", False)]
+    assert fins[1]["erro"] == "RuntimeError: sem dados"
+
+
+def test_limitar_cpu_sem_limites():
+    assert limitar_cpu(0, 0)["nice"] == 0
+
+
+def test_emitir_progresso_so_no_worker(monkeypatch, capsys):
+    monkeypatch.delenv(VARIAVEL_PROGRESSO, raising=False)
+    emitir_progresso(etapa=1)
+    assert capsys.readouterr().out == ""
+
+    monkeypatch.setenv(VARIAVEL_PROGRESSO, "1")
+    emitir_progresso(etapa=1, etapas=6)
+    assert capsys.readouterr().out == MARCADOR_PROGRESSO + '{"etapa": 1, "etapas": 6}\n'
@@ -0,0 +1,161 @@
+import re
+import sys
+import time
+
+from app.training_jobs import TAMANHO_MAX_LINHA, GerenciadorTreinos
+
+
+def _pid(status):
+    return re.search(r"pid=(\d+)", " ".join(status["ultimas_linhas"])).group(1)
+
+
+def test_jobs_rodam_em_ordem_no_mesmo_worker(worker_falso):
+    gerenciador = GerenciadorTreinos(comando=worker_falso)
+    try:
+        primeiro, criado = gerenciador.submeter("completo")
+        segundo, _ = gerenciador.submeter("incremental")
+        assert criado is True
+
+        assert gerenciador.aguardar(segundo.id, timeout=30)
+        assert gerenciador.obter(primeiro.id)["estado"] == "concluido"
+        assert gerenciador.obter(segundo.id)["estado"] == "concluido"
+        # Worker quente: os dois jobs rodaram no mesmo processo
+        assert _pid(gerenciador.obter(primeiro.id)) == _pid(gerenciador.obter(segundo.id))
+        assert [j["job_id"] for j in gerenciador.listar()] == [segundo.id, primeiro.id]
+    finally:
+        gerenciador.encerrar()
+
+
+def test_single_flight_por_modo(worker_falso):
+    gerenciador = GerenciadorTreinos(comando=worker_falso)
+    try:
+        job, _ = gerenciador.submeter("lento")
+        repetido, criado = gerenciador.submeter("lento")
+        assert criado is False
+        assert repetido is job
+        outro, criado = gerenciador.submeter("completo")
+        assert criado is True
+        assert outro.estado == "na_fila"
+    finally:
+        gerenciador.encerrar()
+
+
+def test_cancelar_na_fila_e_em_execucao(worker_falso):
+    gerenciador = GerenciadorTreinos(comando=worker_falso)
+    try:
+        lento, _ = gerenciador.submeter("lento")
+        na_fila, _ = gerenciador.submeter("completo")
+
+        assert gerenciador.cancelar(na_fila.id)["estado"] == "cancelado"
+        assert not gerenciador.aguardar(lento.id, timeout=0.5)
+        gerenciador.cancelar(lento.id)
+        assert gerenciador.aguardar(lento.id, timeout=30)
+        assert gerenciador.obter(lento.id)["estado"] == "cancelado"
+
+        # O próximo job sobe um worker novo
+        depois, _ = gerenciador.submeter("completo")
+        assert gerenciador.aguardar(depois.id, timeout=30)
+        assert gerenciador.obter(depois.id)["estado"] == "concluido"
+        assert gerenciador.cancelar("naoexiste") is None
+    finally:
+        gerenciador.encerrar()
+
+
+def test_job_com_falha_nao_derruba_a_fila(worker_falso):
+    gerenciador = GerenciadorTreinos(comando=worker_falso)
+    try:
+        falha, _ = gerenciador.submeter("falha")
+        depois, _ = gerenciador.submeter("completo")
+        assert gerenciador.aguardar(depois.id, timeout=30)
+        assert gerenciador.obter(falha.id)["estado"] == "falhou"
+        assert gerenciador.obter(falha.id)["erro"] == "falhou"
+        assert gerenciador.obter(depois.id)["estado"] == "concluido"
+    finally:
+        gerenciador.encerrar()
+
+
+def test_worker_que_nao_inicia():
+    gerenciador = GerenciadorTreinos(comando=[sys.executable, "-c", "import sys; sys.exit(3)"])
+    job, _ = gerenciador.submeter("completo")
+    assert gerenciador.aguardar(job.id, timeout=30)
+    status = gerenciador.obter(job.id)
+    assert status["estado"] == "falhou"
+    assert "código 3" in status["erro"]
+
+
+def test_historico_limitado(worker_falso):
+    gerenciador = GerenciadorTreinos(comando=worker_falso, historico_max=2)
+    try:
+        for _ in range(4):
+            job, _ = gerenciador.submeter("completo")
+            assert gerenciador.aguardar(job.id, timeout=30)
+        gerenciador.submeter("completo")
+        assert len(gerenciador.listar()) <= 3
+    finally:
+        gerenciador.encerrar()
+
+
+def test_progresso_do_job_em_execucao(worker_falso):
+    gerenciador = GerenciadorTreinos(comando=worker_falso)
+    try:
+        assert gerenciador.progresso()["em_execucao"] == 0
+        job, _ = gerenciador.submeter("lento")
+        limite = time.monotonic() + 30
+        while gerenciador.progresso()["candidatos_avaliados"] < 1 and time.monotonic() < limite:
+            time.sleep(0.05)
+
+        progresso = gerenciador.progresso()
+        assert progresso["em_execucao"] == 1
+        assert (progresso["etapa"], progresso["etapas"]) == (5, 6)
+        # 3 ajustes concluídos com 2 folds: 1 candidato avaliado de 4
+        assert (progresso["candidatos_avaliados"], progresso["candidatos_total"]) == (1, 4)
+        assert progresso["segundos"] > 0
+        assert gerenciador.obter(job.id)["progresso"]["descricao"] == "Treinando o modelo"
+        # Eventos de progresso não vão para as linhas de saída
+        assert not any("@@progresso" in linha for linha in gerenciador.obter(job.id)["ultimas_linhas"])
+
+        gerenciador.cancelar(job.id)
+        assert gerenciador.aguardar(job.id, timeout=30)
+        assert gerenciador.progresso()["em_execucao"] == 0
+    finally:
+        gerenciador.encerrar()
+
+
+def test_saida_lida_em_pedacos_limitados(worker_falso):
+    gerenciador = GerenciadorTreinos(comando=worker_falso, linhas_max=5)
+    try:
+        job, _ = gerenciador.submeter("linha_longa")
+        assert gerenciador.aguardar(job.id, timeout=30)
+        status = gerenciador.obter(job.id)
+        assert status["estado"] == "concluido"
+        assert len(status["ultimas_linhas"]) <= 5
+        assert max(len(linha) for linha in status["ultimas_linhas"]) <= TAMANHO_MAX_LINHA
+        assert sum(linha.count("x") for linha in status["ultimas_linhas"]) == 20000
+    finally:
+        gerenciador.encerrar()
+
+
+def test_cancelado_enquanto_o_worker_inicia_nao_e_despachado(worker_falso):
+    gerenciador = GerenciadorTreinos(comando=worker_falso)
+    obter_worker = gerenciador._obter_worker
+
+    def cancelar_e_obter():
+        # Cancelamento entre a saída da fila e o início do worker: ainda não há worker para encerrar
+        gerenciador.cancelar(gerenciador._atual.id)
+        return obter_worker()
+
+    gerenciador._obter_worker = cancelar_e_obter
+    try:
+        job, _ = gerenciador.submeter("completo")
+        assert gerenciador.aguardar(job.id, timeout=30)
+        status = gerenciador.obter(job.id)
+        assert status["estado"] == "cancelado"
+        # O worker não recebeu o job
+        assert status["ultimas_linhas"] == []
+
+        gerenciador._obter_worker = obter_worker
+        depois, _ = gerenciador.submeter("completo")
+        assert gerenciador.aguardar(depois.id, timeout=30)
+        assert gerenciador.obter(depois.id)["estado"] == "concluido"
+    finally:
+        gerenciador.encerrar()
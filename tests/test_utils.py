@@ -1,7 +1,9 @@
 import pandas as pd
 import pytest
 from unittest.mock import patch, MagicMock
+from src import utils
 from src.utils import load_data
+from src.preprocessing import clean_data
 
 CSV_CONTENT = "IAA;IEG;IPS;IDA;IPV\n5.5;6.0;7.0;8.0;9.0"
 
@@ -47,3 +49,132 @@ def test_load_data_fallback_comma_separator():
     ):
         df_result = load_data(paths)
         assert "Defasagem" in df_result.columns
+
+
+CSV_ANO = "RA;IAA 2024;Defasagem 2024;Fase;Pedra 2024\nRA-1;5,5;-1;3;Ametista\nRA-2;8,0;0;ALFA;Quartzo\n"
+
+
+def test_load_data_cache_colunar(tmp_path):
+    csv = tmp_path / "PEDE2024.csv"
+    csv.write_text(CSV_ANO, encoding="utf-8")
+    cache = tmp_path / "cache"
+    paths = {"2024": str(csv)}
+
+    primeira, segunda = {}, {}
+    df_csv = load_data(paths, cache_dir=str(cache), estatisticas=primeira)
+    with patch("pandas.read_csv") as mock_read:
+        df_cache = load_data(paths, cache_dir=str(cache), estatisticas=segunda)
+
+    # Ano sem mudanças não é parseado de novo e o resultado é idêntico
+    mock_read.assert_not_called()
+    pd.testing.assert_frame_equal(df_csv, df_cache)
+    assert primeira["2024"]["cache"] == "miss"
+    assert segunda["2024"]["cache"] == "hit"
+    assert segunda["2024"]["sha256"] == primeira["2024"]["sha256"]
+
+
+def test_load_data_cache_invalida_com_arquivo_ou_mapa(tmp_path):
+    csv = tmp_path / "PEDE2024.csv"
+    csv.write_text(CSV_ANO, encoding="utf-8")
+    cache = tmp_path / "cache"
+    paths = {"2024": str(csv)}
+    load_data(paths, cache_dir=str(cache))
+
+    # Conteúdo novo: relê o CSV e substitui a versão antiga no cache
+    csv.write_text(CSV_ANO + "RA-3;7,0;-2;5;Topazio\n", encoding="utf-8")
+    carga = {}
+    df = load_data(paths, cache_dir=str(cache), estatisticas=carga)
+    assert carga["2024"]["cache"] == "miss"
+    assert len(df) == 3
+    assert len(list(cache.glob("PEDE2024-*.parquet"))) == 1
+
+    # Mapa de renomeação diferente também invalida
+    mapas = {"2024": {**utils.RENAME_MAPS["2024"], "Fase": "Fase"}}
+    with patch.dict(utils.RENAME_MAPS, mapas):
+        load_data(paths, cache_dir=str(cache), estatisticas=carga)
+    assert carga["2024"]["cache"] == "miss"
+
+
+def test_load_data_sem_parquet_segue_sem_cache(tmp_path):
+    csv = tmp_path / "PEDE2024.csv"
+    csv.write_text(CSV_ANO, encoding="utf-8")
+
+    with patch("pandas.DataFrame.to_parquet", side_effect=ImportError("pyarrow ausente")):
+        df = load_data({"2024": str(csv)}, cache_dir=str(tmp_path / "cache"))
+
+    assert df["Defasagem"].tolist() == [-1, 0]
+
+
+def test_load_data_detecta_separador_e_le_so_colunas_usadas(tmp_path):
+    csv = tmp_path / "PEDE2023.csv"
+    csv.write_text(
+        "RA,IAA 2023,Avaliador1,Defasagem 2023,Escola\nRA-1,\"7,5\",Fulano,-1,EE Centro\n", encoding="utf-8"
+    )
+
+    with patch("pandas.read_csv", wraps=pd.read_csv) as mock_read:
+        df = load_data({"2023": str(csv)})
+
+    # Separador vem do cabeçalho: uma única leitura, sem tentativa e erro
+    assert mock_read.call_count == 1
+    assert mock_read.call_args.kwargs["sep"] == ","
+    assert df.columns.tolist() == ["IAA", "Defasagem", "Ano_Base", "RA"]
+    # Colunas numéricas já chegam convertidas, com a vírgula decimal tratada como em clean_data
+    assert df["IAA"].dtype == "float64"
+    assert df["IAA"].iloc[0] == 7.5
+
+
+def test_load_data_anos_em_paralelo_e_leitura_em_blocos(tmp_path, monkeypatch):
+    paths = {}
+    for ano in ("2022", "2023", "2024"):
+        csv = tmp_path / f"PEDE{ano}.csv"
+        linhas = "".join(f"RA-{i};{i % 10},5;-{i % 3}\n" for i in range(50))
+        csv.write_text(f"RA;IAA {ano};Defasagem {ano}\n{linhas}".replace("Defasagem 2022", "Defas"), encoding="utf-8")
+        paths[ano] = str(csv)
+
+    sequencial = load_data(paths, max_workers=1)
+    monkeypatch.setattr(utils, "LIMIAR_LEITURA_EM_BLOCOS_BYTES", 0)
+    monkeypatch.setattr(utils, "LINHAS_POR_BLOCO", 7)
+    paralelo_em_blocos = load_data(paths, max_workers=3)
+
+    # Mesmas linhas, na ordem dos anos informados, com os blocos já convertidos
+    pd.testing.assert_frame_equal(sequencial, paralelo_em_blocos)
+    assert paralelo_em_blocos["IAA"].dtype == "float64"
+    assert sequencial["Ano_Base"].tolist() == [2022] * 50 + [2023] * 50 + [2024] * 50
+
+
+def test_leitura_tipada_em_blocos_equivale_a_clean_data_do_texto(tmp_path, monkeypatch):
+    csv = tmp_path / "PEDE2024.csv"
+    csv.write_text(
+        "RA;IAA 2024;IEG 2024;INDE 2024;Idade;Defasagem 2024;Fase\n"
+        "RA-1;7,5;8.25;1.234,5;1/17/00;-1;3\n"
+        "RA-2;;abc;6,1;15;0;ALFA\n"
+        "RA-3;12;9;7;40;x;2\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(utils, "LIMIAR_LEITURA_EM_BLOCOS_BYTES", 0)
+    monkeypatch.setattr(utils, "LINHAS_POR_BLOCO", 2)
+    df = load_data({"2024": str(csv)})
+
+    assert df["IAA"].iloc[0] == 7.5
+    assert pd.isna(df["IAA"].iloc[1])
+    assert df["INDE"].tolist() == [1234.5, 6.1, 7.0]
+    assert df["Idade"].tolist() == [17.0, 15.0, 40.0]
+    # clean_data dá o mesmo resultado partindo das colunas tipadas ou do texto original
+    texto = pd.read_csv(csv, sep=";", dtype=str).rename(columns=utils.mapa_renomeacao("2024"))
+    texto["Ano_Base"] = 2024
+    pd.testing.assert_frame_equal(
+        clean_data(df).reset_index(drop=True),
+        clean_data(texto[df.columns]).reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_load_data_ano_sem_mapa_usa_formato_de_2024(tmp_path):
+    csv = tmp_path / "PEDE2031.csv"
+    csv.write_text("RA;IAA 2031;Defasagem 2031;Pedra 2031\nRA-1;7,5;-1;Topazio\n", encoding="utf-8")
+
+    df = load_data({"2031": str(csv)})
+
+    assert utils.mapa_renomeacao("2031")["IAA 2031"] == "IAA"
+    assert df.columns.tolist() == ["IAA", "Defasagem", "Ano_Base", "Pedra", "RA"]
+    assert df["Ano_Base"].iloc[0] == 2031